@@ -0,0 +1,26 @@
+from typing import Optional
+import hmac
+import os
+
+from fastapi import Header, HTTPException
+
+
+ADMIN_TOKEN_HEADER = 'X-Admin-Token'
+
+
+def admin_token() -> Optional[str]:
+    """管理员令牌，取环境变量 ADMIN_TOKEN，未设置时管理接口全部关闭"""
+    return os.environ.get('ADMIN_TOKEN') or None
+
+
+def is_admin_token(token: Optional[str]) -> bool:
+    expected = admin_token()
+    if not expected or not token:
+        return False
+    return hmac.compare_digest(token.encode('utf-8'), expected.encode('utf-8'))
+
+
+async def require_admin(x_admin_token: Optional[str] = Header(None, description="管理员令牌")):
+    """管理接口依赖：校验 X-Admin-Token 请求头"""
+    if not is_admin_token(x_admin_token):
+        raise HTTPException(status_code=403, detail="需要管理员权限")
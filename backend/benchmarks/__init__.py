@@ -0,0 +1,6 @@
+"""EventService 性能基准测试
+
+- generator: 按倍数生成与 data/ 目录结构一致的合成数据
+- run: 在合成数据上运行基准场景，结果保存为 JSON
+- loadtest: 按前端调用组合对 HTTP 接口并发压测
+"""
@@ -0,0 +1,371 @@
+"""合成数据生成器
+
+按倍数（相对约5000条事件的原始数据量）生成 raw_conflict / conflict_event_detail /
+info_merge / conflict_event / phone_master_index / people_info_simple 文件，
+保持中文描述、脱敏手机号/身份证、聚类规模分布等特征与真实数据接近。
+
+用法（在 backend 目录下）：
+    python -m benchmarks.generator --scale 10 --output /tmp/bench_data
+"""
+import argparse
+import json
+import os
+from collections import Counter
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+BASE_EVENTS = 5000
+
+TOWNS = {
+    '集士港镇': ('JSGW', 805), '高桥镇': ('GQW', 793), '古林镇': ('GLW', 675),
+    '石碶街道': ('SQW', 610), '望春街道': ('WCW', 401), '江厦街道': ('JXIW', 389),
+    '段塘街道': ('DUTW', 381), '南门街道': ('NMW', 334), '西门街道': ('XMEW', 290),
+    '白云街道': ('BYW', 284), '鼓楼街道': ('GLOW', 209), '洞桥镇': ('DQW', 200),
+    '月湖街道': ('YHW', 180), '横街镇': ('HJW', 150), '鄞江镇': ('YJW', 120),
+    '章水镇': ('ZSW', 90), '龙观乡': ('LGW', 60),
+}
+
+COMMUNITIES = [
+    '井亭社区', '秋实社区', '集士港村', '明馨社区', '丽园社区', '祝家桥村', '胜丰社区',
+    '岳童村', '梁祝社区', '长乐社区', '万众村', '新街社区', '郡庙社区', '南苑社区',
+]
+
+GRIDS = ['警情分流网格', '公安网格', '城市网格', '农村网格']
+
+LEVELS = (['三级事件', '二级事件', '四级事件'], [0.71, 0.27, 0.02])
+
+CATEGORIES = {
+    '消费纠纷': ('消费问题', [
+        '来电称客人因为退钱的事情，一直在店里影响营业。',
+        '我在这家店买的东西有质量问题，商家不给退换，发生纠纷',
+        '我来这边消费，本来要营业到凌晨，现在提前赶我们走，引起纠纷',
+        '这里有顾客不付钱，产生纠纷，报警人电话：',
+        '充值的会员卡店家不认账，要求退款被拒绝',
+    ]),
+    '经济纠纷': ('经济（债务）问题', [
+        '因为修房子的事情引起，民工和我老婆正在吵架，报警人电话',
+        '朋友借钱一直不还，现在联系不上，要求处理',
+        '合伙做生意分账不清，双方在店门口争执',
+    ]),
+    '邻里纠纷': ('邻里问题', [
+        '楼上邻居半夜一直很吵，上去沟通发生争吵',
+        '邻居把建筑垃圾堆放在我家门口，双方发生口角',
+        '邻居家空调外机对着我家窗户，多次协商无果',
+    ]),
+    '劳动人事（就业）纠纷': ('劳资问题', [
+        '老板拖欠工资不给，现在在公司门口讨薪',
+        '为房主提供装修服务后未获得约定报酬，雇主拒不见面',
+        '3个工人因为工钱的事情，现在不让工厂生产',
+    ]),
+    '物业管理纠纷': ('物业问题', [
+        '物业乱收停车费，和保安发生争执',
+        '小区物业不让装修工人进入，双方吵起来了',
+    ]),
+    '家庭婚姻纠纷': ('家庭问题', [
+        '和老公因为孩子的事情吵架，现在情绪激动',
+        '家里老人赡养问题兄弟姐妹之间发生争吵',
+    ]),
+    '公共秩序纠纷': ('公共秩序问题', [
+        '有人在路边占道经营，劝说后发生争执',
+        '广场舞音乐太吵，附近居民与跳舞人员发生争吵',
+    ]),
+    '租赁纠纷': ('租赁问题', [
+        '我与房东因为租金问题产生纠纷，报警人电话：',
+        '租车合同到期押金不退，多次催促未处理',
+        '房东要提前收回房子，不退押金',
+    ]),
+    '司乘纠纷': ('司乘（代驾）问题', [
+        '我们打了出租车，司机记错了地址，中途把我们放下了，态度恶劣',
+        '网约车司机拒载，还骂我，发生纠纷',
+        '乘客手机落在车上，司机送回来后乘客不肯下来拿',
+    ]),
+}
+
+RESULTS = [
+    '镇街科室: 情指转派属地所出警处置办结',
+    '镇街科室: 刚刚报警人打电话过来，已调解好了，不用处理了.',
+    '镇街科室: 已联系双方到所调解，双方达成一致',
+    '镇街科室: 已告知当事人通过法律途径解决',
+]
+
+DEPARTMENTS = (['非警务协同处置', '综合治理办', '综合指挥室', '新街社区', '郡庙社区'],
+               [0.5, 0.3, 0.1, 0.05, 0.05])
+
+PHONE_PREFIXES = ['130', '131', '133', '138', '139', '151', '152', '158', '159',
+                  '176', '177', '181', '183', '186', '189', '191', '192']
+
+SURNAMES = list('王李张刘陈杨黄赵吴周徐孙马朱胡郭何高林罗郑梁谢宋唐许韩冯邓曹彭曾肖田董袁潘蒋蔡余杜叶程苏魏吕丁任沈姚卢姜崔钟谭陆汪范金石廖贾夏韦付方白邹孟熊秦邱江尹薛闫段雷侯龙史陶黎贺顾毛郝龚邵万钱严覃武戴莫孔向汤')
+GIVEN = list('伟芳娜秀敏静丽强磊军洋勇艳杰娟涛明超兰霞平刚桂英华玉萍红建国文辉力永健世广志义兴良海山仁波宁贵福生龙元全胜学祥才发武新利清飞彬富顺信子杰涛昌成康星光天达安岩中茂进林有坚和彪博诚先敬震振壮会思群豪心邦承乐绍功松善厚庆磊民友裕河哲江超浩亮政谦亨奇固之轮翰朗伯宏言若鸣朋斌梁栋维启克伦翔旭鹏泽晨辰士以建家致树炎德行时泰盛雄琛钧冠策腾楠榕风航弘')
+
+RAW_COLUMNS = [
+    '事件编号', '事件描述', '区县名称', '镇街名称', '村社名称', '网格名称', '事件级别', '事件类型',
+    '二级分类', '四条跑道', '标注类型', '事件状态', '事件详细状态', '上报时间', '最后派发时间',
+    '最后受理时间', '办结时间', '处置结果', '办结职能科室/部门', '上报人', '网格类型', '数据来源', '所属组织',
+]
+
+
+def _masked_phones(rng: np.random.Generator, n: int) -> np.ndarray:
+    prefixes = rng.choice(PHONE_PREFIXES, n)
+    suffixes = np.char.zfill(rng.integers(0, 10000, n).astype(str), 4)
+    return np.char.add(np.char.add(prefixes, '****'), suffixes).astype(object)
+
+
+def _full_phones(rng: np.random.Generator, n: int) -> np.ndarray:
+    prefixes = rng.choice(PHONE_PREFIXES, n)
+    suffixes = np.char.zfill(rng.integers(0, 10 ** 8, n).astype(str), 8)
+    return np.char.add(prefixes, suffixes).astype(object)
+
+
+def _id_cards(rng: np.random.Generator, n: int) -> np.ndarray:
+    regions = rng.choice(['330203', '330205', '330212', '341200', '513700', '520200'], n)
+    births = pd.to_datetime('1950-01-01') + pd.to_timedelta(rng.integers(0, 365 * 55, n), unit='D')
+    seq = np.char.zfill(rng.integers(0, 10000, n).astype(str), 4)
+    ids = np.char.add(np.char.add(regions, births.strftime('%Y%m%d').to_numpy().astype(str)), seq)
+    return ids.astype(object)
+
+
+def _mask_id_cards(ids: np.ndarray) -> np.ndarray:
+    ids = pd.Series(ids, dtype=object)
+    return (ids.str[:4] + '*****' + ids.str[-4:]).to_numpy()
+
+
+def _names(rng: np.random.Generator, n: int) -> np.ndarray:
+    names = np.char.add(rng.choice(SURNAMES, n), rng.choice(GIVEN, n))
+    two_chars = rng.random(n) < 0.6
+    names = np.where(two_chars, np.char.add(names, rng.choice(GIVEN, n)), names)
+    return names.astype(object)
+
+
+def _raw_time(times: pd.Series) -> pd.Series:
+    """原始数据的时间格式：d/m/yy H:MM"""
+    return (times.dt.day.astype(str) + '/' + times.dt.month.astype(str) + '/' + times.dt.strftime('%y')
+            + ' ' + times.dt.hour.astype(str) + ':' + times.dt.strftime('%M'))
+
+
+def generate(output_dir: str, scale: float = 1.0, seed: int = 42,
+             start: str = '2025-01-01', days: int = 180) -> Dict[str, int]:
+    """生成合成数据文件，返回各文件的行数"""
+    rng = np.random.default_rng(seed)
+    n = max(int(BASE_EVENTS * scale), 10)
+    os.makedirs(output_dir, exist_ok=True)
+
+    # 人员池：多数号码只出现一两次，少量号码反复报警
+    n_persons = max(int(n * 0.8), 50)
+    person_phones = _masked_phones(rng, n_persons)
+    person_names = _names(rng, n_persons)
+    person_id_full = _id_cards(rng, n_persons)
+    person_ids = _mask_id_cards(person_id_full)
+
+    repeaters = max(n_persons // 50, 5)
+    callers = rng.integers(0, n_persons, n)
+    repeat_mask = rng.random(n) < 0.15
+    callers[repeat_mask] = (rng.zipf(1.5, repeat_mask.sum()) - 1) % repeaters
+
+    # 时间、地点、分类
+    base = pd.Timestamp(start)
+    report = base + pd.to_timedelta(rng.integers(0, days * 24 * 60, n), unit='m')
+    report = pd.Series(report).dt.floor('min')
+
+    town_names = list(TOWNS)
+    town_weights = np.array([TOWNS[t][1] for t in town_names], dtype=float)
+    towns = rng.choice(town_names, n, p=town_weights / town_weights.sum())
+    communities = np.where(rng.random(n) < 0.8, '公众社区', rng.choice(COMMUNITIES, n))
+    grids = rng.choice(GRIDS, n, p=[0.67, 0.14, 0.13, 0.06])
+
+    category_names = list(CATEGORIES)
+    categories = rng.choice(category_names, n)
+
+    # 聚类：约3成事件属于多事件聚类，规模服从几何分布；
+    # 同一聚类沿用首个事件的报警人、分类和镇街，上报时间在首个事件之后的几天内
+    order = rng.permutation(n)
+    n_clustered = int(n * 0.3)
+    sizes = rng.geometric(0.45, max(n_clustered, 1)) + 1
+    sizes = sizes[np.cumsum(sizes) <= n_clustered]
+    sizes = np.concatenate([sizes, np.ones(n - sizes.sum(), dtype=np.int64)])
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+
+    cluster_of = np.empty(n, dtype=np.int64)
+    cluster_of[order] = np.repeat(np.arange(len(sizes)), sizes)
+    rank = np.empty(n, dtype=np.int64)
+    rank[order] = np.arange(n) - np.repeat(starts, sizes)
+    lead = order[starts][cluster_of]
+
+    callers = callers[lead]
+    categories = categories[lead]
+    towns = towns[lead]
+    gaps = pd.to_timedelta(np.round(rng.exponential(24 * 60, n)) * (rank > 0), unit='m')
+    report = report.iloc[lead].reset_index(drop=True) + gaps
+
+    event_uid = np.char.add('CLUSTER_', np.char.zfill((cluster_of + 1).astype(str), 6)).astype(object)
+    sequence_total = sizes[cluster_of]
+    cluster_rows = pd.DataFrame({'cluster': cluster_of, 'time': report}).groupby('cluster')['time'].agg(['min', 'max'])
+    cluster_rows = list(zip(
+        np.char.add('CLUSTER_', np.char.zfill((cluster_rows.index.to_numpy() + 1).astype(str), 6)),
+        sizes, cluster_rows['min'], cluster_rows['max'], order[starts]
+    ))
+
+    caller_phones = person_phones[callers]
+
+    # 描述、处置结果、时效
+    descriptions = np.empty(n, dtype=object)
+    tags = np.empty(n, dtype=object)
+    for category in category_names:
+        mask = categories == category
+        tag, templates = CATEGORIES[category]
+        descriptions[mask] = rng.choice(templates, mask.sum())
+        tags[mask] = tag
+    descriptions = (pd.Series(descriptions) + pd.Series(caller_phones) + ' #非警务#纠纷事项#'
+                    + pd.Series(tags) + '#报警电话:' + pd.Series(caller_phones)).to_numpy()
+
+    dispatch = report + pd.to_timedelta(rng.integers(0, 6, n), unit='m')
+    accept = dispatch + pd.to_timedelta(rng.integers(5, 90, n), unit='m')
+    close = accept + pd.to_timedelta(np.round(rng.lognormal(6.5, 1.0, n)), unit='m')
+
+    event_ids = np.char.add(
+        np.char.add(np.array([TOWNS[t][0] for t in towns]), report.dt.strftime('%Y%m%d').to_numpy().astype(str)),
+        np.char.zfill(np.arange(n).astype(str), 6)
+    ).astype(object)
+
+    raw = pd.DataFrame({
+        '事件编号': event_ids,
+        '事件描述': descriptions,
+        '区县名称': '海曙区',
+        '镇街名称': towns,
+        '村社名称': communities,
+        '网格名称': grids,
+        '事件级别': rng.choice(LEVELS[0], n, p=LEVELS[1]),
+        '事件类型': '矛盾纠纷',
+        '二级分类': categories,
+        '四条跑道': '平安法治',
+        '标注类型': '矛盾纠纷',
+        '事件状态': '归档',
+        '事件详细状态': '归档',
+        '上报时间': report,
+        '最后派发时间': dispatch,
+        '最后受理时间': accept,
+        '办结时间': close,
+        '处置结果': rng.choice(RESULTS, n),
+        '办结职能科室/部门': rng.choice(DEPARTMENTS[0], n, p=DEPARTMENTS[1]),
+        '上报人': np.char.add(np.array([TOWNS[t][0][:-1].lower() for t in towns]), '9927a'),
+        '网格类型': grids,
+        '数据来源': '基层智治、全量矛调',
+        '所属组织': '海曙区/' + pd.Series(towns) + '/' + pd.Series(communities) + '/' + pd.Series(grids),
+    })
+
+    # 参与人：报警人 + 部分事件的对方/第二报警人
+    participants = [[{'name': None, 'role': '报警人', 'id': None, 'phone': phone}] for phone in caller_phones]
+    with_name = rng.random(n) < 0.3
+    for i in np.flatnonzero(with_name):
+        participants[i][0]['name'] = person_names[callers[i]]
+        participants[i][0]['id'] = person_ids[callers[i]]
+    opponents = rng.integers(0, n_persons, n)
+    for i in np.flatnonzero(rng.random(n) < 0.12):
+        participants[i].append({'name': person_names[opponents[i]], 'role': '对方',
+                                'id': person_ids[opponents[i]], 'phone': person_phones[opponents[i]]})
+    has_info = rng.random(n) < 0.8
+
+    detail = raw.copy()
+    for col in ['上报时间', '最后派发时间', '最后受理时间', '办结时间']:
+        detail[col] = raw[col] = _raw_time(raw[col])  # 与真实数据一致，两张表都为 d/m/yy H:MM
+    detail['CallerPhone'] = np.where(has_info, caller_phones, '')
+    detail['CallerID'] = [p[0]['id'] or '' if ok else '' for p, ok in zip(participants, has_info)]
+    detail['phone_set'] = ['、'.join(sorted({x['phone'] for x in p})) if ok else ''
+                           for p, ok in zip(participants, has_info)]
+    detail['EventUID'] = event_uid
+    detail['sequence_total'] = sequence_total
+
+    info = pd.DataFrame({
+        'event_id': event_ids[has_info],
+        'extracted_info': [json.dumps(p, ensure_ascii=False) for p, ok in zip(participants, has_info) if ok],
+        'event_extracted_info': [repr(p) for p, ok in zip(participants, has_info) if ok],
+        'result_extracted_info': '',
+    })
+
+    cluster = pd.DataFrame(cluster_rows, columns=['EventUID', 'record_count', 'first', 'last', 'lead'])
+    lead_category = categories[cluster['lead'].to_numpy()]
+    lead_phone = caller_phones[cluster['lead'].to_numpy()]
+    cluster_description = np.where(
+        cluster['record_count'].to_numpy() > 1,
+        '该集群涉及同一' + pd.Series(lead_category) + '的多次报警，报警人（电话尾号'
+        + pd.Series(lead_phone).str[-4:] + '）反复催促处理。前期已协调但未彻底解决，需再次出警调解。',
+        '单次报警的' + pd.Series(lead_category) + '事件，已按流程处置。'
+    )
+    duration = ((cluster['last'] - cluster['first']).dt.total_seconds() / 86400).round().astype(int)
+    conflict_event = pd.DataFrame({
+        'EventUID': cluster['EventUID'],
+        'record_count': cluster['record_count'],
+        'first_report_time': cluster['first'].dt.strftime('%Y-%m-%d %H:%M:%S'),
+        'last_report_time': cluster['last'].dt.strftime('%Y-%m-%d %H:%M:%S'),
+        'sequence_total': cluster['record_count'],
+        'duration_days': duration,
+        'phone_flag': 'has_phone',
+        'created_time': pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'cluster_description': cluster_description,
+    })
+
+    # 人员分析：按号码汇总参与的事件
+    flat = pd.DataFrame(
+        [(event_ids[i], x['phone'], x['name'] or '', x['id'] or '', x['role'])
+         for i in np.flatnonzero(has_info) for x in participants[i]],
+        columns=['event_id', 'phone', 'name', 'id_card', 'role']
+    )
+    rows = []
+    for phone, group in flat.groupby('phone', sort=False):
+        names = Counter(x for x in group['name'] if x)
+        ids = Counter(x for x in group['id_card'] if x)
+        roles = Counter(group['role'])
+        rows.append({
+            'phone': phone,
+            'name': names.most_common(1)[0][0] if names else '',
+            'id_card': ids.most_common(1)[0][0] if ids else '',
+            'primary_role': roles.most_common(1)[0][0],
+            'total_events': len(group),
+            'event_count': group['event_id'].nunique(),
+            'name_candidates': repr(dict(names)) if len(names) > 1 else '',
+            'id_candidates': repr(dict(ids)) if len(ids) > 1 else '',
+            'role_distribution': repr(dict(roles)),
+            'related_events': repr(list(dict.fromkeys(group['event_id']))[:10]),
+        })
+    phone_master = pd.DataFrame(rows)
+
+    n_people = max(n // 20, 13)
+    picked = rng.choice(n_persons, n_people, replace=False) if n_people <= n_persons else np.arange(n_persons)
+    people = pd.DataFrame({
+        'person_id': np.arange(1, len(picked) + 1),
+        'id_card_no': person_id_full[picked],
+        'name_cn': person_names[picked],
+        'mobile_phone': _full_phones(rng, len(picked)),
+        'gender': rng.integers(1, 3, len(picked)),
+        'birth_date': pd.to_datetime(pd.Series(person_id_full[picked]).str[6:14], format='%Y%m%d').dt.strftime('%Y-%m-%d'),
+    })
+
+    files = {
+        'raw_conflict.csv': raw[RAW_COLUMNS],
+        'conflict_event_detail.csv': detail,
+        'info_merge.csv': info,
+        'conflict_event.csv': conflict_event,
+        'phone_master_index.csv': phone_master,
+        'people_info_simple.csv': people,
+    }
+    for filename, df in files.items():
+        quoting = 1 if filename == 'people_info_simple.csv' else 0
+        df.to_csv(os.path.join(output_dir, filename), index=False, quoting=quoting)
+    return {filename: len(df) for filename, df in files.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='生成合成基准数据')
+    parser.add_argument('--scale', type=float, default=1.0, help='数据量倍数（1 约为5000条事件）')
+    parser.add_argument('--output', required=True, help='输出目录')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子')
+    args = parser.parse_args()
+
+    counts = generate(args.output, scale=args.scale, seed=args.seed)
+    for filename, count in counts.items():
+        print(f"{filename}: {count} 行")
+
+
+if __name__ == '__main__':
+    main()
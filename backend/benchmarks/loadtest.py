@@ -0,0 +1,352 @@
+"""HTTP 层压测工具
+
+按前端 api.js 中的调用组合并发回放请求（列表翻页、搜索、详情等），
+统计各接口的 p50/p95/p99 延迟、吞吐量、延迟直方图和错误数。只依赖标准库，不需要外部服务。
+
+用法（在 backend 目录下）：
+    # 进程内启动应用（可配合 EVENT_DATA_DIR 使用合成数据）
+    python -m benchmarks.loadtest --concurrency 16 --duration 30
+
+    # 以多 worker 子进程方式启动 uvicorn，对比不同 worker 数
+    python -m benchmarks.loadtest --workers 4 --concurrency 32 --duration 30
+
+    # 压测已运行的服务
+    python -m benchmarks.loadtest --url http://localhost:8000 --concurrency 16
+
+    # 自定义流量组合
+    python -m benchmarks.loadtest --mix events_page=5,event_detail=3,events_search=1
+"""
+import argparse
+import http.client
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import quote, urlencode, urlsplit
+
+# 默认流量组合（权重），对应前端页面的调用
+DEFAULT_MIX = {
+    'events_page': 30,            # EventList 翻页 getEvents
+    'events_filtered': 10,        # EventList 筛选 getEvents(town/level/category)
+    'events_search': 8,           # EventList 搜索 getEvents(search)
+    'event_detail': 15,           # EventDetail getEventDetail
+    'cluster_list': 10,           # ClusterList getClusterList
+    'cluster_detail': 8,          # ClusterDetail getClusterDetail
+    'filter_options': 5,          # getFilterOptions
+    'cluster_filter_options': 3,  # getClusterFilterOptions
+    'person_analysis': 6,         # PersonAnalysisList
+    'person_analysis_detail': 4,  # PersonAnalysisDetail
+    'health': 1,                  # healthCheck
+}
+
+# 直方图桶上界（毫秒）
+HISTOGRAM_BUCKETS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, float('inf')]
+
+SEARCH_TERMS = ['纠纷', '工资', '邻居', '租金', '出租车', '物业', '报警']
+
+
+class Samples:
+    """压测前从服务拉取的真实编号，用于构造详情请求"""
+
+    def __init__(self):
+        self.event_ids: List[str] = []
+        self.event_uids: List[str] = []
+        self.phones: List[str] = []
+        self.towns: List[str] = []
+        self.levels: List[str] = []
+        self.total_pages = 1
+
+
+def _request(conn: http.client.HTTPConnection, path: str) -> Tuple[int, bytes]:
+    conn.request('GET', path, headers={'Accept': 'application/json', 'Accept-Encoding': 'identity'})
+    response = conn.getresponse()
+    return response.status, response.read()
+
+
+def build_requests(samples: Samples) -> Dict[str, Callable[[random.Random], str]]:
+    """每种流量类型生成一个请求路径"""
+    def events_page(rng):
+        page = min(int(rng.paretovariate(1.5)), samples.total_pages)
+        return '/api/events?' + urlencode({'page': page, 'page_size': 20})
+
+    def events_filtered(rng):
+        params = {'page': 1, 'page_size': 20}
+        if samples.towns:
+            params['town'] = rng.choice(samples.towns)
+        if samples.levels and rng.random() < 0.5:
+            params['level'] = rng.choice(samples.levels)
+        return '/api/events?' + urlencode(params)
+
+    def events_search(rng):
+        term = rng.choice(SEARCH_TERMS + samples.phones[:20])
+        return '/api/events?' + urlencode({'page': 1, 'page_size': 20, 'search': term})
+
+    return {
+        'events_page': events_page,
+        'events_filtered': events_filtered,
+        'events_search': events_search,
+        'event_detail': lambda rng: '/api/events/' + quote(rng.choice(samples.event_ids)),
+        'cluster_list': lambda rng: '/api/cluster-list?' + urlencode({'page': rng.randint(1, 5), 'page_size': 20}),
+        'cluster_detail': lambda rng: '/api/clusters/' + quote(rng.choice(samples.event_uids)),
+        'filter_options': lambda rng: '/api/filter-options',
+        'cluster_filter_options': lambda rng: '/api/cluster-filter-options',
+        'person_analysis': lambda rng: '/api/person-analysis?' + urlencode({'page': rng.randint(1, 5), 'page_size': 20}),
+        'person_analysis_detail': lambda rng: '/api/person-analysis/' + quote(rng.choice(samples.phones)),
+        'health': lambda rng: '/api/health',
+    }
+
+
+def collect_samples(host: str, port: int) -> Samples:
+    conn = http.client.HTTPConnection(host, port, timeout=60)
+    samples = Samples()
+
+    _, body = _request(conn, '/api/events?page=1&page_size=100')
+    events = json.loads(body)
+    samples.event_ids = [item['事件编号'] for item in events['items']]
+    samples.total_pages = max(events['total'] // 20, 1)
+    # 聚类详情按事件表的 EventUID 查询，聚合事件列表中的 EventUID 不一定能在事件表中找到成员
+    samples.event_uids = list(dict.fromkeys(item['EventUID'] for item in events['items'] if item.get('EventUID')))
+
+    _, body = _request(conn, '/api/person-analysis?page=1&page_size=100')
+    samples.phones = [item['phone'] for item in json.loads(body)['items']]
+
+    _, body = _request(conn, '/api/filter-options')
+    options = json.loads(body)
+    samples.towns = options.get('towns', [])
+    samples.levels = options.get('levels', [])
+    conn.close()
+    return samples
+
+
+class Recorder:
+    """线程安全地记录每个请求的延迟和结果"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def record(self, name: str, elapsed_ms: float, error: Optional[str] = None):
+        with self._lock:
+            if error is None:
+                self.latencies[name].append(elapsed_ms)
+            else:
+                self.errors[name][error] += 1
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, max(0, math.ceil(q * len(sorted_values)) - 1))
+    return sorted_values[idx]
+
+
+def _histogram(values: List[float]) -> Dict[str, int]:
+    counts = [0] * len(HISTOGRAM_BUCKETS)
+    for value in values:
+        counts[bisect_left(HISTOGRAM_BUCKETS, value)] += 1
+    labels = [f"<={upper:g}ms" for upper in HISTOGRAM_BUCKETS[:-1]] + [f">{HISTOGRAM_BUCKETS[-2]:g}ms"]
+    return dict(zip(labels, counts))
+
+
+def summarise(recorder: Recorder, elapsed_s: float) -> Dict[str, Any]:
+    endpoints = {}
+    total_ok = 0
+    total_errors = 0
+    for name in sorted(set(recorder.latencies) | set(recorder.errors)):
+        values = sorted(recorder.latencies.get(name, []))
+        errors = dict(recorder.errors.get(name, {}))
+        n_errors = sum(errors.values())
+        total_ok += len(values)
+        total_errors += n_errors
+        endpoints[name] = {
+            'requests': len(values) + n_errors,
+            'errors': errors,
+            'throughput_rps': round(len(values) / elapsed_s, 2) if elapsed_s else 0,
+            'p50_ms': round(_percentile(values, 0.50), 2),
+            'p95_ms': round(_percentile(values, 0.95), 2),
+            'p99_ms': round(_percentile(values, 0.99), 2),
+            'max_ms': round(values[-1], 2) if values else 0,
+            'histogram': _histogram(values),
+        }
+    return {
+        'elapsed_s': round(elapsed_s, 2),
+        'requests': total_ok + total_errors,
+        'errors': total_errors,
+        'throughput_rps': round(total_ok / elapsed_s, 2) if elapsed_s else 0,
+        'endpoints': endpoints,
+    }
+
+
+def run_load(host: str, port: int, mix: Dict[str, float], concurrency: int,
+             duration: Optional[float], total_requests: Optional[int], seed: int = 0) -> Dict[str, Any]:
+    samples = collect_samples(host, port)
+    builders = build_requests(samples)
+    names = [name for name in mix if name in builders and mix[name] > 0]
+    weights = [mix[name] for name in names]
+    recorder = Recorder()
+
+    deadline = time.perf_counter() + duration if duration else None
+    remaining = [total_requests] if total_requests else None
+    remaining_lock = threading.Lock()
+
+    def take() -> bool:
+        if deadline is not None and time.perf_counter() >= deadline:
+            return False
+        if remaining is not None:
+            with remaining_lock:
+                if remaining[0] <= 0:
+                    return False
+                remaining[0] -= 1
+        return True
+
+    def worker(worker_id: int):
+        rng = random.Random(seed + worker_id)
+        conn = http.client.HTTPConnection(host, port, timeout=60)
+        while take():
+            name = rng.choices(names, weights)[0]
+            path = builders[name](rng)
+            start = time.perf_counter()
+            try:
+                status, _ = _request(conn, path)
+                elapsed = (time.perf_counter() - start) * 1000
+                recorder.record(name, elapsed, None if status < 400 else f"HTTP {status}")
+            except (OSError, http.client.HTTPException) as e:
+                recorder.record(name, 0, type(e).__name__)
+                conn.close()
+                conn = http.client.HTTPConnection(host, port, timeout=60)
+        conn.close()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, range(concurrency)))
+    return summarise(recorder, time.perf_counter() - start)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_ready(host: str, port: int, timeout: float = 300):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection(host, port, timeout=5)
+            status, _ = _request(conn, '/api/ready')
+            conn.close()
+            if status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"服务在 {timeout} 秒内未就绪")
+
+
+def start_in_process(port: int):
+    """在后台线程中启动 uvicorn（单进程）"""
+    import uvicorn
+    from main import app
+
+    server = uvicorn.Server(uvicorn.Config(app, host='127.0.0.1', port=port, log_level='warning'))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    return server, thread
+
+
+def start_subprocess(port: int, workers: int) -> subprocess.Popen:
+    """以子进程方式启动多 worker 的 uvicorn"""
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'main:app', '--host', '127.0.0.1', '--port', str(port),
+         '--workers', str(workers), '--log-level', 'warning'],
+        cwd=backend_dir,
+    )
+
+
+def parse_mix(value: Optional[str]) -> Dict[str, float]:
+    if not value:
+        return dict(DEFAULT_MIX)
+    if os.path.exists(value):
+        with open(value, encoding='utf-8') as f:
+            return {k: float(v) for k, v in json.load(f).items()}
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def print_report(result: Dict[str, Any]):
+    print(f"\n总请求 {result['requests']}，错误 {result['errors']}，耗时 {result['elapsed_s']}s，"
+          f"吞吐 {result['throughput_rps']} req/s")
+    print(f"{'endpoint':26s} {'reqs':>7s} {'err':>5s} {'rps':>8s} {'p50':>9s} {'p95':>9s} {'p99':>9s} {'max':>9s}")
+    for name, stats in result['endpoints'].items():
+        errors = sum(stats['errors'].values())
+        print(f"{name:26s} {stats['requests']:>7d} {errors:>5d} {stats['throughput_rps']:>8.1f} "
+              f"{stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f} {stats['max_ms']:>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='HTTP 层压测')
+    parser.add_argument('--url', help='压测已运行的服务，如 http://localhost:8000')
+    parser.add_argument('--workers', type=int, default=0, help='以子进程启动 uvicorn 的 worker 数（0 表示进程内启动）')
+    parser.add_argument('--data-dir', help='被测服务使用的数据目录（设置 EVENT_DATA_DIR）')
+    parser.add_argument('--concurrency', type=int, default=8, help='并发连接数')
+    parser.add_argument('--duration', type=float, default=20, help='压测时长（秒）')
+    parser.add_argument('--requests', type=int, help='总请求数（指定后忽略时长）')
+    parser.add_argument('--mix', help='流量组合，如 events_page=5,event_detail=3，或 JSON 文件路径')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    parser.add_argument('--output', help='结果JSON输出路径')
+    args = parser.parse_args()
+
+    if args.data_dir:
+        os.environ['EVENT_DATA_DIR'] = os.path.abspath(args.data_dir)
+
+    process = None
+    if args.url:
+        parts = urlsplit(args.url)
+        host, port = parts.hostname, parts.port or 80
+    else:
+        host, port = '127.0.0.1', _free_port()
+        if args.workers > 0:
+            process = start_subprocess(port, args.workers)
+        else:
+            start_in_process(port)
+
+    try:
+        _wait_ready(host, port)
+        result = run_load(
+            host, port, parse_mix(args.mix), args.concurrency,
+            duration=None if args.requests else args.duration,
+            total_requests=args.requests, seed=args.seed,
+        )
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    result['config'] = {
+        'target': args.url or ('subprocess' if args.workers else 'in-process'),
+        'workers': args.workers or 1,
+        'concurrency': args.concurrency,
+        'mix': parse_mix(args.mix),
+    }
+    print_report(result)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
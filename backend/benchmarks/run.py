@@ -0,0 +1,184 @@
+"""EventService 基准测试场景
+
+在合成数据上测量数据加载、事件列表（有/无搜索）、聚类详情、人员分析详情和脱敏人口搜索的耗时，
+结果保存为 JSON，可与上一次结果对比。
+
+用法（在 backend 目录下）：
+    python -m benchmarks.run --scale 10 --output benchmarks/results/scale10.json
+    python -m benchmarks.run --scale 10 --compare benchmarks/results/scale10.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.generator import generate
+from models import PersonAnalysisQuery, PersonSearchQuery
+from services import EventService
+
+
+def measure(fn: Callable[[], Any], repeat: int = 5, warmup: int = 1) -> Dict[str, float]:
+    """多次执行并统计耗时（毫秒）"""
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        'runs': repeat,
+        'min_ms': round(timings[0], 3),
+        'median_ms': round(statistics.median(timings), 3),
+        'mean_ms': round(statistics.fmean(timings), 3),
+        'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+        'max_ms': round(timings[-1], 3),
+    }
+
+
+def _samples(service: EventService) -> Dict[str, Any]:
+    """挑选有代表性的查询参数：最大聚类、事件最多的号码、存在的人口记录"""
+    cluster_sizes = service.detail_df['EventUID'].astype(str).value_counts()
+    phones = service.phone_master_df.sort_values('event_count', ascending=False)['phone'].astype(str)
+    person = service.people_df.iloc[len(service.people_df) // 2]
+    mobile = str(person['mobile_phone'])
+    id_card = str(person['id_card_no'])
+    report_times = service._event_times[~np.isnat(service._event_times)]
+    latest = pd.Timestamp(report_times.max()) if len(report_times) else pd.Timestamp.now()
+    return {
+        'cluster_uid': cluster_sizes.index[0],
+        'top_phone': phones.iloc[0],
+        'event_id': str(service.detail_df['事件编号'].iloc[len(service.detail_df) // 2]),
+        'masked_phone': mobile[:3] + '****' + mobile[-4:],
+        'masked_id_card': id_card[:4] + '*' * 10 + id_card[-4:],
+        'week_start': (latest - pd.Timedelta(days=7)).to_pydatetime(),
+        'week_end': latest.to_pydatetime(),
+    }
+
+
+def scenarios(service: EventService, s: Dict[str, Any]) -> Dict[str, Callable[[], Any]]:
+    return {
+        'get_events_page1': lambda: service.get_events(page=1, page_size=20),
+        'get_events_deep_page': lambda: service.get_events(page=max(len(service.detail_df) // 40, 1), page_size=20),
+        'get_events_filtered': lambda: service.get_events(town='街道', level='三级', category='纠纷'),
+        'get_events_time_range': lambda: service.get_events(start_time=s['week_start'], end_time=s['week_end']),
+        'get_events_search_text': lambda: service.get_events(search='纠纷'),
+        'get_events_search_phone': lambda: service.get_events(search=s['top_phone']),
+        'get_event_detail': lambda: service.get_event_detail(s['event_id']),
+        'get_cluster_list': lambda: service.get_cluster_list(page=1, page_size=20),
+        'get_cluster_detail': lambda: service.get_cluster_detail(s['cluster_uid']),
+        'get_person_analysis': lambda: service.get_person_analysis(PersonAnalysisQuery(page=1, page_size=20)),
+        'get_person_analysis_search': lambda: service.get_person_analysis(PersonAnalysisQuery(search='王')),
+        'get_person_analysis_detail': lambda: service.get_person_analysis_detail(s['top_phone']),
+        'search_people_masked_phone': lambda: service.search_people(PersonSearchQuery(phone=s['masked_phone'])),
+        'search_people_masked_id_card': lambda: service.search_people(PersonSearchQuery(id_card=s['masked_id_card'])),
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(scale: float, repeat: int, data_dir: Optional[str] = None, seed: int = 42,
+        only: Optional[List[str]] = None) -> Dict[str, Any]:
+    """生成（或复用）数据并运行全部场景"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if data_dir is None:
+            data_dir = tmp_dir
+            generate(data_dir, scale=scale, seed=seed)
+
+        results: Dict[str, Dict[str, float]] = {}
+        load_repeat = 1 if scale >= 100 else min(repeat, 3)
+        results['load_data'] = measure(lambda: EventService(data_dir=data_dir, lazy=False), repeat=load_repeat, warmup=0)
+        results['load_events_table'] = measure(lambda: EventService(data_dir=data_dir).detail_df, repeat=load_repeat, warmup=0)
+
+        service = EventService(data_dir=data_dir, lazy=False)
+        samples = _samples(service)
+        for name, fn in scenarios(service, samples).items():
+            if only and name not in only:
+                continue
+            results[name] = measure(fn, repeat=repeat)
+            print(f"{name:32s} median {results[name]['median_ms']:>10.2f} ms", file=sys.stderr)
+
+        rows = {
+            'events': len(service.detail_df),
+            'clusters': len(service.cluster_df),
+            'info': len(service.info_df),
+            'people': len(service.people_df),
+            'phone_master': len(service.phone_master_df),
+        }
+
+    return {
+        'meta': {
+            'scale': scale,
+            'seed': seed,
+            'repeat': repeat,
+            'rows': rows,
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'git_commit': _git_commit(),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+        },
+        'results': results,
+    }
+
+
+def compare(current: Dict[str, Any], previous: Dict[str, Any]):
+    """按中位数对比两次结果"""
+    print(f"{'scenario':32s} {'previous':>12s} {'current':>12s} {'ratio':>8s}")
+    for name, stats in current['results'].items():
+        before = previous.get('results', {}).get(name)
+        if not before:
+            print(f"{name:32s} {'-':>12s} {stats['median_ms']:>12.2f} {'-':>8s}")
+            continue
+        ratio = stats['median_ms'] / before['median_ms'] if before['median_ms'] else float('inf')
+        flag = '  <-- slower' if ratio > 1.2 else ''
+        print(f"{name:32s} {before['median_ms']:>12.2f} {stats['median_ms']:>12.2f} {ratio:>7.2f}x{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='EventService 基准测试')
+    parser.add_argument('--scale', type=float, default=1.0, help='数据量倍数（1 约为5000条事件）')
+    parser.add_argument('--repeat', type=int, default=5, help='每个场景的重复次数')
+    parser.add_argument('--data-dir', help='使用已有数据目录，不生成合成数据')
+    parser.add_argument('--seed', type=int, default=42, help='合成数据随机种子')
+    parser.add_argument('--only', nargs='*', help='只运行指定场景')
+    parser.add_argument('--output', help='结果JSON输出路径')
+    parser.add_argument('--compare', help='与之前的结果JSON对比')
+    args = parser.parse_args()
+
+    result = run(args.scale, args.repeat, data_dir=args.data_dir, seed=args.seed, only=args.only)
+
+    if args.compare and os.path.exists(args.compare):
+        with open(args.compare, encoding='utf-8') as f:
+            compare(result, json.load(f))
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存: {args.output}", file=sys.stderr)
+    elif not args.compare:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""位图索引：分类列的每个取值一个位图，组合筛选按字（64 位）做位运算
+
+列表页按镇街、级别、分类、相关事件数筛选和人员分析按角色筛选，原来每个条件都对候选行做一次
+字符串包含匹配，生成新的布尔序列和筛选后的拷贝。这些列只有几十个不同取值：筛选条件先在取值上
+匹配，命中取值的位图按位或，各条件再按位与，结果行数即位图中 1 的个数。
+
+位图为 numpy uint64 数组，第 p 行对应第 p // 64 个字的第 p % 64 位。追加行时按容量翻倍扩展，
+增量写入不需要重建。
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+WORD_BITS = 64
+
+# 每个字节中 1 的个数（numpy 1.x 没有 bitwise_count）
+_BYTE_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def _word_count(size: int) -> int:
+    return (size + WORD_BITS - 1) // WORD_BITS
+
+
+def bitmap_from_mask(mask: np.ndarray, offset: int = 0) -> np.ndarray:
+    """布尔数组转为位图；offset 为 mask[0] 在其所在字中的位序号（追加行时对齐已有位图）"""
+    if offset:
+        mask = np.concatenate([np.zeros(offset, dtype=bool), mask])
+    packed = np.packbits(mask, bitorder='little')
+    padded = np.zeros(_word_count(len(mask)) * 8, dtype=np.uint8)
+    padded[:len(packed)] = packed
+    return padded.view('<u8')
+
+
+def bitmap_count(bits: np.ndarray) -> int:
+    """位图中 1 的个数"""
+    return int(_BYTE_POPCOUNT[bits.view(np.uint8)].sum(dtype=np.int64))
+
+
+def bitmap_contains(bits: np.ndarray, positions: np.ndarray) -> np.ndarray:
+    """各行位置在位图中是否为 1"""
+    positions = np.asarray(positions, dtype=np.int64)
+    words = bits[positions >> 6]
+    return ((words >> (positions & 63).astype(np.uint64)) & np.uint64(1)).astype(bool)
+
+
+def bitmap_and(bitmaps: List[np.ndarray]) -> np.ndarray:
+    result = bitmaps[0].copy()
+    for bits in bitmaps[1:]:
+        np.bitwise_and(result, bits, out=result)
+    return result
+
+
+def encode_values(values: Iterable) -> Tuple[np.ndarray, List[str]]:
+    """把一列取值编码为（各行的编码, 编码对应的取值），取值按字符串处理，缺失值为空字符串"""
+    values = values if isinstance(values, pd.Series) else pd.Series(list(values), dtype=object)
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes = values.cat.codes.to_numpy()
+        uniques = [str(value) for value in values.cat.categories]
+        if (codes < 0).any():
+            uniques.append('')
+            codes = np.where(codes < 0, len(uniques) - 1, codes)
+        return codes, uniques
+    # 用字典编码而不是 pd.factorize，避免在每个字符串对象上缓存 UTF-8 编码（见 storage.py）
+    pool: Dict[str, int] = {}
+    keys = values.fillna('').astype(str).to_numpy()
+    codes = np.fromiter((pool.setdefault(key, len(pool)) for key in keys), dtype=np.int64, count=len(keys))
+    return codes, list(pool)
+
+
+class BitmapIndex:
+    """一列的位图索引：取值 -> 该取值所在行的位图（取值按字符串处理，缺失值为空字符串）"""
+
+    def __init__(self, values: Optional[Iterable] = None):
+        self.size = 0
+        self._capacity = 0  # 每个位图已分配的字数
+        self._bitmaps: Dict[str, np.ndarray] = {}
+        if values is not None:
+            self.add(values)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def values(self) -> List[str]:
+        return list(self._bitmaps)
+
+    def add(self, values: Iterable):
+        """在末尾追加行"""
+        codes, uniques = encode_values(values)
+        first_word, offset = divmod(self.size, WORD_BITS)
+        self.size += len(codes)
+        self._reserve(_word_count(self.size))
+        for code in np.unique(codes):
+            bits = bitmap_from_mask(codes == code, offset)
+            target = self._bitmaps.get(uniques[code])
+            if target is None:
+                target = self._bitmaps[uniques[code]] = np.zeros(self._capacity, dtype=np.uint64)
+            target[first_word:first_word + len(bits)] |= bits
+
+    def _reserve(self, words: int):
+        """保证每个位图至少有 words 个字（按容量翻倍扩展，摊销追加的复制代价）"""
+        if words <= self._capacity:
+            return
+        self._capacity = max(words, self._capacity * 2)
+        for value, bits in self._bitmaps.items():
+            grown = np.zeros(self._capacity, dtype=np.uint64)
+            grown[:len(bits)] = bits
+            self._bitmaps[value] = grown
+
+    def bitmap(self, value: str) -> np.ndarray:
+        """取值的位图（只读视图，没有该取值时为全 0）"""
+        bits = self._bitmaps.get(value)
+        words = _word_count(self.size)
+        return bits[:words] if bits is not None else np.zeros(words, dtype=np.uint64)
+
+    def union(self, values: Iterable[str]) -> np.ndarray:
+        """任一取值所在行的位图"""
+        result = np.zeros(_word_count(self.size), dtype=np.uint64)
+        for value in values:
+            bits = self._bitmaps.get(value)
+            if bits is not None:
+                np.bitwise_or(result, bits[:len(result)], out=result)
+        return result
+
+    def count(self, value: str) -> int:
+        return bitmap_count(self.bitmap(value))
@@ -0,0 +1,143 @@
+from hashlib import blake2b
+from typing import Callable, Iterable, Optional
+from urllib.parse import parse_qsl, urlencode
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.middleware.gzip import GZipMiddleware
+
+from metrics import cache_lookup
+
+try:
+    import brotli
+except ImportError:  # 可选依赖，未安装时只使用 gzip
+    brotli = None
+
+
+def _normalized_query(query_string: bytes) -> str:
+    """查询参数按键排序，参数顺序不同的相同查询得到相同的 ETag"""
+    return urlencode(sorted(parse_qsl(query_string.decode('latin-1'), keep_blank_values=True)))
+
+
+def _etag_matches(if_none_match: Optional[bytes], etag: str) -> bool:
+    """If-None-Match 弱比较（忽略 W/ 前缀），支持多个值和 *"""
+    if not if_none_match:
+        return False
+    tag = etag[2:] if etag.startswith('W/') else etag
+    for candidate in if_none_match.decode('latin-1').split(','):
+        candidate = candidate.strip()
+        if candidate == '*':
+            return True
+        if (candidate[2:] if candidate.startswith('W/') else candidate) == tag:
+            return True
+    return False
+
+
+class ETagMiddleware:
+    """ASGI 中间件：读接口的条件请求
+
+    ETag 由数据版本（数据文件 + 增量写入次数）和路径、查询参数计算，不需要先生成响应。
+    请求头 If-None-Match 与当前 ETag 一致时直接返回 304，不调用接口；
+    否则正常处理，并在 200 响应上附加 ETag 和 Cache-Control: no-cache（浏览器每次都带 ETag 重新验证）。
+    带 X-Profile 头的分析请求总是正常执行。
+    """
+
+    def __init__(self, app, version: Callable[[], str], prefixes: Iterable[str] = ('/api/',),
+                 skip_prefixes: Iterable[str] = ('/api/admin', '/api/ready', '/api/health')):
+        self.app = app
+        self.version = version
+        self.prefixes = tuple(prefixes)
+        self.skip_prefixes = tuple(skip_prefixes)
+
+    def etag(self, scope) -> str:
+        key = f"{scope['path']}?{_normalized_query(scope.get('query_string', b''))}"
+        digest = blake2b(key.encode('utf-8'), digest_size=8).hexdigest()
+        return f'W/"{self.version()}-{digest}"'
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get('path', '')
+        if (scope['type'] != 'http' or scope['method'] not in ('GET', 'HEAD')
+                or not path.startswith(self.prefixes) or path.startswith(self.skip_prefixes)):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get('headers') or [])
+        etag = self.etag(scope)
+        cache_headers = [(b'etag', etag.encode('latin-1')), (b'cache-control', b'no-cache')]
+
+        if_none_match = headers.get(b'if-none-match')
+        if if_none_match is not None and b'x-profile' not in headers:
+            hit = _etag_matches(if_none_match, etag)
+            cache_lookup('etag', hit)
+            if hit:
+                await send({'type': 'http.response.start', 'status': 304, 'headers': cache_headers})
+                await send({'type': 'http.response.body', 'body': b''})
+                return
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start' and message['status'] == 200:
+                message['headers'] = list(message.get('headers', [])) + cache_headers
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+class BrotliResponder:
+    """对完整（非流式）响应体做 brotli 压缩，流式响应和已编码的响应原样发送"""
+
+    def __init__(self, app, minimum_size: int, quality: int):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.quality = quality
+        self.initial_message = None
+        self.passthrough = False
+
+    async def __call__(self, scope, receive, send):
+        async def send_with_brotli(message):
+            if message['type'] == 'http.response.start':
+                self.initial_message = message
+                self.passthrough = 'content-encoding' in Headers(raw=message['headers'])
+                return
+            if message['type'] != 'http.response.body':
+                await send(message)
+                return
+            if self.initial_message is not None:
+                initial, self.initial_message = self.initial_message, None
+                body = message.get('body', b'')
+                if self.passthrough or message.get('more_body', False) or len(body) < self.minimum_size:
+                    self.passthrough = True
+                else:
+                    body = brotli.compress(body, quality=self.quality)
+                    headers = MutableHeaders(raw=initial['headers'])
+                    headers['Content-Encoding'] = 'br'
+                    headers['Content-Length'] = str(len(body))
+                    headers.add_vary_header('Accept-Encoding')
+                    message['body'] = body
+                await send(initial)
+            await send(message)
+
+        await self.app(scope, receive, send_with_brotli)
+
+
+class CompressionMiddleware:
+    """ASGI 中间件：压缩较大的响应
+
+    客户端接受 br 且安装了 brotli 时使用 brotli，否则使用 gzip；小于 minimum_size 的响应不压缩。
+    压缩级别取中等值：列表/时间线 JSON 的压缩率与最高级别相差很小，CPU 开销低得多。
+    """
+
+    def __init__(self, app, minimum_size: int = 1000, gzip_level: int = 5, brotli_quality: int = 5,
+                 skip_paths: Iterable[str] = ()):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.brotli_quality = brotli_quality
+        self.skip_paths = set(skip_paths)
+        self.gzip = GZipMiddleware(app, minimum_size=minimum_size, compresslevel=gzip_level)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope.get('path') in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+        if brotli is not None and 'br' in Headers(scope=scope).get('accept-encoding', ''):
+            await BrotliResponder(self.app, self.minimum_size, self.brotli_quality)(scope, receive, send)
+            return
+        await self.gzip(scope, receive, send)
@@ -0,0 +1,132 @@
+"""分块读取数据CSV
+
+整表 pd.read_csv 的峰值内存随文件大小增长（解析缓冲、按列推断类型，之后 fillna 再复制一份），
+多年的导出文件难以一次读入。这里按字节把文件切成若干片段，逐段解析并规范化，调用方逐段
+追加到数据表或数据库，峰值内存由片段大小决定。片段只在引号外的换行处切分，带引号的多行字段
+（事件描述、处置结果中常见）不会被截断；片段可以交给多个进程并行解析，结果按文件顺序返回。
+
+各片段的列类型不能各自推断（同一列在不同片段可能推断成整数、浮点数或文本，拼接后类型不一致），
+除调用方声明的数值列外一律按文本读取。
+"""
+import io
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+
+def default_chunk_bytes() -> int:
+    """每个片段的字节数，取环境变量 EVENT_CSV_CHUNK_MB（默认 64）"""
+    return max(1, int(float(os.environ.get('EVENT_CSV_CHUNK_MB', '64')) * 1024 * 1024))
+
+
+def default_workers() -> int:
+    """并行解析的进程数，取环境变量 EVENT_CSV_WORKERS（默认 0，在当前进程内逐段解析）"""
+    return int(os.environ.get('EVENT_CSV_WORKERS', '0'))
+
+
+def _record_end(data: bytes, quotechar: bytes, last: bool = True) -> int:
+    """data 中引号外的最后一个（last=False 时为第一个）换行之后的位置，没有时返回 -1
+
+    data 须从记录边界开始；引号内的换行属于字段内容，"" 转义的引号成对出现，不影响奇偶。
+    """
+    if last:
+        end = data.rfind(b'\n')
+        while end >= 0 and data.count(quotechar, 0, end) % 2:
+            end = data.rfind(b'\n', 0, end)
+    else:
+        end = data.find(b'\n')
+        while end >= 0 and data.count(quotechar, 0, end) % 2:
+            end = data.find(b'\n', end + 1)
+    return end + 1 if end >= 0 else -1
+
+
+def record_ranges(path: str, start: int, chunk_bytes: int, quotechar: str = '"') -> Iterator[Tuple[int, int]]:
+    """从 start（记录边界）起把文件切成约 chunk_bytes 字节、以完整记录结尾的片段 (起, 止)"""
+    quote = quotechar.encode('utf-8')
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        while start < size:
+            f.seek(start)
+            data = f.read(chunk_bytes)
+            end = len(data) if start + len(data) >= size else _record_end(data, quote)
+            if end <= 0:
+                # 单条记录比片段还长，扩大片段重读
+                chunk_bytes *= 2
+                continue
+            if data[:end].strip():
+                yield start, start + end
+            start += end
+
+
+def read_header(path: str, read_options: Dict[str, Any]) -> Tuple[List[str], int]:
+    """读取表头，返回（列名, 第一条数据记录的字节位置）"""
+    columns = list(pd.read_csv(path, nrows=0, **read_options).columns)
+    quote = read_options.get('quotechar', '"').encode('utf-8')
+    with open(path, 'rb') as f:
+        data = f.read(1024 * 1024)
+        end = _record_end(data, quote, last=False)
+        while end < 0 and len(data) < os.path.getsize(path):
+            data += f.read(len(data))
+            end = _record_end(data, quote, last=False)
+    return columns, end if end >= 0 else len(data)
+
+
+def normalize_chunk(df: pd.DataFrame, numeric: Dict[str, Optional[int]]) -> pd.DataFrame:
+    """规范化一个片段：声明的数值列转为数值（无法解析的按给定值填充，未给定时保留 NaN），
+    其余文本列的缺失值填为空字符串"""
+    for col, fill in numeric.items():
+        if col in df.columns:
+            values = pd.to_numeric(df[col], errors='coerce')
+            df[col] = values if fill is None else values.fillna(fill).astype(int)
+    text_columns = [col for col in df.columns if col not in numeric and df[col].hasnans]
+    if text_columns:
+        df[text_columns] = df[text_columns].fillna('')
+    return df
+
+
+def _read_range(path: str, start: int, end: int, columns: List[str], read_options: Dict[str, Any],
+                numeric: Dict[str, Optional[int]]) -> pd.DataFrame:
+    """解析文件的一个片段（在工作进程中执行时只传递文件位置，不传递数据）"""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    df = pd.read_csv(io.BytesIO(data), header=None, names=columns, dtype=str, **read_options)
+    return normalize_chunk(df, numeric)
+
+
+def read_csv_chunks(path: str, read_options: Optional[Dict[str, Any]] = None,
+                    numeric: Optional[Dict[str, Optional[int]]] = None,
+                    chunk_bytes: Optional[int] = None, workers: Optional[int] = None) -> Iterator[pd.DataFrame]:
+    """按文件顺序逐段返回规范化后的数据（行号在片段内从 0 开始）；只有表头时返回一个空表
+
+    - **numeric**: 数值列 -> 无法解析时的填充值（None 表示保留 NaN），其余列按文本读取
+    - **workers**: 大于 1 时用多个进程并行解析，最多同时持有 2 * workers 个片段
+    """
+    read_options = read_options or {}
+    numeric = numeric or {}
+    chunk_bytes = chunk_bytes or default_chunk_bytes()
+    workers = default_workers() if workers is None else workers
+
+    columns, data_start = read_header(path, read_options)
+    ranges = record_ranges(path, data_start, chunk_bytes, read_options.get('quotechar', '"'))
+    produced = False
+    if workers > 1 and os.path.getsize(path) - data_start > chunk_bytes:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            for start, end in ranges:
+                pending.append(pool.submit(_read_range, path, start, end, columns, read_options, numeric))
+                if len(pending) >= 2 * workers:
+                    produced = True
+                    yield pending.popleft().result()
+            while pending:
+                produced = True
+                yield pending.popleft().result()
+    else:
+        for start, end in ranges:
+            produced = True
+            yield _read_range(path, start, end, columns, read_options, numeric)
+    if not produced:
+        yield pd.DataFrame({col: pd.Series(dtype=object) for col in columns})
@@ -0,0 +1,160 @@
+from collections import deque
+from datetime import datetime, date, timedelta
+from typing import Any, Deque, Dict, List, NamedTuple, Optional, Set, Tuple, Union
+import asyncio
+import itertools
+import threading
+
+import numpy as np
+
+from metrics import registry
+from models import EventResponse
+from services import EventService, RELATED_EVENT_BUCKETS, filter_terms
+
+
+FEED_SUBSCRIBERS = registry.counter(
+    'event_feed_subscriptions_total', '实时事件推送的订阅次数'
+)
+FEED_DELIVERED = registry.counter(
+    'event_feed_delivered_total', '推送给订阅者的事件数（result=dropped 为订阅者队列已满而丢弃）', ('result',)
+)
+
+# 与事件列表搜索相同的字段
+SEARCH_FIELDS = ('事件编号', '事件描述', '处置结果', 'CallerPhone', 'CallerID')
+
+
+class FeedFilter(NamedTuple):
+    """订阅的筛选条件，与 get_events 的参数一致；相同条件的订阅共用一次匹配"""
+    search: Optional[str] = None
+    town: Optional[str] = None
+    level: Optional[str] = None
+    category: Optional[str] = None
+    related_events: Optional[str] = None
+    start_time: Optional[Union[datetime, date]] = None
+    end_time: Optional[Union[datetime, date]] = None
+
+    def matches(self, event: 'FeedEvent') -> bool:
+        """不区分大小写的包含匹配和时间范围（只给出日期时结束时间包含当天全天）"""
+        if self.search and not any(self.search.lower() in text for text in event.search_texts):
+            return False
+        # 逗号分隔的多个取值满足任一即可
+        for value, text in ((self.town, event.item.镇街名称), (self.level, event.item.事件级别),
+                            (self.category, event.item.二级分类)):
+            if value and not any(term.lower() in text.lower() for term in filter_terms(value)):
+                return False
+        ranges = [RELATED_EVENT_BUCKETS[bucket] for bucket in filter_terms(self.related_events)
+                  if bucket in RELATED_EVENT_BUCKETS]
+        if ranges:
+            sequence_total = event.item.sequence_total or 1
+            if not any((low is None or sequence_total >= low) and (high is None or sequence_total <= high)
+                       for low, high in ranges):
+                return False
+        if self.start_time is not None or self.end_time is not None:
+            if np.isnat(event.report_time):
+                return False
+            if self.start_time is not None and event.report_time < EventService._to_datetime64(self.start_time):
+                return False
+            if self.end_time is not None:
+                if isinstance(self.end_time, date) and not isinstance(self.end_time, datetime):
+                    if event.report_time >= EventService._to_datetime64(self.end_time + timedelta(days=1)):
+                        return False
+                elif event.report_time > EventService._to_datetime64(self.end_time):
+                    return False
+        return True
+
+
+class FeedEvent(NamedTuple):
+    """一条新写入的事件：序号、列表项、搜索字段（小写）、上报时间和序列化后的推送数据"""
+    seq: int
+    item: EventResponse
+    search_texts: Tuple[str, ...]
+    report_time: np.datetime64
+    data: str
+
+
+class Subscriber:
+    """一个推送连接：在事件循环中读取的有界队列"""
+
+    def __init__(self, feed_filter: FeedFilter, loop: asyncio.AbstractEventLoop, max_queue: int):
+        self.filter = feed_filter
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.dropped = 0
+
+    def _put(self, event: FeedEvent):
+        try:
+            self.queue.put_nowait(event)
+            FEED_DELIVERED.inc(1, 'delivered')
+        except asyncio.QueueFull:
+            # 客户端读取过慢：丢弃并记录，推送流会提示客户端重新拉取列表
+            self.dropped += 1
+            FEED_DELIVERED.inc(1, 'dropped')
+
+    def deliver(self, event: FeedEvent):
+        """由写入线程调用，交给订阅者所在的事件循环入队"""
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            pass  # 事件循环已关闭，连接随之结束
+
+
+class EventFeed:
+    """新写入事件的推送中心
+
+    订阅按筛选条件分组：每条新事件对每组不同的筛选条件只匹配一次，再分发给组内全部订阅者，
+    推送数据也只序列化一次。最近 history_size 条事件保留在内存中，断线重连时按 Last-Event-ID 补发。
+    """
+
+    def __init__(self, history_size: int = 1000, max_queue: int = 1000):
+        self.max_queue = max_queue
+        self._groups: Dict[FeedFilter, Set[Subscriber]] = {}
+        self._history: Deque[FeedEvent] = deque(maxlen=history_size)
+        self._seq = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def subscribe(self, feed_filter: FeedFilter, last_event_id: Optional[int] = None) -> Subscriber:
+        """新建订阅（须在事件循环中调用）；给出 last_event_id 时先补发之后的匹配事件"""
+        subscriber = Subscriber(feed_filter, asyncio.get_running_loop(), self.max_queue)
+        with self._lock:
+            self._groups.setdefault(feed_filter, set()).add(subscriber)
+            missed = [event for event in self._history if last_event_id is not None and event.seq > last_event_id]
+        for event in missed:
+            if feed_filter.matches(event):
+                subscriber._put(event)
+        FEED_SUBSCRIBERS.inc()
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        with self._lock:
+            group = self._groups.get(subscriber.filter)
+            if group is not None:
+                group.discard(subscriber)
+                if not group:
+                    del self._groups[subscriber.filter]
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(group) for group in self._groups.values())
+
+    def publish(self, events: List[Tuple[EventResponse, Dict[str, Any], np.datetime64]]):
+        """EventService 的写入监听器：events 为（列表项, 事件行, 上报时间）"""
+        feed_events = []
+        for item, row, report_time in events:
+            search_texts = tuple(str(row.get(field, '') or '').lower() for field in SEARCH_FIELDS)
+            search_texts += ((item.报警人信息 or '').lower(),)
+            with self._lock:
+                seq = next(self._seq)
+            feed_events.append(FeedEvent(seq, item, search_texts, report_time, item.model_dump_json()))
+
+        with self._lock:
+            self._history.extend(feed_events)
+            groups = [(feed_filter, list(subscribers)) for feed_filter, subscribers in self._groups.items()]
+
+        for feed_filter, subscribers in groups:
+            for event in feed_events:
+                if feed_filter.matches(event):
+                    for subscriber in subscribers:
+                        subscriber.deliver(event)
+
+
+event_feed = EventFeed()
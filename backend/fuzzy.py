@@ -0,0 +1,91 @@
+"""姓名模糊索引：按编辑距离查找近似姓名（如 刘李康 / 刘利康）
+
+中文姓名只有 2-4 个字，任意两个姓名的编辑距离集中在 0-4，BK 树在这样的度量上几乎每个
+分支都要访问，退化为线性扫描。这里使用对称删除索引：每个姓名预先登记删去至多
+max_distance 个字后的全部变体，查询时生成查询词的删除变体，共享变体的姓名即为候选，
+再计算真实编辑距离过滤。查询只做 O(变体数) 次字典查找，与姓名总数无关。
+"""
+from itertools import combinations
+from typing import Any, Dict, Hashable, List, Optional, Set, Tuple
+
+
+def edit_distance(a: str, b: str) -> int:
+    """Levenshtein 编辑距离（插入、删除、替换各计 1）"""
+    if a == b:
+        return 0
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+def deletion_variants(term: str, max_deletes: int) -> Set[str]:
+    """删去至多 max_deletes 个字得到的全部字符串（含原词；字数不超过 max_deletes 时含空串，
+    单字姓名之间的替换经由空串匹配）"""
+    variants = {term}
+    for count in range(1, min(max_deletes, len(term)) + 1):
+        for positions in combinations(range(len(term)), count):
+            variants.add(''.join(char for i, char in enumerate(term) if i not in positions))
+    return variants
+
+
+def normalize_name(name: Any) -> str:
+    """去掉首尾和中间的空白；空值返回空串"""
+    if name is None:
+        return ''
+    name = ''.join(str(name).split()).lower()
+    return '' if name in ('nan', 'none', 'null') else name
+
+
+class NameIndex:
+    """姓名 -> 记录键 的模糊索引
+
+    一个记录可以登记多个姓名（如人员分析表的 name 和 name_candidates），查询结果中每个记录
+    只出现一次，取其各姓名中的最小距离。
+    """
+
+    def __init__(self, max_distance: int = 1):
+        self.max_distance = max_distance
+        self._keys: Dict[str, List[Hashable]] = {}      # 姓名 -> 记录键
+        self._variants: Dict[str, List[str]] = {}       # 删除变体 -> 姓名
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, name: Any, key: Hashable):
+        name = normalize_name(name)
+        if not name:
+            return
+        keys = self._keys.get(name)
+        if keys is None:
+            self._keys[name] = [key]
+            for variant in deletion_variants(name, self.max_distance):
+                self._variants.setdefault(variant, []).append(name)
+        elif keys[-1] != key:
+            keys.append(key)
+
+    def search(self, name: str, max_distance: Optional[int] = None) -> List[Tuple[Hashable, int]]:
+        """距离不超过 max_distance（不超过建索引时的距离）的记录键及距离，按（距离, 记录键）排列"""
+        name = normalize_name(name)
+        if not name:
+            return []
+        limit = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+
+        candidates = set()
+        for variant in deletion_variants(name, limit):
+            candidates.update(self._variants.get(variant, ()))
+
+        matched = sorted(
+            (distance, candidate) for candidate in candidates
+            if (distance := edit_distance(name, candidate)) <= limit
+        )
+        results: Dict[Hashable, int] = {}
+        for distance, candidate in matched:
+            for key in self._keys[candidate]:
+                results.setdefault(key, distance)
+        return sorted(results.items(), key=lambda item: (item[1], item[0]))
@@ -0,0 +1,172 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterable, Optional
+import asyncio
+import os
+import threading
+import time
+
+from fastapi import HTTPException
+
+from metrics import registry
+
+
+GOVERNOR_ADMISSIONS = registry.counter(
+    'query_governor_admissions_total', '查询准入结果（cheap 为低代价直接执行，admitted 为高代价获得执行名额）',
+    ('operation', 'result')
+)
+GOVERNOR_INTERRUPTS = registry.counter(
+    'query_governor_interrupted_total', '因超时或客户端断开而中止的查询', ('reason',)
+)
+
+
+class QueryRejected(HTTPException):
+    """高代价查询排队超时：返回 503 和 Retry-After"""
+
+    def __init__(self, operation: str, retry_after: int):
+        super().__init__(status_code=503, detail=f"服务繁忙，{operation} 查询排队超时，请稍后重试",
+                         headers={'Retry-After': str(retry_after)})
+
+
+class QueryTimeout(HTTPException):
+    """查询超过截止时间：返回 504"""
+
+    def __init__(self):
+        super().__init__(status_code=504, detail="查询超时")
+
+
+class QueryCancelled(HTTPException):
+    """客户端已断开，查询中止（响应不会被读取，状态码 499 只用于日志和指标）"""
+
+    def __init__(self):
+        super().__init__(status_code=499, detail="客户端已断开连接")
+
+
+class QueryContext:
+    """单个请求的截止时间和取消标记，由 GovernorMiddleware 创建，查询循环中通过 check_deadline 检查"""
+
+    __slots__ = ('deadline', 'cancelled')
+
+    def __init__(self, timeout: Optional[float] = None):
+        self.deadline = time.monotonic() + timeout if timeout else None
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def remaining(self) -> Optional[float]:
+        return None if self.deadline is None else self.deadline - time.monotonic()
+
+    def interrupted(self) -> bool:
+        return self.cancelled or (self.deadline is not None and time.monotonic() >= self.deadline)
+
+    def check(self):
+        if self.cancelled:
+            GOVERNOR_INTERRUPTS.inc(1, 'disconnected')
+            raise QueryCancelled()
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            GOVERNOR_INTERRUPTS.inc(1, 'timeout')
+            raise QueryTimeout()
+
+
+# 当前请求的查询上下文（线程池执行的接口会复制该上下文，取消标记对查询线程可见）
+current_query: ContextVar[Optional[QueryContext]] = ContextVar('current_query', default=None)
+
+
+def check_deadline():
+    """查询已超时或客户端已断开时抛出异常；不在请求中（如后台预热、基准测试）时不做任何事"""
+    context = current_query.get()
+    if context is not None:
+        context.check()
+
+
+def query_interrupted() -> bool:
+    """不抛异常的检查，供 SQLite 进度回调等无法抛出异常的位置使用"""
+    context = current_query.get()
+    return context is not None and context.interrupted()
+
+
+class QueryGovernor:
+    """高代价查询的准入控制
+
+    代价为 EventService.estimate_cost 估算的扫描/序列化行数。低于 expensive_cost 的查询直接执行；
+    高代价查询同时最多执行 max_expensive 个，其余最多排队 queue_timeout 秒（不超过请求剩余时间），
+    仍未获得名额时返回 503。
+    """
+
+    def __init__(self, max_expensive: int = 2, expensive_cost: int = 20000, queue_timeout: float = 5.0):
+        self.max_expensive = max_expensive
+        self.expensive_cost = expensive_cost
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max_expensive)
+
+    @contextmanager
+    def admit(self, operation: str, cost: int):
+        if cost < self.expensive_cost:
+            GOVERNOR_ADMISSIONS.inc(1, operation, 'cheap')
+            check_deadline()
+            yield
+            return
+
+        wait = self.queue_timeout
+        context = current_query.get()
+        remaining = context.remaining() if context is not None else None
+        if remaining is not None:
+            wait = max(0.0, min(wait, remaining))
+        if not self._slots.acquire(timeout=wait):
+            GOVERNOR_ADMISSIONS.inc(1, operation, 'rejected')
+            check_deadline()
+            raise QueryRejected(operation, retry_after=max(1, int(self.queue_timeout)))
+        GOVERNOR_ADMISSIONS.inc(1, operation, 'admitted')
+        try:
+            check_deadline()
+            yield
+        finally:
+            self._slots.release()
+
+
+class GovernorMiddleware:
+    """ASGI 中间件：为每个请求设置查询截止时间，并在客户端断开时取消查询
+
+    请求消息由后台任务持续读取并转交给应用，读到 http.disconnect 时立即标记取消，
+    正在线程池中执行的查询在下一次 check_deadline 时中止。
+    """
+
+    def __init__(self, app, timeout: Optional[float] = 30.0, prefixes: Iterable[str] = ('/api/',),
+                 skip_prefixes: Iterable[str] = ('/api/admin',)):
+        self.app = app
+        self.timeout = timeout
+        self.prefixes = tuple(prefixes)
+        self.skip_prefixes = tuple(skip_prefixes)
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get('path', '')
+        if scope['type'] != 'http' or not path.startswith(self.prefixes) or path.startswith(self.skip_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        context = QueryContext(self.timeout)
+        messages: asyncio.Queue = asyncio.Queue()
+
+        async def listen():
+            while True:
+                message = await receive()
+                await messages.put(message)
+                if message['type'] == 'http.disconnect':
+                    context.cancel()
+                    return
+
+        listener = asyncio.ensure_future(listen())
+        token = current_query.set(context)
+        try:
+            await self.app(scope, messages.get, send)
+        finally:
+            current_query.reset(token)
+            listener.cancel()
+
+
+query_governor = QueryGovernor(
+    max_expensive=int(os.environ.get('QUERY_MAX_EXPENSIVE', '2')),
+    expensive_cost=int(os.environ.get('QUERY_EXPENSIVE_COST', '20000')),
+    queue_timeout=float(os.environ.get('QUERY_QUEUE_TIMEOUT', '5')),
+)
@@ -0,0 +1,156 @@
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, Iterable, List, Optional, Tuple
+import threading
+
+import numpy as np
+
+# 热点接口的最长统计窗口（小时）；与前一个等长窗口比较，保留期至少为其两倍
+MAX_WINDOW_HOURS = 720
+
+
+class SlidingWindowCounter:
+    """按键维护有序的事件时间戳，支持任意长度（不超过保留期）的窗口计数"""
+
+    def __init__(self, retention_seconds: int):
+        self.retention_seconds = retention_seconds
+        self._times: Dict[str, List[int]] = {}  # 键 -> 升序的上报时间（秒）
+        self._events: Dict[str, List[str]] = {}  # 键 -> 与时间一一对应的事件编号
+        self.latest_time: Optional[int] = None
+
+    def add(self, key: str, ts: int, event_id: str):
+        """记录一次事件，时间基本有序时为O(1)追加"""
+        times = self._times.setdefault(key, [])
+        events = self._events.setdefault(key, [])
+        if not times or ts >= times[-1]:
+            times.append(ts)
+            events.append(event_id)
+        else:
+            idx = bisect_right(times, ts)
+            times.insert(idx, ts)
+            events.insert(idx, event_id)
+
+        if self.latest_time is None or ts > self.latest_time:
+            self.latest_time = ts
+        self._prune(key)
+
+    def _prune(self, key: str):
+        """丢弃超出保留期的时间戳"""
+        cutoff = self.latest_time - self.retention_seconds
+        times = self._times[key]
+        drop = bisect_left(times, cutoff)
+        if drop:
+            del times[:drop]
+            del self._events[key][:drop]
+        if not times:
+            del self._times[key]
+            del self._events[key]
+
+    def window(self, key: str, start: int, end: int) -> Tuple[int, int]:
+        """返回键在 (start, end] 内事件的下标区间"""
+        times = self._times.get(key, [])
+        return bisect_right(times, start), bisect_right(times, end)
+
+    def keys(self) -> Iterable[str]:
+        return self._times.keys()
+
+    def times(self, key: str) -> List[int]:
+        return self._times.get(key, [])
+
+    def events(self, key: str) -> List[str]:
+        return self._events.get(key, [])
+
+
+class HotspotDetector:
+    """重复报警/升级热点检测
+
+    对每个电话号码和每个村社维护滑动窗口计数器，新事件写入时增量更新，
+    查询时按窗口内的事件数量与阈值比较，不需要重新扫描事件表。
+    """
+
+    KINDS = ('phone', 'community')
+
+    def __init__(self, retention_hours: int = 2 * MAX_WINDOW_HOURS):
+        self.retention_hours = retention_hours
+        self._counters = {
+            kind: SlidingWindowCounter(retention_hours * 3600) for kind in self.KINDS
+        }
+        self._community_labels: Dict[str, Tuple[str, str]] = {}  # 村社键 -> (镇街名称, 村社名称)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def community_key(town: str, community: str) -> str:
+        """村社名称在不同镇街之间会重复（如“公众社区”），因此带上镇街作为键"""
+        return f"{town}/{community}"
+
+    def observe(self, event_id: str, report_time: np.datetime64, phones: Iterable[str],
+                town: str = '', community: str = ''):
+        """写入一条事件（上报时间无法解析的事件不参与热点统计）"""
+        if np.isnat(report_time):
+            return
+        ts = int(report_time.astype('datetime64[s]').astype(np.int64))
+
+        with self._lock:
+            for phone in set(p for p in phones if p):
+                self._counters['phone'].add(phone, ts, event_id)
+
+            if community:
+                key = self.community_key(town, community)
+                self._community_labels[key] = (town, community)
+                self._counters['community'].add(key, ts, event_id)
+
+    def latest_time(self) -> Optional[np.datetime64]:
+        """已写入事件中最晚的上报时间"""
+        latest = [c.latest_time for c in self._counters.values() if c.latest_time is not None]
+        if not latest:
+            return None
+        return np.datetime64(max(latest), 's')
+
+    def hotspots(self, kind: str, window_hours: float, threshold: int,
+                 as_of: Optional[np.datetime64] = None, limit: int = 50) -> List[dict]:
+        """列出最近 window_hours 小时内事件数达到阈值的电话或村社
+
+        同时统计前一个等长窗口的事件数，用于判断是否在升级；只保留最新事件之前 retention_hours 小时的
+        时间戳，as_of 与前一窗口须落在保留期内
+        """
+        counter = self._counters[kind]
+        window = int(window_hours * 3600)
+
+        with self._lock:
+            if as_of is None:
+                if counter.latest_time is None:
+                    return []
+                end = counter.latest_time
+            else:
+                end = int(np.datetime64(as_of, 's').astype(np.int64))
+            start = end - window
+
+            items = []
+            for key in counter.keys():
+                times = counter.times(key)
+                # 最晚一次事件早于窗口起点，不可能是热点
+                if times[-1] <= start:
+                    continue
+                lo, hi = counter.window(key, start, end)
+                count = hi - lo
+                if count < threshold:
+                    continue
+
+                prev_lo = bisect_right(times, start - window)
+                previous_count = lo - prev_lo
+                item = {
+                    'key': key,
+                    'kind': kind,
+                    'event_count': count,
+                    'previous_count': previous_count,
+                    'rate_per_hour': round(count / window_hours, 4),
+                    'escalating': count > previous_count,
+                    'first_time': str(np.datetime64(times[lo], 's')).replace('T', ' '),
+                    'last_time': str(np.datetime64(times[hi - 1], 's')).replace('T', ' '),
+                    'event_ids': list(reversed(counter.events(key)[lo:hi])),
+                }
+                if kind == 'community':
+                    item['town'], item['community'] = self._community_labels.get(key, ('', ''))
+                items.append(item)
+
+        items.sort(key=lambda x: (x['event_count'], x['event_count'] - x['previous_count']), reverse=True)
+        return items[:limit]
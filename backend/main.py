@@ -1,6 +1,10 @@
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Depends, Header, Request
+from fastapi.responses import PlainTextResponse, JSONResponse, StreamingResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Optional
+from typing import Optional, Union
+from datetime import datetime, date
+import asyncio
+import os
 import uvicorn
 
 from models import (
@@ -14,9 +18,38 @@ from models import (
     PersonAnalysisResponse,
     PersonEvent,
     PersonDetailResponse,
-    PersonAnalysisQuery
+    PersonAnalysisQuery,
+    HotspotResponse,
+    SlaReportResponse,
+    OrgTreeResponse,
+    EventIngestRequest,
+    EventIngestResponse,
+    PhoneNetworkResponse,
+    PhoneComponentResponse,
+    SimilarResponse,
+    SimilarSearchQuery,
+    BatchEventQuery,
+    BatchClusterQuery,
+    BatchPersonQuery,
+    BatchEventDetailResponse,
+    BatchClusterDetailResponse,
+    BatchPersonDetailResponse,
+    SlowQueryResponse,
+    ProfileListResponse,
+    MemoryReportResponse,
+    PartitionReportResponse,
+    ReadinessResponse,
+    ProjectedListResponse
 )
-from services import event_service
+from services import event_service, parse_fields, check_supported, UnsupportedInBackend
+from hotspots import MAX_WINDOW_HOURS
+from metrics import registry, MetricsMiddleware
+from profiling import ProfilingMiddleware, profile_store, slow_query_log
+from admin import require_admin
+from caching import ETagMiddleware, CompressionMiddleware
+from feed import FeedFilter, event_feed
+from governor import GovernorMiddleware, query_governor
+from render_cache import create_render_cache
 
 # 创建FastAPI应用
 app = FastAPI(
@@ -25,6 +58,11 @@ app = FastAPI(
     version="1.0.0"
 )
 
+@app.exception_handler(UnsupportedInBackend)
+async def unsupported_handler(request: Request, exc: UnsupportedInBackend):
+    """当前存储后端不支持的分析（如分片模式下需要全部事件的统计）返回 501"""
+    return JSONResponse(status_code=501, content={"detail": str(exc)})
+
 # 配置CORS中间件
 app.add_middleware(
     CORSMiddleware,
@@ -34,6 +72,51 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 实时推送：新写入的事件按订阅的筛选条件分发（长连接，不压缩、不参与 ETag 和慢请求日志）
+STREAM_PATH = "/api/events/stream"
+STREAM_KEEPALIVE_SECONDS = 15
+event_service.add_ingest_listener(event_feed.publish)
+
+# 聚类和人员详情的预渲染缓存（命中时直接返回存好的 JSON，写入新事件后只重新渲染受影响的条目）
+render_cache = create_render_cache(event_service)
+event_service.add_ingest_listener(render_cache.on_ingest)
+
+# 查询截止时间和客户端断开取消（写入接口和推送长连接除外）
+app.add_middleware(GovernorMiddleware, timeout=float(os.environ.get('QUERY_TIMEOUT_SECONDS', '30')),
+                   skip_prefixes=('/api/admin', '/api/events/ingest', STREAM_PATH))
+
+
+def supported(operation: str):
+    """路由依赖：当前存储后端不支持该查询时在执行接口前返回 501"""
+    def check():
+        check_supported(event_service, operation)
+    return Depends(check)
+
+
+def governed(operation: str, **params):
+    """按估算代价对查询做准入控制：高代价查询限制并发，排队超时返回 503"""
+    return query_governor.admit(operation, event_service.estimate_cost(operation, **params))
+
+# 较大的响应（列表、时间线）压缩传输
+app.add_middleware(CompressionMiddleware, skip_paths=(STREAM_PATH,))
+
+# 读接口的 ETag 条件请求：数据版本和查询不变时返回 304
+app.add_middleware(ETagMiddleware, version=event_service.data_version,
+                   skip_prefixes=('/api/admin', '/api/ready', '/api/health', STREAM_PATH))
+
+# 请求耗时指标（按路由模板统计，见 /metrics）
+app.add_middleware(MetricsMiddleware)
+
+# 慢请求日志和管理员请求分析（X-Profile 头 + X-Admin-Token）
+app.add_middleware(ProfilingMiddleware,
+                   skip_prefixes=('/metrics', '/api/admin', '/docs', '/openapi.json', STREAM_PATH))
+
+@app.on_event("startup")
+async def start_warmup():
+    """服务开始接收请求后在后台预热数据表和索引，预热完成后预渲染详情（EVENT_WARMUP=0 时关闭，完全按需加载）"""
+    if os.environ.get('EVENT_WARMUP', '1').lower() not in ('0', 'false', 'no'):
+        render_cache.start(wait_for=event_service.start_warmup())
+
 @app.get("/", summary="根路径")
 async def root():
     """根路径，返回API状态信息"""
@@ -51,15 +134,36 @@ async def health_check():
         "message": "API is running normally"
     }
 
-@app.get("/api/events", response_model=PaginatedResponse, summary="获取事件列表")
-async def get_events(
+@app.get("/api/ready", response_model=ReadinessResponse, summary="就绪检查")
+async def readiness_check():
+    """就绪检查端点，返回各数据表和索引的加载状态；后台预热进行中时返回 503"""
+    status = event_service.get_load_status()
+    return JSONResponse(
+        status_code=200 if status['ready'] else 503,
+        content=ReadinessResponse(**status).model_dump()
+    )
+
+@app.get("/metrics", response_class=PlainTextResponse, summary="运行指标")
+async def get_metrics():
+    """Prometheus 文本格式的运行指标：请求耗时、各阶段耗时、扫描行数、结果数和索引命中"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# 调用 event_service 的接口定义为同步函数，由线程池执行：
+# 数据表按需加载或耗时查询时不阻塞事件循环，/api/health 等接口始终立即响应
+@app.get("/api/events", response_model=Union[PaginatedResponse, ProjectedListResponse], summary="获取事件列表")
+def get_events(
     page: int = Query(1, ge=1, description="页码"),
     page_size: int = Query(20, ge=1, le=100, description="每页数量"),
     search: Optional[str] = Query(None, description="搜索关键词"),
     town: Optional[str] = Query(None, description="镇街名称筛选"),
     level: Optional[str] = Query(None, description="事件级别筛选"),
     category: Optional[str] = Query(None, description="二级分类筛选"),
-    related_events: Optional[str] = Query(None, description="相关事件数量筛选")
+    related_events: Optional[str] = Query(None, description="相关事件数量筛选"),
+    start_time: Optional[Union[datetime, date]] = Query(None, description="上报时间起（含）"),
+    end_time: Optional[Union[datetime, date]] = Query(None, description="上报时间止（含）"),
+    fields: Optional[str] = Query(None, description="返回的字段（逗号分隔），如 事件编号,上报时间,镇街名称,事件描述"),
+    description_length: Optional[int] = Query(None, ge=1, description="事件描述截断长度（字符）"),
+    org_path: Optional[str] = Query(None, description="所属组织路径筛选，如 海曙区/月湖街道")
 ):
     """
     获取事件列表，支持分页、搜索和筛选，按上报时间倒序排列
@@ -71,23 +175,122 @@ async def get_events(
     - **level**: 事件级别筛选
     - **category**: 二级分类筛选
     - **related_events**: 相关事件数量筛选，可选值：0（无关联）、1（1个关联）、2-5（2-5个关联）、5+（5个以上关联）
+    - **org_path**: 所属组织筛选，取组织树任一层的节点路径（精确匹配，包含其下级），见 /api/org-tree
+    - 以上筛选条件均可用逗号分隔多个取值（满足任一即可），如 `town=高桥镇,古林镇`
+    - **start_time**: 上报时间起，如 2025-05-01 或 2025-05-01T08:00:00
+    - **end_time**: 上报时间止
+    - **fields**: 只返回指定字段，未请求报警人信息时不查询参与人
+    - **description_length**: 事件描述超过该长度时截断
     """
     try:
-        result = event_service.get_events(
-            page=page,
-            page_size=page_size,
-            search=search,
-            town=town,
-            level=level,
-            category=category,
-            related_events=related_events
-        )
+        field_list = parse_fields(fields, EventResponse)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        with governed('get_events', page=page, page_size=page_size, search=search, town=town, level=level,
+                      category=category, related_events=related_events, start_time=start_time, end_time=end_time,
+                      org_path=org_path):
+            result = event_service.get_events(
+                page=page,
+                page_size=page_size,
+                search=search,
+                town=town,
+                level=level,
+                category=category,
+                related_events=related_events,
+                start_time=start_time,
+                end_time=end_time,
+                fields=field_list,
+                description_length=description_length,
+                org_path=org_path
+            )
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取事件列表失败: {str(e)}")
 
+@app.post("/api/events/ingest", response_model=EventIngestResponse, summary="增量写入事件",
+          dependencies=[Depends(require_admin)])
+def ingest_events(request: EventIngestRequest):
+    """
+    增量写入新事件，写入后立即参与查询和热点检测（需要 X-Admin-Token）
+    
+    - **events**: 事件列表，字段与事件详情一致，可附带 extracted_info（参与人列表）
+    """
+    try:
+        ingested = event_service.ingest_events(request.events)
+        return EventIngestResponse(ingested=ingested, total=event_service.event_total())
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"写入事件失败: {str(e)}")
+
+@app.get("/api/events/stream", summary="实时推送新写入的事件")
+async def stream_events(
+    request: Request,
+    search: Optional[str] = Query(None, description="搜索关键词"),
+    town: Optional[str] = Query(None, description="镇街名称筛选"),
+    level: Optional[str] = Query(None, description="事件级别筛选"),
+    category: Optional[str] = Query(None, description="二级分类筛选"),
+    related_events: Optional[str] = Query(None, description="相关事件数量筛选"),
+    start_time: Optional[Union[datetime, date]] = Query(None, description="上报时间起（含）"),
+    end_time: Optional[Union[datetime, date]] = Query(None, description="上报时间止（含）"),
+    last_event_id: Optional[str] = Header(None, description="断线重连时浏览器自动携带的最后事件序号")
+):
+    """
+    以 Server-Sent Events 推送新写入且符合筛选条件的事件，筛选参数与事件列表相同
+    
+    - 每条事件为 `event: event`，`id` 为推送序号，`data` 为事件列表项 JSON
+    - 客户端读取过慢导致事件被丢弃时推送 `event: lagged`，客户端应重新拉取列表
+    - 每 15 秒发送一次注释行保持连接；重连时携带 Last-Event-ID 补发断线期间的事件
+    """
+    try:
+        feed_filter = FeedFilter(search, town, level, category, related_events, start_time, end_time)
+        resume_from = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+        subscriber = event_feed.subscribe(feed_filter, resume_from)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"订阅事件推送失败: {str(e)}")
+    
+    async def event_stream():
+        try:
+            yield "retry: 3000\n\n"
+            reported_drops = 0
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), timeout=STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if subscriber.dropped > reported_drops:
+                    reported_drops = subscriber.dropped
+                    yield f"event: lagged\ndata: {reported_drops}\n\n"
+                yield f"id: {event.seq}\nevent: event\ndata: {event.data}\n\n"
+        finally:
+            event_feed.unsubscribe(subscriber)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/api/events/batch", response_model=BatchEventDetailResponse, summary="批量获取事件详情")
+def get_events_batch(query: BatchEventQuery):
+    """
+    根据事件编号列表批量获取事件详情
+    
+    - **ids**: 事件编号列表，最多5000个
+    """
+    try:
+        with governed('get_events_batch', event_ids=query.ids):
+            result = event_service.get_events_batch(query.ids)
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"批量获取事件详情失败: {str(e)}")
+
 @app.get("/api/events/{event_id}", response_model=EventDetailResponse, summary="获取事件详情")
-async def get_event_detail(event_id: str):
+def get_event_detail(event_id: str):
     """
     根据事件编号获取事件详情
     
@@ -103,15 +306,70 @@ async def get_event_detail(event_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取事件详情失败: {str(e)}")
 
+@app.get("/api/events/{event_id}/similar", response_model=SimilarResponse, summary="获取相似事件")
+def get_similar_events(
+    event_id: str,
+    top_k: int = Query(10, ge=1, le=100, description="返回数量")
+):
+    """
+    根据事件描述查找相似的历史事件和聚类事件（字符n-gram TF-IDF 余弦相似度）
+    
+    - **event_id**: 事件编号
+    - **top_k**: 事件和聚类事件各返回的数量
+    """
+    try:
+        result = event_service.get_similar_to_event(event_id, top_k=top_k)
+        if result is None:
+            raise HTTPException(status_code=404, detail=f"未找到事件编号为 {event_id} 的事件")
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取相似事件失败: {str(e)}")
+
+@app.post("/api/similar", response_model=SimilarResponse, summary="按文本查找相似事件")
+def find_similar(query: SimilarSearchQuery):
+    """
+    按自由文本（如新来电的事件描述）查找相似的历史事件和聚类事件
+    
+    - **text**: 描述文本
+    - **top_k**: 事件和聚类事件各返回的数量
+    """
+    try:
+        result = event_service.find_similar(query.text, top_k=query.top_k)
+        return result
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"查找相似事件失败: {str(e)}")
+
+@app.post("/api/clusters/batch", response_model=BatchClusterDetailResponse, summary="批量获取聚类事件详情")
+def get_clusters_batch(query: BatchClusterQuery):
+    """
+    根据EventUID列表批量获取聚类事件详情
+    
+    - **event_uids**: EventUID列表，最多5000个
+    """
+    try:
+        with governed('get_clusters_batch', event_uids=query.event_uids):
+            result = event_service.get_clusters_batch(query.event_uids)
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"批量获取聚类事件详情失败: {str(e)}")
+
 @app.get("/api/clusters/{event_uid}", response_model=ClusterEventResponse, summary="获取聚类事件详情")
-async def get_cluster_detail(event_uid: str):
+def get_cluster_detail(event_uid: str):
     """
-    根据EventUID获取聚类事件详情
+    根据EventUID获取聚类事件详情（已预渲染的直接返回缓存的 JSON）
     
     - **event_uid**: 聚类事件UID
     """
     try:
-        result = event_service.get_cluster_detail(event_uid)
+        cached = render_cache.get('cluster', event_uid)
+        if cached is not None:
+            return Response(content=cached, media_type="application/json")
+        with governed('get_cluster_detail', event_uids=[event_uid]):
+            result = event_service.get_cluster_detail(event_uid)
         if result is None:
             raise HTTPException(status_code=404, detail=f"未找到EventUID为 {event_uid} 的聚类事件")
         return result
@@ -121,7 +379,7 @@ async def get_cluster_detail(event_uid: str):
         raise HTTPException(status_code=500, detail=f"获取聚类事件详情失败: {str(e)}")
 
 @app.get("/api/filter-options", response_model=FilterOptions, summary="获取筛选选项")
-async def get_filter_options():
+def get_filter_options():
     """
     获取可用的筛选选项，包括镇街名称、事件级别、二级分类
     """
@@ -131,15 +389,19 @@ async def get_filter_options():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取筛选选项失败: {str(e)}")
 
-@app.get("/api/cluster-list", response_model=ClusterListPaginatedResponse, summary="获取聚合事件列表")
-async def get_cluster_list(
+@app.get("/api/cluster-list", response_model=Union[ClusterListPaginatedResponse, ProjectedListResponse], summary="获取聚合事件列表")
+def get_cluster_list(
     page: int = Query(1, ge=1, description="页码"),
     page_size: int = Query(20, ge=1, le=100, description="每页数量"),
     search: Optional[str] = Query(None, description="搜索描述关键词"),
     min_event_count: Optional[int] = Query(None, ge=2, description="最小事件数量"),
     max_event_count: Optional[int] = Query(None, ge=2, description="最大事件数量"),
     min_duration: Optional[float] = Query(None, ge=0, description="最小持续时间（天）"),
-    max_duration: Optional[float] = Query(None, ge=0, description="最大持续时间（天）")
+    max_duration: Optional[float] = Query(None, ge=0, description="最大持续时间（天）"),
+    start_time: Optional[Union[datetime, date]] = Query(None, description="时间范围起（最后上报时间 >= 该时间）"),
+    end_time: Optional[Union[datetime, date]] = Query(None, description="时间范围止（首次上报时间 <= 该时间）"),
+    fields: Optional[str] = Query(None, description="返回的字段（逗号分隔），如 EventUID,record_count,cluster_description"),
+    description_length: Optional[int] = Query(None, ge=1, description="聚类描述截断长度（字符）")
 ):
     """
     获取聚合事件列表，只显示record_count > 1的记录
@@ -151,23 +413,38 @@ async def get_cluster_list(
     - **max_event_count**: 最大事件数量筛选
     - **min_duration**: 最小持续时间筛选（天）
     - **max_duration**: 最大持续时间筛选（天）
+    - **start_time**: 时间范围起，返回与该时间范围有交集的聚合事件
+    - **end_time**: 时间范围止
+    - **fields**: 只返回指定字段
+    - **description_length**: 聚类描述超过该长度时截断
     """
     try:
-        result = event_service.get_cluster_list(
-            page=page,
-            page_size=page_size,
-            search=search,
-            min_event_count=min_event_count,
-            max_event_count=max_event_count,
-            min_duration=min_duration,
-            max_duration=max_duration
-        )
+        field_list = parse_fields(fields, ClusterListResponse)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        with governed('get_cluster_list', page=page, page_size=page_size, search=search):
+            result = event_service.get_cluster_list(
+                page=page,
+                page_size=page_size,
+                search=search,
+                min_event_count=min_event_count,
+                max_event_count=max_event_count,
+                min_duration=min_duration,
+                max_duration=max_duration,
+                start_time=start_time,
+                end_time=end_time,
+                fields=field_list,
+                description_length=description_length
+            )
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取聚合事件列表失败: {str(e)}")
 
 @app.get("/api/cluster-filter-options", response_model=ClusterFilterOptions, summary="获取聚合事件筛选选项")
-async def get_cluster_filter_options():
+def get_cluster_filter_options():
     """
     获取聚合事件的筛选选项，包括事件数量范围、持续时间范围
     """
@@ -178,24 +455,28 @@ async def get_cluster_filter_options():
         raise HTTPException(status_code=500, detail=f"获取聚合事件筛选选项失败: {str(e)}")
 
 @app.post("/api/people/search", response_model=PersonSearchResponse, summary="搜索人口信息")
-async def search_people(query: PersonSearchQuery):
+def search_people(query: PersonSearchQuery):
     """
     搜索人口信息
     
     - **name**: 姓名（模糊搜索）
     - **id_card**: 身份证号码（支持脱敏格式）
     - **phone**: 手机号码（支持脱敏格式）
+    - **fuzzy**: 为 true 时姓名按编辑距离模糊匹配，结果按距离排序并返回 name_distance
     - **page**: 页码，从1开始
     - **page_size**: 每页数量，1-100之间
     """
     try:
-        result = event_service.search_people(query)
+        with governed('search_people', query=query):
+            result = event_service.search_people(query)
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"搜索人口信息失败: {str(e)}")
 
 @app.get("/api/people/{person_id}", response_model=PersonInfo, summary="获取人员详细信息")
-async def get_person_detail(person_id: str):
+def get_person_detail(person_id: str):
     """
     根据人员ID获取详细信息
     
@@ -211,12 +492,14 @@ async def get_person_detail(person_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取人员详细信息失败: {str(e)}")
 
-@app.get("/api/person-analysis", response_model=PersonAnalysisResponse, summary="获取人员分析列表")
-async def get_person_analysis(
+@app.get("/api/person-analysis", response_model=Union[PersonAnalysisResponse, ProjectedListResponse], summary="获取人员分析列表")
+def get_person_analysis(
     page: int = Query(1, ge=1, description="页码"),
     page_size: int = Query(20, ge=1, le=100, description="每页数量"),
     search: Optional[str] = Query(None, description="搜索关键词（姓名或手机号）"),
-    role: Optional[str] = Query(None, description="角色筛选")
+    role: Optional[str] = Query(None, description="角色筛选"),
+    fuzzy: bool = Query(False, description="姓名模糊匹配（按编辑距离，含候选姓名）"),
+    fields: Optional[str] = Query(None, description="返回的字段（逗号分隔），如 phone,name,event_count")
 ):
     """
     获取人员分析列表，按事件数量倒序排列
@@ -224,22 +507,32 @@ async def get_person_analysis(
     - **page**: 页码，从1开始
     - **page_size**: 每页数量，1-100之间
     - **search**: 搜索关键词，支持姓名或手机号
-    - **role**: 按角色筛选，如"报警人"、"对方"等
+    - **role**: 按角色筛选，如"报警人"、"对方"等，可用逗号分隔多个角色
+    - **fuzzy**: 为 true 时 search 按姓名（含 name_candidates 中的候选姓名）编辑距离模糊匹配，如 刘李康 可匹配 刘利康，结果按距离排序并返回 name_distance
+    - **fields**: 只返回指定字段
     """
+    try:
+        field_list = parse_fields(fields, PersonAnalysis)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     try:
         query = PersonAnalysisQuery(
             page=page,
             page_size=page_size,
             search=search,
-            role=role
+            role=role,
+            fuzzy=fuzzy
         )
-        result = event_service.get_person_analysis(query)
+        with governed('get_person_analysis', query=query):
+            result = event_service.get_person_analysis(query, fields=field_list)
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取人员分析列表失败: {str(e)}")
 
 @app.get("/api/person-analysis/roles", response_model=list[str], summary="获取人员分析角色选项")
-async def get_person_analysis_roles():
+def get_person_analysis_roles():
     """
     获取人员分析中的所有角色选项
     """
@@ -249,15 +542,35 @@ async def get_person_analysis_roles():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取角色选项失败: {str(e)}")
 
+@app.post("/api/person-analysis/batch", response_model=BatchPersonDetailResponse, summary="批量获取人员分析详情")
+def get_person_analysis_batch(query: BatchPersonQuery):
+    """
+    根据手机号列表批量获取人员分析详情
+    
+    - **phones**: 手机号列表，最多5000个
+    """
+    try:
+        with governed('get_person_analysis_batch', phones=query.phones):
+            result = event_service.get_person_analysis_batch(query.phones)
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"批量获取人员分析详情失败: {str(e)}")
+
 @app.get("/api/person-analysis/{phone}", response_model=PersonDetailResponse, summary="获取人员分析详情")
-async def get_person_analysis_detail(phone: str):
+def get_person_analysis_detail(phone: str):
     """
-    根据手机号获取人员分析详情，包含关联的事件列表
+    根据手机号获取人员分析详情，包含关联的事件列表（已预渲染的直接返回缓存的 JSON）
     
     - **phone**: 手机号码
     """
     try:
-        result = event_service.get_person_analysis_detail(phone)
+        cached = render_cache.get('person', phone)
+        if cached is not None:
+            return Response(content=cached, media_type="application/json")
+        with governed('get_person_analysis_detail', phones=[phone]):
+            result = event_service.get_person_analysis_detail(phone)
         if result is None:
             raise HTTPException(status_code=404, detail=f"未找到手机号为 {phone} 的人员信息")
         return result
@@ -266,6 +579,179 @@ async def get_person_analysis_detail(phone: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取人员分析详情失败: {str(e)}")
 
+@app.get("/api/person-analysis/{phone}/network", response_model=PhoneNetworkResponse, summary="获取人员关系网络",
+         dependencies=[supported('get_person_network')])
+def get_person_network(
+    phone: str,
+    hops: int = Query(2, ge=1, le=4, description="展开跳数"),
+    max_nodes: int = Query(200, ge=1, le=2000, description="最多返回节点数")
+):
+    """
+    根据手机号获取共现关系网络：与该号码出现在同一事件中的号码，以及这些号码的关联号码
+    
+    - **phone**: 手机号码
+    - **hops**: 展开跳数，1-4之间
+    - **max_nodes**: 最多返回节点数，超出时按跳数截断
+    """
+    try:
+        with governed('get_person_network', max_nodes=max_nodes):
+            result = event_service.get_person_network(phone, hops=hops, max_nodes=max_nodes)
+        if result is None:
+            raise HTTPException(status_code=404, detail=f"未找到手机号为 {phone} 的关联信息")
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取人员关系网络失败: {str(e)}")
+
+@app.get("/api/person-analysis/{phone}/component", response_model=PhoneComponentResponse, summary="获取人员关联群体",
+         dependencies=[supported('get_person_component')])
+def get_person_component(
+    phone: str,
+    limit: int = Query(500, ge=1, le=5000, description="最多返回号码数")
+):
+    """
+    根据手机号获取其所在连通分量（通过共同事件直接或间接关联的全部号码），按事件数量倒序
+    
+    - **phone**: 手机号码
+    - **limit**: 最多返回号码数
+    """
+    try:
+        result = event_service.get_person_component(phone, limit=limit)
+        if result is None:
+            raise HTTPException(status_code=404, detail=f"未找到手机号为 {phone} 的关联信息")
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取人员关联群体失败: {str(e)}")
+
+@app.get("/api/hotspots", response_model=HotspotResponse, summary="获取重复报警热点",
+         dependencies=[supported('get_hotspots')])
+def get_hotspots(
+    kind: str = Query("phone", pattern="^(phone|community)$", description="热点类型：phone（电话）或 community（村社）"),
+    window_hours: float = Query(24, gt=0, le=MAX_WINDOW_HOURS, description="统计窗口（小时）"),
+    threshold: int = Query(3, ge=1, description="窗口内事件数阈值"),
+    as_of: Optional[datetime] = Query(None, description="统计截止时间，默认为最新事件的上报时间"),
+    limit: int = Query(50, ge=1, le=500, description="返回数量")
+):
+    """
+    获取最近 N 小时内事件数达到阈值的电话号码或村社，按事件数倒序排列
+    
+    - **kind**: phone 按参与人电话统计，community 按村社（镇街/村社名称）统计
+    - **window_hours**: 统计窗口（小时），最长 720 小时
+    - **threshold**: 窗口内事件数达到该值即视为热点
+    - **as_of**: 统计截止时间
+    - **limit**: 返回数量
+    """
+    try:
+        result = event_service.get_hotspots(
+            kind=kind,
+            window_hours=window_hours,
+            threshold=threshold,
+            as_of=as_of,
+            limit=limit
+        )
+        return result
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取热点失败: {str(e)}")
+
+@app.get("/api/org-tree", response_model=OrgTreeResponse, summary="所属组织树下钻")
+def get_org_tree(path: Optional[str] = Query(None, description="节点路径，如 海曙区/月湖街道，为空时为根节点")):
+    """
+    所属组织（区县 → 镇街 → 村社 → 网格）逐级下钻：节点的事件数和直接下级，下级按事件数倒序排列
+    
+    - **path**: 节点路径，下级的 path 可继续下钻，也可作为事件列表的 org_path 筛选
+    """
+    try:
+        result = event_service.get_org_tree(path)
+        if result is None:
+            raise HTTPException(status_code=404, detail=f"未找到组织 {path}")
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取组织树失败: {str(e)}")
+
+@app.get("/api/sla", response_model=SlaReportResponse, summary="处置时效统计",
+         dependencies=[supported('get_sla_report')])
+def get_sla_report(
+    group_by: str = Query("department", pattern="^(department|town|category)$",
+                          description="分组：department（办结职能科室/部门）、town（镇街）或 category（二级分类）"),
+    min_events: int = Query(1, ge=1, description="只返回事件数不少于该值的分组")
+):
+    """
+    派发、受理、办结用时（小时）按分组的均值、分位数（p50/p90/p95/p99）和直方图，分组按事件数倒序排列
+    
+    - **group_by**: 分组方式
+    - **min_events**: 只返回事件数不少于该值的分组
+    - 用时：dispatch 为上报到最后派发，accept 为最后派发到最后受理，close 为上报到办结；缺少时间的事件不计入该环节，受理后又被再次派发的事件不计入受理环节
+    """
+    try:
+        return event_service.get_sla_report(group_by=group_by, min_events=min_events)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取处置时效统计失败: {str(e)}")
+
+@app.get("/api/admin/slow-queries", response_model=SlowQueryResponse, summary="慢请求日志",
+         dependencies=[Depends(require_admin)])
+async def get_slow_queries(limit: int = Query(50, ge=1, le=500, description="返回数量")):
+    """
+    耗时最长的请求，包含请求参数和 EventService 各阶段耗时（需要 X-Admin-Token）
+    
+    - **limit**: 返回数量
+    """
+    try:
+        return SlowQueryResponse(items=slow_query_log.slowest(limit))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取慢请求日志失败: {str(e)}")
+
+@app.delete("/api/admin/slow-queries", summary="清空慢请求日志", dependencies=[Depends(require_admin)])
+async def clear_slow_queries():
+    """清空慢请求日志（需要 X-Admin-Token）"""
+    slow_query_log.clear()
+    return {"status": "cleared"}
+
+@app.get("/api/admin/profiles", response_model=ProfileListResponse, summary="请求分析结果列表",
+         dependencies=[Depends(require_admin)])
+async def get_profiles():
+    """最近的请求分析结果（需要 X-Admin-Token）"""
+    try:
+        return ProfileListResponse(items=profile_store.list())
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取分析结果失败: {str(e)}")
+
+@app.get("/api/admin/profiles/{profile_id}", response_class=PlainTextResponse, summary="获取请求分析结果",
+         dependencies=[Depends(require_admin)])
+async def get_profile(profile_id: str):
+    """
+    获取单个请求的分析结果（需要 X-Admin-Token）
+    
+    - **profile_id**: 分析请求响应头 X-Profile-Id 中的编号
+    - 返回：sample 模式为折叠栈文本（可用 flamegraph.pl / speedscope 生成火焰图），cprofile 模式为 pstats 文本
+    """
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"未找到分析结果 {profile_id}")
+    return PlainTextResponse(profile['profile'])
+
+@app.get("/api/admin/memory", response_model=MemoryReportResponse, summary="内存占用报告",
+         dependencies=[Depends(require_admin), supported('get_memory_report')])
+def get_memory_report():
+    """各数据表按列的内存占用、索引大小和进程常驻内存（需要 X-Admin-Token）"""
+    try:
+        return event_service.get_memory_report()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取内存占用失败: {str(e)}")
+
+@app.get("/api/admin/partitions", response_model=PartitionReportResponse, summary="分区目录",
+         dependencies=[Depends(require_admin), supported('get_partition_report')])
+def get_partition_report():
+    """事件和聚类事件按上报月份的分区目录：行数、时间范围、取值计数和是否已读入内存（需要 X-Admin-Token）"""
+    try:
+        return event_service.get_partition_report()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取分区目录失败: {str(e)}")
+
 # 运行应用
 if __name__ == "__main__":
     uvicorn.run(
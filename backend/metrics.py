@@ -0,0 +1,264 @@
+from bisect import bisect_left
+from contextlib import ContextDecorator
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Tuple
+import threading
+import time
+
+from starlette.routing import Match
+
+
+# 默认延迟分桶（秒），覆盖 0.5ms ~ 10s
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# 行数/结果数分桶
+SIZE_BUCKETS = (0, 1, 10, 20, 50, 100, 500, 1000, 5000, 10000, 50000, 100000, 500000, 1000000)
+
+
+def _format_labels(labelnames: Tuple[str, ...], labelvalues: Tuple[str, ...], extra: str = '') -> str:
+    parts = [
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in zip(labelnames, labelvalues)
+    ]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """单调递增计数器，按标签值分组"""
+
+    type_name = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, *labelvalues: str):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [
+            f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}'
+            for labels, value in values
+        ]
+
+
+class Histogram:
+    """固定分桶直方图，按标签值分组
+
+    每次记录只做一次二分查找和两次加法，可在高并发下常开。
+    """
+
+    type_name = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 标签值 -> [各分桶计数..., +Inf 计数, 总和]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labelvalues)
+            if series is None:
+                series = self._values[labelvalues] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            values = sorted((labels, list(series)) for labels, series in self._values.items())
+        lines = []
+        for labels, series in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series[:-1]):
+                cumulative += count
+                le = 'le="{}"'.format(_format_value(bound))
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}')
+            label_str = _format_labels(self.labelnames, labels)
+            lines.append(f'{self.name}_sum{label_str} {_format_value(series[-1])}')
+            lines.append(f'{self.name}_count{label_str} {cumulative}')
+        return lines
+
+
+class MetricsRegistry:
+    """指标注册表，按 Prometheus 文本格式输出"""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                  buckets: Iterable[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.type_name}')
+            lines.extend(metric.collect())
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+REQUEST_LATENCY = registry.histogram(
+    'http_request_duration_seconds', 'HTTP请求耗时（秒）', ('method', 'route', 'status')
+)
+STAGE_LATENCY = registry.histogram(
+    'event_service_stage_duration_seconds', 'EventService各阶段耗时（秒）', ('stage',)
+)
+ROWS_SCANNED = registry.histogram(
+    'event_service_rows_scanned', '查询扫描的候选行数', ('query',), buckets=SIZE_BUCKETS
+)
+RESULT_SIZE = registry.histogram(
+    'event_service_result_size', '查询命中的结果总数', ('query',), buckets=SIZE_BUCKETS
+)
+CACHE_REQUESTS = registry.counter(
+    'event_service_cache_requests_total', '索引/缓存查找次数', ('cache', 'result')
+)
+
+
+class RequestTrace:
+    """单个请求内的阶段耗时记录 [(stage, 秒), ...]，执行过这些阶段的线程，
+    以及需要在最外层阶段内启用的确定性分析器（cProfile 只对启用它的线程生效）"""
+
+    __slots__ = ('stages', 'threads', 'profiler', 'profiling')
+
+    def __init__(self, profiler=None):
+        self.stages: List[Tuple[str, float]] = []
+        self.threads = set()
+        self.profiler = profiler
+        self.profiling = False
+
+
+# 当前请求的跟踪记录，由请求中间件设置，未设置时不记录（线程池执行的接口会复制该上下文）
+request_trace: ContextVar[Optional[RequestTrace]] = ContextVar('request_trace', default=None)
+
+
+class timed(ContextDecorator):
+    """记录一个阶段的耗时，可作为上下文管理器或装饰器使用
+
+        with timed('get_events.search'):
+            ...
+
+        @timed('get_cluster_detail')
+        def get_cluster_detail(...):
+            ...
+    """
+
+    def __init__(self, stage: str, histogram: Histogram = STAGE_LATENCY):
+        self.stage = stage
+        self.histogram = histogram
+        self._local = threading.local()
+
+    def __enter__(self):
+        starts = getattr(self._local, 'starts', None)
+        if starts is None:
+            starts = self._local.starts = []
+        trace = request_trace.get()
+        enabled_profiler = False
+        if trace is not None:
+            trace.threads.add(threading.get_ident())
+            if trace.profiler is not None and not trace.profiling:
+                trace.profiling = enabled_profiler = True
+                trace.profiler.enable()
+        starts.append((time.perf_counter(), enabled_profiler))
+        return self
+
+    def __exit__(self, *exc):
+        start, enabled_profiler = self._local.starts.pop()
+        elapsed = time.perf_counter() - start
+        self.histogram.observe(elapsed, self.stage)
+        trace = request_trace.get()
+        if trace is not None:
+            trace.stages.append((self.stage, elapsed))
+            if enabled_profiler:
+                trace.profiler.disable()
+                trace.profiling = False
+        return False
+
+
+def cache_lookup(cache: str, hit: bool, count: int = 1):
+    """记录一次缓存/索引查找是否命中"""
+    if count:
+        CACHE_REQUESTS.inc(count, cache, 'hit' if hit else 'miss')
+
+
+class MetricsMiddleware:
+    """ASGI 中间件：按路由模板记录请求耗时
+
+    路由模板（如 /api/events/{event_id}）在路由匹配后从 scope['endpoint'] 反查，
+    避免路径参数造成标签基数膨胀；未匹配的请求记为 unmatched。
+    """
+
+    def __init__(self, app, skip_paths: Iterable[str] = ('/metrics',)):
+        self.app = app
+        self.skip_paths = set(skip_paths)
+        self._routes: Optional[Dict[object, str]] = None
+
+    def _route_path(self, scope) -> str:
+        router = scope.get('router') or getattr(scope.get('app'), 'router', None)
+        routes = getattr(router, 'routes', [])
+        endpoint = scope.get('endpoint')
+        if endpoint is None:
+            # 未经过路由就已返回的请求（如 ETag 命中的 304）按路径匹配路由模板
+            for route in routes:
+                if hasattr(route, 'matches') and route.matches(scope)[0] == Match.FULL:
+                    return getattr(route, 'path', 'unmatched')
+            return 'unmatched'
+        if self._routes is None or endpoint not in self._routes:
+            self._routes = {getattr(route, 'endpoint', None): getattr(route, 'path', '') for route in routes}
+        return self._routes.get(endpoint, 'unmatched')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope.get('path') in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        status = {'code': 500}
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                status['code'] = message['status']
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = self._route_path(scope)
+            REQUEST_LATENCY.observe(time.perf_counter() - start, scope['method'], route, str(status['code']))
@@ -1,6 +1,6 @@
-from pydantic import BaseModel
-from typing import List, Optional, Any
-from datetime import datetime
+from pydantic import BaseModel, Field
+from typing import List, Optional, Any, Union, Dict
+from datetime import datetime, date
 
 class EventResponse(BaseModel):
     """事件列表响应模型"""
@@ -51,6 +51,14 @@ class PaginatedResponse(BaseModel):
     page_size: int
     total_pages: int
 
+class ProjectedListResponse(BaseModel):
+    """字段投影的分页响应模型（列表项只包含请求的字段）"""
+    items: List[Dict[str, Any]]
+    total: int
+    page: int
+    page_size: int
+    total_pages: int
+
 class FilterOptions(BaseModel):
     """筛选选项模型"""
     towns: List[str]
@@ -67,6 +75,8 @@ class EventQuery(BaseModel):
     level: Optional[str] = None
     category: Optional[str] = None
     related_events: Optional[str] = None  # 相关事件数量筛选
+    start_time: Optional[Union[datetime, date]] = None  # 上报时间起
+    end_time: Optional[Union[datetime, date]] = None  # 上报时间止
 
 class ClusterListResponse(BaseModel):
     """聚合事件列表响应模型"""
@@ -94,6 +104,8 @@ class ClusterQuery(BaseModel):
     max_event_count: Optional[int] = None  # 最大事件数量
     min_duration: Optional[float] = None  # 最小持续时间（天）
     max_duration: Optional[float] = None  # 最大持续时间（天）
+    start_time: Optional[Union[datetime, date]] = None  # 时间范围起
+    end_time: Optional[Union[datetime, date]] = None  # 时间范围止
 
 class ClusterFilterOptions(BaseModel):
     """聚合事件筛选选项模型"""
@@ -119,12 +131,14 @@ class PersonInfo(BaseModel):
     highest_education: Optional[str] = None
     occupation_code: Optional[str] = None
     employer_name: Optional[str] = None
+    name_distance: Optional[int] = None  # 模糊搜索时与搜索姓名的编辑距离
 
 class PersonSearchQuery(BaseModel):
     """人口信息搜索查询模型"""
     name: Optional[str] = None
     id_card: Optional[str] = None  # 脱敏的身份证
     phone: Optional[str] = None    # 脱敏的手机号
+    fuzzy: bool = False            # 姓名按编辑距离模糊匹配，结果按距离排序
     page: int = 1
     page_size: int = 10
 
@@ -146,6 +160,7 @@ class PersonAnalysis(BaseModel):
     event_count: int
     name_candidates: Optional[str] = None
     id_candidates: Optional[str] = None
+    name_distance: Optional[int] = None  # 模糊搜索时与搜索姓名的编辑距离
 
 class PersonAnalysisResponse(BaseModel):
     """人员分析列表分页响应模型"""
@@ -180,4 +195,256 @@ class PersonAnalysisQuery(BaseModel):
     page: int = 1
     page_size: int = 20
     search: Optional[str] = None  # 搜索姓名或手机号
-    role: Optional[str] = None    # 按角色筛选
\ No newline at end of file
+    role: Optional[str] = None    # 按角色筛选
+    fuzzy: bool = False           # 只按姓名（含候选姓名）编辑距离模糊匹配，结果按距离排序
+
+# 热点检测相关模型
+class HotspotItem(BaseModel):
+    """热点（重复报警电话或高发村社）模型"""
+    key: str
+    kind: str  # phone 或 community
+    town: Optional[str] = None
+    community: Optional[str] = None
+    event_count: int  # 窗口内事件数
+    previous_count: int  # 前一个等长窗口内事件数
+    rate_per_hour: float
+    escalating: bool  # 窗口内事件数是否高于前一个窗口
+    first_time: str
+    last_time: str
+    event_ids: List[str]
+
+class HotspotResponse(BaseModel):
+    """热点列表响应模型"""
+    kind: str
+    window_hours: float
+    threshold: int
+    as_of: Optional[str] = None
+    items: List[HotspotItem]
+
+class OrgNode(BaseModel):
+    """所属组织树的节点"""
+    name: str
+    path: str  # 完整路径，如 海曙区/月湖街道，可作为事件列表的 org_path 筛选
+    level: str  # 区县/镇街/村社/网格
+    event_count: int
+    has_children: bool
+
+class OrgTreeResponse(BaseModel):
+    """所属组织树下钻响应模型"""
+    path: str  # 根节点为空字符串
+    level: Optional[str] = None
+    event_count: int
+    children: List[OrgNode]
+
+class SlaStageStats(BaseModel):
+    """一个环节的用时统计（小时），缺少时间或用时为负的事件不计入"""
+    count: int
+    mean: Optional[float] = None
+    p50: Optional[float] = None
+    p90: Optional[float] = None
+    p95: Optional[float] = None
+    p99: Optional[float] = None
+    histogram: List[int]  # 各分档的事件数，分档见 SlaReportResponse.bins
+
+class SlaGroupStats(BaseModel):
+    """一个分组的处置时效统计"""
+    name: str
+    events: int
+    stages: Dict[str, SlaStageStats]  # dispatch（上报到派发）/ accept（派发到受理）/ close（上报到办结）
+
+class SlaReportResponse(BaseModel):
+    """处置时效统计响应模型"""
+    group_by: str
+    bins: List[str]
+    overall: SlaGroupStats
+    groups: List[SlaGroupStats]
+
+class EventIngestRequest(BaseModel):
+    """事件增量写入请求模型"""
+    events: List[Dict[str, Any]]  # 字段与事件详情一致，可附带extracted_info
+
+class EventIngestResponse(BaseModel):
+    """事件增量写入响应模型"""
+    ingested: int
+    total: int
+
+# 人员关系网络相关模型
+class NetworkNode(BaseModel):
+    """共现网络节点模型"""
+    phone: str
+    hop: int  # 距中心号码的跳数
+    event_count: int  # 该号码参与的事件数
+    name: Optional[str] = None
+    primary_role: Optional[str] = None
+
+class NetworkEdge(BaseModel):
+    """共现网络边模型"""
+    source: str
+    target: str
+    weight: int  # 共同参与的事件数
+
+class PhoneNetworkResponse(BaseModel):
+    """电话号码共现网络响应模型"""
+    phone: str
+    hops: int
+    component_id: int
+    component_size: int
+    truncated: bool  # 节点数是否超过上限被截断
+    nodes: List[NetworkNode]
+    edges: List[NetworkEdge]
+
+class PhoneComponentResponse(BaseModel):
+    """电话号码所在连通分量响应模型"""
+    phone: str
+    component_id: int
+    component_size: int
+    phones: List[str]
+
+# 相似事件相关模型
+class SimilarEvent(BaseModel):
+    """相似事件模型"""
+    事件编号: str
+    事件描述: str
+    镇街名称: Optional[str] = None
+    上报时间: Optional[str] = None
+    EventUID: Optional[str] = None
+    score: float  # 余弦相似度
+
+class SimilarCluster(BaseModel):
+    """相似聚类事件模型"""
+    EventUID: str
+    cluster_description: str
+    record_count: int
+    first_report_time: Optional[str] = None
+    last_report_time: Optional[str] = None
+    score: float  # 余弦相似度
+
+class SimilarResponse(BaseModel):
+    """相似事件查询响应模型"""
+    query: str
+    events: List[SimilarEvent]
+    clusters: List[SimilarCluster]
+
+class SimilarSearchQuery(BaseModel):
+    """相似事件文本查询模型"""
+    text: str
+    top_k: int = Field(10, ge=1, le=100)
+
+# 批量查询相关模型
+BATCH_MAX_IDS = 5000  # 单次批量查询的最大数量
+
+class BatchEventQuery(BaseModel):
+    """批量事件查询模型"""
+    ids: List[str] = Field(..., min_length=1, max_length=BATCH_MAX_IDS)
+
+class BatchClusterQuery(BaseModel):
+    """批量聚类事件查询模型"""
+    event_uids: List[str] = Field(..., min_length=1, max_length=BATCH_MAX_IDS)
+
+class BatchPersonQuery(BaseModel):
+    """批量人员分析查询模型"""
+    phones: List[str] = Field(..., min_length=1, max_length=BATCH_MAX_IDS)
+
+class BatchEventDetailResponse(BaseModel):
+    """批量事件详情响应模型"""
+    items: List[EventDetailResponse]
+    missing: List[str]  # 未找到的事件编号
+
+class BatchClusterDetailResponse(BaseModel):
+    """批量聚类事件详情响应模型"""
+    items: List[ClusterEventResponse]
+    missing: List[str]  # 未找到的EventUID
+
+class BatchPersonDetailResponse(BaseModel):
+    """批量人员分析详情响应模型"""
+    items: List[PersonDetailResponse]
+    missing: List[str]  # 未找到的手机号
+
+# 性能分析相关模型
+class StageTiming(BaseModel):
+    """请求内 EventService 阶段耗时"""
+    stage: str
+    duration_ms: float
+
+class SlowQueryItem(BaseModel):
+    """慢请求记录"""
+    method: str
+    path: str
+    query: str
+    status: int
+    duration_ms: float
+    stages: List[StageTiming]
+    time: str
+    profile_id: Optional[str] = None
+
+class SlowQueryResponse(BaseModel):
+    """慢请求日志响应模型"""
+    items: List[SlowQueryItem]
+
+class ProfileSummary(BaseModel):
+    """请求分析结果概要"""
+    id: str
+    mode: str  # sample（折叠栈）/ cprofile（pstats 文本）
+    samples: Optional[int] = None
+    method: str
+    path: str
+    query: str
+    duration_ms: float
+    time: str
+
+class ProfileListResponse(BaseModel):
+    """请求分析结果列表"""
+    items: List[ProfileSummary]
+
+# 内存占用相关模型
+class ColumnMemory(BaseModel):
+    """列内存占用"""
+    column: str
+    dtype: str
+    bytes: int
+
+class TableMemory(BaseModel):
+    """表内存占用"""
+    name: str
+    rows: int
+    bytes: int
+    columns: List[ColumnMemory]
+
+class MemoryReportResponse(BaseModel):
+    """内存占用报告"""
+    compact_storage: bool
+    rss_bytes: int  # 进程常驻内存
+    tables_bytes: int
+    tables: List[TableMemory]
+    indexes: Dict[str, int]  # 索引名 -> 字节数
+
+# 分区目录相关模型
+class PartitionInfo(BaseModel):
+    """一个按上报月份划分的分区"""
+    key: str  # 年月（YYYY-MM），时间未知的分区为空字符串
+    rows: int
+    min_time: Optional[str] = None
+    max_time: Optional[str] = None
+    loaded: bool  # 是否已读入内存（冷分区在首次需要时从快照读入）
+    facets: Dict[str, Dict[str, int]]  # 列 -> 取值 -> 行数
+
+class PartitionReportResponse(BaseModel):
+    """事件和聚类事件的分区目录"""
+    tiered: bool  # 是否启用冷热分层
+    hot_months: int
+    events: List[PartitionInfo]
+    clusters: List[PartitionInfo]
+
+# 加载状态相关模型
+class ComponentStatus(BaseModel):
+    """数据表/索引组件加载状态"""
+    name: str
+    loaded: bool
+    rows: Optional[int] = None
+    seconds: Optional[float] = None  # 加载耗时
+
+class ReadinessResponse(BaseModel):
+    """就绪检查响应模型"""
+    ready: bool
+    warming_up: bool
+    components: List[ComponentStatus]
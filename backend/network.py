@@ -0,0 +1,99 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+
+
+class PhoneGraph:
+    """电话号码共现图
+
+    以 电话×电话 的CSR稀疏矩阵存储，边权为两个号码共同出现的事件数。
+    邻域遍历和连通分量计算都在scipy的编译代码中完成。
+    """
+
+    def __init__(self, phones: List[str], adjacency: sparse.csr_matrix, event_counts: np.ndarray):
+        self.phones = np.asarray(phones, dtype=object)
+        self.phone_index: Dict[str, int] = {phone: i for i, phone in enumerate(phones)}
+        self.adjacency = adjacency
+        self.event_counts = event_counts
+        self.component_count, self.component_labels = connected_components(adjacency, directed=False)
+        self.component_sizes = np.bincount(self.component_labels) if len(phones) else np.array([], dtype=np.int64)
+
+    @classmethod
+    def from_participants(cls, participants_by_event: Dict[str, Iterable[str]]) -> 'PhoneGraph':
+        """由 事件编号 -> 电话号码列表 构建共现图"""
+        phone_index: Dict[str, int] = {}
+        rows: List[int] = []
+        cols: List[int] = []
+        event_row = 0
+        for phones in participants_by_event.values():
+            unique_phones = set(p for p in phones if p)
+            if not unique_phones:
+                continue
+            for phone in unique_phones:
+                rows.append(event_row)
+                cols.append(phone_index.setdefault(phone, len(phone_index)))
+            event_row += 1
+
+        n_phones = len(phone_index)
+        incidence = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.int32), (rows, cols)),
+            shape=(event_row, n_phones)
+        )
+
+        # 电话×电话共现矩阵（去掉自环）
+        adjacency = (incidence.T @ incidence).tocsr()
+        adjacency.setdiag(0)
+        adjacency.eliminate_zeros()
+
+        event_counts = np.asarray(incidence.sum(axis=0)).ravel()
+        phones = [None] * n_phones
+        for phone, i in phone_index.items():
+            phones[i] = phone
+        return cls(phones, adjacency, event_counts)
+
+    def __contains__(self, phone: str) -> bool:
+        return phone in self.phone_index
+
+    def neighbourhood(self, phone: str, hops: int = 2,
+                      max_nodes: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, bool]:
+        """广度优先展开 hops 跳以内的邻居
+
+        返回（节点下标, 对应跳数, 是否因 max_nodes 截断），节点按跳数排列
+        """
+        start = self.phone_index[phone]
+        hop_of = np.full(len(self.phones), -1, dtype=np.int16)
+        hop_of[start] = 0
+        frontier = np.array([start])
+        nodes = [frontier]
+        truncated = False
+
+        for hop in range(1, hops + 1):
+            if not len(frontier):
+                break
+            # 取前沿节点所在行的列下标即为其邻居
+            neighbours = np.unique(self.adjacency[frontier].indices)
+            frontier = neighbours[hop_of[neighbours] < 0]
+            hop_of[frontier] = hop
+            nodes.append(frontier)
+
+        nodes = np.concatenate(nodes)
+        if max_nodes is not None and len(nodes) > max_nodes:
+            nodes = nodes[:max_nodes]
+            truncated = True
+        return nodes, hop_of[nodes], truncated
+
+    def edges(self, nodes: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """节点集合内部的边（每条无向边只返回一次）"""
+        sub = self.adjacency[nodes][:, nodes].tocoo()
+        upper = sub.row < sub.col
+        return nodes[sub.row[upper]], nodes[sub.col[upper]], sub.data[upper]
+
+    def component(self, phone: str) -> Tuple[int, int]:
+        """号码所在的连通分量编号和大小"""
+        label = int(self.component_labels[self.phone_index[phone]])
+        return label, int(self.component_sizes[label])
+
+    def component_members(self, label: int) -> np.ndarray:
+        return np.flatnonzero(self.component_labels == label)
@@ -0,0 +1,126 @@
+"""所属组织路径树：区县 → 镇街 → 村社 → 网格的逐级下钻和按节点精确筛选
+
+事件的所属组织为 `海曙区/月湖街道/公众社区/警情分流网格` 形式的路径，原来只能按镇街名称做包含匹配。
+这里在加载时把路径建成树：
+
+- 每个节点（以路径前缀为键）记录事件数和直接下级，下钻一层只读取该节点的下级，代价与下级个数成正比
+- 每一层一个位图索引，取值为各行在该层的路径前缀；按任一层节点筛选即取该层索引中节点的位图，
+  与其他筛选条件的位图按位与
+
+节点事件数覆盖全部事件（冷热分层时由分区目录的取值计数得到），位图只覆盖内存中的行。
+"""
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from bitmaps import WORD_BITS, BitmapIndex, encode_values
+
+ORG_COLUMN = '所属组织'
+
+# 各层的名称，超出的层按序号命名
+ORG_LEVELS = ('区县', '镇街', '村社', '网格')
+
+
+def normalize_org_path(path) -> str:
+    """规范化组织路径：去掉各级名称两端的空白和空的层级"""
+    return '/'.join(part.strip() for part in str(path).split('/') if part.strip())
+
+
+def normalize_org_paths(values: pd.Series) -> pd.Series:
+    """规范化一列组织路径（只对不同的取值做字符串处理），缺失值为空字符串"""
+    codes, uniques = encode_values(values)
+    normalized = np.array([normalize_org_path(value) for value in uniques], dtype=object)
+    return pd.Series(normalized[codes], dtype=object)
+
+
+def org_level_name(depth: int) -> str:
+    """第 depth 层（从 1 开始）的名称"""
+    return ORG_LEVELS[depth - 1] if depth <= len(ORG_LEVELS) else f'第{depth}级'
+
+
+def org_path_mask(values: pd.Series, paths: List[str]) -> np.ndarray:
+    """各个规范化路径是否为 paths 中某个节点或其下级"""
+    matched = np.zeros(len(values), dtype=bool)
+    for path in paths:
+        matched |= ((values == path) | values.str.startswith(path + '/')).to_numpy(dtype=bool)
+    return matched
+
+
+def _parent(path: str) -> str:
+    return path.rpartition('/')[0]
+
+
+class OrgTree:
+    """组织路径树：节点路径 -> 事件数和直接下级，每一层一个位图索引（根节点的路径为空字符串）"""
+
+    def __init__(self):
+        self.size = 0  # 位图索引的行数
+        self._counts: Dict[str, int] = {'': 0}
+        self._children: Dict[str, Dict[str, None]] = {'': {}}  # 节点 -> 直接下级（按首次出现顺序）
+        self._levels: List[BitmapIndex] = []
+
+    def __contains__(self, path: str) -> bool:
+        return path in self._children
+
+    def _add_node(self, path: str):
+        """登记节点及其各级上级"""
+        missing = []
+        while path not in self._children:
+            missing.append(path)
+            path = _parent(path)
+        for node in reversed(missing):
+            self._children[_parent(node)][node] = None
+            self._children[node] = {}
+            self._counts[node] = 0
+
+    def add_counts(self, counts: Dict[str, int]):
+        """累加事件数：规范化路径 -> 事件数，计入路径上的每个节点和根节点"""
+        for path, count in counts.items():
+            self._add_node(path)
+            node = path
+            while True:
+                self._counts[node] += count
+                if not node:
+                    break
+                node = _parent(node)
+
+    def add_rows(self, paths: pd.Series):
+        """在位图索引末尾追加行（各行的规范化路径）；没有路径的行不属于任何节点"""
+        codes, uniques = encode_values(paths)
+        parts = [path.split('/') if path else [] for path in uniques]
+        for path in uniques:
+            if path:
+                self._add_node(path)
+        depth = max((len(segments) for segments in parts), default=0)
+        while len(self._levels) < depth:
+            self._levels.append(BitmapIndex([''] * self.size))
+        for level, bitmaps in enumerate(self._levels):
+            # 先在不同的路径上取该层前缀，再按行展开为分类列（位图索引直接使用分类编码）
+            prefix_codes, prefixes = encode_values(
+                ['/'.join(segments[:level + 1]) if len(segments) > level else '' for segments in parts]
+            )
+            bitmaps.add(pd.Series(pd.Categorical.from_codes(prefix_codes[codes], prefixes)))
+        self.size += len(codes)
+
+    def count(self, path: str) -> int:
+        return self._counts.get(path, 0)
+
+    def children(self, path: str) -> List[Tuple[str, int, bool]]:
+        """直接下级的（路径, 事件数, 是否还有下级），按事件数倒序"""
+        children = [(child, self._counts[child], bool(self._children[child])) for child in self._children.get(path, ())]
+        return sorted(children, key=lambda child: -child[1])
+
+    def bitmap(self, path: str) -> np.ndarray:
+        """节点及其下级的全部行的位图（不存在的节点为全 0）"""
+        depth = path.count('/') + 1
+        if not path or path not in self._children or depth > len(self._levels):
+            return np.zeros((self.size + WORD_BITS - 1) // WORD_BITS, dtype=np.uint64)
+        return self._levels[depth - 1].bitmap(path)
+
+    def union(self, paths: Iterable[str]) -> np.ndarray:
+        """任一节点下全部行的位图"""
+        result = np.zeros((self.size + WORD_BITS - 1) // WORD_BITS, dtype=np.uint64)
+        for path in paths:
+            np.bitwise_or(result, self.bitmap(path), out=result)
+        return result
@@ -0,0 +1,386 @@
+"""按上报月份分区：分区目录、分区裁剪和冷分区的列式快照
+
+事件表整表在内存中，只查本周的请求也要带着历年的数据：筛选选项要扫全表去重，冷启动要读完整个
+CSV。这里按上报月份把事件表和聚类表划分为分区，分区目录记录每个分区的行数、时间范围和各筛选列
+的取值计数：
+
+- 有时间范围或默认按时间倒序的查询先在目录上裁剪出相关分区；完整落在时间范围内的分区用取值计数
+  得到命中数，只有范围边界所在的分区和当前页所在的分区需要逐行处理
+- 开启冷热分层（EVENT_HOT_MONTHS）时，事件表按分区写成列式快照（每个分区一个目录，每个读取片段
+  一个 .npz 文件，文本列存为 UTF-8 字节和偏移量），启动时只读入最近几个月，其余分区留在磁盘上，
+  第一次被查询用到时再读入；数据文件未变化时重启直接读快照，不再解析 CSV
+"""
+import json
+import os
+import shutil
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from bitmaps import encode_values
+
+UNKNOWN_PARTITION = ''  # 上报时间无法解析的行
+CATALOGUE_FILE = 'catalogue.json'
+# 快照格式版本，取值计数的列变化时加一，旧快照在下次启动时重建
+SNAPSHOT_FORMAT = 2
+
+
+def default_hot_months() -> int:
+    """常驻内存的最近月份数，取环境变量 EVENT_HOT_MONTHS（默认 0，不分层，全部读入内存）"""
+    return int(os.environ.get('EVENT_HOT_MONTHS', '0'))
+
+
+def default_snapshot_dir(data_dir: str) -> str:
+    """分区快照目录，取环境变量 EVENT_SNAPSHOT_DIR，默认为数据目录下的 partitions/"""
+    return os.environ.get('EVENT_SNAPSHOT_DIR') or os.path.join(data_dir, 'partitions')
+
+
+def partition_keys(times: np.ndarray) -> np.ndarray:
+    """各行所在的分区（上报月份 YYYY-MM，无法解析的时间为 UNKNOWN_PARTITION）"""
+    keys = np.datetime_as_string(times.astype('datetime64[M]'), unit='M').astype(object)
+    keys[np.isnat(times)] = UNKNOWN_PARTITION
+    return keys
+
+
+def month_bounds(key: str) -> Tuple[np.datetime64, np.datetime64]:
+    """分区的时间边界 [月初, 下月初)"""
+    start = np.datetime64(key, 'M')
+    return start.astype('datetime64[ns]'), (start + 1).astype('datetime64[ns]')
+
+
+def _time_text(value: np.datetime64) -> Optional[str]:
+    return None if np.isnat(value) else str(pd.Timestamp(value))
+
+
+class Partition:
+    """一个分区的目录项
+
+    - **rows**: 行数（包含增量写入的行）
+    - **min_time / max_time**: 分区内最早/最晚的时间
+    - **facets**: 列 -> 取值 -> 行数
+    - **loaded**: 分区的行是否已读入内存
+    - **fragments**: 快照中该分区的片段文件（相对快照目录）
+    """
+    __slots__ = ('key', 'rows', 'min_time', 'max_time', 'facets', 'loaded', 'fragments')
+
+    def __init__(self, key: str, loaded: bool = True):
+        self.key = key
+        self.rows = 0
+        self.min_time = np.datetime64('NaT', 'ns')
+        self.max_time = np.datetime64('NaT', 'ns')
+        self.facets: Dict[str, Dict[str, int]] = {}
+        self.loaded = loaded
+        self.fragments: List[str] = []
+
+    def overlaps(self, start: Optional[np.datetime64], end: Optional[np.datetime64]) -> bool:
+        """分区与时间范围 [start, end) 是否有交集（时间未知的分区只在没有时间范围时参与）"""
+        if self.key == UNKNOWN_PARTITION:
+            return start is None and end is None
+        return (start is None or self.max_time >= start) and (end is None or self.min_time < end)
+
+    def within(self, start: Optional[np.datetime64], end: Optional[np.datetime64]) -> bool:
+        """分区的全部行是否都在时间范围 [start, end) 内"""
+        if self.key == UNKNOWN_PARTITION:
+            return start is None and end is None
+        return (start is None or self.min_time >= start) and (end is None or self.max_time < end)
+
+    def facet_count(self, column: str, predicate: Callable[[pd.Series], np.ndarray]) -> int:
+        """列取值满足条件（对取值做的向量化判断）的行数；没有该列时为 0"""
+        counts = self.facets.get(column)
+        if not counts:
+            return 0
+        matched = predicate(pd.Series(list(counts), dtype=object))
+        return int(np.asarray(list(counts.values()), dtype=np.int64)[matched].sum())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'key': self.key,
+            'rows': self.rows,
+            'min_time': _time_text(self.min_time),
+            'max_time': _time_text(self.max_time),
+            'facets': self.facets,
+            'fragments': self.fragments,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], loaded: bool) -> 'Partition':
+        partition = cls(data['key'], loaded=loaded)
+        partition.rows = int(data['rows'])
+        partition.min_time = np.datetime64(data['min_time'] or 'NaT', 'ns')
+        partition.max_time = np.datetime64(data['max_time'] or 'NaT', 'ns')
+        partition.facets = {column: dict(counts) for column, counts in data['facets'].items()}
+        partition.fragments = list(data.get('fragments', []))
+        return partition
+
+
+class PartitionCatalogue:
+    """分区目录：分区键 -> Partition；partitions() 按时间倒序排列，时间未知的分区排在最后"""
+
+    def __init__(self):
+        self._partitions: Dict[str, Partition] = {}
+
+    def __len__(self) -> int:
+        return len(self._partitions)
+
+    def get(self, key: str) -> Optional[Partition]:
+        return self._partitions.get(key)
+
+    def partitions(self) -> List[Partition]:
+        return sorted(self._partitions.values(), key=lambda p: (p.key != UNKNOWN_PARTITION, p.key), reverse=True)
+
+    @property
+    def total_rows(self) -> int:
+        return sum(partition.rows for partition in self._partitions.values())
+
+    def add(self, times: np.ndarray, facets: Dict[str, pd.Series], loaded: bool = True,
+            end_times: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+        """登记一批行，返回 分区键 -> 这批行中属于该分区的行号
+
+        - **times**: 决定分区的时间（每行一个）
+        - **facets**: 列 -> 各行取值，累加到分区的取值计数
+        - **end_times**: 行本身是一个时间段时（聚类事件）的结束时间，用于分区的最晚时间
+        """
+        if not len(times):
+            return {}
+        keys = partition_keys(times)
+        uniques, key_codes = np.unique(keys, return_inverse=True)
+        end_times = times if end_times is None else end_times
+        groups: Dict[str, np.ndarray] = {}
+        for code, key in enumerate(uniques):
+            rows = np.flatnonzero(key_codes == code)
+            groups[key] = rows
+            partition = self._partitions.get(key)
+            if partition is None:
+                partition = self._partitions[key] = Partition(key, loaded=loaded)
+            partition.rows += len(rows)
+            if key != UNKNOWN_PARTITION:
+                ends = end_times[rows]
+                ends = ends[~np.isnat(ends)]
+                first = times[rows].min()
+                last = max(ends.max(), times[rows].max()) if len(ends) else times[rows].max()
+                partition.min_time = first if np.isnat(partition.min_time) else min(partition.min_time, first)
+                partition.max_time = last if np.isnat(partition.max_time) else max(partition.max_time, last)
+        for column, values in facets.items():
+            value_codes, values_uniques = encode_values(values)
+            counts = np.bincount(key_codes * len(values_uniques) + value_codes,
+                                 minlength=len(uniques) * len(values_uniques)).reshape(len(uniques), len(values_uniques))
+            for code, key in enumerate(uniques):
+                facet = self._partitions[key].facets.setdefault(column, {})
+                for value_code in np.flatnonzero(counts[code]):
+                    value = values_uniques[value_code]
+                    facet[value] = facet.get(value, 0) + int(counts[code, value_code])
+        return groups
+
+    def prune(self, start: Optional[np.datetime64] = None, end: Optional[np.datetime64] = None) -> List[Partition]:
+        """与时间范围 [start, end) 有交集的分区（按时间倒序）"""
+        return [partition for partition in self.partitions() if partition.overlaps(start, end)]
+
+    def facet_values(self, column: str) -> List[str]:
+        """各分区中出现过的取值"""
+        values = {}
+        for partition in self._partitions.values():
+            values.update(dict.fromkeys(value for value, count in partition.facets.get(column, {}).items() if count))
+        return list(values)
+
+    def facet_totals(self, column: str) -> Dict[str, int]:
+        """各取值在全部分区中的行数"""
+        totals: Dict[str, int] = {}
+        for partition in self._partitions.values():
+            for value, count in partition.facets.get(column, {}).items():
+                totals[value] = totals.get(value, 0) + count
+        return totals
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        return [partition.to_dict() for partition in self.partitions()]
+
+    @classmethod
+    def from_list(cls, data: List[Dict[str, Any]], loaded: Callable[[str], bool]) -> 'PartitionCatalogue':
+        catalogue = cls()
+        for item in data:
+            catalogue._partitions[item['key']] = Partition.from_dict(item, loaded=loaded(item['key']))
+        return catalogue
+
+
+class KeyDirectory:
+    """键（事件编号、EventUID）-> 所在分区，用于按编号查询冷分区中的行时只加载对应的分区
+
+    按键的 64 位哈希排序存储（每个键 10 字节）；哈希冲突只会多加载一个分区，不会漏掉。
+    """
+
+    def __init__(self):
+        self.partition_keys: List[str] = []
+        self._hashes: List[np.ndarray] = []
+        self._codes: List[np.ndarray] = []
+        self._sorted: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    @staticmethod
+    def _hash(keys: Iterable) -> np.ndarray:
+        return pd.util.hash_array(np.asarray([str(key) for key in keys], dtype=object))
+
+    def add(self, keys: Iterable, partition: str):
+        if partition not in self.partition_keys:
+            self.partition_keys.append(partition)
+        hashes = self._hash(keys)
+        self._hashes.append(hashes)
+        self._codes.append(np.full(len(hashes), self.partition_keys.index(partition), dtype=np.int16))
+        self._sorted = None
+
+    def _arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        if self._sorted is None:
+            hashes = np.concatenate(self._hashes) if self._hashes else np.array([], dtype=np.uint64)
+            codes = np.concatenate(self._codes) if self._codes else np.array([], dtype=np.int16)
+            order = np.argsort(hashes, kind='stable')
+            self._sorted = (hashes[order], codes[order])
+            self._hashes, self._codes = [self._sorted[0]], [self._sorted[1]]
+        return self._sorted
+
+    def partitions_of(self, keys: Iterable) -> List[str]:
+        """各键所在的分区（去重）"""
+        hashes, codes = self._arrays()
+        wanted = self._hash(keys)
+        lo = np.searchsorted(hashes, wanted, side='left')
+        hi = np.searchsorted(hashes, wanted, side='right')
+        found = set()
+        for start, end in zip(lo.tolist(), hi.tolist()):
+            found.update(codes[start:end].tolist())
+        return [self.partition_keys[code] for code in sorted(found)]
+
+    def save(self, path: str):
+        hashes, codes = self._arrays()
+        np.savez(path, hashes=hashes, codes=codes)
+
+    @classmethod
+    def load(cls, path: str, partition_keys: List[str]) -> 'KeyDirectory':
+        directory = cls()
+        directory.partition_keys = list(partition_keys)
+        with np.load(path, allow_pickle=False) as arrays:
+            directory._sorted = (arrays['hashes'], arrays['codes'])
+        directory._hashes, directory._codes = [directory._sorted[0]], [directory._sorted[1]]
+        return directory
+
+
+# ---- 列式快照 ----
+
+def _encode_text(values: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """文本列编码为（UTF-8 字节, 各行的字符偏移量）"""
+    texts = ['' if value is None else str(value) for value in values.tolist()]
+    offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+    np.cumsum([len(text) for text in texts], out=offsets[1:])
+    return np.frombuffer(''.join(texts).encode('utf-8'), dtype=np.uint8), offsets
+
+
+def _decode_text(data: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    text = data.tobytes().decode('utf-8')
+    values = np.empty(len(offsets) - 1, dtype=object)
+    values[:] = [text[start:end] for start, end in zip(offsets[:-1].tolist(), offsets[1:].tolist())]
+    return values
+
+
+def write_fragment(path: str, df: pd.DataFrame):
+    """把一个片段按列写入 .npz 文件（数值列保留原类型，其余列按文本存储）"""
+    arrays = {}
+    for i, column in enumerate(df.columns):
+        values = df[column]
+        if pd.api.types.is_numeric_dtype(values.dtype) and not isinstance(values.dtype, pd.CategoricalDtype):
+            arrays[f'c{i}'] = values.to_numpy()
+        else:
+            arrays[f'c{i}_data'], arrays[f'c{i}_offsets'] = _encode_text(values)
+    np.savez(path, **arrays)
+
+
+def read_fragment(path: str, columns: List[str]) -> pd.DataFrame:
+    with np.load(path, allow_pickle=False) as arrays:
+        data = {}
+        for i, column in enumerate(columns):
+            if f'c{i}' in arrays:
+                data[column] = arrays[f'c{i}']
+            else:
+                data[column] = _decode_text(arrays[f'c{i}_data'], arrays[f'c{i}_offsets'])
+    return pd.DataFrame(data, columns=columns)
+
+
+class PartitionSnapshot:
+    """分区列式快照：catalogue.json 记录数据版本、列名和分区目录，分区的各片段在以分区键命名的子目录中，
+    keys-<i>.npz 为 key_columns 各列的 KeyDirectory"""
+
+    def __init__(self, directory: str, key_columns: Tuple[str, ...] = ()):
+        self.directory = directory
+        self.key_columns = key_columns
+        self.columns: List[str] = []
+        self.keys: Dict[str, KeyDirectory] = {}
+
+    def load(self, version: str, hot: Callable[[List[str]], Iterable[str]]) -> Optional[PartitionCatalogue]:
+        """读取与数据版本一致的快照目录，hot 由全部分区键选出常驻内存的分区；没有或已过期时返回 None"""
+        try:
+            with open(os.path.join(self.directory, CATALOGUE_FILE), encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if (manifest.get('version') != version or manifest.get('format') != SNAPSHOT_FORMAT
+                or manifest.get('key_columns') != list(self.key_columns)):
+            return None
+        self.columns = manifest['columns']
+        self.keys = {
+            column: KeyDirectory.load(os.path.join(self.directory, f'keys-{i}.npz'), manifest['key_partitions'][i])
+            for i, column in enumerate(self.key_columns)
+        }
+        hot_keys = set(hot([item['key'] for item in manifest['partitions']]))
+        return PartitionCatalogue.from_list(manifest['partitions'], loaded=lambda key: key in hot_keys)
+
+    def build(self, version: str, chunks: Iterator[pd.DataFrame],
+              split: Callable[[pd.DataFrame], Tuple[np.ndarray, Dict[str, pd.Series]]],
+              hot: Callable[[List[str]], Iterable[str]]) -> PartitionCatalogue:
+        """逐块写入快照：split 返回一块的分区时间和取值计数列；全部写完后再替换原快照目录"""
+        building = f'{self.directory}.building-{os.getpid()}'
+        shutil.rmtree(building, ignore_errors=True)
+        os.makedirs(building)
+        catalogue = PartitionCatalogue()
+        self.keys = {column: KeyDirectory() for column in self.key_columns}
+        for number, chunk in enumerate(chunks):
+            if not self.columns:
+                self.columns = list(chunk.columns)
+            if chunk.empty:
+                continue
+            times, facets = split(chunk)
+            for key, rows in catalogue.add(times, facets, loaded=False).items():
+                part = chunk.iloc[rows]
+                name = os.path.join(key or 'unknown', f'{number:05d}.npz')
+                os.makedirs(os.path.join(building, key or 'unknown'), exist_ok=True)
+                write_fragment(os.path.join(building, name), part)
+                catalogue.get(key).fragments.append(name)
+                for column, directory in self.keys.items():
+                    if column in part.columns:
+                        directory.add(part[column], key)
+        for i, directory in enumerate(self.keys.values()):
+            directory.save(os.path.join(building, f'keys-{i}.npz'))
+        with open(os.path.join(building, CATALOGUE_FILE), 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': version,
+                'format': SNAPSHOT_FORMAT,
+                'columns': self.columns,
+                'key_columns': list(self.key_columns),
+                'key_partitions': [directory.partition_keys for directory in self.keys.values()],
+                'partitions': catalogue.to_list(),
+            }, f, ensure_ascii=False)
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.replace(building, self.directory)
+        hot_keys = set(hot([partition.key for partition in catalogue.partitions()]))
+        for partition in catalogue.partitions():
+            partition.loaded = partition.key in hot_keys
+        return catalogue
+
+    def read(self, partitions: List[Partition]) -> pd.DataFrame:
+        """读取若干分区的全部片段（分区内保持原文件顺序）"""
+        frames = [read_fragment(os.path.join(self.directory, name), self.columns)
+                  for partition in partitions for name in partition.fragments]
+        if not frames:
+            return pd.DataFrame({column: pd.Series(dtype=object) for column in self.columns})
+        return pd.concat(frames, ignore_index=True)
+
+
+def latest_months(months: int) -> Callable[[List[str]], List[str]]:
+    """选出最近 months 个月的分区键（时间未知的分区不常驻）"""
+    def select(keys: List[str]) -> List[str]:
+        return sorted((key for key in keys if key != UNKNOWN_PARTITION), reverse=True)[:months]
+    return select
@@ -0,0 +1,240 @@
+from collections import Counter, OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs
+import cProfile
+import heapq
+import io
+import itertools
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+
+from admin import is_admin_token
+from metrics import RequestTrace, request_trace
+
+
+PROFILE_HEADER = 'x-profile'
+PROFILE_ID_HEADER = 'x-profile-id'
+
+
+class StackSampler:
+    """采样分析器：后台线程定时抓取目标线程的调用栈
+
+    目标线程为处理请求的事件循环线程，加上请求内执行过 EventService 调用的线程池线程（由 RequestTrace 记录）。
+    结果为折叠栈格式（"外层;...;内层 次数"，每行一个栈），可直接用 flamegraph.pl / speedscope 打开。
+    采样期间临时调低解释器的线程切换间隔，否则目标线程持有GIL时采样线程约每5ms才能运行一次。
+    """
+
+    def __init__(self, thread_id: int, trace: RequestTrace, interval: float = 0.001):
+        self.thread_id = thread_id
+        self.trace = trace
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._switch_interval = None
+
+    @staticmethod
+    def _frame_label(frame) -> str:
+        code = frame.f_code
+        return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id in {self.thread_id, *self.trace.threads}:
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(self._frame_label(frame))
+                    frame = frame.f_back
+                self.stacks[';'.join(reversed(labels))] += 1
+            self.samples += 1
+
+    def start(self):
+        self._switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(min(self._switch_interval, self.interval / 2))
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        sys.setswitchinterval(self._switch_interval)
+
+    def collapsed(self) -> str:
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+class ProfileStore:
+    """最近的请求分析结果（内存保留 capacity 条，设置 PROFILE_DIR 时同时写入文件）"""
+
+    def __init__(self, capacity: int = 20, directory: Optional[str] = None):
+        self.capacity = capacity
+        self.directory = directory
+        self._profiles: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, profile: Dict[str, Any]):
+        with self._lock:
+            self._profiles[profile['id']] = profile
+            while len(self._profiles) > self.capacity:
+                self._profiles.popitem(last=False)
+        if self.directory:
+            suffix = 'folded' if profile['mode'] == 'sample' else 'txt'
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, f"{profile['id']}.{suffix}"), 'w', encoding='utf-8') as f:
+                f.write(profile['profile'])
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            profiles = list(self._profiles.values())
+        return [{k: v for k, v in p.items() if k != 'profile'} for p in reversed(profiles)]
+
+
+class SlowQueryLog:
+    """保留耗时最长的 capacity 个请求（最小堆，新请求只有比当前最快的一条慢才会替换它）"""
+
+    def __init__(self, capacity: int = 50):
+        self.capacity = capacity
+        self._heap: List = []
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def record(self, duration_ms: float, entry: Dict[str, Any]):
+        with self._lock:
+            if len(self._heap) >= self.capacity and duration_ms <= self._heap[0][0]:
+                return
+            item = (duration_ms, next(self._counter), entry)
+            if len(self._heap) < self.capacity:
+                heapq.heappush(self._heap, item)
+            else:
+                heapq.heapreplace(self._heap, item)
+
+    def slowest(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            items = sorted(self._heap, key=lambda item: -item[0])
+        return [entry for _, _, entry in items[:limit]]
+
+    def clear(self):
+        with self._lock:
+            self._heap = []
+
+
+profile_store = ProfileStore(directory=os.environ.get('PROFILE_DIR') or None)
+slow_query_log = SlowQueryLog(capacity=int(os.environ.get('SLOW_QUERY_LOG_SIZE', '50')))
+
+# 同一时间只对一个请求做采样分析（切换间隔是全局设置）
+_profile_lock = threading.Lock()
+
+
+def _profile_mode(scope, headers: Dict[bytes, bytes]) -> Optional[str]:
+    """请求头 X-Profile 或查询参数 profile 指定分析方式：sample（默认）/ cprofile"""
+    value = headers.get(PROFILE_HEADER.encode())
+    if value is not None:
+        value = value.decode('latin-1')
+    else:
+        values = parse_qs(scope.get('query_string', b'').decode('latin-1')).get('profile')
+        value = values[0] if values else None
+    if value is None or value.lower() in ('', '0', 'false', 'no'):
+        return None
+    return 'cprofile' if value.lower() == 'cprofile' else 'sample'
+
+
+class ProfilingMiddleware:
+    """ASGI 中间件：记录慢请求，并对管理员标记的请求做性能分析
+
+    - 每个请求收集 EventService 各阶段耗时，耗时最长的请求进入慢请求日志
+    - 带 X-Profile 头（或 profile 查询参数）且 X-Admin-Token 有效的请求在分析器下执行，
+      结果按 X-Profile-Id 响应头中的编号保存，非管理员的分析标记被忽略
+    """
+
+    def __init__(self, app, skip_prefixes=('/metrics', '/api/admin', '/docs', '/openapi.json')):
+        self.app = app
+        self.skip_prefixes = tuple(skip_prefixes)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope.get('path', '').startswith(self.skip_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get('headers') or [])
+        mode = _profile_mode(scope, headers)
+        if mode is not None:
+            token = headers.get(b'x-admin-token')
+            if not is_admin_token(token.decode('latin-1') if token else None):
+                mode = None
+            elif mode == 'sample' and not _profile_lock.acquire(blocking=False):
+                mode = None
+
+        profile_id = uuid.uuid4().hex[:12] if mode else None
+        status = {'code': 500}
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                status['code'] = message['status']
+                if profile_id:
+                    message['headers'] = list(message.get('headers', [])) + [
+                        (PROFILE_ID_HEADER.encode(), profile_id.encode())
+                    ]
+            await send(message)
+
+        # cprofile 模式只分析 EventService 调用本身：分析器在请求内最外层的 timed 阶段中启用
+        profiler = cProfile.Profile() if mode == 'cprofile' else None
+        trace = RequestTrace(profiler)
+        trace_token = request_trace.set(trace)
+        if mode == 'sample':
+            profiler = StackSampler(threading.get_ident(), trace)
+            profiler.start()
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            request_trace.reset(trace_token)
+            if mode == 'sample':
+                profiler.stop()
+                _profile_lock.release()
+                profile_text, samples = profiler.collapsed(), profiler.samples
+            elif mode == 'cprofile' and not trace.stages:
+                # 请求没有调用 EventService（健康检查、预渲染缓存命中、304 等），分析器从未启用
+                profile_text, samples = '请求未执行 EventService 调用，没有分析数据\n', None
+            elif mode == 'cprofile':
+                buffer = io.StringIO()
+                pstats.Stats(profiler, stream=buffer).sort_stats('cumulative').print_stats(60)
+                profile_text, samples = buffer.getvalue(), None
+
+            entry = {
+                'method': scope['method'],
+                'path': scope['path'],
+                'query': scope.get('query_string', b'').decode('latin-1'),
+                'status': status['code'],
+                'duration_ms': round(duration_ms, 3),
+                'stages': [{'stage': stage, 'duration_ms': round(elapsed * 1000, 3)} for stage, elapsed in trace.stages],
+                'time': datetime.now().isoformat(timespec='seconds'),
+                'profile_id': profile_id,
+            }
+            slow_query_log.record(duration_ms, entry)
+            if mode:
+                profile_store.add({
+                    'id': profile_id,
+                    'mode': mode,
+                    'samples': samples,
+                    'method': entry['method'],
+                    'path': entry['path'],
+                    'query': entry['query'],
+                    'duration_ms': entry['duration_ms'],
+                    'time': entry['time'],
+                    'profile': profile_text,
+                })
@@ -0,0 +1,200 @@
+"""聚类和人员详情的预渲染缓存
+
+聚类详情要取出全部成员事件、逐条查报警人和当事人信息并排序时间线，人员详情要解析关联事件列表、
+逐条查角色，同一个详情页被反复打开时每次都重算一遍。这里在后台把全部聚类和事件数最多的前 N 个
+手机号的详情渲染成响应 JSON，存入本地 SQLite 键值表；详情接口命中时直接返回存好的字节，
+不查询数据表也不序列化。
+
+- 缓存文件与数据文件摘要绑定，数据文件被替换后整体失效重建；文件跨重启保留，重启后无需重新渲染
+- 增量写入后立即删除受影响的聚类（新事件的 EventUID）和人员（新事件参与人的手机号），
+  再在后台只重新渲染这些条目；删除和写入按代次（每次写入加一）比较，写入前开始渲染的旧结果不会覆盖
+- pandas 后端的增量写入只在内存中，重启后丢失，写入过的缓存文件在下次启动时整体重建
+"""
+import os
+import queue
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from metrics import cache_lookup
+
+KINDS = ('cluster', 'person')
+
+
+def render_cache_enabled() -> bool:
+    """取环境变量 EVENT_RENDER_CACHE（默认开启，0 关闭）"""
+    return os.environ.get('EVENT_RENDER_CACHE', '1').lower() not in ('0', 'false', 'no')
+
+
+def default_cache_path(data_dir: str) -> str:
+    """缓存文件路径，取环境变量 EVENT_RENDER_CACHE_PATH，默认为数据目录下的 render_cache.sqlite3"""
+    return os.environ.get('EVENT_RENDER_CACHE_PATH') or os.path.join(data_dir, 'render_cache.sqlite3')
+
+
+def default_top_phones() -> int:
+    """预渲染的人员数（按事件数倒序），取环境变量 EVENT_RENDER_CACHE_TOP_PHONES（默认 1000）"""
+    return int(os.environ.get('EVENT_RENDER_CACHE_TOP_PHONES', '1000'))
+
+
+def render_json(model: Any) -> bytes:
+    """与接口 response_model 序列化结果相同的 JSON 字节"""
+    return JSONResponse(content=jsonable_encoder(model)).body
+
+
+class DetailRenderCache:
+    """详情预渲染缓存：(kind, key) -> 响应 JSON，kind 为 cluster（EventUID）或 person（手机号）
+
+    - **service**: EventService，提供 cluster_uids()、top_phones()、批量详情和 affected_detail_keys()
+    - **path**: 缓存文件路径，为 None 时不缓存（get 总是未命中）
+    """
+
+    def __init__(self, service, path: Optional[str], top_phones: int = 1000, batch_size: int = 200):
+        self.service = service
+        self.path = path
+        self.top_phones = top_phones
+        self.batch_size = batch_size
+        self._local = threading.local()
+        self._lock = threading.Lock()  # 写入、删除和代次检查
+        self._generation = 0  # 增量写入次数
+        self._dirty: Dict[Tuple[str, str], int] = {}  # 增量写入删除的条目 -> 删除时的代次
+        self._phones: set = set()  # 预渲染的手机号集合，增量写入时只重新渲染其中的号码
+        self._queue: 'queue.Queue' = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._ready = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    def _conn(self) -> sqlite3.Connection:
+        """当前线程的连接（读取不加锁，WAL 模式下与后台写入互不阻塞）"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _meta(self) -> Dict[str, str]:
+        return dict(self._conn().execute('SELECT name, value FROM meta').fetchall())
+
+    def _set_meta(self, conn: sqlite3.Connection, **values: Any):
+        conn.executemany('INSERT OR REPLACE INTO meta VALUES (?, ?)', [(k, str(v)) for k, v in values.items()])
+
+    def _open(self) -> bool:
+        """建表并校验缓存文件，返回已有内容是否完整可用"""
+        conn = self._conn()
+        with conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)')
+            conn.execute('CREATE TABLE IF NOT EXISTS renders (kind TEXT, key TEXT, body BLOB, '
+                         'PRIMARY KEY (kind, key)) WITHOUT ROWID')
+        meta = self._meta()
+        stale = (meta.get('source') != self.service.source_version()
+                 or meta.get('top_phones') != str(self.top_phones)
+                 or (meta.get('ingested') == '1' and not self.service.persistent_ingest))
+        if stale:
+            with self._lock, conn:
+                conn.execute('DELETE FROM renders')
+                conn.execute('DELETE FROM meta')
+                self._set_meta(conn, source=self.service.source_version(), top_phones=self.top_phones)
+            return False
+        self._phones = {row[0] for row in conn.execute("SELECT key FROM renders WHERE kind = 'person'")}
+        return meta.get('complete') == '1'
+
+    def start(self, wait_for: Optional[threading.Thread] = None) -> Optional[threading.Thread]:
+        """打开缓存文件并启动后台渲染线程；缓存不完整时先渲染全部条目（wait_for 为预热线程时等其完成后开始）"""
+        if not self.enabled:
+            return None
+        if self._thread is not None:
+            return self._thread
+        try:
+            complete = self._open()
+        except Exception as e:
+            print(f"详情预渲染缓存打开失败: {e}")
+            return None
+        self._ready = True
+        if not complete:
+            self._queue.put(None)
+        self._thread = threading.Thread(target=self._run, args=(wait_for,), name='detail-render-cache', daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def _run(self, wait_for: Optional[threading.Thread]):
+        if wait_for is not None:
+            wait_for.join()
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    self._render_all()
+                else:
+                    self._render(*item)
+            except Exception as e:
+                print(f"详情预渲染失败: {e}")
+
+    def _render_all(self):
+        phones = self.service.top_phones(self.top_phones)
+        self._phones = set(phones)
+        self._render('cluster', self.service.cluster_uids())
+        self._render('person', phones)
+        with self._lock, self._conn() as conn:
+            self._set_meta(conn, complete=1)
+        print(f"详情预渲染完成: 聚类 {self.count('cluster')} 个, 人员 {self.count('person')} 个")
+
+    def _render(self, kind: str, keys: List[str]):
+        """分批渲染并写入；渲染开始后被增量写入删除的条目不写入（之后会按新数据重新渲染）"""
+        for start in range(0, len(keys), self.batch_size):
+            batch = keys[start:start + self.batch_size]
+            with self._lock:
+                generation = self._generation
+            fetch = self.service.get_clusters_batch if kind == 'cluster' else self.service.get_person_analysis_batch
+            result = fetch(batch)
+            missing = set(result.missing)
+            found = [key for key in dict.fromkeys(str(key) for key in batch) if key not in missing]
+            rows = [(kind, key, render_json(item)) for key, item in zip(found, result.items)]
+            with self._lock:
+                rows = [row for row in rows if self._dirty.get((kind, row[1]), -1) <= generation]
+                for row in rows:
+                    self._dirty.pop((kind, row[1]), None)
+                with self._conn() as conn:
+                    conn.executemany('INSERT OR REPLACE INTO renders VALUES (?, ?, ?)', rows)
+
+    def get(self, kind: str, key: str) -> Optional[bytes]:
+        """已渲染的响应 JSON，未命中时返回 None"""
+        if not self._ready:
+            return None
+        row = self._conn().execute('SELECT body FROM renders WHERE kind = ? AND key = ?', (kind, key)).fetchone()
+        cache_lookup(f'render_{kind}', row is not None)
+        return row[0] if row is not None else None
+
+    def count(self, kind: str) -> int:
+        return self._conn().execute('SELECT COUNT(*) FROM renders WHERE kind = ?', (kind,)).fetchone()[0]
+
+    def on_ingest(self, events: List[tuple]):
+        """写入监听器：删除受影响的条目并排入后台重新渲染"""
+        if not self._ready:
+            return
+        event_uids, phones = self.service.affected_detail_keys([row for _, row, _ in events])
+        phones = [phone for phone in phones if phone in self._phones]
+        keys = [('cluster', uid) for uid in event_uids] + [('person', phone) for phone in phones]
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                self._dirty[key] = self._generation
+            with self._conn() as conn:
+                conn.executemany('DELETE FROM renders WHERE kind = ? AND key = ?', keys)
+                self._set_meta(conn, ingested=1)
+        if event_uids:
+            self._queue.put(('cluster', event_uids))
+        if phones:
+            self._queue.put(('person', phones))
+
+
+def create_render_cache(service) -> DetailRenderCache:
+    """按环境变量创建详情预渲染缓存（EVENT_RENDER_CACHE=0 或服务没有本地数据目录时为不缓存的空实例）"""
+    path = default_cache_path(service.data_dir) if render_cache_enabled() and service.data_dir else None
+    return DetailRenderCache(service, path, top_phones=default_top_phones())
@@ -1,112 +1,1167 @@
 import pandas as pd
 import numpy as np
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Union, Callable, Iterator, Tuple
 import re
 import os
-from datetime import datetime
-from models import EventResponse, EventDetailResponse, ClusterEventResponse, PaginatedResponse, FilterOptions, ClusterListResponse, ClusterListPaginatedResponse, ClusterFilterOptions, PersonInfo, PersonSearchQuery, PersonSearchResponse, PersonAnalysis, PersonAnalysisResponse, PersonEvent, PersonDetailResponse, PersonAnalysisQuery, PersonAnalysis, PersonAnalysisResponse, PersonEvent, PersonDetailResponse, PersonAnalysisQuery
+import threading
+import time
+import zlib
+from datetime import datetime, date, timedelta
+from models import EventResponse, EventDetailResponse, ClusterEventResponse, PaginatedResponse, FilterOptions, ClusterListResponse, ClusterListPaginatedResponse, ClusterFilterOptions, PersonInfo, PersonSearchQuery, PersonSearchResponse, PersonAnalysis, PersonAnalysisResponse, PersonEvent, PersonDetailResponse, PersonAnalysisQuery, PersonAnalysis, PersonAnalysisResponse, PersonEvent, PersonDetailResponse, PersonAnalysisQuery, HotspotItem, HotspotResponse, NetworkNode, NetworkEdge, PhoneNetworkResponse, PhoneComponentResponse, SimilarEvent, SimilarCluster, SimilarResponse, BatchEventDetailResponse, BatchClusterDetailResponse, BatchPersonDetailResponse, ProjectedListResponse, ColumnMemory, TableMemory, MemoryReportResponse, PartitionInfo, PartitionReportResponse, SlaReportResponse, OrgNode, OrgTreeResponse
 import json
+from hotspots import HotspotDetector
+from sla import SlaIndex
+from org_tree import ORG_COLUMN, OrgTree, normalize_org_path, normalize_org_paths, org_level_name, org_path_mask
+from network import PhoneGraph
+from similarity import TfidfIndex
+from metrics import timed, cache_lookup, ROWS_SCANNED, RESULT_SIZE
+from governor import check_deadline
+from extraction import extract_participants, TEXT_EXTRACTION_VERSION, TEXT_SOURCE
+from fuzzy import NameIndex
+from bitmaps import BitmapIndex, bitmap_and, bitmap_contains, bitmap_count
+from csv_chunks import read_csv_chunks
+from partitions import (PartitionCatalogue, PartitionSnapshot, UNKNOWN_PARTITION, default_hot_months,
+                        default_snapshot_dir, latest_months, month_bounds)
+from storage import compact_storage_enabled, fill_missing, compact_frame, align_categories, frame_memory_report, process_rss
+
+# 数据表文件及读取参数
+TABLE_FILES = {
+    'detail_df': ('conflict_event_detail.csv', {}),
+    'cluster_df': ('conflict_event.csv', {}),
+    'info_df': ('info_merge.csv', {}),
+    # 人口信息使用更强的CSV解析参数
+    'people_df': ('people_info_simple.csv', {'sep': ',', 'quotechar': '"', 'quoting': 1, 'engine': 'python'}),
+    'phone_master_df': ('phone_master_index.csv', {}),
+}
+
+# 数据表的数值列 -> 无法解析时的填充值（None 表示保留缺失值），其余列按文本读取
+TABLE_NUMERIC_COLUMNS = {
+    'detail_df': {'sequence_total': 1},
+    'cluster_df': {'record_count': None, 'sequence_total': None, 'duration_days': None},
+    'phone_master_df': {'total_events': None, 'event_count': 0},
+}
+
+TABLE_LABELS = {
+    'detail_df': '事件详情',
+    'cluster_df': '聚类事件',
+    'info_df': '报警人信息',
+    'people_df': '人口信息',
+    'phone_master_df': '人员分析',
+}
+
+# 按需加载的组件：数据表及其索引、相似度索引、热点检测器和处置时效统计
+# 组件 -> 首次访问时加载该组件的属性
+LAZY_COMPONENTS = {
+    'detail_df': ('detail_df', '_event_times', '_event_time_order', '_event_times_sorted',
+                  '_event_desc_order', '_event_id_index', '_cluster_members', '_event_partitions'),
+    'cluster_df': ('cluster_df', '_cluster_first_order', '_cluster_first_sorted',
+                   '_cluster_last_order', '_cluster_last_sorted', '_cluster_uid_index', '_cluster_partitions'),
+    'info_df': ('info_df', '_participants_by_event', '_phone_graph'),
+    'people_df': ('people_df',),
+    'phone_master_df': ('phone_master_df', '_phone_index'),
+    'people_names': ('_people_name_index',),
+    'person_names': ('_person_name_index',),
+    'event_bitmaps': ('_event_bitmaps', '_org_tree'),
+    'role_bitmaps': ('_role_bitmaps',),
+    'event_similarity': ('_event_similarity',),
+    'cluster_similarity': ('_cluster_similarity',),
+    'hotspots': ('hotspot_detector',),
+    'sla': ('_sla_index',),
+}
+LAZY_ATTRIBUTES = {attr: component for component, attrs in LAZY_COMPONENTS.items() for attr in attrs}
+
+# 搜索时每扫描这么多候选行检查一次查询截止时间/客户端是否断开
+SEARCH_CHUNK_ROWS = 20000
+
+# 后台预热顺序：列表页依赖的表优先
+WARMUP_ORDER = ['detail_df', 'event_bitmaps', 'info_df', 'cluster_df', 'phone_master_df', 'role_bitmaps',
+                'people_df', 'people_names', 'person_names', 'event_similarity', 'cluster_similarity', 'hotspots', 'sla']
+
+# 需要全部事件的组件：冷热分层时构建前先加载全部冷分区，后台预热时跳过（首次使用时加载）
+FULL_DATA_COMPONENTS = ('event_similarity', 'hotspots', 'sla')
+
+# 冷分区快照中建"键 -> 分区"目录的列，按编号查询冷分区中的事件或聚类成员时只加载对应的分区
+PARTITION_KEY_COLUMNS = ('事件编号', 'EventUID')
+
+# 聚类事件分区的取值计数：事件数分档 -> record_count 范围（含两端，None 表示不限）
+CLUSTER_COUNT_RANGES = {'1': (None, 1), '2': (2, 2), '3-5': (3, 5), '6-10': (6, 10), '10+': (11, None)}
+
+# 姓名模糊索引：组件 -> （数据表, 姓名列）；人员分析表另外登记 name_candidates 中的候选姓名
+NAME_INDEX_TABLES = {
+    'people_names': ('people_df', 'name_cn'),
+    'person_names': ('phone_master_df', 'name'),
+}
+# name_candidates 形如 {'刘李康': 3, '刘利康': 1}
+CANDIDATE_NAME_PATTERN = r"'([^']+)'\s*:"
+
+# 事件列表筛选参数 -> 建位图索引的列（见 bitmaps.py）
+EVENT_FILTER_COLUMNS = {'town': '镇街名称', 'level': '事件级别', 'category': '二级分类'}
+
+# 相关事件数筛选：取值 -> sequence_total 范围（含两端，None 表示不限）
+RELATED_EVENT_BUCKETS = {
+    '0': (None, 1),   # 无关联事件
+    '1': (2, 2),      # 1个关联事件
+    '2-5': (3, 6),    # 2-5个关联事件
+    '5+': (7, None),  # 5个以上关联事件
+}
+
+# 时间字符串的格式，按顺序尝试：原始数据为 日/月/两位年（如 12/5/25 23:57 为 2025年5月12日），
+# 增量写入和聚类事件表为 ISO 格式
+TIME_FORMATS = ('%d/%m/%y %H:%M', '%d/%m/%y %H:%M:%S', 'ISO8601')
+
+# 时间解析规则版本，规则变化时加一：由解析结果派生的分区快照、详情预渲染缓存和 SQLite 时间列随之重建
+TIME_PARSE_VERSION = 2
+
+
+def parse_times(values) -> np.ndarray:
+    """将时间字符串解析为datetime64数组（依次尝试 TIME_FORMATS），都无法解析的为NaT"""
+    text = pd.Series(values, dtype=object).astype(str).str.strip().reset_index(drop=True)
+    times = pd.Series(pd.NaT, index=text.index, dtype='datetime64[ns]')
+    for time_format in TIME_FORMATS:
+        missing = times.isna()
+        if not missing.any():
+            break
+        times[missing] = pd.to_datetime(text[missing], format=time_format, errors='coerce')
+    return times.to_numpy(dtype='datetime64[ns]')
+
+
+def parse_time(value) -> pd.Timestamp:
+    """解析单个时间字符串，无法解析的为NaT"""
+    return pd.Timestamp(parse_times([value])[0])
+
+
+class UnsupportedInBackend(Exception):
+    """当前存储后端不支持的查询（如分片模式下需要全部事件的统计），接口返回 501"""
+
+
+def check_supported(service, operation: str):
+    """service 的存储后端不支持 operation（方法名）时抛出 UnsupportedInBackend"""
+    message = service.unsupported_operations.get(operation)
+    if message is not None:
+        raise UnsupportedInBackend(message)
+
+
+def parse_fields(fields: Optional[str], model) -> Optional[List[str]]:
+    """解析 fields 查询参数（逗号分隔的字段名），未给出时返回 None；包含模型没有的字段时抛出 ValueError"""
+    if not fields:
+        return None
+    names = list(dict.fromkeys(name.strip() for name in fields.split(',') if name.strip()))
+    unknown = [name for name in names if name not in model.model_fields]
+    if unknown:
+        raise ValueError(f"未知字段: {', '.join(unknown)}，可选字段: {', '.join(model.model_fields)}")
+    return names or None
+
+
+def filter_terms(value: Optional[str]) -> List[str]:
+    """筛选参数中逗号分隔的多个取值（满足任一即可）"""
+    return [term.strip() for term in value.split(',') if term.strip()] if value else []
+
+
+def project_item(item, fields: Optional[List[str]], text_field: Optional[str] = None,
+                 text_length: Optional[int] = None) -> Dict[str, Any]:
+    """列表项投影为只含请求字段的字典，text_field 超过 text_length 个字符时截断并加省略号"""
+    data = item.model_dump(include=set(fields) if fields else None)
+    text = data.get(text_field) if text_field else None
+    if text_length is not None and isinstance(text, str) and len(text) > text_length:
+        data[text_field] = text[:text_length] + '…'
+    return data
+
 
 class EventService:
-    def __init__(self):
-        """初始化服务，加载数据"""
-        self.detail_df = None
-        self.cluster_df = None
-        self.info_df = None  # 新增报警人信息数据
-        self.people_df = None  # 新增人口信息数据
-        self.phone_master_df = None  # 新增人员分析数据
-        self.load_data()
-    
-    def load_data(self):
-        """加载CSV数据文件"""
-        try:
-            # 获取数据文件路径
+    # 本后端不支持的查询：方法名 -> 说明（接口在查询前检查，返回 501）
+    unsupported_operations: Dict[str, str] = {}
+
+    def __init__(self, data_dir: Optional[str] = None, compact_storage: Optional[bool] = None,
+                 lazy: bool = True, text_participants: Optional[bool] = None, hot_months: Optional[int] = None):
+        """初始化服务
+        
+        - **data_dir**: 数据文件目录，默认取环境变量 EVENT_DATA_DIR，否则为项目根目录下的 data/
+        - **compact_storage**: 紧凑存储（分类列、Arrow字符串、保留数值类型），默认取环境变量 EVENT_COMPACT_STORAGE
+        - **lazy**: 数据表和索引在首次访问时加载（见 LAZY_COMPONENTS），为 False 时立即全部加载
+        - **text_participants**: 没有上游参与人的事件从描述文本中提取参与人，默认开启，环境变量 EVENT_TEXT_PARTICIPANTS=0 关闭
+        - **hot_months**: 冷热分层，只有最近几个月的事件分区常驻内存（见 partitions.py），默认取环境变量 EVENT_HOT_MONTHS，0 为不分层
+        """
+        if data_dir is None:
+            data_dir = os.environ.get('EVENT_DATA_DIR')
+        if data_dir is None:
             current_dir = os.path.dirname(os.path.abspath(__file__))
-            parent_dir = os.path.dirname(current_dir)
-            
-            detail_path = os.path.join(parent_dir, 'data', 'conflict_event_detail.csv')
-            cluster_path = os.path.join(parent_dir, 'data', 'conflict_event.csv')
-            info_path = os.path.join(parent_dir, 'data', 'info_merge.csv')
-            people_path = os.path.join(parent_dir, 'data', 'people_info_simple.csv')
-            phone_master_path = os.path.join(parent_dir, 'data', 'phone_master_index.csv')
-            
-            # 加载事件详情数据
-            self.detail_df = pd.read_csv(detail_path)
-            
-            # 加载聚类事件数据  
-            self.cluster_df = pd.read_csv(cluster_path)
-            
-            # 加载报警人信息数据
-            self.info_df = pd.read_csv(info_path)
-            
-            # 加载人口信息数据（使用更强的CSV解析参数）
-            self.people_df = pd.read_csv(people_path, sep=',', quotechar='"', quoting=1, engine='python')
-            
-            # 加载人员分析数据
-            self.phone_master_df = pd.read_csv(phone_master_path)
-            
-            # 数据清洗和预处理
-            self._preprocess_data()
-            
-            print(f"数据加载成功: 事件详情 {len(self.detail_df)} 条, 聚类事件 {len(self.cluster_df)} 条, 报警人信息 {len(self.info_df)} 条, 人口信息 {len(self.people_df)} 条, 人员分析 {len(self.phone_master_df)} 条")
-            
+            data_dir = os.path.join(os.path.dirname(current_dir), 'data')
+        self.data_dir = data_dir
+        self.compact_storage = compact_storage_enabled() if compact_storage is None else compact_storage
+        if text_participants is None:
+            text_participants = os.environ.get('EVENT_TEXT_PARTICIPANTS', '1').lower() not in ('0', 'false', 'no')
+        self.text_participants = text_participants
+        self.hot_months = default_hot_months() if hot_months is None else hot_months
+        self._event_snapshot: Optional[PartitionSnapshot] = None  # 冷热分层时事件表的分区快照
+        self._loaded: Dict[str, float] = {}  # 已加载的组件 -> 加载耗时（秒）
+        self._load_lock = threading.RLock()
+        self._warmup_thread: Optional[threading.Thread] = None
+        self._source_version = self._source_fingerprint()
+        self._ingest_count = 0  # 增量写入次数，写入后数据版本随之变化
+        self._ingest_listeners: List[Callable[[List[tuple]], None]] = []
+        if not lazy:
+            self.load_data()
+    
+    def __getattr__(self, name: str):
+        """按需加载：访问尚未加载的数据表或索引时加载其所属组件"""
+        component = LAZY_ATTRIBUTES.get(name)
+        if component is None:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+        self._ensure_loaded(component)
+        return self.__dict__[name]
+    
+    def _ensure_loaded(self, component: str):
+        if component in self._loaded:
+            return
+        with self._load_lock:
+            if component in self._loaded:
+                return
+            start = time.perf_counter()
+            if component in FULL_DATA_COMPONENTS:
+                self._ensure_all_partitions()
+            with timed(f'load.{component}'):
+                if component in TABLE_FILES:
+                    self._load_table(component)
+                elif component in NAME_INDEX_TABLES:
+                    self._build_name_index(component)
+                elif component == 'event_bitmaps':
+                    self._build_event_bitmaps()
+                elif component == 'role_bitmaps':
+                    self._build_role_bitmaps()
+                elif component == 'event_similarity':
+                    self._build_event_similarity()
+                elif component == 'cluster_similarity':
+                    self._build_cluster_similarity()
+                elif component == 'hotspots':
+                    self._build_hotspot_detector()
+                elif component == 'sla':
+                    self._build_sla_index()
+            self._loaded[component] = time.perf_counter() - start
+    
+    def is_loaded(self, component: str) -> bool:
+        return component in self._loaded
+    
+    @timed('load_data')
+    def load_data(self, components: Optional[List[str]] = None):
+        """加载全部（或 components 中的）数据表并构建索引"""
+        for component in components or WARMUP_ORDER:
+            self._ensure_loaded(component)
+        print(f"数据加载成功: 事件详情 {len(self.detail_df)} 条, 聚类事件 {len(self.cluster_df)} 条, 报警人信息 {len(self.info_df)} 条, 人口信息 {len(self.people_df)} 条, 人员分析 {len(self.phone_master_df)} 条")
+    
+    def start_warmup(self) -> threading.Thread:
+        """在后台线程中按 WARMUP_ORDER 预热全部组件（服务启动后调用，不阻塞接收请求）"""
+        with self._load_lock:
+            if self._warmup_thread is None:
+                # 冷热分层时不预热需要全部事件的组件，冷分区留在磁盘上直到首次使用
+                components = [c for c in WARMUP_ORDER if not (self.hot_months > 0 and c in FULL_DATA_COMPONENTS)]
+                self._warmup_thread = threading.Thread(target=self.load_data, args=(components,),
+                                                       name='event-service-warmup', daemon=True)
+                self._warmup_thread.start()
+        return self._warmup_thread
+    
+    def get_load_status(self) -> Dict[str, Any]:
+        """各组件的加载状态"""
+        warming = self._warmup_thread is not None and self._warmup_thread.is_alive()
+        components = []
+        for component in WARMUP_ORDER:
+            loaded = component in self._loaded
+            rows = len(self.__dict__[component]) if loaded and component in TABLE_FILES else None
+            components.append({
+                'name': component,
+                'loaded': loaded,
+                'rows': rows,
+                'seconds': round(self._loaded[component], 3) if loaded else None,
+            })
+        return {
+            'ready': not warming,
+            'warming_up': warming,
+            'components': components,
+        }
+    
+    def _source_fingerprint(self) -> str:
+        """数据文件的修改时间和大小及时间解析、文本提取规则版本的摘要，数据文件被替换后（重启加载）数据版本随之变化"""
+        parts = [f'time-parse:{TIME_PARSE_VERSION}', f'text-extraction:{TEXT_EXTRACTION_VERSION}']
+        for file_name, _ in TABLE_FILES.values():
+            try:
+                stat = os.stat(os.path.join(self.data_dir, file_name))
+                parts.append(f'{file_name}:{stat.st_mtime_ns}:{stat.st_size}')
+            except OSError:
+                parts.append(f'{file_name}:-')
+        return format(zlib.crc32('|'.join(parts).encode('utf-8')), '08x')
+    
+    def data_version(self) -> str:
+        """数据版本（数据文件摘要-增量写入次数），用于接口的 ETag"""
+        return f'{self._source_version}-{self._ingest_count}'
+    
+    # 增量写入是否持久保存（pandas 后端只写入内存，重启后丢失）
+    persistent_ingest = False
+    
+    def source_version(self) -> str:
+        """数据文件摘要（不含增量写入次数），用于详情预渲染缓存文件的校验"""
+        return self._source_version
+    
+    def _load_table(self, name: str):
+        """读取一张数据表并构建其索引，读取失败时使用空表"""
+        try:
+            if name == 'detail_df' and self.hot_months > 0:
+                df = self._read_partitioned_events()
+            else:
+                df = self._read_table(name)
+            print(f"数据加载成功: {TABLE_LABELS[name]} {len(df)} 条")
         except Exception as e:
-            print(f"数据加载失败: {e}")
+            print(f"数据加载失败: {TABLE_LABELS[name]}, 错误: {e}")
             # 创建空的DataFrame作为fallback
-            self.detail_df = pd.DataFrame()
-            self.cluster_df = pd.DataFrame()
-            self.info_df = pd.DataFrame()
-            self.people_df = pd.DataFrame()
-            self.phone_master_df = pd.DataFrame()
+            df = pd.DataFrame()
+        setattr(self, name, df)
+        
+        if name == 'detail_df':
+            self._build_event_time_index()
+            self._build_event_lookup_indexes()
+            if self._event_snapshot is None:
+                self._build_event_partitions()
+        elif name == 'cluster_df':
+            self._build_cluster_time_index()
+            self._build_cluster_lookup_index()
+        elif name == 'info_df':
+            self._build_participant_index()
+        elif name == 'phone_master_df':
+            self._build_phone_lookup_index()
     
-    def _preprocess_data(self):
-        """预处理数据"""
+    def _read_table(self, name: str) -> pd.DataFrame:
+        """从CSV文件分块读取一张数据表并预处理"""
+        df = pd.concat(list(self._table_chunks(name)), ignore_index=True)
+        return self._preprocess_table(name, df)
+    
+    def _table_chunks(self, name: str, workers: Optional[int] = None) -> Iterator[pd.DataFrame]:
+        """分块读取一张数据表的CSV文件，每块已按 TABLE_NUMERIC_COLUMNS 规范化（见 csv_chunks.py）"""
+        file_name, read_options = TABLE_FILES[name]
+        return read_csv_chunks(os.path.join(self.data_dir, file_name), read_options,
+                               TABLE_NUMERIC_COLUMNS.get(name), workers=workers)
+    
+    def _read_partitioned_events(self) -> pd.DataFrame:
+        """冷热分层读取事件表：从分区快照读入最近 hot_months 个月的分区（快照不存在或已过期时先由CSV逐块生成）"""
+        snapshot = PartitionSnapshot(default_snapshot_dir(self.data_dir), PARTITION_KEY_COLUMNS)
+        hot = latest_months(self.hot_months)
+        catalogue = snapshot.load(self._source_version, hot)
+        if catalogue is None:
+            with timed('load.partition_snapshot'):
+                catalogue = snapshot.build(self._source_version, self._table_chunks('detail_df'),
+                                           self._event_partition_split, hot)
+        df = self._preprocess_table('detail_df', snapshot.read([p for p in catalogue.partitions() if p.loaded]))
+        self._event_partitions = catalogue
+        self._event_snapshot = snapshot
+        return df
+    
+    def _event_partition_split(self, df: pd.DataFrame) -> Tuple[np.ndarray, Dict[str, pd.Series]]:
+        """事件行的分区时间和取值计数列"""
+        if '上报时间' in df.columns:
+            times = self._parse_times(df['上报时间'])
+        else:
+            times = np.full(len(df), np.datetime64('NaT'), dtype='datetime64[ns]')
+        return times, self._event_bitmap_columns(df)
+    
+    def _build_event_partitions(self):
+        """由已读入的事件表建分区目录（不分层时全部分区都在内存中）"""
+        catalogue = PartitionCatalogue()
         if not self.detail_df.empty:
-            # 处理缺失值
-            self.detail_df = self.detail_df.fillna('')
-            
-            # 确保数字字段的正确类型
-            if 'sequence_total' in self.detail_df.columns:
-                self.detail_df['sequence_total'] = pd.to_numeric(
-                    self.detail_df['sequence_total'], errors='coerce'
-                ).fillna(1).astype(int)
+            catalogue.add(self._event_times, self._event_bitmap_columns(self.detail_df))
+        self._event_partitions = catalogue
+    
+    def _preprocess_table(self, name: str, df: pd.DataFrame) -> pd.DataFrame:
+        """预处理数据"""
+        if df.empty:
+            return df
+        
+        # 处理缺失值
+        df = fill_missing(df, self.compact_storage)
+        
+        # 确保数字字段的正确类型（sequence_total 缺失为1，event_count 缺失为0）
+        for col, fill in TABLE_NUMERIC_COLUMNS.get(name, {}).items():
+            if fill is not None and col in df.columns:
+                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(fill).astype(int)
+        
+        # 紧凑存储：文本列转为分类/Arrow字符串，整数列缩小位宽
+        if self.compact_storage:
+            df = compact_frame(df)
+        return df
+    
+    def _build_event_time_index(self):
+        """构建上报时间的有序索引，时间范围查询通过二分查找完成"""
+        if not self.detail_df.empty and '上报时间' in self.detail_df.columns:
+            self._event_times = self._parse_times(self.detail_df['上报时间'])
+        else:
+            self._event_times = np.array([], dtype='datetime64[ns]')
+        self._event_time_order, self._event_times_sorted = self._sort_time_index(self._event_times)
         
-        if not self.cluster_df.empty:
-            self.cluster_df = self.cluster_df.fillna('')
+        # 按上报时间倒序的全部位置（无法解析的时间排在最后）
+        missing = np.flatnonzero(np.isnat(self._event_times))
+        self._event_desc_order = np.concatenate([self._event_time_order[::-1], missing])
+    
+    def _build_cluster_time_index(self):
+        """构建聚类事件的首次/最后上报时间索引"""
+        if not self.cluster_df.empty and 'first_report_time' in self.cluster_df.columns:
+            first_times = self._parse_times(self.cluster_df['first_report_time'])
+            last_times = self._parse_times(self.cluster_df['last_report_time'])
+        else:
+            first_times = np.array([], dtype='datetime64[ns]')
+            last_times = np.array([], dtype='datetime64[ns]')
+        self._cluster_first_order, self._cluster_first_sorted = self._sort_time_index(first_times)
+        self._cluster_last_order, self._cluster_last_sorted = self._sort_time_index(last_times)
+        
+        # 聚类按首次上报月份分区，分区的最晚时间取成员的最后上报时间
+        self._cluster_partitions = PartitionCatalogue()
+        if len(first_times):
+            facets = {}
+            if 'record_count' in self.cluster_df.columns:
+                facets['event_count_range'] = self._value_ranges(self.cluster_df['record_count'], CLUSTER_COUNT_RANGES)
+            self._cluster_partitions.add(first_times, facets, end_times=last_times)
+    
+    def _append_time_index(self, new_times: np.ndarray, offset: int):
+        """将新写入事件的上报时间合并进有序索引（不重新解析已有数据）"""
+        self._event_times = np.concatenate([self._event_times, new_times])
+        new_order, new_sorted = self._sort_time_index(new_times)
+        insert_at = np.searchsorted(self._event_times_sorted, new_sorted, side='right')
+        self._event_time_order = np.insert(self._event_time_order, insert_at, new_order + offset)
+        self._event_times_sorted = np.insert(self._event_times_sorted, insert_at, new_sorted)
+        
+        missing = np.flatnonzero(np.isnat(self._event_times))
+        self._event_desc_order = np.concatenate([self._event_time_order[::-1], missing])
+    
+    @staticmethod
+    def _build_key_index(values: pd.Series, offset: int = 0) -> pd.Series:
+        """构建 键 -> 首次出现的行位置 的索引"""
+        keys = values.astype(str).to_numpy()
+        first = ~pd.Series(keys).duplicated().to_numpy()
+        return pd.Series(np.flatnonzero(first) + offset, index=pd.Index(keys[first], dtype=object))
+    
+    @staticmethod
+    def _group_positions(values: pd.Series, offset: int = 0) -> Dict[str, np.ndarray]:
+        """构建 键 -> 全部行位置 的索引（空值不建索引）"""
+        keys = values.astype(str).reset_index(drop=True)
+        groups = keys.groupby(keys, sort=False).indices
+        return {key: positions + offset for key, positions in groups.items() if key}
+    
+    @staticmethod
+    def _lookup_positions(index: pd.Series, keys: List[str]) -> np.ndarray:
+        """批量查找键对应的行位置，不存在的键返回-1"""
+        if index.empty or not len(keys):
+            return np.full(len(keys), -1, dtype=np.int64)
+        found = index.index.get_indexer(pd.Index(keys, dtype=object))
+        return np.where(found >= 0, index.to_numpy()[found], -1)
+    
+    @staticmethod
+    def _empty_key_index() -> pd.Series:
+        return pd.Series(dtype=np.int64, index=pd.Index([], dtype=object))
+    
+    def _build_event_lookup_indexes(self):
+        """构建事件编号、EventUID到行位置的索引，详情查询不再扫描全表"""
+        if not self.detail_df.empty and '事件编号' in self.detail_df.columns:
+            self._event_id_index = self._build_key_index(self.detail_df['事件编号'])
+        else:
+            self._event_id_index = self._empty_key_index()
         
+        if not self.detail_df.empty and 'EventUID' in self.detail_df.columns:
+            self._cluster_members = self._group_positions(self.detail_df['EventUID'])
+        else:
+            self._cluster_members = {}
+    
+    def _build_cluster_lookup_index(self):
+        """构建聚类表 EventUID 到行位置的索引"""
+        if not self.cluster_df.empty and 'EventUID' in self.cluster_df.columns:
+            self._cluster_uid_index = self._build_key_index(self.cluster_df['EventUID'])
+        else:
+            self._cluster_uid_index = self._empty_key_index()
+    
+    def _build_phone_lookup_index(self):
+        """构建人员分析表手机号到行位置的索引"""
+        if not self.phone_master_df.empty and 'phone' in self.phone_master_df.columns:
+            self._phone_index = self._build_key_index(self.phone_master_df['phone'])
+        else:
+            self._phone_index = self._empty_key_index()
+    
+    @classmethod
+    def _related_event_buckets(cls, sequence_total: pd.Series) -> pd.Series:
+        """各行的相关事件数分档（RELATED_EVENT_BUCKETS 的取值）"""
+        return cls._value_ranges(sequence_total, RELATED_EVENT_BUCKETS, fill=1)
+    
+    @staticmethod
+    def _value_ranges(values: pd.Series, ranges: Dict[str, tuple], fill: Optional[int] = None) -> pd.Series:
+        """各行数值所在的分档（ranges 为 分档 -> 范围，含两端），不在任何分档中的为空字符串"""
+        values = pd.to_numeric(values, errors='coerce')
+        values = (values.fillna(fill) if fill is not None else values).to_numpy()
+        buckets = np.full(len(values), '', dtype=object)
+        for bucket, (low, high) in ranges.items():
+            buckets[((values >= low) if low is not None else True) & ((values <= high) if high is not None else True)] = bucket
+        return pd.Series(buckets, dtype=object)
+    
+    def _event_bitmap_columns(self, df: pd.DataFrame) -> Dict[str, pd.Series]:
+        """建位图索引和分区取值计数的列：镇街、级别、分类、相关事件数分档和规范化的所属组织路径"""
+        columns = {column: df[column] for column in EVENT_FILTER_COLUMNS.values() if column in df.columns}
+        if 'sequence_total' in df.columns:
+            columns['related_events'] = self._related_event_buckets(df['sequence_total'])
+        if ORG_COLUMN in df.columns:
+            columns[ORG_COLUMN] = normalize_org_paths(df[ORG_COLUMN])
+        return columns
+    
+    def _build_event_bitmaps(self):
+        """构建事件筛选列的位图索引和所属组织路径树（节点事件数取分区目录的计数，包含未读入的冷分区）"""
+        columns = self._event_bitmap_columns(self.detail_df)
+        org_paths = columns.pop(ORG_COLUMN, pd.Series([''] * len(self.detail_df), dtype=object))
+        self._event_bitmaps = {column: BitmapIndex(values) for column, values in columns.items()}
+        tree = OrgTree()
+        tree.add_counts(self._event_partitions.facet_totals(ORG_COLUMN))
+        tree.add_rows(org_paths)
+        self._org_tree = tree
+    
+    def _build_role_bitmaps(self):
+        """构建人员分析主要角色的位图索引"""
+        df = self.phone_master_df
+        self._role_bitmaps = BitmapIndex(df['primary_role'] if 'primary_role' in df.columns else [''] * len(df))
+    
+    def _append_lookup_indexes(self, new_df: pd.DataFrame, offset: int):
+        """将新写入事件加入事件编号和EventUID索引"""
+        if '事件编号' in new_df.columns:
+            new_index = self._build_key_index(new_df['事件编号'], offset)
+            new_index = new_index[~new_index.index.isin(self._event_id_index.index)]
+            self._event_id_index = pd.concat([self._event_id_index, new_index])
+        
+        if 'EventUID' in new_df.columns:
+            for event_uid, positions in self._group_positions(new_df['EventUID'], offset).items():
+                existing = self._cluster_members.get(event_uid)
+                self._cluster_members[event_uid] = (
+                    positions if existing is None else np.concatenate([existing, positions])
+                )
+    
+    @staticmethod
+    def _parse_times(values: pd.Series) -> np.ndarray:
+        """将时间字符串解析为datetime64数组，无法解析的为NaT（格式见 TIME_FORMATS）"""
+        return parse_times(values)
+    
+    @staticmethod
+    def _sort_time_index(times: np.ndarray):
+        """返回（按时间升序的行位置, 对应的有序时间），NaT不进入索引"""
+        valid_positions = np.flatnonzero(~np.isnat(times))
+        order = valid_positions[np.argsort(times[valid_positions], kind='stable')]
+        return order, times[order]
+    
+    @staticmethod
+    def _to_datetime64(value) -> np.datetime64:
+        """将查询参数中的时间转换为datetime64（带时区的时间按本地时间处理）"""
+        ts = pd.Timestamp(value)
+        if ts.tzinfo is not None:
+            ts = ts.tz_localize(None)
+        return ts.to_datetime64()
+    
+    def _time_range_positions(self, order: np.ndarray, sorted_times: np.ndarray,
+                              start_time: Optional[Union[datetime, date]] = None,
+                              end_time: Optional[Union[datetime, date]] = None) -> np.ndarray:
+        """二分查找时间范围 [start_time, end_time] 内的行位置（按时间升序）
+        
+        只给出日期时，结束时间包含当天全天
+        """
+        return self._positions_between(order, sorted_times, *self._time_range_bounds(start_time, end_time))
+    
+    def _time_range_bounds(self, start_time: Optional[Union[datetime, date]] = None,
+                           end_time: Optional[Union[datetime, date]] = None
+                           ) -> Tuple[Optional[np.datetime64], Optional[np.datetime64]]:
+        """时间范围 [start_time, end_time] 转为左闭右开的 [起, 止)（只给出日期时，结束时间包含当天全天）"""
+        start = self._to_datetime64(start_time) if start_time is not None else None
+        end = None
+        if end_time is not None:
+            if isinstance(end_time, date) and not isinstance(end_time, datetime):
+                end = self._to_datetime64(end_time + timedelta(days=1))
+            else:
+                end = self._to_datetime64(end_time) + np.timedelta64(1, 'ns')
+        return start, end
+    
+    @staticmethod
+    def _positions_between(order: np.ndarray, sorted_times: np.ndarray,
+                           start: Optional[np.datetime64], end: Optional[np.datetime64]) -> np.ndarray:
+        """有序时间索引中 [start, end) 内的行位置（按时间升序）"""
+        lo = np.searchsorted(sorted_times, start, side='left') if start is not None else 0
+        hi = np.searchsorted(sorted_times, end, side='left') if end is not None else len(sorted_times)
+        if hi <= lo:
+            return order[:0]
+        return order[lo:hi]
+    
+    @staticmethod
+    def _contains_mask(values: pd.Series, pattern: str) -> np.ndarray:
+        """对候选行做不区分大小写的包含匹配，返回布尔位置掩码"""
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # 分类列只匹配各个类别，再按编码展开
+            matched = np.asarray(values.cat.categories.astype(str).str.contains(pattern, case=False, na=False), dtype=bool)
+            codes = values.cat.codes.to_numpy()
+            return np.where(codes >= 0, matched[codes], False) if len(matched) else np.zeros(len(codes), dtype=bool)
+        return values.astype(str).str.contains(pattern, case=False, na=False).to_numpy()
+    
+    @staticmethod
+    def _parse_participants(extracted_info_str) -> List[Dict[str, Any]]:
+        """解析extracted_info中的参与人列表，解析失败返回空列表"""
+        if not extracted_info_str or pd.isna(extracted_info_str):
+            return []
+        if isinstance(extracted_info_str, list):
+            return extracted_info_str
+        try:
+            info_list = json.loads(extracted_info_str)
+        except (json.JSONDecodeError, TypeError):
+            return []
+        return info_list if isinstance(info_list, list) else []
+    
+    def _build_participant_index(self):
+        """构建 事件编号 -> 参与人列表 的索引（每条extracted_info只解析一次）"""
+        self._participants_by_event: Dict[str, List[Dict[str, Any]]] = {}
+        self._phone_graph = None  # 电话共现图在首次查询时构建
         if not self.info_df.empty:
-            self.info_df = self.info_df.fillna('')
+            self._index_participants(self.info_df)
+        self._index_text_participants(self.detail_df)
+    
+    def _index_participants(self, info_df: pd.DataFrame):
+        """将报警人信息行加入参与人索引（同一事件以第一条记录为准，可替换从文本提取的参与人）"""
+        for event_id, info_str in zip(info_df['event_id'].astype(str), info_df['extracted_info']):
+            existing = self._participants_by_event.get(event_id)
+            if existing is None or (existing and existing[0].get('source') == TEXT_SOURCE):
+                participants = self._parse_participants(info_str)
+                if participants or existing is None:
+                    self._participants_by_event[event_id] = participants
+    
+    def _text_participants(self, events_df: pd.DataFrame) -> Dict[str, List[Dict[str, Any]]]:
+        """没有上游参与人的事件，从事件描述和处置结果中提取参与人（见 extraction.py）"""
+        if not self.text_participants or events_df.empty or '事件编号' not in events_df.columns:
+            return {}
+        event_ids = events_df['事件编号'].astype(str)
+        missing = np.array([not self._participants_by_event.get(event_id) for event_id in event_ids], dtype=bool)
+        if not missing.any():
+            return {}
+        
+        texts = pd.Series('', index=events_df.index)
+        for col in ('事件描述', '处置结果'):
+            if col in events_df.columns:
+                texts = texts + ' ' + events_df[col].astype(str)
+        with timed('extract_participants'):
+            return extract_participants(event_ids[missing], texts[missing])
+    
+    def _index_text_participants(self, events_df: pd.DataFrame):
+        """把从文本提取的参与人加入参与人索引（只补充没有上游参与人的事件）"""
+        for event_id, participants in self._text_participants(events_df).items():
+            if not self._participants_by_event.get(event_id):
+                self._participants_by_event[event_id] = participants
+    
+    def _event_phones(self, event_id: str) -> List[str]:
+        """事件中所有参与人的电话号码"""
+        return [
+            str(person.get('phone')) for person in self._participants_by_event.get(event_id, [])
+            if isinstance(person, dict) and person.get('phone')
+        ]
+    
+    def _build_hotspot_detector(self):
+        """按上报时间顺序把已加载的事件写入热点检测器"""
+        detector = HotspotDetector()
+        if not self.detail_df.empty:
+            self._observe_hotspots(self._event_time_order, detector)
+        self.hotspot_detector = detector
+    
+    def _build_sla_index(self):
+        """计算全部事件的各环节用时并预先算好各分组的分位数"""
+        index = SlaIndex(self._parse_times)
+        index.add(self.detail_df)
+        index.refresh()
+        self._sla_index = index
+    
+    def _observe_hotspots(self, positions: np.ndarray, detector: HotspotDetector):
+        """将指定行位置的事件写入热点检测器"""
+        df = self.detail_df
+        event_ids = df['事件编号'].astype(str).to_numpy()[positions]
+        towns = df['镇街名称'].astype(str).to_numpy()[positions] if '镇街名称' in df.columns else [''] * len(positions)
+        communities = df['村社名称'].astype(str).to_numpy()[positions] if '村社名称' in df.columns else [''] * len(positions)
+        times = self._event_times[positions]
+        
+        for event_id, report_time, town, community in zip(event_ids, times, towns, communities):
+            detector.observe(
+                event_id, report_time, self._event_phones(event_id), town=town, community=community
+            )
+    
+    @timed('ingest_events')
+    def ingest_events(self, events: List[Dict[str, Any]]) -> int:
+        """增量写入新事件
+        
+        事件字段与事件详情表一致，可附带 extracted_info（参与人列表或JSON字符串）。
+        新事件追加到事件详情表和报警人信息表，并增量更新时间索引、参与人索引和热点检测器。
+        """
+        if not events:
+            return 0
         
-        if not self.people_df.empty:
-            self.people_df = self.people_df.fillna('')
+        new_df = pd.DataFrame(events)
         
-        if not self.phone_master_df.empty:
-            self.phone_master_df = self.phone_master_df.fillna('')
-            # 确保event_count是数字类型
-            if 'event_count' in self.phone_master_df.columns:
-                self.phone_master_df['event_count'] = pd.to_numeric(
-                    self.phone_master_df['event_count'], errors='coerce'
-                ).fillna(0).astype(int)
+        # 拆分出参与人信息
+        if 'extracted_info' in new_df.columns:
+            info_rows = new_df[['事件编号', 'extracted_info']].rename(columns={'事件编号': 'event_id'})
+            info_rows = info_rows[info_rows['extracted_info'].apply(
+                lambda x: isinstance(x, (str, list)) and bool(x)
+            )].copy()
+            info_rows['extracted_info'] = info_rows['extracted_info'].apply(
+                lambda x: x if isinstance(x, str) else json.dumps(x, ensure_ascii=False)
+            )
+            new_df = new_df.drop(columns=['extracted_info'])
+        else:
+            info_rows = pd.DataFrame(columns=['event_id', 'extracted_info'])
+        
+        if not self.detail_df.empty:
+            new_df = new_df.reindex(columns=self.detail_df.columns)
+        new_df = new_df.fillna('')
+        if 'sequence_total' in new_df.columns:
+            new_df['sequence_total'] = pd.to_numeric(
+                new_df['sequence_total'], errors='coerce'
+            ).fillna(1).astype(int)
+        if self.compact_storage and not self.detail_df.empty:
+            new_df = align_categories(self.detail_df, new_df)
+        
+        if not info_rows.empty:
+            info_rows = info_rows.astype(str)
+            if not self.info_df.empty:
+                info_rows = info_rows.reindex(columns=self.info_df.columns).fillna('')
+            self.info_df = pd.concat([self.info_df, info_rows], ignore_index=True)
+            self._index_participants(info_rows)
+            self._phone_graph = None
+        positions = self._append_events(new_df)
+        facets = self._event_bitmap_columns(new_df)
+        self._event_partitions.add(self._event_times[positions], facets)
+        if self.is_loaded('event_bitmaps') and ORG_COLUMN in facets:
+            self._org_tree.add_counts(facets[ORG_COLUMN].value_counts().to_dict())
+        
+        self._ingest_count += 1
+        self._notify_ingest(new_df, self._event_times[positions])
+        return len(new_df)
     
-    def _get_caller_info(self, event_id: str) -> Optional[str]:
-        """获取事件的报警人信息"""
-        if self.info_df.empty:
+    def _append_events(self, new_df: pd.DataFrame) -> np.ndarray:
+        """把事件行追加到事件详情表并增量更新已构建的索引，返回新行的行位置（增量写入和加载冷分区共用）"""
+        offset = len(self.detail_df)
+        self.detail_df = pd.concat([self.detail_df, new_df], ignore_index=True)
+        if self.is_loaded('info_df'):
+            self._index_text_participants(new_df)
+            self._phone_graph = None
+        
+        # 增量更新索引
+        if '上报时间' in new_df.columns:
+            new_times = self._parse_times(new_df['上报时间'])
+        else:
+            new_times = np.full(len(new_df), np.datetime64('NaT'), dtype='datetime64[ns]')
+        self._append_time_index(new_times, offset)
+        self._append_lookup_indexes(new_df, offset)
+        # 位图、热点检测器、相似度索引和处置时效统计只在已构建时增量更新，未构建的会在首次使用时包含新事件
+        if self.is_loaded('event_bitmaps'):
+            columns = self._event_bitmap_columns(new_df)
+            self._org_tree.add_rows(columns.pop(ORG_COLUMN, pd.Series([''] * len(new_df), dtype=object)))
+            for column, values in columns.items():
+                self._event_bitmaps.setdefault(column, BitmapIndex([''] * offset)).add(values)
+        positions = np.arange(offset, offset + len(new_df))
+        if self.is_loaded('hotspots'):
+            self._observe_hotspots(
+                positions[np.argsort(self._event_times[positions], kind='stable')], self.hotspot_detector
+            )
+        if '事件描述' in new_df.columns and self.is_loaded('event_similarity'):
+            self._event_similarity.add_documents(positions, new_df['事件描述'].astype(str))
+        if self.is_loaded('sla'):
+            self._sla_index.add(new_df)
+        return positions
+    
+    # ---- 事件分区（见 partitions.py）----
+    
+    def _has_cold_partitions(self) -> bool:
+        partitions = self._event_partitions.partitions()  # 先触发事件表加载，快照在加载时打开
+        return self._event_snapshot is not None and any(not p.loaded for p in partitions)
+    
+    def _load_partitions(self, partitions: list):
+        """把冷分区从快照读入内存（追加到事件详情表并增量更新索引，数据版本不变）"""
+        if not any(not partition.loaded for partition in partitions):
+            return
+        with self._load_lock:
+            cold = [partition for partition in partitions if not partition.loaded]
+            if not cold:
+                return
+            with timed('load.partitions'):
+                df = self._preprocess_table('detail_df', self._event_snapshot.read(cold))
+                if not self.detail_df.empty:
+                    df = df.reindex(columns=self.detail_df.columns)
+                    if self.compact_storage:
+                        df = align_categories(self.detail_df, df)
+                self._append_events(df)
+                for partition in cold:
+                    partition.loaded = True
+            print(f"分区加载: {', '.join(p.key or '时间未知' for p in cold)} 共 {len(df)} 条")
+    
+    def _ensure_all_partitions(self):
+        """加载全部冷分区（需要全部事件的功能首次使用前调用）"""
+        if self._has_cold_partitions():
+            self._load_partitions(self._event_partitions.partitions())
+    
+    def _ensure_key_partitions(self, column: str, keys: List[str]):
+        """加载含有这些键（事件编号或EventUID）的冷分区"""
+        if not keys or not self._has_cold_partitions():
+            return
+        partitions = [self._event_partitions.get(key) for key in self._event_snapshot.keys[column].partitions_of(keys)]
+        self._load_partitions([partition for partition in partitions if partition is not None])
+    
+    def _event_positions(self, event_ids: List[str]) -> np.ndarray:
+        """批量查找事件编号对应的行位置（不存在的为 -1）；未找到的编号先加载其所在的冷分区再查"""
+        positions = self._lookup_positions(self._event_id_index, event_ids)
+        if (positions < 0).any() and self._has_cold_partitions():
+            self._ensure_key_partitions('事件编号', [event_id for event_id, p in zip(event_ids, positions) if p < 0])
+            positions = self._lookup_positions(self._event_id_index, event_ids)
+        return positions
+    
+    def add_ingest_listener(self, listener: Callable[[List[tuple]], None]):
+        """注册写入监听器：每次增量写入后以（事件列表项, 事件行, 上报时间）列表调用一次"""
+        self._ingest_listeners.append(listener)
+    
+    def _notify_ingest(self, new_df: pd.DataFrame, report_times: np.ndarray):
+        if not self._ingest_listeners:
+            return
+        events = []
+        for (_, row), report_time in zip(new_df.iterrows(), report_times):
+            caller_info = self._get_caller_info(str(row.get('事件编号', '')))
+            events.append((self._event_item_from_row(row, caller_info), row, report_time))
+        for listener in list(self._ingest_listeners):
+            try:
+                listener(events)
+            except Exception as e:
+                print(f"写入监听器执行失败: {e}")
+    
+    def event_total(self) -> int:
+        """事件总数（包括冷分区中尚未读入内存的事件）"""
+        return self._event_partitions.total_rows
+    
+    def _no_events(self) -> bool:
+        """没有任何事件（内存中没有，也没有冷分区）"""
+        return self.detail_df.empty and not self._has_cold_partitions()
+    
+    # ---- 详情预渲染（见 render_cache.py）----
+    
+    def cluster_uids(self) -> List[str]:
+        """全部聚类事件的EventUID"""
+        if self.cluster_df.empty or 'EventUID' not in self.cluster_df.columns:
+            return []
+        return self.cluster_df['EventUID'].astype(str).tolist()
+    
+    def top_phones(self, limit: int) -> List[str]:
+        """人员分析中事件数最多的前 limit 个手机号"""
+        df = self.phone_master_df
+        if limit <= 0 or df.empty or 'phone' not in df.columns:
+            return []
+        if 'event_count' not in df.columns:
+            return df['phone'].astype(str).tolist()[:limit]
+        order = np.argsort(-df['event_count'].to_numpy(), kind='stable')[:limit]
+        return df['phone'].astype(str).to_numpy()[order].tolist()
+    
+    def affected_detail_keys(self, rows: List[pd.Series]) -> Tuple[List[str], List[str]]:
+        """新写入事件影响的聚类详情（事件的EventUID）和人员详情（事件参与人的手机号）"""
+        event_uids = dict.fromkeys(str(row.get('EventUID', '')) for row in rows)
+        event_uids.pop('', None)
+        phones = dict.fromkeys(
+            phone for row in rows for phone in self._event_phones(str(row.get('事件编号', '')))
+        )
+        return list(event_uids), list(phones)
+    
+    # ---- 查询代价估算（QueryGovernor 准入控制使用，单位约为扫描/序列化的行数）----
+    
+    # 搜索词不少于该长度时走全文索引（pandas 后端没有索引，逐行包含匹配）
+    indexed_search_min_length: Optional[int] = None
+    
+    def _search_cost_factor(self, search: Optional[str]) -> int:
+        """每个候选行的搜索代价：走索引为 1；逐行匹配时多列包含匹配加报警人信息拼接约为 4，
+        过短的搜索词还会命中大量行、后续筛选和计数都更重，记为 8"""
+        if not search:
+            return 0
+        if self.indexed_search_min_length is not None and len(search) >= self.indexed_search_min_length:
+            return 1
+        return 8 if len(search) < 3 else 4
+    
+    def _event_candidate_count(self, start_time=None, end_time=None) -> int:
+        """时间范围内的事件数（有序时间索引二分查找，不扫描）"""
+        if start_time is None and end_time is None:
+            return self.event_total()
+        start, end = self._time_range_bounds(start_time, end_time)
+        partitions = self._event_partitions.prune(start, end)
+        if any(not partition.loaded for partition in partitions):
+            # 冷分区按分区行数估算（范围边界所在的分区按整个分区计）
+            return sum(partition.rows for partition in partitions)
+        return len(self._positions_between(self._event_time_order, self._event_times_sorted, start, end))
+    
+    def _event_filter_cost(self, candidates: int, **filters) -> Tuple[int, int]:
+        """筛选后剩余的候选行数和筛选本身的代价
+        
+        位图筛选只做按字运算，代价记为 0；剩余行数为位图中 1 的个数，有时间范围时按比例估算。
+        """
+        bits = self._event_filter_bitmap(**filters)
+        total = len(self.detail_df)  # 位图只覆盖内存中的行，冷分区按同样的比例估算
+        matched = bitmap_count(bits) if bits is not None else total
+        return (matched if candidates == total else candidates * matched // max(total, 1)), 0
+    
+    def _table_size(self, name: str) -> int:
+        return len(getattr(self, name))
+    
+    def _person_event_counts(self, phones: List[str]) -> int:
+        """人员关联事件总数（人员详情需要逐个事件构建时间线）"""
+        if self.phone_master_df.empty:
+            return 0
+        positions = self._lookup_positions(self._phone_index, phones)
+        counts = self.phone_master_df['event_count'].to_numpy()[positions[positions >= 0]]
+        return int(np.nan_to_num(counts.astype(float)).sum())
+    
+    def _cluster_member_counts(self, event_uids: List[str]) -> int:
+        """聚类成员事件总数"""
+        return sum(len(self._cluster_members.get(event_uid, ())) for event_uid in event_uids)
+    
+    def estimate_cost(self, operation: str, **params) -> int:
+        """按筛选条件估算查询代价：搜索词选择性、翻页深度、人员/聚类详情的扇出大小
+        
+        只做索引查找和计数，不执行查询本身；未知操作的代价为 0。
+        """
+        page = params.get('page') or 1
+        page_size = params.get('page_size') or 20
+        depth = page * page_size
+        
+        if operation == 'get_events':
+            candidates = self._event_candidate_count(params.get('start_time'), params.get('end_time'))
+            filters = {name: params.get(name) for name in ('town', 'level', 'category', 'related_events', 'org_path')}
+            filter_cost = 0
+            if any(filters.values()):
+                candidates, filter_cost = self._event_filter_cost(candidates, **filters)
+            return candidates * self._search_cost_factor(params.get('search')) + filter_cost + depth
+        if operation == 'get_cluster_list':
+            return self._table_size('cluster_df') * self._search_cost_factor(params.get('search')) + depth
+        if operation == 'search_people':
+            query = params['query']
+            # 模糊姓名搜索只处理索引命中的行
+            rows = 0 if query.name and query.fuzzy else self._table_size('people_df')
+            # 脱敏格式匹配逐行调用 Python 函数
+            return rows * (4 if query.id_card or query.phone else 1 if query.name else 0) + query.page * query.page_size
+        if operation == 'get_person_analysis':
+            query = params['query']
+            fuzzy = query.search and query.fuzzy
+            scanned = self._table_size('phone_master_df') if (query.search or query.role) and not fuzzy else 0
+            return scanned + query.page * query.page_size
+        if operation in ('get_person_analysis_detail', 'get_person_analysis_batch'):
+            return self._person_event_counts(params['phones']) * 10
+        if operation in ('get_cluster_detail', 'get_clusters_batch'):
+            return self._cluster_member_counts(params['event_uids']) * 10
+        if operation == 'get_events_batch':
+            return len(params['event_ids'])
+        if operation == 'get_person_network':
+            return params.get('max_nodes', 200) * 10
+        return 0
+    
+    @timed('get_hotspots')
+    def get_hotspots(self, kind: str = 'phone', window_hours: float = 24, threshold: int = 3,
+                     as_of: Optional[datetime] = None, limit: int = 50) -> HotspotResponse:
+        """获取重复报警/升级热点（电话或村社）"""
+        as_of_value = self._to_datetime64(as_of) if as_of is not None else self.hotspot_detector.latest_time()
+        items = self.hotspot_detector.hotspots(
+            kind, window_hours, threshold, as_of=as_of_value, limit=limit
+        )
+        
+        return HotspotResponse(
+            kind=kind,
+            window_hours=window_hours,
+            threshold=threshold,
+            as_of=str(pd.Timestamp(as_of_value)) if as_of_value is not None else None,
+            items=[HotspotItem(**item) for item in items]
+        )
+    
+    @timed('get_org_tree')
+    def get_org_tree(self, path: Optional[str] = None) -> Optional[OrgTreeResponse]:
+        """所属组织树下钻：节点的事件数和直接下级（按事件数倒序），path 为空时为根节点（全部事件）"""
+        path = normalize_org_path(path or '')
+        tree = self._org_tree
+        if path not in tree:
             return None
+        return self._org_tree_response(path, tree.count(path), tree.children(path))
+    
+    @staticmethod
+    def _org_tree_response(path: str, event_count: int, children: List[Tuple[str, int, bool]]) -> OrgTreeResponse:
+        """由节点事件数和下级的（路径, 事件数, 是否还有下级）构建下钻响应"""
+        depth = path.count('/') + 1 if path else 0
+        return OrgTreeResponse(
+            path=path,
+            level=org_level_name(depth) if depth else None,
+            event_count=event_count,
+            children=[
+                OrgNode(name=child.rpartition('/')[2], path=child, level=org_level_name(depth + 1),
+                        event_count=count, has_children=has_children)
+                for child, count, has_children in children
+            ]
+        )
+    
+    @timed('get_sla_report')
+    def get_sla_report(self, group_by: str = 'department', min_events: int = 1) -> SlaReportResponse:
+        """处置时效统计：派发、受理、办结用时（小时）按科室/部门、镇街或二级分类分组的分位数和直方图"""
+        return SlaReportResponse(**self._sla_index.report(group_by, min_events))
+    
+    def _get_phone_graph(self) -> PhoneGraph:
+        """获取电话共现图（由参与人索引构建，写入新参与人后重新构建）"""
+        cache_lookup('phone_graph', self._phone_graph is not None)
+        self._ensure_all_partitions()
+        if self._phone_graph is None:
+            self._phone_graph = PhoneGraph.from_participants(
+                {event_id: self._event_phones(event_id) for event_id in self._participants_by_event}
+            )
+        return self._phone_graph
+    
+    def _phone_names(self, phones: List[str]) -> Dict[str, Dict[str, Any]]:
+        """批量获取电话号码在人员分析表中的姓名和主要角色"""
+        if self.phone_master_df.empty or not phones:
+            return {}
+        
+        rows = self.phone_master_df[self.phone_master_df['phone'].astype(str).isin(phones)]
+        return {
+            str(row['phone']): {
+                'name': str(row.get('name', '')) if row.get('name') else None,
+                'primary_role': str(row.get('primary_role', '')) if row.get('primary_role') else None
+            }
+            for _, row in rows.drop_duplicates('phone').iterrows()
+        }
+    
+    @timed('get_person_network')
+    def get_person_network(self, phone: str, hops: int = 2, max_nodes: int = 200) -> Optional[PhoneNetworkResponse]:
+        """获取电话号码的 k 跳共现网络（共同出现在同一事件中的号码）"""
+        graph = self._get_phone_graph()
+        if phone not in graph:
+            return None
+        
+        nodes, node_hops, truncated = graph.neighbourhood(phone, hops=hops, max_nodes=max_nodes)
+        sources, targets, weights = graph.edges(nodes)
+        component_id, component_size = graph.component(phone)
+        
+        node_phones = [str(p) for p in graph.phones[nodes]]
+        names = self._phone_names(node_phones)
+        
+        return PhoneNetworkResponse(
+            phone=phone,
+            hops=hops,
+            component_id=component_id,
+            component_size=component_size,
+            truncated=truncated,
+            nodes=[
+                NetworkNode(
+                    phone=node_phone,
+                    hop=int(hop),
+                    event_count=int(graph.event_counts[node]),
+                    name=names.get(node_phone, {}).get('name'),
+                    primary_role=names.get(node_phone, {}).get('primary_role')
+                )
+                for node, node_phone, hop in zip(nodes, node_phones, node_hops)
+            ],
+            edges=[
+                NetworkEdge(source=str(graph.phones[src]), target=str(graph.phones[dst]), weight=int(weight))
+                for src, dst, weight in zip(sources, targets, weights)
+            ]
+        )
+    
+    @timed('get_person_component')
+    def get_person_component(self, phone: str, limit: int = 500) -> Optional[PhoneComponentResponse]:
+        """获取电话号码所在连通分量（通过共同事件直接或间接关联的所有号码）"""
+        graph = self._get_phone_graph()
+        if phone not in graph:
+            return None
+        
+        component_id, component_size = graph.component(phone)
+        members = graph.component_members(component_id)
+        # 按事件数量倒序
+        members = members[np.argsort(-graph.event_counts[members], kind='stable')][:limit]
+        
+        return PhoneComponentResponse(
+            phone=phone,
+            component_id=component_id,
+            component_size=component_size,
+            phones=[str(p) for p in graph.phones[members]]
+        )
+    
+    def _name_frame(self, component: str) -> Tuple[pd.DataFrame, np.ndarray]:
+        """建姓名索引用的数据表及记录键（行位置）"""
+        df = getattr(self, NAME_INDEX_TABLES[component][0])
+        return df, np.arange(len(df))
+    
+    def _build_name_index(self, component: str):
+        """构建姓名模糊索引（姓名和候选姓名 -> 记录键）"""
+        df, keys = self._name_frame(component)
+        name_column = NAME_INDEX_TABLES[component][1]
+        index = NameIndex()
+        if name_column in df.columns:
+            for name, key in zip(df[name_column].tolist(), keys.tolist()):
+                index.add(name, key)
+        if 'name_candidates' in df.columns:
+            candidates = df['name_candidates'].astype(str).str.findall(CANDIDATE_NAME_PATTERN)
+            for names, key in zip(candidates.tolist(), keys.tolist()):
+                for name in names:
+                    index.add(name, key)
+        setattr(self, LAZY_COMPONENTS[component][0], index)
+    
+    def _build_event_similarity(self):
+        """构建事件描述的TF-IDF索引"""
+        index = TfidfIndex()
+        if not self.detail_df.empty and '事件描述' in self.detail_df.columns:
+            index.add_documents(range(len(self.detail_df)), self.detail_df['事件描述'].astype(str))
+        self._event_similarity = index
+    
+    def _build_cluster_similarity(self):
+        """构建聚类描述的TF-IDF索引"""
+        index = TfidfIndex()
+        if not self.cluster_df.empty and 'cluster_description' in self.cluster_df.columns:
+            index.add_documents(range(len(self.cluster_df)), self.cluster_df['cluster_description'].astype(str))
+        self._cluster_similarity = index
+    
+    def _similar_items(self, text: str, top_k: int, exclude_positions: List[int] = ()) -> SimilarResponse:
+        """按描述文本查找相似事件和相似聚类事件"""
+        events = []
+        for position, score in self._event_similarity.similar(text, top_k=top_k, exclude=exclude_positions):
+            row = self.detail_df.iloc[position]
+            events.append(SimilarEvent(
+                事件编号=str(row.get('事件编号', '')),
+                事件描述=str(row.get('事件描述', '')),
+                镇街名称=str(row.get('镇街名称', '')) if row.get('镇街名称') else None,
+                上报时间=str(row.get('上报时间', '')) if row.get('上报时间') else None,
+                EventUID=str(row.get('EventUID', '')) if row.get('EventUID') else None,
+                score=round(score, 4)
+            ))
+        
+        clusters = []
+        for position, score in self._cluster_similarity.similar(text, top_k=top_k):
+            row = self.cluster_df.iloc[position]
+            clusters.append(SimilarCluster(
+                EventUID=str(row.get('EventUID', '')),
+                cluster_description=str(row.get('cluster_description', '')),
+                record_count=int(row.get('record_count', 0)),
+                first_report_time=str(row.get('first_report_time', '')) if row.get('first_report_time') else None,
+                last_report_time=str(row.get('last_report_time', '')) if row.get('last_report_time') else None,
+                score=round(score, 4)
+            ))
         
-        # 查找对应事件的信息
-        info_row = self.info_df[self.info_df['event_id'].astype(str) == event_id]
+        return SimilarResponse(query=text, events=events, clusters=clusters)
+    
+    @timed('get_similar_to_event')
+    def get_similar_to_event(self, event_id: str, top_k: int = 10) -> Optional[SimilarResponse]:
+        """查找与指定事件描述相似的历史事件和聚类事件（不包含该事件本身）"""
+        if self._no_events():
+            return None
         
-        if info_row.empty:
+        position = int(self._event_positions([event_id])[0])
+        if position < 0:
+            return None
+        
+        text = str(self.detail_df['事件描述'].iloc[position])
+        return self._similar_items(text, top_k, exclude_positions=[position])
+    
+    @timed('find_similar')
+    def find_similar(self, text: str, top_k: int = 10) -> SimilarResponse:
+        """按自由文本查找相似事件和聚类事件"""
+        return self._similar_items(text, top_k)
+    
+    def _get_caller_info(self, event_id: str) -> Optional[str]:
+        """获取事件的报警人信息"""
+        info_list = self._participants_by_event.get(event_id)
+        if not info_list:
             return None
         
         try:
-            extracted_info_str = info_row.iloc[0]['extracted_info']
-            if not extracted_info_str or pd.isna(extracted_info_str):
-                return None
-            
-            # 解析JSON
-            info_list = json.loads(extracted_info_str)
-            
             # 提取报警人信息
             callers = []
             for person in info_list:
@@ -122,6 +1177,8 @@ class EventService:
                         caller_info.append(f"电话: {phone}")
                     if id_card:
                         caller_info.append(f"身份证: {id_card}")
+                    if person.get('plate'):
+                        caller_info.append(f"车牌: {person['plate']}")
                     
                     if caller_info:
                         callers.append(" | ".join(caller_info))
@@ -129,29 +1186,17 @@ class EventService:
             # 如果有多个报警人，用分号分隔
             return "; ".join(callers) if callers else None
             
-        except (json.JSONDecodeError, KeyError, Exception) as e:
+        except (KeyError, AttributeError) as e:
             print(f"解析报警人信息失败: {event_id}, 错误: {e}")
             return None
     
     def _get_involved_parties_info(self, event_id: str) -> Optional[str]:
         """获取事件的当事人信息（除报警人外的所有人）"""
-        if self.info_df.empty:
-            return None
-        
-        # 查找对应事件的信息
-        info_row = self.info_df[self.info_df['event_id'].astype(str) == event_id]
-        
-        if info_row.empty:
+        info_list = self._participants_by_event.get(event_id)
+        if not info_list:
             return None
         
         try:
-            extracted_info_str = info_row.iloc[0]['extracted_info']
-            if not extracted_info_str or pd.isna(extracted_info_str):
-                return None
-            
-            # 解析JSON
-            info_list = json.loads(extracted_info_str)
-            
             # 提取当事人信息（除报警人外的所有人）
             parties = []
             for person in info_list:
@@ -170,6 +1215,8 @@ class EventService:
                         party_info.append(f"电话: {phone}")
                     if id_card:
                         party_info.append(f"身份证: {id_card}")
+                    if person.get('plate'):
+                        party_info.append(f"车牌: {person['plate']}")
                     
                     if party_info:
                         parties.append(" | ".join(party_info))
@@ -177,105 +1224,94 @@ class EventService:
             # 如果有多个当事人，用分号分隔
             return "; ".join(parties) if parties else None
             
-        except (json.JSONDecodeError, KeyError, Exception) as e:
+        except (KeyError, AttributeError) as e:
             print(f"解析当事人信息失败: {event_id}, 错误: {e}")
             return None
     
+    @timed('get_events')
     def get_events(self, page: int = 1, page_size: int = 20, search: Optional[str] = None,
                    town: Optional[str] = None, level: Optional[str] = None,
-                   category: Optional[str] = None, related_events: Optional[str] = None) -> PaginatedResponse:
-        """获取事件列表（分页）"""
-        
-        if self.detail_df.empty:
-            return PaginatedResponse(
+                   category: Optional[str] = None, related_events: Optional[str] = None,
+                   start_time: Optional[Union[datetime, date]] = None, end_time: Optional[Union[datetime, date]] = None,
+                   fields: Optional[List[str]] = None, description_length: Optional[int] = None,
+                   org_path: Optional[str] = None) -> Union[PaginatedResponse, ProjectedListResponse]:
+        """获取事件列表（分页）
+        
+        给出 fields 或 description_length 时返回字段投影的列表项，未请求报警人信息时不查询参与人；
+        冷热分层时只加载时间范围内（没有搜索词时只加载当前页所在）的冷分区；
+        org_path 按所属组织树的节点精确筛选（节点本身及其下级）
+        """
+        projected = fields is not None or description_length is not None
+        response_cls = ProjectedListResponse if projected else PaginatedResponse
+        
+        if self._no_events():
+            return response_cls(
                 items=[], total=0, page=page, page_size=page_size, total_pages=0
             )
         
-        df = self.detail_df.copy()
-        
-        # 应用搜索过滤
-        if search:
-            # 转义正则表达式特殊字符，避免搜索包含*等字符时出错
-            search_escaped = re.escape(search)
+        start_idx = (page - 1) * page_size
+        end_idx = start_idx + page_size
+        filters = {'town': town, 'level': level, 'category': category, 'related_events': related_events,
+                   'org_path': org_path}
+        
+        # 在分区目录上裁剪出与时间范围有交集的分区
+        start, end = self._time_range_bounds(start_time, end_time)
+        partitions = self._event_partitions.prune(start, end)
+        cold = [partition for partition in partitions if not partition.loaded]
+        if cold and not search and self._facet_countable(**filters):
+            with timed('get_events.partitions'):
+                page_positions, total = self._partition_page(partitions, start, end, start_idx, end_idx, filters)
+        else:
+            self._load_partitions(cold)
             
-            # 为每个事件获取报警人信息用于搜索
-            df_with_caller = df.copy()
-            df_with_caller['报警人信息_搜索'] = df_with_caller['事件编号'].apply(
-                lambda x: self._get_caller_info(str(x)) or ''
-            )
+            # 候选行位置，按上报时间倒序排列（时间范围通过有序索引二分查找得到）
+            if start is not None or end is not None:
+                positions = self._positions_between(self._event_time_order, self._event_times_sorted, start, end)[::-1]
+            else:
+                positions = self._event_desc_order
+            ROWS_SCANNED.observe(len(positions), 'get_events')
             
-            search_condition = (
-                df_with_caller['事件编号'].astype(str).str.contains(search_escaped, case=False, na=False) |
-                df_with_caller['事件描述'].astype(str).str.contains(search_escaped, case=False, na=False) |
-                df_with_caller['处置结果'].astype(str).str.contains(search_escaped, case=False, na=False) |
-                df_with_caller['CallerPhone'].astype(str).str.contains(search_escaped, case=False, na=False) |
-                df_with_caller['CallerID'].astype(str).str.contains(search_escaped, case=False, na=False) |
-                df_with_caller['报警人信息_搜索'].astype(str).str.contains(search_escaped, case=False, na=False)
-            )
-            df = df_with_caller[search_condition].drop(columns=['报警人信息_搜索'])
-        
-        # 应用筛选条件
-        if town:
-            df = df[df['镇街名称'].astype(str).str.contains(town, case=False, na=False)]
-        
-        if level:
-            df = df[df['事件级别'].astype(str).str.contains(level, case=False, na=False)]
-        
-        if category:
-            df = df[df['二级分类'].astype(str).str.contains(category, case=False, na=False)]
-        
-        # 应用相关事件数量筛选
-        if related_events:
-            if related_events == "0":  # 无关联事件
-                df = df[df['sequence_total'] <= 1]
-            elif related_events == "1":  # 1个关联事件
-                df = df[df['sequence_total'] == 2]
-            elif related_events == "2-5":  # 2-5个关联事件
-                df = df[(df['sequence_total'] >= 3) & (df['sequence_total'] <= 6)]
-            elif related_events == "5+":  # 5个以上关联事件
-                df = df[df['sequence_total'] > 6]
-        
-        # 按上报时间倒序排列
-        try:
-            df['上报时间_parsed'] = pd.to_datetime(df['上报时间'], errors='coerce')
-            df = df.sort_values('上报时间_parsed', ascending=False, na_position='last')
-            df = df.drop(columns=['上报时间_parsed'])  # 删除临时列
-        except Exception as e:
-            print(f"排序失败: {e}")
-            # 如果时间解析失败，按原始字符串倒序排列
-            df = df.sort_values('上报时间', ascending=False, na_position='last')
+            # 先按位图索引筛选，再只对筛选后的行做逐行搜索
+            with timed('get_events.filter'):
+                positions = self._filter_event_positions(positions, **filters)
+            
+            # 应用搜索过滤（分块扫描，块之间检查查询是否已超时或被取消）
+            if search and len(positions):
+                with timed('get_events.search'):
+                    # 转义正则表达式特殊字符，避免搜索包含*等字符时出错
+                    search_escaped = re.escape(search)
+                    matched = []
+                    for chunk_start in range(0, len(positions), SEARCH_CHUNK_ROWS):
+                        check_deadline()
+                        chunk = positions[chunk_start:chunk_start + SEARCH_CHUNK_ROWS]
+                        matched.append(chunk[self._search_mask(self.detail_df.iloc[chunk], search_escaped)])
+                    positions = np.concatenate(matched)
+            total = len(positions)
+            page_positions = positions[start_idx:end_idx]
         
         # 计算分页
-        total = len(df)
+        RESULT_SIZE.observe(total, 'get_events')
         total_pages = (total + page_size - 1) // page_size
-        start_idx = (page - 1) * page_size
-        end_idx = start_idx + page_size
         
         # 获取当前页数据
-        page_df = df.iloc[start_idx:end_idx]
+        page_df = self.detail_df.iloc[page_positions]
         
         # 转换为响应模型
         items = []
-        for _, row in page_df.iterrows():
-            event_id = str(row.get('事件编号', ''))
-            caller_info = self._get_caller_info(event_id)
-            
-            event = EventResponse(
-                事件编号=event_id,
-                事件描述=str(row.get('事件描述', '')),
-                镇街名称=str(row.get('镇街名称', '')),
-                事件级别=str(row.get('事件级别', '')),
-                二级分类=str(row.get('二级分类', '')),
-                上报时间=str(row.get('上报时间', '')),
-                CallerPhone=str(row.get('CallerPhone', '')) if row.get('CallerPhone') else None,
-                CallerID=str(row.get('CallerID', '')) if row.get('CallerID') else None,
-                EventUID=str(row.get('EventUID', '')) if row.get('EventUID') else None,
-                sequence_total=int(row.get('sequence_total', 1)) if pd.notna(row.get('sequence_total')) else None,
-                报警人信息=caller_info
-            )
-            items.append(event)
-        
-        return PaginatedResponse(
+        caller_hits = 0
+        need_caller_info = fields is None or '报警人信息' in fields
+        with timed('get_events.serialize'):
+            for _, row in page_df.iterrows():
+                check_deadline()
+                caller_info = self._get_caller_info(str(row.get('事件编号', ''))) if need_caller_info else None
+                caller_hits += caller_info is not None
+                item = self._event_item_from_row(row, caller_info)
+                items.append(project_item(item, fields, '事件描述', description_length) if projected else item)
+        if need_caller_info:
+            cache_lookup('caller_info', True, caller_hits)
+            cache_lookup('caller_info', False, len(items) - caller_hits)
+        
+        return response_cls(
             items=items,
             total=total,
             page=page,
@@ -283,19 +1319,193 @@ class EventService:
             total_pages=total_pages
         )
     
+    def _facet_countable(self, town: Optional[str], level: Optional[str], category: Optional[str],
+                         related_events: Optional[str], org_path: Optional[str] = None) -> bool:
+        """命中数能否由分区的取值计数得到：至多一个筛选条件（多个条件的交集需要逐行判断）"""
+        conditions = sum(bool(value) for value in (town, level, category))
+        conditions += bool(self._related_event_filter(related_events)) + bool(self._org_path_filter(org_path))
+        return conditions <= 1
+    
+    @staticmethod
+    def _org_path_filter(org_path: Optional[str]) -> List[str]:
+        """所属组织筛选中的规范化节点路径（逗号分隔多个节点）"""
+        return [path for path in map(normalize_org_path, filter_terms(org_path)) if path]
+    
+    def _related_event_filter(self, related_events: Optional[str]) -> List[str]:
+        """相关事件数筛选中有效的分档（没有 sequence_total 列时不筛选）"""
+        if 'related_events' not in self._event_bitmaps:
+            return []
+        return [bucket for bucket in filter_terms(related_events) if bucket in RELATED_EVENT_BUCKETS]
+    
+    def _partition_facet_count(self, partition, town: Optional[str], level: Optional[str],
+                               category: Optional[str], related_events: Optional[str],
+                               org_path: Optional[str] = None) -> int:
+        """完整落在时间范围内的分区中满足筛选条件的行数（至多一个条件，见 _facet_countable）"""
+        for param, value in (('town', town), ('level', level), ('category', category)):
+            if value:
+                return partition.facet_count(EVENT_FILTER_COLUMNS[param], lambda values: self._match_values(values, value))
+        buckets = self._related_event_filter(related_events)
+        if buckets:
+            return partition.facet_count('related_events', lambda values: values.isin(buckets).to_numpy())
+        paths = self._org_path_filter(org_path)
+        if paths:
+            return partition.facet_count(ORG_COLUMN, lambda values: org_path_mask(values, paths))
+        return partition.rows
+    
+    def _partition_positions(self, partition, start: Optional[np.datetime64], end: Optional[np.datetime64]) -> np.ndarray:
+        """内存中属于该分区且在 [start, end) 内的行位置（按上报时间倒序）"""
+        if partition.key == UNKNOWN_PARTITION:
+            return np.flatnonzero(np.isnat(self._event_times))
+        month_start, month_end = month_bounds(partition.key)
+        return self._positions_between(
+            self._event_time_order, self._event_times_sorted,
+            month_start if start is None else max(start, month_start),
+            month_end if end is None else min(end, month_end)
+        )[::-1]
+    
+    def _partition_page(self, partitions: list, start: Optional[np.datetime64], end: Optional[np.datetime64],
+                        page_start: int, page_end: int, filters: Dict[str, Optional[str]]) -> Tuple[np.ndarray, int]:
+        """按分区目录计数，只加载范围边界和当前页所在的分区，返回（当前页的行位置, 命中总数）
+        
+        完整落在时间范围内的分区用取值计数；分区按时间倒序排列，互不重叠，逐个分区取出的行拼接起来
+        即为全部命中行按时间倒序的排列。
+        """
+        rows: Dict[str, np.ndarray] = {}
+        
+        def partition_rows(partition) -> np.ndarray:
+            if partition.key not in rows:
+                self._load_partitions([partition])
+                positions = self._partition_positions(partition, start, end)
+                ROWS_SCANNED.observe(len(positions), 'get_events')
+                rows[partition.key] = self._filter_event_positions(positions, **filters)
+            return rows[partition.key]
+        
+        counts = [
+            self._partition_facet_count(partition, **filters) if partition.within(start, end)
+            else len(partition_rows(partition))
+            for partition in partitions
+        ]
+        page = []
+        offset = 0
+        for partition, count in zip(partitions, counts):
+            if count and offset < page_end and offset + count > page_start:
+                page.append(partition_rows(partition)[max(page_start - offset, 0):page_end - offset])
+            offset += count
+        return (np.concatenate(page) if page else np.array([], dtype=np.int64)), sum(counts)
+    
+    def _search_mask(self, candidates: pd.DataFrame, pattern: str) -> np.ndarray:
+        """事件编号、描述、处置结果、CallerPhone、CallerID 和报警人信息的包含匹配"""
+        # 为每个候选事件获取报警人信息用于搜索
+        caller_search = candidates['事件编号'].apply(
+            lambda x: self._get_caller_info(str(x)) or ''
+        )
+        
+        return (
+            self._contains_mask(candidates['事件编号'], pattern) |
+            self._contains_mask(candidates['事件描述'], pattern) |
+            self._contains_mask(candidates['处置结果'], pattern) |
+            self._contains_mask(candidates['CallerPhone'], pattern) |
+            self._contains_mask(candidates['CallerID'], pattern) |
+            self._contains_mask(caller_search, pattern)
+        )
+    
+    @staticmethod
+    def _event_item_from_row(row: pd.Series, caller_info: Optional[str]) -> EventResponse:
+        """由事件详情行构建事件列表项"""
+        return EventResponse(
+            事件编号=str(row.get('事件编号', '')),
+            事件描述=str(row.get('事件描述', '')),
+            镇街名称=str(row.get('镇街名称', '')),
+            事件级别=str(row.get('事件级别', '')),
+            二级分类=str(row.get('二级分类', '')),
+            上报时间=str(row.get('上报时间', '')),
+            CallerPhone=str(row.get('CallerPhone', '')) if row.get('CallerPhone') else None,
+            CallerID=str(row.get('CallerID', '')) if row.get('CallerID') else None,
+            EventUID=str(row.get('EventUID', '')) if row.get('EventUID') else None,
+            sequence_total=int(row.get('sequence_total', 1)) if pd.notna(row.get('sequence_total')) else None,
+            报警人信息=caller_info
+        )
+    
+    def _filter_event_positions(self, positions: np.ndarray, town: Optional[str], level: Optional[str],
+                                category: Optional[str], related_events: Optional[str],
+                                org_path: Optional[str] = None) -> np.ndarray:
+        """按镇街、级别、分类、相关事件数量和所属组织筛选候选行位置（候选行的顺序不变）"""
+        bits = self._event_filter_bitmap(town, level, category, related_events, org_path)
+        if bits is None or not len(positions):
+            return positions
+        return positions[bitmap_contains(bits, positions)]
+    
+    def _event_filter_bitmap(self, town: Optional[str], level: Optional[str], category: Optional[str],
+                             related_events: Optional[str], org_path: Optional[str] = None) -> Optional[np.ndarray]:
+        """筛选条件的位图（各条件同时满足），没有筛选条件时返回 None
+        
+        镇街、级别、分类为不区分大小写的包含匹配，相关事件数为 RELATED_EVENT_BUCKETS 中的分档，
+        所属组织为组织树节点的精确匹配（含下级）；每个条件可以用逗号分隔多个取值，满足任一即可。
+        """
+        conditions = []
+        for param, value in (('town', town), ('level', level), ('category', category)):
+            if value:
+                bitmaps = self._event_bitmaps.get(EVENT_FILTER_COLUMNS[param])
+                if bitmaps is None:  # 没有该列时没有行满足条件
+                    bitmaps = BitmapIndex([''] * len(self.detail_df))
+                conditions.append(self._match_bitmap(bitmaps, value))
+        buckets = self._related_event_filter(related_events)
+        if buckets:
+            conditions.append(self._event_bitmaps['related_events'].union(buckets))
+        paths = self._org_path_filter(org_path)
+        if paths:
+            conditions.append(self._org_tree.union(paths))
+        return bitmap_and(conditions) if conditions else None
+    
+    def _match_bitmap(self, bitmaps: BitmapIndex, value: str) -> np.ndarray:
+        """在列的各个取值上做包含匹配（取值只有几十个），命中取值的位图按位或"""
+        values = pd.Series(bitmaps.values(), dtype=object)
+        return bitmaps.union(values[self._match_values(values, value)])
+    
+    def _match_values(self, values: pd.Series, value: str) -> np.ndarray:
+        """筛选参数（逗号分隔的多个取值）对各个取值的包含匹配，满足任一即可"""
+        matched = np.zeros(len(values), dtype=bool)
+        for term in filter_terms(value):
+            matched |= self._contains_mask(values, term)
+        return matched
+    
+    @timed('get_event_detail')
     def get_event_detail(self, event_id: str) -> Optional[EventDetailResponse]:
         """获取事件详情"""
         
-        if self.detail_df.empty:
+        if self._no_events():
             return None
         
         # 查找事件
-        event_row = self.detail_df[self.detail_df['事件编号'].astype(str) == event_id]
+        position = int(self._event_positions([event_id])[0])
+        cache_lookup('event_id_index', position >= 0)
         
-        if event_row.empty:
+        if position < 0:
             return None
         
-        row = event_row.iloc[0]
+        return self._event_detail_from_row(self.detail_df.iloc[position])
+    
+    @timed('get_events_batch')
+    def get_events_batch(self, event_ids: List[str]) -> BatchEventDetailResponse:
+        """批量获取事件详情（一次索引查找解析全部事件编号）"""
+        event_ids = list(dict.fromkeys(str(x) for x in event_ids))
+        
+        if self._no_events():
+            return BatchEventDetailResponse(items=[], missing=event_ids)
+        
+        positions = self._event_positions(event_ids)
+        found = positions >= 0
+        
+        items = []
+        for _, row in self.detail_df.iloc[positions[found]].iterrows():
+            check_deadline()
+            items.append(self._event_detail_from_row(row))
+        missing = [event_id for event_id, ok in zip(event_ids, found) if not ok]
+        return BatchEventDetailResponse(items=items, missing=missing)
+    
+    def _event_detail_from_row(self, row: pd.Series) -> EventDetailResponse:
+        """由事件详情行构建事件详情响应"""
+        event_id = str(row.get('事件编号', ''))
         
         # 计算相关事件数量
         related_events_count = 0  # 默认为0
@@ -308,7 +1518,7 @@ class EventService:
         involved_parties_info = self._get_involved_parties_info(event_id)
         
         return EventDetailResponse(
-            事件编号=str(row.get('事件编号', '')),
+            事件编号=event_id,
             事件描述=str(row.get('事件描述', '')),
             镇街名称=str(row.get('镇街名称', '')),
             村社名称=str(row.get('村社名称', '')) if row.get('村社名称') else None,
@@ -324,24 +1534,52 @@ class EventService:
             当事人信息=involved_parties_info
         )
     
+    @timed('get_cluster_detail')
     def get_cluster_detail(self, event_uid: str) -> Optional[ClusterEventResponse]:
         """获取聚类事件详情"""
         
-        if self.cluster_df.empty or self.detail_df.empty:
+        if self.cluster_df.empty or self._no_events():
             return None
         
         # 从聚类数据中获取基本信息
-        cluster_row = self.cluster_df[self.cluster_df['EventUID'].astype(str) == event_uid]
+        position = self._cluster_uid_index.get(event_uid)
+        cache_lookup('cluster_uid_index', position is not None)
         
-        if cluster_row.empty:
+        if position is None:
             return None
         
-        cluster_info = cluster_row.iloc[0]
+        self._ensure_key_partitions('EventUID', [event_uid])
+        return self._cluster_detail_from_row(event_uid, self.cluster_df.iloc[position])
+    
+    @timed('get_clusters_batch')
+    def get_clusters_batch(self, event_uids: List[str]) -> BatchClusterDetailResponse:
+        """批量获取聚类事件详情"""
+        event_uids = list(dict.fromkeys(str(x) for x in event_uids))
+        
+        if self.cluster_df.empty or self._no_events():
+            return BatchClusterDetailResponse(items=[], missing=event_uids)
+        
+        positions = self._lookup_positions(self._cluster_uid_index, event_uids)
+        self._ensure_key_partitions('EventUID', [uid for uid, p in zip(event_uids, positions) if p >= 0])
+        
+        items = []
+        missing = []
+        for event_uid, position in zip(event_uids, positions):
+            check_deadline()
+            detail = self._cluster_detail_from_row(event_uid, self.cluster_df.iloc[position]) if position >= 0 else None
+            if detail is None:
+                missing.append(event_uid)
+            else:
+                items.append(detail)
+        return BatchClusterDetailResponse(items=items, missing=missing)
+    
+    def _cluster_detail_from_row(self, event_uid: str, cluster_info: pd.Series) -> Optional[ClusterEventResponse]:
+        """由聚类事件行和其成员事件构建聚类事件详情响应"""
         
         # 获取该聚类下的所有事件
-        cluster_events = self.detail_df[self.detail_df['EventUID'].astype(str) == event_uid]
+        cluster_events = self._cluster_member_rows(event_uid)
         
-        if cluster_events.empty:
+        if cluster_events is None or cluster_events.empty:
             return None
         
         # 计算参与人数（该EventUID下所有事件的phone_set中的电话号码去重数量）
@@ -363,6 +1601,13 @@ class EventService:
             last_report_time=str(cluster_info.get('last_report_time', ''))
         )
     
+    def _cluster_member_rows(self, event_uid: str) -> Optional[pd.DataFrame]:
+        """聚类下的全部事件行（按行位置顺序）"""
+        member_positions = self._cluster_members.get(event_uid)
+        if member_positions is None:
+            return None
+        return self.detail_df.iloc[member_positions]
+    
     def _count_participants(self, phone_set: str) -> int:
         """计算参与人数（phone_set中的电话号码数量）"""
         if not phone_set or pd.isna(phone_set):
@@ -402,7 +1647,7 @@ class EventService:
                     # 尝试多种时间格式解析
                     try:
                         # 先尝试标准格式
-                        parsed_time = pd.to_datetime(report_time, errors='coerce')
+                        parsed_time = parse_time(report_time)
                         if pd.notna(parsed_time):
                             report_times.append(parsed_time)
                     except:
@@ -440,6 +1685,7 @@ class EventService:
         timeline = []
         
         for _, row in events_df.iterrows():
+            check_deadline()
             event_id = str(row.get('事件编号', ''))
             
             # 获取报警人信息和当事人信息
@@ -459,7 +1705,7 @@ class EventService:
         
         # 按上报时间排序
         try:
-            timeline.sort(key=lambda x: pd.to_datetime(x['上报时间'], errors='coerce') if x['上报时间'] else pd.Timestamp.min)
+            timeline.sort(key=lambda x: parse_time(x['上报时间']) if x['上报时间'] else pd.Timestamp.min)
         except:
             pass  # 如果排序失败，保持原顺序
         
@@ -468,16 +1714,17 @@ class EventService:
     def get_filter_options(self) -> FilterOptions:
         """获取筛选选项"""
         
-        if self.detail_df.empty:
+        if self._no_events():
             return FilterOptions(towns=[], levels=[], categories=[], related_event_options=[])
         
-        # 获取去重的选项
-        towns = sorted([str(x) for x in self.detail_df['镇街名称'].dropna().unique() if str(x).strip()])
-        levels = sorted([str(x) for x in self.detail_df['事件级别'].dropna().unique() if str(x).strip()])
-        categories = sorted([str(x) for x in self.detail_df['二级分类'].dropna().unique() if str(x).strip()])
+        # 获取去重的选项（由分区目录的取值计数合并，不扫描事件表，也不加载冷分区）
+        catalogue = self._event_partitions
+        towns = sorted(x for x in catalogue.facet_values('镇街名称') if x.strip())
+        levels = sorted(x for x in catalogue.facet_values('事件级别') if x.strip())
+        categories = sorted(x for x in catalogue.facet_values('二级分类') if x.strip())
         
         # 相关事件数量选项（固定选项）
-        related_event_options = ["0", "1", "2-5", "5+"]
+        related_event_options = list(RELATED_EVENT_BUCKETS)
         
         return FilterOptions(
             towns=towns,
@@ -486,45 +1733,71 @@ class EventService:
             related_event_options=related_event_options
         )
     
+    @timed('get_cluster_list')
     def get_cluster_list(self, page: int = 1, page_size: int = 20, search: Optional[str] = None,
                         min_event_count: Optional[int] = None, max_event_count: Optional[int] = None,
-                        min_duration: Optional[float] = None, max_duration: Optional[float] = None) -> ClusterListPaginatedResponse:
-        """获取聚合事件列表（分页）"""
+                        min_duration: Optional[float] = None, max_duration: Optional[float] = None,
+                        start_time: Optional[Union[datetime, date]] = None, end_time: Optional[Union[datetime, date]] = None,
+                        fields: Optional[List[str]] = None, description_length: Optional[int] = None) -> Union[ClusterListPaginatedResponse, ProjectedListResponse]:
+        """获取聚合事件列表（分页），给出 fields 或 description_length 时返回字段投影的列表项"""
+        projected = fields is not None or description_length is not None
+        response_cls = ProjectedListResponse if projected else ClusterListPaginatedResponse
         
         if self.cluster_df.empty:
-            return ClusterListPaginatedResponse(
+            return response_cls(
                 items=[], total=0, page=page, page_size=page_size, total_pages=0
             )
         
-        df = self.cluster_df.copy()
+        df = self.cluster_df
+        
+        # 时间范围筛选：聚类的时间跨度与 [start_time, end_time] 有交集
+        # （first_report_time <= end_time 且 last_report_time >= start_time）
+        # 两个有序索引各二分出一个区间，只在区间内的行位置上求交集（结果按行位置升序）
+        start, end = self._time_range_bounds(start_time, end_time)
+        if end is not None and start is not None:
+            positions = np.intersect1d(
+                self._positions_between(self._cluster_first_order, self._cluster_first_sorted, None, end),
+                self._positions_between(self._cluster_last_order, self._cluster_last_sorted, start, None),
+            )
+        elif end is not None:
+            positions = np.sort(self._positions_between(self._cluster_first_order, self._cluster_first_sorted, None, end))
+        elif start is not None:
+            positions = np.sort(self._positions_between(self._cluster_last_order, self._cluster_last_sorted, start, None))
+        else:
+            positions = np.arange(len(df))
+        ROWS_SCANNED.observe(len(positions), 'get_cluster_list')
         
         # 只显示record_count > 1的记录
-        df = df[df['record_count'] > 1]
+        positions = positions[df['record_count'].to_numpy()[positions] > 1]
         
         # 应用搜索过滤（对描述进行搜索）
-        if search:
-            search_condition = df['cluster_description'].astype(str).str.contains(search, case=False, na=False)
-            df = df[search_condition]
+        if search and len(positions):
+            positions = positions[self._contains_mask(df['cluster_description'].iloc[positions], search)]
         
         # 应用事件数量筛选
+        record_count = df['record_count'].to_numpy()
         if min_event_count is not None:
-            df = df[df['record_count'] >= min_event_count]
+            positions = positions[record_count[positions] >= min_event_count]
         
         if max_event_count is not None:
-            df = df[df['record_count'] <= max_event_count]
+            positions = positions[record_count[positions] <= max_event_count]
         
         # 应用持续时间筛选
+        duration_days = df['duration_days'].to_numpy()
         if min_duration is not None:
-            df = df[df['duration_days'] >= min_duration]
+            positions = positions[duration_days[positions] >= min_duration]
         
         if max_duration is not None:
-            df = df[df['duration_days'] <= max_duration]
+            positions = positions[duration_days[positions] <= max_duration]
+        
+        df = df.iloc[positions]
         
         # 按record_count倒序排列，然后按duration_days倒序
         df = df.sort_values(['record_count', 'duration_days'], ascending=[False, False])
         
         # 计算分页
         total = len(df)
+        RESULT_SIZE.observe(total, 'get_cluster_list')
         total_pages = (total + page_size - 1) // page_size
         start_idx = (page - 1) * page_size
         end_idx = start_idx + page_size
@@ -535,17 +1808,10 @@ class EventService:
         # 转换为响应模型
         items = []
         for _, row in page_df.iterrows():
-            cluster = ClusterListResponse(
-                EventUID=str(row.get('EventUID', '')),
-                cluster_description=str(row.get('cluster_description', '')),
-                record_count=int(row.get('record_count', 0)),
-                duration_days=float(row.get('duration_days', 0)) if pd.notna(row.get('duration_days')) else None,
-                first_report_time=str(row.get('first_report_time', '')),
-                last_report_time=str(row.get('last_report_time', ''))
-            )
-            items.append(cluster)
+            item = self._cluster_item_from_row(row)
+            items.append(project_item(item, fields, 'cluster_description', description_length) if projected else item)
         
-        return ClusterListPaginatedResponse(
+        return response_cls(
             items=items,
             total=total,
             page=page,
@@ -553,6 +1819,18 @@ class EventService:
             total_pages=total_pages
         )
     
+    @staticmethod
+    def _cluster_item_from_row(row: pd.Series) -> ClusterListResponse:
+        """由聚类事件行构建聚合事件列表项"""
+        return ClusterListResponse(
+            EventUID=str(row.get('EventUID', '')),
+            cluster_description=str(row.get('cluster_description', '')),
+            record_count=int(row.get('record_count', 0)),
+            duration_days=float(row.get('duration_days', 0)) if pd.notna(row.get('duration_days')) else None,
+            first_report_time=str(row.get('first_report_time', '')),
+            last_report_time=str(row.get('last_report_time', ''))
+        )
+    
     def get_cluster_filter_options(self) -> ClusterFilterOptions:
         """获取聚合事件筛选选项"""
         
@@ -571,9 +1849,13 @@ class EventService:
                 duration_ranges=[]
             )
         
+        return self._cluster_filter_options(df['record_count'].max(), df['duration_days'].max())
+    
+    @staticmethod
+    def _cluster_filter_options(max_count, max_duration) -> ClusterFilterOptions:
+        """由最大事件数量和最大持续时间生成聚合事件筛选选项"""
         # 事件数量范围选项
         event_count_ranges = []
-        max_count = df['record_count'].max()
         if max_count >= 2:
             event_count_ranges.append("2")
         if max_count >= 3:
@@ -585,7 +1867,6 @@ class EventService:
         
         # 持续时间范围选项
         duration_ranges = []
-        max_duration = df['duration_days'].max()
         if pd.notna(max_duration) and max_duration > 0:
             duration_ranges.append("0-1天")
             if max_duration > 1:
@@ -672,6 +1953,7 @@ class EventService:
         # 如果查询的是完整号码，直接匹配
         return search_phone == original_phone
     
+    @timed('search_people')
     def search_people(self, query: PersonSearchQuery) -> PersonSearchResponse:
         """搜索人口信息"""
         if self.people_df.empty:
@@ -679,18 +1961,22 @@ class EventService:
                 items=[], total=0, page=query.page, page_size=query.page_size, total_pages=0
             )
         
-        df = self.people_df.copy()
-        
-        # 应用搜索条件
-        if query.name:
+        # 应用搜索条件（模糊搜索只取姓名索引中的近似姓名，不扫描全表）
+        if query.name and query.fuzzy:
+            df = self._fuzzy_name_rows(self.people_df, self._people_name_index, query.name)
+        else:
+            df = self.people_df.copy()
+        if query.name and not query.fuzzy:
             df = df[df['name_cn'].astype(str).str.contains(query.name, case=False, na=False)]
         
         if query.id_card:
+            check_deadline()
             # 对身份证进行匹配（支持脱敏格式）
             mask = df.apply(lambda row: self._match_masked_id_card(query.id_card, str(row['id_card_no'])), axis=1)
             df = df[mask]
         
         if query.phone:
+            check_deadline()
             # 对手机号进行匹配（支持脱敏格式）
             mask = df.apply(lambda row: self._match_masked_phone(query.phone, str(row['mobile_phone'])), axis=1)
             df = df[mask]
@@ -707,26 +1993,10 @@ class EventService:
         # 转换为响应模型
         items = []
         for _, row in page_df.iterrows():
-            person = PersonInfo(
-                person_id=str(row.get('person_id', '')),
-                name_cn=str(row.get('name_cn', '')),
-                id_card_no=self._mask_id_card(str(row.get('id_card_no', ''))),
-                mobile_phone=self._mask_phone(str(row.get('mobile_phone', ''))),
-                gender=str(row.get('gender', '')) if row.get('gender') else None,
-                birth_date=str(row.get('birth_date', '')) if row.get('birth_date') else None,
-                nationality_code=str(row.get('nationality_code', '')) if row.get('nationality_code') else None,
-                ethnicity_code=str(row.get('ethnicity_code', '')) if row.get('ethnicity_code') else None,
-                hukou_province=str(row.get('hukou_province', '')) if row.get('hukou_province') else None,
-                hukou_city=str(row.get('hukou_city', '')) if row.get('hukou_city') else None,
-                hukou_county=str(row.get('hukou_county', '')) if row.get('hukou_county') else None,
-                reside_province=str(row.get('reside_province', '')) if row.get('reside_province') else None,
-                reside_city=str(row.get('reside_city', '')) if row.get('reside_city') else None,
-                reside_county=str(row.get('reside_county', '')) if row.get('reside_county') else None,
-                highest_education=str(row.get('highest_education', '')) if row.get('highest_education') else None,
-                occupation_code=str(row.get('occupation_code', '')) if row.get('occupation_code') else None,
-                employer_name=str(row.get('employer_name', '')) if row.get('employer_name') else None
-            )
-            items.append(person)
+            item = self._person_info_from_row(row)
+            if '_name_distance' in row:
+                item.name_distance = int(row['_name_distance'])
+            items.append(item)
         
         return PersonSearchResponse(
             items=items,
@@ -746,9 +2016,11 @@ class EventService:
         if person_row.empty:
             return None
         
-        row = person_row.iloc[0]
-        
         # 返回详细信息（脱敏处理）
+        return self._person_info_from_row(person_row.iloc[0])
+    
+    def _person_info_from_row(self, row: pd.Series) -> PersonInfo:
+        """由人口信息行构建人员信息（证件号和手机号脱敏）"""
         return PersonInfo(
             person_id=str(row.get('person_id', '')),
             name_cn=str(row.get('name_cn', '')),
@@ -769,18 +2041,26 @@ class EventService:
             employer_name=str(row.get('employer_name', '')) if row.get('employer_name') else None
         )
     
-    def get_person_analysis(self, query: PersonAnalysisQuery) -> PersonAnalysisResponse:
-        """获取人员分析列表（分页）"""
+    @timed('get_person_analysis')
+    def get_person_analysis(self, query: PersonAnalysisQuery,
+                            fields: Optional[List[str]] = None) -> Union[PersonAnalysisResponse, ProjectedListResponse]:
+        """获取人员分析列表（分页），给出 fields 时返回字段投影的列表项"""
+        response_cls = ProjectedListResponse if fields is not None else PersonAnalysisResponse
         
         if self.phone_master_df.empty:
-            return PersonAnalysisResponse(
+            return response_cls(
                 items=[], total=0, page=query.page, page_size=query.page_size, total_pages=0
             )
         
-        df = self.phone_master_df.copy()
+        fuzzy = bool(query.search and query.fuzzy)
+        if fuzzy:
+            df = self._fuzzy_name_rows(self.phone_master_df, self._person_name_index, query.search)
+        else:
+            df = self.phone_master_df
+        ROWS_SCANNED.observe(len(df), 'get_person_analysis')
         
         # 应用搜索过滤
-        if query.search:
+        if query.search and not fuzzy:
             search_escaped = re.escape(query.search)
             search_condition = (
                 df['name'].astype(str).str.contains(search_escaped, case=False, na=False) |
@@ -788,15 +2068,19 @@ class EventService:
             )
             df = df[search_condition]
         
-        # 应用角色筛选
+        # 应用角色筛选（位图索引，行标签即行位置）
         if query.role:
-            df = df[df['primary_role'].astype(str).str.contains(query.role, case=False, na=False)]
+            df = df[bitmap_contains(self._match_bitmap(self._role_bitmaps, query.role), df.index.to_numpy())]
         
-        # 按event_count倒序排列
-        df = df.sort_values('event_count', ascending=False)
+        # 按event_count倒序排列（模糊搜索先按姓名距离）
+        if fuzzy:
+            df = df.sort_values(['_name_distance', 'event_count'], ascending=[True, False], kind='stable')
+        else:
+            df = df.sort_values('event_count', ascending=False)
         
         # 计算分页
         total = len(df)
+        RESULT_SIZE.observe(total, 'get_person_analysis')
         total_pages = (total + query.page_size - 1) // query.page_size
         start_idx = (query.page - 1) * query.page_size
         end_idx = start_idx + query.page_size
@@ -807,18 +2091,12 @@ class EventService:
         # 转换为响应模型
         items = []
         for _, row in page_df.iterrows():
-            person = PersonAnalysis(
-                phone=str(row.get('phone', '')),
-                name=str(row.get('name', '')) if row.get('name') else None,
-                id_card=str(row.get('id_card', '')) if row.get('id_card') else None,
-                primary_role=str(row.get('primary_role', '')) if row.get('primary_role') else None,
-                event_count=int(row.get('event_count', 0)),
-                name_candidates=str(row.get('name_candidates', '')) if row.get('name_candidates') else None,
-                id_candidates=str(row.get('id_candidates', '')) if row.get('id_candidates') else None
-            )
-            items.append(person)
+            item = self._person_analysis_from_row(row)
+            if fuzzy:
+                item.name_distance = int(row['_name_distance'])
+            items.append(project_item(item, fields) if fields is not None else item)
         
-        return PersonAnalysisResponse(
+        return response_cls(
             items=items,
             total=total,
             page=query.page,
@@ -826,6 +2104,28 @@ class EventService:
             total_pages=total_pages
         )
     
+    @staticmethod
+    def _fuzzy_name_rows(df: pd.DataFrame, index: NameIndex, name: str) -> pd.DataFrame:
+        """姓名索引中近似姓名对应的行（按距离、行位置排列），附加 _name_distance 列"""
+        matches = index.search(name)
+        return df.iloc[[position for position, _ in matches]].assign(
+            _name_distance=[distance for _, distance in matches]
+        )
+    
+    @staticmethod
+    def _person_analysis_from_row(row: pd.Series) -> PersonAnalysis:
+        """由人员分析行构建人员分析列表项"""
+        return PersonAnalysis(
+            phone=str(row.get('phone', '')),
+            name=str(row.get('name', '')) if row.get('name') else None,
+            id_card=str(row.get('id_card', '')) if row.get('id_card') else None,
+            primary_role=str(row.get('primary_role', '')) if row.get('primary_role') else None,
+            event_count=int(row.get('event_count', 0)),
+            name_candidates=str(row.get('name_candidates', '')) if row.get('name_candidates') else None,
+            id_candidates=str(row.get('id_candidates', '')) if row.get('id_candidates') else None
+        )
+    
+    @timed('get_person_analysis_detail')
     def get_person_analysis_detail(self, phone: str) -> Optional[PersonDetailResponse]:
         """获取人员分析详情"""
         
@@ -833,45 +2133,89 @@ class EventService:
             return None
         
         # 查找人员信息
-        person_row = self.phone_master_df[self.phone_master_df['phone'].astype(str) == phone]
+        position = self._phone_index.get(phone)
+        cache_lookup('phone_index', position is not None)
         
-        if person_row.empty:
+        if position is None:
             return None
         
-        row = person_row.iloc[0]
+        row = self.phone_master_df.iloc[position]
+        event_ids = self._parse_related_events(row)
+        event_positions = dict(zip(event_ids, self._event_positions(event_ids)))
+        return self._person_detail_from_row(phone, row, self._person_event_rows(event_ids, event_positions))
+    
+    @timed('get_person_analysis_batch')
+    def get_person_analysis_batch(self, phones: List[str]) -> BatchPersonDetailResponse:
+        """批量获取人员分析详情（手机号和关联事件编号各一次索引查找）"""
+        phones = list(dict.fromkeys(str(x) for x in phones))
         
-        # 获取相关事件列表
+        if self.phone_master_df.empty:
+            return BatchPersonDetailResponse(items=[], missing=phones)
+        
+        positions = self._lookup_positions(self._phone_index, phones)
+        found = positions >= 0
+        rows = self.phone_master_df.iloc[positions[found]]
+        found_phones = [phone for phone, ok in zip(phones, found) if ok]
+        
+        # 一次解析所有人员的关联事件
+        related = [self._parse_related_events(row) for _, row in rows.iterrows()]
+        all_event_ids = list(dict.fromkeys(event_id for event_ids in related for event_id in event_ids))
+        event_positions = dict(zip(all_event_ids, self._event_positions(all_event_ids)))
+        
+        items = [
+            self._person_detail_from_row(phone, row, self._person_event_rows(event_ids, event_positions))
+            for phone, (_, row), event_ids in zip(found_phones, rows.iterrows(), related)
+        ]
+        missing = [phone for phone, ok in zip(phones, found) if not ok]
+        return BatchPersonDetailResponse(items=items, missing=missing)
+    
+    @staticmethod
+    def _parse_related_events(row: pd.Series) -> List[str]:
+        """解析人员分析行中的关联事件编号列表（格式：['id1', 'id2', ...]）"""
         related_events_str = str(row.get('related_events', ''))
-        events = []
-        
-        if related_events_str and related_events_str != 'nan':
-            try:
-                # 解析事件ID列表（格式：['id1', 'id2', ...]）
-                import ast
-                event_ids = ast.literal_eval(related_events_str)
-                
-                # 获取每个事件的详细信息
-                for event_id in event_ids:
-                    event_detail = self.get_event_detail(str(event_id))
-                    if event_detail:
-                        # 在事件中查找这个人的角色
-                        role = self._get_person_role_in_event(phone, str(event_id))
-                        
-                        event = PersonEvent(
-                            事件编号=event_detail.事件编号,
-                            事件描述=event_detail.事件描述,
-                            上报时间=event_detail.上报时间,
-                            办结时间=event_detail.办结时间,
-                            处置结果=event_detail.处置结果,
-                            role=role
-                        )
-                        events.append(event)
-                        
-            except Exception as e:
-                print(f"解析相关事件失败: {e}")
+        if not related_events_str or related_events_str == 'nan':
+            return []
         
-        # 按时间排序事件
-        events.sort(key=lambda x: pd.to_datetime(x.上报时间, errors='coerce') if x.上报时间 else pd.Timestamp.min)
+        try:
+            import ast
+            return [str(event_id) for event_id in ast.literal_eval(related_events_str)]
+        except Exception as e:
+            print(f"解析相关事件失败: {e}")
+            return []
+    
+    def _person_event_rows(self, event_ids: List[str], event_positions: Dict[str, int]) -> List[tuple]:
+        """按关联事件编号取出（事件行, 上报时间），不存在的事件跳过"""
+        event_rows = []
+        for event_id in event_ids:
+            position = event_positions.get(event_id, -1)
+            if position >= 0:
+                event_rows.append((self.detail_df.iloc[position], self._event_times[position]))
+        return event_rows
+    
+    def _person_detail_from_row(self, phone: str, row: pd.Series, event_rows: List[tuple]) -> PersonDetailResponse:
+        """由人员分析行和关联事件（事件行, 上报时间）构建人员分析详情响应"""
+        events = []
+        event_times = []
+        for event_row, report_time in event_rows:
+            check_deadline()
+            # 在事件中查找这个人的角色
+            role = self._get_person_role_in_event(phone, str(event_row.get('事件编号', '')))
+            
+            events.append(PersonEvent(
+                事件编号=str(event_row.get('事件编号', '')),
+                事件描述=str(event_row.get('事件描述', '')),
+                上报时间=str(event_row.get('上报时间', '')),
+                办结时间=str(event_row.get('办结时间', '')) if event_row.get('办结时间') else None,
+                处置结果=str(event_row.get('处置结果', '')) if event_row.get('处置结果') else None,
+                role=role
+            ))
+            event_times.append(report_time)
+        
+        # 按时间排序事件（无法解析的时间排在最前）
+        if events:
+            times = np.array(event_times, dtype='datetime64[ns]')
+            order = np.argsort(np.where(np.isnat(times), np.datetime64(pd.Timestamp.min), times), kind='stable')
+            events = [events[i] for i in order]
         
         return PersonDetailResponse(
             phone=str(row.get('phone', '')),
@@ -886,30 +2230,18 @@ class EventService:
     
     def _get_person_role_in_event(self, phone: str, event_id: str) -> Optional[str]:
         """获取人员在特定事件中的角色"""
-        if self.info_df.empty:
-            return None
-        
-        # 查找对应事件的信息
-        info_row = self.info_df[self.info_df['event_id'].astype(str) == event_id]
-        
-        if info_row.empty:
+        info_list = self._participants_by_event.get(event_id)
+        if not info_list:
             return None
         
         try:
-            extracted_info_str = info_row.iloc[0]['extracted_info']
-            if not extracted_info_str or pd.isna(extracted_info_str):
-                return None
-            
-            # 解析JSON
-            info_list = json.loads(extracted_info_str)
-            
             # 查找匹配的手机号
             for person in info_list:
                 person_phone = person.get('phone', '')
                 if person_phone == phone:
                     return person.get('role', '未知')
                     
-        except (json.JSONDecodeError, KeyError, Exception) as e:
+        except (KeyError, AttributeError) as e:
             print(f"解析角色信息失败: {event_id}, 错误: {e}")
             return None
         
@@ -922,6 +2254,67 @@ class EventService:
         
         roles = self.phone_master_df['primary_role'].dropna().unique()
         return sorted([str(role) for role in roles if str(role).strip()])
+    
+    def get_partition_report(self) -> PartitionReportResponse:
+        """事件和聚类事件的分区目录（按时间倒序）"""
+        def infos(catalogue: PartitionCatalogue) -> List[PartitionInfo]:
+            return [PartitionInfo(**{k: v for k, v in partition.to_dict().items() if k != 'fragments'},
+                                  loaded=partition.loaded)
+                    for partition in catalogue.partitions()]
+        
+        events = infos(self._event_partitions)  # 首次访问时读入事件表（分层时为热分区）
+        return PartitionReportResponse(
+            tiered=self._event_snapshot is not None,
+            hot_months=self.hot_months,
+            events=events,
+            clusters=infos(self._cluster_partitions)
+        )
+    
+    def get_memory_report(self) -> MemoryReportResponse:
+        """已加载数据表按列的内存占用，以及时间/查找/相似度索引的大小"""
+        tables = []
+        for name in TABLE_FILES:
+            if not self.is_loaded(name):
+                continue
+            report = frame_memory_report(self.__dict__[name])
+            tables.append(TableMemory(
+                name=name,
+                rows=report['rows'],
+                bytes=report['bytes'],
+                columns=[ColumnMemory(**column) for column in report['columns']]
+            ))
+        
+        indexes = {}
+        for name, value in vars(self).items():
+            if isinstance(value, np.ndarray):
+                indexes[name] = int(value.nbytes)
+            elif isinstance(value, pd.Series):
+                indexes[name] = int(value.memory_usage(deep=True))
+            elif isinstance(value, TfidfIndex):
+                indexes[name] = int(value.tf.data.nbytes + value.tf.indices.nbytes + value.tf.indptr.nbytes
+                                    + value.doc_freq.nbytes + value.keys.nbytes)
+        
+        return MemoryReportResponse(
+            compact_storage=self.compact_storage,
+            rss_bytes=process_rss(),
+            tables_bytes=sum(table.bytes for table in tables),
+            tables=sorted(tables, key=lambda table: -table.bytes),
+            indexes=dict(sorted(indexes.items(), key=lambda item: -item[1]))
+        )
+
+def create_event_service(backend: Optional[str] = None, data_dir: Optional[str] = None) -> EventService:
+    """创建服务，backend 默认取环境变量 EVENT_STORAGE_BACKEND：pandas（默认，全部数据在内存中）、sqlite
+    或 sharded（分片协调者，见 sharding.py）"""
+    backend = (backend or os.environ.get('EVENT_STORAGE_BACKEND', 'pandas')).lower()
+    if backend == 'sqlite':
+        from sqlite_store import SqliteEventService
+        return SqliteEventService(data_dir=data_dir)
+    if backend == 'sharded':
+        from sharding import ShardedEventService
+        return ShardedEventService()
+    if backend != 'pandas':
+        raise ValueError(f"未知的存储后端: {backend}")
+    return EventService(data_dir=data_dir)
 
 # 创建全局服务实例
-event_service = EventService() 
\ No newline at end of file
+event_service = create_event_service() 
\ No newline at end of file
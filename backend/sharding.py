@@ -0,0 +1,809 @@
+"""按镇街分片与分散-汇总查询
+
+单个 EventService 进程装不下全市各区县的数据时，把事件、参与人、聚类事件和人员分析按镇街
+拆分到多个分片，每个分片是一个独立的进程（本机或其他节点），运行普通的 EventService；
+协调者（ShardedEventService）把查询分发给各分片再合并结果：
+
+- 列表查询（事件、聚类事件、人员分析）：每个分片返回自己排序后的前 page * page_size 条和命中数，
+  协调者按相同的排序键归并后取出当前页，命中数相加；按镇街筛选时只查询含有匹配镇街的分片。
+  排序键相同的行（如上报时间相同的事件）按分片顺序排列，与单个服务中按数据文件行序排列不同，
+  但同一查询的各页结果一致（不重复、不遗漏）
+- 筛选选项：各分片的取值合并
+- 按编号/手机号查询详情：分发给全部分片，取找到的结果；批量查询按请求顺序合并，各分片都没有的为 missing
+- 增量写入：按事件的镇街发送到持有该镇街的分片（新镇街按名称散列）
+
+分片规则（split_data）：镇街按事件数从多到少依次分给事件数最少的分片；聚类事件跟随其首个成员事件
+所在的分片，同一聚类的成员事件都放在该分片（聚类详情不跨分片）；报警人信息和原始数据跟随事件；
+人员分析的每个手机号放在其关联事件最多的分片；人口信息每个分片一份。
+
+分片之间通过 multiprocessing.connection 通信（TCP，authkey 认证），请求为（方法名, 参数），
+结果为 pickle 后的响应模型。通过认证的一方可以让对方反序列化任意对象，因此没有默认密钥：
+分片节点和连接远程分片的协调者必须设置 EVENT_SHARD_AUTHKEY，本机启动的分片每次随机生成密钥。
+
+拆分数据（在 backend 目录下）：
+    python sharding.py split --data-dir ../data --out ../data/shards --shards 4
+
+启动分片节点（每个分片一个进程）：
+    EVENT_SHARD_AUTHKEY=<随机密钥> python sharding.py serve --data-dir ../data/shards/shard-0 --port 9100
+
+协调者：设置 EVENT_STORAGE_BACKEND=sharded，EVENT_SHARDS=host:port,host:port 指定分片地址（同时设置 EVENT_SHARD_AUTHKEY）；
+只设置 EVENT_SHARDS_DIR（split 的输出目录）时在本机为每个分片启动一个子进程。
+"""
+import argparse
+import atexit
+import heapq
+import json
+import os
+import queue
+import secrets
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import Client, Connection, Listener
+from operator import itemgetter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from csv_chunks import read_csv_chunks
+from models import (
+    BatchClusterDetailResponse, BatchEventDetailResponse, BatchPersonDetailResponse, ClusterFilterOptions,
+    ClusterListPaginatedResponse, FilterOptions, OrgTreeResponse, PaginatedResponse, PersonAnalysisQuery,
+    PersonAnalysisResponse, ProjectedListResponse, SimilarResponse
+)
+from services import (
+    EventService, TABLE_FILES, check_supported, create_event_service, filter_terms, parse_times, project_item
+)
+
+# 拆分时原样复制到每个分片的表（人口信息不按镇街划分）
+REPLICATED_FILES = ('people_info_simple.csv',)
+
+# 跟随事件分片的表：文件名 -> 事件编号列
+EVENT_FOLLOWER_FILES = {'info_merge.csv': 'event_id', 'raw_conflict.csv': '事件编号'}
+
+MANIFEST_FILE = 'shards.json'
+
+# 连接分片被拒绝时的重试次数和首次重试前的等待（秒，之后每次加倍）
+SHARD_CONNECT_ATTEMPTS = 6
+SHARD_CONNECT_BACKOFF = 0.1
+
+# 分片进程对外提供的方法（EventService 的公开查询和写入方法）
+SHARD_METHODS = frozenset({
+    'get_events', 'get_events_batch', 'get_event_detail', 'get_similar_to_event', 'find_similar',
+    'get_filter_options', 'get_cluster_list', 'get_cluster_detail', 'get_clusters_batch',
+    'get_cluster_filter_options', 'get_person_analysis', 'get_person_analysis_detail',
+    'get_person_analysis_batch', 'get_person_analysis_roles', 'search_people', 'get_person_detail',
+    'estimate_cost', 'event_total', 'data_version', 'get_load_status', 'ingest_events', 'get_org_tree',
+})
+
+
+def shard_authkey() -> Optional[bytes]:
+    """分片通信的认证密钥，取环境变量 EVENT_SHARD_AUTHKEY，未设置时为 None"""
+    value = os.environ.get('EVENT_SHARD_AUTHKEY')
+    return value.encode('utf-8') if value else None
+
+
+def require_shard_authkey() -> bytes:
+    """分片节点和连接远程分片的协调者必须设置认证密钥：请求是 pickle，通过认证即可在分片上执行代码"""
+    authkey = shard_authkey()
+    if authkey is None:
+        raise ValueError("分片通信需要设置 EVENT_SHARD_AUTHKEY（各节点一致的随机密钥）")
+    return authkey
+
+
+def shard_backend() -> str:
+    """分片进程的存储后端，取环境变量 EVENT_SHARD_BACKEND（默认 pandas）"""
+    return os.environ.get('EVENT_SHARD_BACKEND', 'pandas').lower()
+
+
+def parse_address(value: str) -> Tuple[str, int]:
+    host, _, port = value.strip().rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+def shard_dirs(shards_dir: str) -> List[str]:
+    """split_data 输出目录下按编号排列的分片数据目录"""
+    names = [name for name in os.listdir(shards_dir) if name.startswith('shard-')]
+    return [os.path.join(shards_dir, name) for name in sorted(names, key=lambda name: int(name[6:]))]
+
+
+def town_shard(town: str, shards: int) -> int:
+    """分片表中没有的镇街（新写入的镇街）按名称散列到分片"""
+    return zlib.crc32(town.encode('utf-8')) % shards
+
+
+# ---- 数据拆分 ----
+
+def assign_towns(town_counts: Dict[str, int], shards: int) -> Dict[str, int]:
+    """镇街按事件数从多到少依次分给当前事件数最少的分片"""
+    loads = [(0, shard) for shard in range(shards)]
+    assignment = {}
+    for town, count in sorted(town_counts.items(), key=lambda item: (-item[1], item[0])):
+        load, shard = heapq.heappop(loads)
+        assignment[town] = shard
+        heapq.heappush(loads, (load + count, shard))
+    return assignment
+
+
+class _ShardWriters:
+    """各分片同名CSV文件的追加写入（首次写入时写表头）"""
+
+    def __init__(self, out_dirs: List[str], file_name: str, read_options: Dict[str, Any]):
+        self.paths = [os.path.join(out_dir, file_name) for out_dir in out_dirs]
+        self.options = {'quoting': read_options['quoting']} if 'quoting' in read_options else {}
+        self.started = [False] * len(out_dirs)
+
+    def write(self, df: pd.DataFrame, shards):
+        for shard, part in df.groupby(shards, sort=False):
+            shard = int(shard)
+            part.to_csv(self.paths[shard], mode='a' if self.started[shard] else 'w',
+                        header=not self.started[shard], index=False, **self.options)
+            self.started[shard] = True
+
+    def finish(self, columns: List[str]):
+        """没有写入任何行的分片只写表头"""
+        for path, started in zip(self.paths, self.started):
+            if not started:
+                pd.DataFrame(columns=columns).to_csv(path, index=False, **self.options)
+
+
+def _text_chunks(path: str, read_options: Dict[str, Any]):
+    """全部按文本分块读取（拆分只搬运数据，不转换类型）"""
+    return read_csv_chunks(path, read_options)
+
+
+def split_data(data_dir: str, out_dir: str, shards: int) -> Dict[str, Any]:
+    """把数据目录按镇街拆分为 shards 个分片目录（out_dir/shard-<i>），返回写入 shards.json 的分片表"""
+    detail_file, detail_options = TABLE_FILES['detail_df']
+    detail_path = os.path.join(data_dir, detail_file)
+
+    # 第一遍：各镇街的事件数，聚类事件的首个成员所在镇街
+    town_counts: Dict[str, int] = {}
+    cluster_towns: Dict[str, str] = {}
+    for chunk in _text_chunks(detail_path, detail_options):
+        for town, count in chunk['镇街名称'].value_counts().items():
+            town_counts[town] = town_counts.get(town, 0) + int(count)
+        if 'EventUID' in chunk.columns:
+            for event_uid, town in zip(chunk['EventUID'], chunk['镇街名称']):
+                if event_uid:
+                    cluster_towns.setdefault(event_uid, town)
+    assignment = assign_towns(town_counts, shards)
+    cluster_shards = {event_uid: assignment[town] for event_uid, town in cluster_towns.items()}
+
+    out_dirs = [os.path.join(out_dir, f'shard-{i}') for i in range(shards)]
+    shutil.rmtree(out_dir, ignore_errors=True)
+    for path in out_dirs:
+        os.makedirs(path)
+
+    # 第二遍：事件按聚类（没有聚类时按镇街）写入分片，记录事件编号所在的分片
+    event_shards: Dict[str, int] = {}
+    writers = _ShardWriters(out_dirs, detail_file, detail_options)
+    columns: List[str] = []
+    for chunk in _text_chunks(detail_path, detail_options):
+        columns = list(chunk.columns)
+        targets = [
+            cluster_shards.get(event_uid, assignment[town])
+            for event_uid, town in zip(chunk.get('EventUID', [''] * len(chunk)), chunk['镇街名称'])
+        ]
+        event_shards.update(zip(chunk['事件编号'], targets))
+        writers.write(chunk, targets)
+    writers.finish(columns)
+
+    def follow(file_name: str, read_options: Dict[str, Any], target: Callable[[pd.DataFrame], List[int]]):
+        path = os.path.join(data_dir, file_name)
+        if not os.path.exists(path):
+            return
+        writers = _ShardWriters(out_dirs, file_name, read_options)
+        columns = []
+        for chunk in _text_chunks(path, read_options):
+            columns = list(chunk.columns)
+            writers.write(chunk, target(chunk))
+        writers.finish(columns)
+
+    # 报警人信息和原始数据跟随事件（原始数据中没有对应事件的按镇街）
+    for file_name, id_column in EVENT_FOLLOWER_FILES.items():
+        follow(file_name, {}, lambda chunk, id_column=id_column: [
+            event_shards.get(event_id, assignment.get(row_town, town_shard(row_town, shards)))
+            for event_id, row_town in zip(chunk[id_column], chunk.get('镇街名称', [''] * len(chunk)))
+        ])
+
+    # 聚类事件跟随成员事件；没有成员事件的聚类放在第一个分片
+    cluster_file, cluster_options = TABLE_FILES['cluster_df']
+    follow(cluster_file, cluster_options, lambda chunk: [cluster_shards.get(uid, 0) for uid in chunk['EventUID']])
+
+    # 人员分析的手机号放在其关联事件最多的分片
+    def phone_targets(chunk: pd.DataFrame) -> List[int]:
+        targets = []
+        for _, row in chunk.iterrows():
+            counts = [0] * shards
+            for event_id in EventService._parse_related_events(row):
+                if event_id in event_shards:
+                    counts[event_shards[event_id]] += 1
+            targets.append(counts.index(max(counts)))
+        return targets
+
+    phone_file, phone_options = TABLE_FILES['phone_master_df']
+    follow(phone_file, phone_options, phone_targets)
+
+    for file_name in REPLICATED_FILES:
+        path = os.path.join(data_dir, file_name)
+        if os.path.exists(path):
+            for shard_dir in out_dirs:
+                shutil.copyfile(path, os.path.join(shard_dir, file_name))
+
+    manifest = {'shards': shards, 'towns': assignment,
+                'events': [sum(1 for target in event_shards.values() if target == i) for i in range(shards)]}
+    with open(os.path.join(out_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+
+# ---- 分片进程 ----
+
+class ShardServer:
+    """在分片进程中执行协调者发来的请求，每个连接一个线程"""
+
+    def __init__(self, service: EventService):
+        self.service = service
+        self._captured = threading.local()
+        service.add_ingest_listener(self._capture)
+
+    def _capture(self, events: List[tuple]):
+        """记录本线程增量写入的事件，随写入结果返回给协调者（由协调者通知它的写入监听器）"""
+        self._captured.events = events
+
+    def serve_forever(self, listener: Listener):
+        while True:
+            try:
+                conn = listener.accept()
+            except Exception as e:  # 认证失败等，继续接受其他连接
+                print(f"分片连接失败: {e}")
+                continue
+            threading.Thread(target=self._handle, args=(conn,), name='shard-connection', daemon=True).start()
+
+    def _handle(self, conn: Connection):
+        with conn:
+            while True:
+                try:
+                    method, args, kwargs = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    conn.send(('ok', self._call(method, args, kwargs)))
+                except Exception as e:
+                    conn.send(('error', f'{type(e).__name__}: {e}'))
+
+    def _call(self, method: str, args: tuple, kwargs: Dict[str, Any]) -> Any:
+        if method not in SHARD_METHODS:
+            raise ValueError(f"分片不支持的方法: {method}")
+        if method == 'ingest_events':
+            self._captured.events = []
+            ingested = self.service.ingest_events(*args, **kwargs)
+            return ingested, self._captured.events
+        return getattr(self.service, method)(*args, **kwargs)
+
+
+def serve_shard(data_dir: str, address: Tuple[str, int], authkey: Optional[bytes] = None,
+                backend: Optional[str] = None, ready_fd: Optional[int] = None):
+    """运行分片：加载 data_dir 的数据并在 address 上接受协调者的请求
+
+    给出 ready_fd 时，开始监听后把实际端口写入该管道（端口为 0 时由系统分配）
+    """
+    authkey = authkey or require_shard_authkey()
+    service = create_event_service(backend or shard_backend(), data_dir=data_dir)
+    listener = Listener(address, authkey=authkey)
+    print(f"分片已启动: {data_dir} {listener.address[0]}:{listener.address[1]}")
+    if ready_fd is not None:
+        with os.fdopen(ready_fd, 'w') as ready:
+            ready.write(f'{listener.address[1]}\n')
+    service.start_warmup()
+    ShardServer(service).serve_forever(listener)
+
+
+def start_local_shards(shards_dir: str) -> Tuple[List[Tuple[str, int]], bytes]:
+    """为 shards_dir 下的每个分片启动一个本机子进程（sharding.py serve），返回各分片的地址和认证密钥
+    （进程随协调者退出）
+
+    - 认证密钥每次启动随机生成，通过环境变量传给子进程
+    - 子进程自行绑定空闲端口，开始监听后通过管道报告端口；全部分片可以连接后才返回
+    - 有分片启动失败时结束已启动的全部子进程后抛出异常
+    """
+    authkey = secrets.token_bytes(32).hex().encode('ascii')
+    env = {**os.environ, 'EVENT_SHARD_AUTHKEY': authkey.decode('ascii'), 'EVENT_STORAGE_BACKEND': shard_backend()}
+    processes, pipes = [], []
+
+    def stop():
+        for process in processes:
+            process.terminate()
+
+    atexit.register(stop)
+    try:
+        for data_dir in shard_dirs(shards_dir):
+            read_fd, write_fd = os.pipe()
+            pipes.append(read_fd)
+            try:
+                processes.append(subprocess.Popen(
+                    [sys.executable, os.path.abspath(__file__), 'serve', '--data-dir', data_dir, '--port', '0',
+                     '--ready-fd', str(write_fd)],
+                    env=env, pass_fds=(write_fd,)
+                ))
+            finally:
+                os.close(write_fd)
+
+        addresses = []
+        for data_dir, process in zip(shard_dirs(shards_dir), processes):
+            with os.fdopen(pipes.pop(0)) as ready:
+                port = ready.readline().strip()  # 子进程退出时管道关闭，读到空行
+            if not port:
+                raise RuntimeError(f"分片 {data_dir} 启动失败（退出码 {process.wait()}）")
+            addresses.append(('127.0.0.1', int(port)))
+    except BaseException:
+        stop()
+        for process in processes:
+            process.wait()
+        for read_fd in pipes:
+            os.close(read_fd)
+        atexit.unregister(stop)
+        raise
+    return addresses, authkey
+
+
+class ShardClient:
+    """到一个分片的连接池（连接不能在线程间共享，并发请求各用一个连接）"""
+
+    def __init__(self, address: Tuple[str, int], authkey: bytes):
+        self.address = address
+        self.authkey = authkey
+        self._idle: 'queue.LifoQueue[Connection]' = queue.LifoQueue()
+
+    def _connect(self) -> Connection:
+        """建立新连接，连接被拒绝（分片还在启动或正在重启）时按指数退避重试"""
+        delay = SHARD_CONNECT_BACKOFF
+        for attempt in range(SHARD_CONNECT_ATTEMPTS):
+            try:
+                return Client(self.address, authkey=self.authkey)
+            except ConnectionRefusedError:
+                if attempt == SHARD_CONNECT_ATTEMPTS - 1:
+                    raise
+                time.sleep(delay)
+                delay *= 2
+
+    def call(self, method: str, *args, **kwargs) -> Any:
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        try:
+            conn.send((method, args, kwargs))
+            status, result = conn.recv()
+        except Exception:
+            conn.close()
+            raise
+        self._idle.put(conn)
+        if status != 'ok':
+            raise RuntimeError(f"分片 {self.address[0]}:{self.address[1]} {method} 失败: {result}")
+        return result
+
+
+# ---- 协调者 ----
+
+def _event_sort_keys(items: list) -> List[tuple]:
+    """事件列表的排序键：上报时间倒序，无法解析的时间排在最后（一页的时间一次解析）"""
+    times = parse_times([item.上报时间 for item in items])
+    return [(True, 0) if missing else (False, -int(value))
+            for value, missing in zip(times.astype(np.int64), np.isnat(times))]
+
+
+def _cluster_sort_keys(items: list) -> List[tuple]:
+    """聚合事件列表的排序键：事件数倒序，再按持续时间倒序（缺失的排在最后）"""
+    keys = []
+    for item in items:
+        duration = item.duration_days
+        missing = duration is None or pd.isna(duration)
+        keys.append((-item.record_count, missing, 0 if missing else -duration))
+    return keys
+
+
+def _person_sort_keys(fuzzy: bool) -> Callable[[list], List[tuple]]:
+    """人员分析列表的排序键：事件数倒序（模糊搜索先按姓名距离）"""
+    if fuzzy:
+        return lambda items: [(item.name_distance if item.name_distance is not None else 0, -item.event_count)
+                              for item in items]
+    return lambda items: [(-item.event_count,) for item in items]
+
+
+def _merge_options(values: List[List[str]]) -> List[str]:
+    return sorted(set(value for options in values for value in options))
+
+
+class ShardedEventService:
+    """分散-汇总查询的协调者，接口与 EventService 一致（见模块说明）；重复报警热点和人员关系网络
+    需要跨分片的全部事件，分片模式下不支持
+
+    - **addresses**: 分片地址列表，默认取环境变量 EVENT_SHARDS
+    - **shards_dir**: 未给出分片地址时在本机为该目录下的每个分片启动子进程，默认取 EVENT_SHARDS_DIR
+    """
+
+    # 没有本地数据目录（详情预渲染缓存不启用）
+    data_dir = None
+    persistent_ingest = False
+
+    def __init__(self, addresses: Optional[List[Tuple[str, int]]] = None, shards_dir: Optional[str] = None,
+                 authkey: Optional[bytes] = None):
+        if addresses is None and os.environ.get('EVENT_SHARDS'):
+            addresses = [parse_address(value) for value in os.environ['EVENT_SHARDS'].split(',') if value.strip()]
+        self.addresses = addresses
+        self.shards_dir = shards_dir or os.environ.get('EVENT_SHARDS_DIR')
+        if not self.addresses and not self.shards_dir:
+            raise ValueError("分片模式需要设置 EVENT_SHARDS 或 EVENT_SHARDS_DIR")
+        # 远程分片必须配置密钥；本机分片在启动时生成密钥
+        self.authkey = authkey or (require_shard_authkey() if self.addresses else None)
+        self._shards: Optional[List[ShardClient]] = None
+        self._start_error: Optional[Exception] = None  # 本机分片启动失败后不再重复启动
+        self._shard_towns: List[List[str]] = []  # 各分片的镇街，按镇街筛选时跳过不含匹配镇街的分片
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._warmup_thread: Optional[threading.Thread] = None
+        self._ingest_listeners: List[Callable[[List[tuple]], None]] = []
+
+    # ---- 分片连接与分发 ----
+
+    @property
+    def shards(self) -> List[ShardClient]:
+        """连接分片（首次使用时；只给出分片目录时先启动本机分片进程）"""
+        if self._shards is None:
+            with self._lock:
+                if self._start_error is not None:
+                    raise RuntimeError(f"本机分片启动失败: {self._start_error}")
+                if self._shards is None:
+                    addresses = self.addresses
+                    if not addresses:
+                        try:
+                            addresses, self.authkey = start_local_shards(self.shards_dir)
+                        except Exception as e:
+                            self._start_error = e
+                            raise
+                    self._executor = ThreadPoolExecutor(max_workers=4 * len(addresses), thread_name_prefix='shard-call')
+                    self._shards = [ShardClient(address, self.authkey) for address in addresses]
+        return self._shards
+
+    def _scatter(self, method: str, *args, shards: Optional[List[int]] = None, **kwargs) -> List[Any]:
+        """并发调用各分片（默认全部分片）的同名方法，按分片顺序返回结果"""
+        clients = self.shards
+        targets = range(len(clients)) if shards is None else shards
+        futures = [self._executor.submit(clients[i].call, method, *args, **kwargs) for i in targets]
+        return [future.result() for future in futures]
+
+    def _refresh_towns(self):
+        self._shard_towns = [options.towns for options in self._scatter('get_filter_options')]
+
+    def _shards_for_town(self, town: Optional[str]) -> Optional[List[int]]:
+        """含有匹配镇街（与 get_events 相同的包含匹配）的分片，没有镇街筛选时为 None（全部分片）"""
+        if not town:
+            return None
+        if not self._shard_towns:
+            self._refresh_towns()
+        shards = []
+        for i, towns in enumerate(self._shard_towns):
+            values = pd.Series(towns, dtype=object)
+            if any(EventService._contains_mask(values, term).any() for term in filter_terms(town)):
+                shards.append(i)
+        return shards
+
+    def _first_found(self, method: str, *args, **kwargs) -> Any:
+        """按编号查询：取第一个找到的分片结果"""
+        return next((result for result in self._scatter(method, *args, **kwargs) if result is not None), None)
+
+    @staticmethod
+    def _merge_page(results: List[Any], sort_keys: Callable[[list], List[tuple]], page: int,
+                    page_size: int) -> Tuple[list, int]:
+        """归并各分片排序后的前 page * page_size 条，返回（当前页, 命中总数）；sort_keys 一次计算一个分片结果的排序键"""
+        merged = heapq.merge(*[zip(sort_keys(result.items), result.items) for result in results], key=itemgetter(0))
+        start = (page - 1) * page_size
+        items = [item for _, (_, item) in zip(range(start + page_size), merged)][start:]
+        return items, sum(result.total for result in results)
+
+    @staticmethod
+    def _page_response(response_cls, items: list, total: int, page: int, page_size: int):
+        return response_cls(items=items, total=total, page=page, page_size=page_size,
+                            total_pages=(total + page_size - 1) // page_size)
+
+    @staticmethod
+    def _merge_batch(results: List[Any], keys: List[str], key_field: str, response_cls):
+        """按请求顺序合并批量查询，各分片都没有的编号为 missing"""
+        found = {}
+        for result in results:
+            for item in result.items:
+                found.setdefault(str(getattr(item, key_field)), item)
+        keys = list(dict.fromkeys(str(key) for key in keys))
+        return response_cls(items=[found[key] for key in keys if key in found],
+                            missing=[key for key in keys if key not in found])
+
+    # ---- 状态 ----
+
+    def start_warmup(self) -> threading.Thread:
+        """在后台线程中连接各分片并等待它们预热完成"""
+        with self._lock:
+            if self._warmup_thread is None:
+                self._warmup_thread = threading.Thread(target=self._wait_ready, name='event-shard-warmup', daemon=True)
+                self._warmup_thread.start()
+        return self._warmup_thread
+
+    def _wait_ready(self):
+        while self._start_error is None:
+            try:
+                if all(status['ready'] for status in self._scatter('get_load_status')):
+                    self._refresh_towns()
+                    return
+            except ConnectionRefusedError:
+                pass  # 分片进程还在启动
+            except Exception as e:
+                print(f"等待分片就绪: {e}")
+            time.sleep(0.5)
+        print(f"本机分片启动失败，停止等待: {self._start_error}")
+
+    def get_load_status(self) -> Dict[str, Any]:
+        """各分片的加载状态（组件名前加分片编号）；有分片连接不上时为未就绪"""
+        try:
+            statuses = self._scatter('get_load_status')
+        except (OSError, EOFError, RuntimeError):
+            return {'ready': False, 'warming_up': True, 'components': []}
+        components = [
+            {**component, 'name': f"shard{i}.{component['name']}"}
+            for i, status in enumerate(statuses) for component in status['components']
+        ]
+        return {
+            'ready': all(status['ready'] for status in statuses),
+            'warming_up': any(status['warming_up'] for status in statuses),
+            'components': components,
+        }
+
+    def data_version(self) -> str:
+        """各分片数据版本的摘要"""
+        return format(zlib.crc32('|'.join(self._scatter('data_version')).encode('utf-8')), '08x')
+
+    def event_total(self) -> int:
+        return sum(self._scatter('event_total'))
+
+    def estimate_cost(self, operation: str, **params) -> int:
+        """各分片估算代价之和"""
+        return sum(self._scatter('estimate_cost', operation, **params))
+
+    # ---- 增量写入 ----
+
+    def add_ingest_listener(self, listener: Callable[[List[tuple]], None]):
+        self._ingest_listeners.append(listener)
+
+    def ingest_events(self, events: List[Dict[str, Any]]) -> int:
+        """按镇街把新事件发送到持有该镇街的分片，写入后通知写入监听器"""
+        if not events:
+            return 0
+        if not self._shard_towns:
+            self._refresh_towns()
+        owners = {town: i for i, towns in enumerate(self._shard_towns) for town in towns}
+        groups: Dict[int, List[Dict[str, Any]]] = {}
+        for event in events:
+            town = str(event.get('镇街名称', ''))
+            groups.setdefault(owners.get(town, town_shard(town, len(self.shards))), []).append(event)
+        shards = sorted(groups)
+        results = [self.shards[i].call('ingest_events', groups[i]) for i in shards]
+        self._refresh_towns()
+        ingested = [event for _, captured in results for event in captured]
+        for listener in list(self._ingest_listeners):
+            try:
+                listener(ingested)
+            except Exception as e:
+                print(f"写入监听器执行失败: {e}")
+        return sum(count for count, _ in results)
+
+    # ---- 列表查询 ----
+
+    def get_events(self, page: int = 1, page_size: int = 20, search: Optional[str] = None,
+                   town: Optional[str] = None, level: Optional[str] = None,
+                   category: Optional[str] = None, related_events: Optional[str] = None,
+                   start_time=None, end_time=None,
+                   fields: Optional[List[str]] = None, description_length: Optional[int] = None,
+                   org_path: Optional[str] = None):
+        """事件列表：各分片的前 page * page_size 条按上报时间倒序归并（按镇街筛选时只查询相关分片）"""
+        projected = fields is not None or description_length is not None
+        response_cls = ProjectedListResponse if projected else PaginatedResponse
+        results = self._scatter(
+            'get_events', page=1, page_size=page * page_size, search=search, town=town, level=level,
+            category=category, related_events=related_events, start_time=start_time, end_time=end_time,
+            org_path=org_path, shards=self._shards_for_town(town)
+        )
+        items, total = self._merge_page(results, _event_sort_keys, page, page_size)
+        if projected:
+            items = [project_item(item, fields, '事件描述', description_length) for item in items]
+        return self._page_response(response_cls, items, total, page, page_size)
+
+    def get_cluster_list(self, page: int = 1, page_size: int = 20, search: Optional[str] = None,
+                         min_event_count: Optional[int] = None, max_event_count: Optional[int] = None,
+                         min_duration: Optional[float] = None, max_duration: Optional[float] = None,
+                         start_time=None, end_time=None,
+                         fields: Optional[List[str]] = None, description_length: Optional[int] = None):
+        """聚合事件列表：各分片的前 page * page_size 条按事件数、持续时间倒序归并"""
+        projected = fields is not None or description_length is not None
+        response_cls = ProjectedListResponse if projected else ClusterListPaginatedResponse
+        results = self._scatter(
+            'get_cluster_list', page=1, page_size=page * page_size, search=search,
+            min_event_count=min_event_count, max_event_count=max_event_count,
+            min_duration=min_duration, max_duration=max_duration, start_time=start_time, end_time=end_time
+        )
+        items, total = self._merge_page(results, _cluster_sort_keys, page, page_size)
+        if projected:
+            items = [project_item(item, fields, 'cluster_description', description_length) for item in items]
+        return self._page_response(response_cls, items, total, page, page_size)
+
+    def get_person_analysis(self, query: PersonAnalysisQuery, fields: Optional[List[str]] = None):
+        """人员分析列表：各分片的前 page * page_size 条按事件数倒序（模糊搜索先按姓名距离）归并"""
+        response_cls = ProjectedListResponse if fields is not None else PersonAnalysisResponse
+        shard_query = query.model_copy(update={'page': 1, 'page_size': query.page * query.page_size})
+        results = self._scatter('get_person_analysis', shard_query)
+        sort_keys = _person_sort_keys(bool(query.search and query.fuzzy))
+        items, total = self._merge_page(results, sort_keys, query.page, query.page_size)
+        if fields is not None:
+            items = [project_item(item, fields) for item in items]
+        return self._page_response(response_cls, items, total, query.page, query.page_size)
+
+    def search_people(self, query):
+        """人口信息每个分片一份，由第一个分片查询"""
+        return self.shards[0].call('search_people', query)
+
+    def get_person_detail(self, person_id: str):
+        return self.shards[0].call('get_person_detail', person_id)
+
+    # ---- 筛选选项 ----
+
+    def get_filter_options(self) -> FilterOptions:
+        results = self._scatter('get_filter_options')
+        self._shard_towns = [result.towns for result in results]
+        related = list(dict.fromkeys(option for result in results for option in result.related_event_options))
+        return FilterOptions(
+            towns=_merge_options([result.towns for result in results]),
+            levels=_merge_options([result.levels for result in results]),
+            categories=_merge_options([result.categories for result in results]),
+            related_event_options=related
+        )
+
+    def get_cluster_filter_options(self) -> ClusterFilterOptions:
+        """各分片的选项都是同一序列的前缀（由最大事件数、最大持续时间决定），取最长的"""
+        results = self._scatter('get_cluster_filter_options')
+        return ClusterFilterOptions(
+            event_count_ranges=max((result.event_count_ranges for result in results), key=len),
+            duration_ranges=max((result.duration_ranges for result in results), key=len)
+        )
+
+    def get_person_analysis_roles(self) -> List[str]:
+        return _merge_options(self._scatter('get_person_analysis_roles'))
+
+    def get_org_tree(self, path: Optional[str] = None) -> Optional[OrgTreeResponse]:
+        """组织树下钻：各分片的节点事件数和同一路径的下级事件数相加"""
+        results = [result for result in self._scatter('get_org_tree', path) if result is not None]
+        if not results:
+            return None
+        children = {}
+        for result in results:
+            for child in result.children:
+                merged = children.get(child.path)
+                if merged is None:
+                    children[child.path] = child.model_copy()
+                else:
+                    merged.event_count += child.event_count
+                    merged.has_children = merged.has_children or child.has_children
+        return OrgTreeResponse(
+            path=results[0].path,
+            level=results[0].level,
+            event_count=sum(result.event_count for result in results),
+            children=sorted(children.values(), key=lambda child: -child.event_count)
+        )
+
+    # ---- 详情 ----
+
+    def get_event_detail(self, event_id: str):
+        return self._first_found('get_event_detail', event_id)
+
+    def get_cluster_detail(self, event_uid: str):
+        return self._first_found('get_cluster_detail', event_uid)
+
+    def get_person_analysis_detail(self, phone: str):
+        return self._first_found('get_person_analysis_detail', phone)
+
+    def get_events_batch(self, event_ids: List[str]):
+        return self._merge_batch(self._scatter('get_events_batch', event_ids), event_ids, '事件编号',
+                                 BatchEventDetailResponse)
+
+    def get_clusters_batch(self, event_uids: List[str]):
+        return self._merge_batch(self._scatter('get_clusters_batch', event_uids), event_uids, 'EventUID',
+                                 BatchClusterDetailResponse)
+
+    def get_person_analysis_batch(self, phones: List[str]):
+        return self._merge_batch(self._scatter('get_person_analysis_batch', phones), phones, 'phone',
+                                 BatchPersonDetailResponse)
+
+    # ---- 相似事件 ----
+
+    def _merge_similar(self, results: List[SimilarResponse], top_k: int) -> SimilarResponse:
+        """各分片的前 top_k 个相似事件和聚类按相似度归并"""
+        return SimilarResponse(
+            query=results[0].query,
+            events=heapq.nlargest(top_k, (event for result in results for event in result.events),
+                                  key=lambda event: event.score),
+            clusters=heapq.nlargest(top_k, (cluster for result in results for cluster in result.clusters),
+                                    key=lambda cluster: cluster.score)
+        )
+
+    def find_similar(self, text: str, top_k: int = 10) -> SimilarResponse:
+        return self._merge_similar(self._scatter('find_similar', text, top_k=top_k), top_k)
+
+    def get_similar_to_event(self, event_id: str, top_k: int = 10) -> Optional[SimilarResponse]:
+        """先找到事件所在的分片取出描述，再在全部分片中按描述查找（排除该事件本身）"""
+        detail = self.get_event_detail(event_id)
+        if detail is None:
+            return None
+        result = self._merge_similar(self._scatter('find_similar', detail.事件描述, top_k=top_k + 1), top_k + 1)
+        result.events = [event for event in result.events if event.事件编号 != event_id][:top_k]
+        result.clusters = result.clusters[:top_k]
+        return result
+
+    # ---- 不支持的分析 ----
+
+    unsupported_operations = {
+        'get_hotspots': '分片模式不支持重复报警热点',
+        'get_person_network': '分片模式不支持人员关系网络',
+        'get_person_component': '分片模式不支持人员关系网络',
+        # 科室/部门和分类跨分片分布，分位数不能由各分片的结果合并
+        'get_sla_report': '分片模式不支持处置时效统计',
+        'get_memory_report': '分片模式不支持内存占用报告',
+        'get_partition_report': '分片模式不支持分区目录',
+    }
+
+    def get_hotspots(self, *args, **kwargs):
+        check_supported(self, 'get_hotspots')
+
+    def get_person_network(self, *args, **kwargs):
+        check_supported(self, 'get_person_network')
+
+    def get_person_component(self, *args, **kwargs):
+        check_supported(self, 'get_person_component')
+
+    def get_sla_report(self, *args, **kwargs):
+        check_supported(self, 'get_sla_report')
+
+    def get_memory_report(self):
+        check_supported(self, 'get_memory_report')
+
+    def get_partition_report(self):
+        check_supported(self, 'get_partition_report')
+
+def main():
+    parser = argparse.ArgumentParser(description='按镇街分片：拆分数据或启动分片节点')
+    commands = parser.add_subparsers(dest='command', required=True)
+    split = commands.add_parser('split', help='把数据目录按镇街拆分为多个分片目录')
+    split.add_argument('--data-dir', help='CSV数据目录，默认同 EventService')
+    split.add_argument('--out', required=True, help='输出目录，每个分片一个子目录 shard-<i>')
+    split.add_argument('--shards', type=int, required=True, help='分片数')
+    serve = commands.add_parser('serve', help='启动一个分片节点')
+    serve.add_argument('--data-dir', required=True, help='分片数据目录')
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, required=True, help='监听端口，0 为由系统分配')
+    serve.add_argument('--ready-fd', type=int, help='开始监听后把实际端口写入该文件描述符（本机启动分片时使用）')
+    args = parser.parse_args()
+
+    if args.command == 'split':
+        data_dir = EventService(data_dir=args.data_dir).data_dir
+        manifest = split_data(data_dir, args.out, args.shards)
+        print(f"拆分完成: {args.shards} 个分片, 各分片事件数 {manifest['events']}")
+    else:
+        if shard_authkey() is None:
+            parser.error("启动分片需要设置 EVENT_SHARD_AUTHKEY")
+        serve_shard(args.data_dir, (args.host, args.port), ready_fd=args.ready_fd)
+
+
+if __name__ == '__main__':
+    main()
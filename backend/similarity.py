@@ -0,0 +1,114 @@
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+import re
+import threading
+
+import numpy as np
+from scipy import sparse
+
+
+class TfidfIndex:
+    """基于字符n-gram的TF-IDF相似度索引
+
+    文档以词频稀疏矩阵（文档×n-gram）保存，IDF和文档范数在查询时由文档频率计算，
+    因此增量加入文档只需追加矩阵行、扩展词表，不需要重建已有数据。
+    查询为一次稀疏矩阵-向量乘法加 top-k 选择。
+    """
+
+    _whitespace = re.compile(r'\s+')
+    _digits = re.compile(r'[\d*]{4,}')  # 电话、证件号等长数字串不参与相似度
+
+    def __init__(self, ngram_range: Tuple[int, int] = (2, 3)):
+        self.ngram_range = ngram_range
+        self.vocabulary: Dict[str, int] = {}
+        self.doc_freq = np.zeros(0, dtype=np.float64)
+        self.tf = sparse.csr_matrix((0, 0), dtype=np.float32)
+        self.keys = np.zeros(0, dtype=np.int64)  # 文档对应的行位置
+        self._norms = None  # 文档的TF-IDF范数，随IDF变化失效
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self.tf.shape[0]
+
+    def _ngrams(self, text: str) -> Counter:
+        text = self._digits.sub('', self._whitespace.sub('', str(text or ''))).lower()
+        lo, hi = self.ngram_range
+        return Counter(
+            text[i:i + n]
+            for n in range(lo, hi + 1)
+            for i in range(len(text) - n + 1)
+        )
+
+    def add_documents(self, keys: Iterable[int], texts: Iterable[str]):
+        """追加文档，新出现的n-gram扩展到词表末尾"""
+        indptr = [0]
+        indices: List[int] = []
+        data: List[int] = []
+        new_keys = []
+        with self._lock:
+            for key, text in zip(keys, texts):
+                for gram, count in self._ngrams(text).items():
+                    col = self.vocabulary.get(gram)
+                    if col is None:
+                        col = self.vocabulary[gram] = len(self.vocabulary)
+                    indices.append(col)
+                    data.append(count)
+                indptr.append(len(indices))
+                new_keys.append(key)
+            if not new_keys:
+                return
+
+            n_terms = len(self.vocabulary)
+            rows = sparse.csr_matrix(
+                (np.asarray(data, dtype=np.float32), np.asarray(indices, dtype=np.int64), np.asarray(indptr)),
+                shape=(len(new_keys), n_terms)
+            )
+            tf = self.tf
+            tf.resize((tf.shape[0], n_terms))
+            self.tf = sparse.vstack([tf, rows], format='csr')
+
+            doc_freq = np.zeros(n_terms, dtype=np.float64)
+            doc_freq[:len(self.doc_freq)] = self.doc_freq
+            doc_freq += np.bincount(rows.indices, minlength=n_terms)
+            self.doc_freq = doc_freq
+
+            self.keys = np.concatenate([self.keys, np.asarray(new_keys, dtype=np.int64)])
+            self._norms = None
+
+    def _idf(self) -> np.ndarray:
+        n_docs = self.tf.shape[0]
+        return np.log((1 + n_docs) / (1 + self.doc_freq)) + 1
+
+    def _query_vector(self, text: str) -> np.ndarray:
+        vector = np.zeros(len(self.vocabulary), dtype=np.float64)
+        for gram, count in self._ngrams(text).items():
+            col = self.vocabulary.get(gram)
+            if col is not None:
+                vector[col] = count
+        return vector
+
+    def similar(self, text: str, top_k: int = 10, exclude: Iterable[int] = ()) -> List[Tuple[int, float]]:
+        """返回与文本最相似的 top_k 个文档（行位置, 余弦相似度）"""
+        with self._lock:
+            if not len(self):
+                return []
+            idf = self._idf()
+            idf_sq = idf * idf
+            if self._norms is None:
+                self._norms = np.sqrt(self.tf.multiply(self.tf) @ idf_sq)
+
+            query = self._query_vector(text)
+            query_norm = np.sqrt(np.dot(query * query, idf_sq))
+            if query_norm == 0:
+                return []
+
+            scores = (self.tf @ (query * idf_sq)) / (np.maximum(self._norms, 1e-12) * query_norm)
+            keys = self.keys
+
+        exclude = list(exclude)
+        if exclude:
+            scores[np.isin(keys, exclude)] = 0
+        k = min(top_k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [(int(keys[i]), float(scores[i])) for i in top if scores[i] > 0]
@@ -0,0 +1,977 @@
+"""SQLite 存储后端
+
+把数据表写入本地 SQLite 数据库文件，列表/搜索/详情查询由带索引的 SQL 和 FTS5 全文索引完成，
+进程内存不再随归档数据量增长。EventService 的其余功能（相似度、热点、电话网络）按需从数据库
+读取数据表到内存，行为与默认的 pandas 后端一致。
+
+启用方式：设置环境变量 EVENT_STORAGE_BACKEND=sqlite，数据库路径取 EVENT_SQLITE_PATH
+（默认 <数据目录>/events.sqlite3），数据库不存在时首次查询前自动由CSV构建。
+
+手动构建（在 backend 目录下，--workers 指定并行解析CSV的进程数）：
+    python sqlite_store.py --data-dir ../data --db ../data/events.sqlite3 --workers 4
+"""
+import argparse
+import json
+import os
+import sqlite3
+import threading
+from collections.abc import Mapping
+from datetime import datetime, date, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from extraction import default_text_roles
+from governor import check_deadline, query_interrupted
+from metrics import timed, cache_lookup, RESULT_SIZE
+from models import (
+    PaginatedResponse, EventDetailResponse, BatchEventDetailResponse, ClusterEventResponse,
+    BatchClusterDetailResponse, ClusterListPaginatedResponse, ClusterFilterOptions, FilterOptions,
+    PersonInfo, PersonSearchQuery, PersonSearchResponse, PersonAnalysisQuery, PersonAnalysisResponse,
+    PersonDetailResponse, BatchPersonDetailResponse, ProjectedListResponse
+)
+from org_tree import ORG_COLUMN, OrgTree, normalize_org_path
+from services import (
+    EventService, NAME_INDEX_TABLES, TABLE_LABELS, EVENT_FILTER_COLUMNS, RELATED_EVENT_BUCKETS, TIME_PARSE_VERSION,
+    filter_terms, project_item
+)
+
+
+# 数据表 -> SQLite 表名
+SQL_TABLES = {
+    'detail_df': 'events',
+    'cluster_df': 'clusters',
+    'info_df': 'info',
+    'people_df': 'people',
+    'phone_master_df': 'phone_master',
+}
+
+# 构建时派生的列（读回 pandas 数据表时去掉）
+DERIVED_COLUMNS = {'_report_ts', '_caller_info', '_first_ts', '_last_ts'}
+
+# 事件列表搜索的字段（与 pandas 后端一致），_caller_info 为构建时生成的报警人信息
+EVENT_SEARCH_COLUMNS = ['事件编号', '事件描述', '处置结果', 'CallerPhone', 'CallerID', '_caller_info']
+
+# 建表后创建的索引：(表, 索引名, 列表达式)
+SQL_INDEXES = [
+    ('events', 'idx_events_report_ts', '"_report_ts"'),
+    ('events', 'idx_events_event_id', '"事件编号"'),
+    ('events', 'idx_events_event_uid', '"EventUID"'),
+    ('events', 'idx_events_town', '"镇街名称"'),
+    ('events', 'idx_events_level', '"事件级别"'),
+    ('events', 'idx_events_category', '"二级分类"'),
+    ('events', 'idx_events_sequence_total', '"sequence_total"'),
+    ('events', 'idx_events_org_path', '"所属组织"'),
+    ('clusters', 'idx_clusters_event_uid', '"EventUID"'),
+    ('clusters', 'idx_clusters_first_ts', '"_first_ts"'),
+    ('clusters', 'idx_clusters_last_ts', '"_last_ts"'),
+    ('clusters', 'idx_clusters_record_count', '"record_count"'),
+    ('people', 'idx_people_person_id', '"person_id"'),
+    ('people', 'idx_people_mobile_phone', '"mobile_phone"'),
+    ('people', 'idx_people_id_card_no', '"id_card_no"'),
+    ('phone_master', 'idx_phone_master_phone', '"phone"'),
+    ('phone_master', 'idx_phone_master_event_count', '"event_count"'),
+]
+
+# 每执行这么多条 SQLite 虚拟机指令检查一次查询是否已超时或客户端已断开
+PROGRESS_CHECK_INSTRUCTIONS = 10000
+
+# IN 查询每批的参数个数（低于 SQLite 默认的变量数上限）
+IN_BATCH_SIZE = 500
+
+
+def default_database_path(data_dir: str) -> str:
+    """数据库路径，取环境变量 EVENT_SQLITE_PATH，默认为数据目录下的 events.sqlite3"""
+    return os.environ.get('EVENT_SQLITE_PATH') or os.path.join(data_dir, 'events.sqlite3')
+
+
+def _quote(name: str) -> str:
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _like_pattern(value: str) -> str:
+    """包含匹配的 LIKE 模式（转义 % _ 和转义符本身，配合 ESCAPE '\\' 使用）"""
+    escaped = value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+
+def _fts_phrase(value: str) -> str:
+    """FTS5 短语查询（trigram 分词下即子串匹配）"""
+    return '"' + value.replace('"', '""') + '"'
+
+
+def _sql_times(times: np.ndarray) -> List[Optional[str]]:
+    """datetime64 数组转为可按字典序比较的时间文本，NaT 为 NULL"""
+    text = np.datetime_as_string(times, unit='us')
+    return [None if value == 'NaT' else value for value in text]
+
+
+def _dict_factory(cursor: sqlite3.Cursor, row: tuple) -> Dict[str, Any]:
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+
+def _write_table(conn: sqlite3.Connection, table: str, df: pd.DataFrame, if_exists: str = 'replace'):
+    if df.empty and not len(df.columns):
+        df = pd.DataFrame({'_empty': pd.Series(dtype=str)})
+    df.to_sql(table, conn, if_exists=if_exists, index=False, chunksize=5000)
+
+
+def _create_fts(conn: sqlite3.Connection, name: str, table: str, columns: List[str]):
+    """为表的文本列创建外部内容的 FTS5 trigram 索引（支持任意子串查询，不区分大小写）"""
+    column_sql = ', '.join(_quote(col) for col in columns)
+    conn.execute(f'DROP TABLE IF EXISTS {name}')
+    conn.execute(
+        f"CREATE VIRTUAL TABLE {name} USING fts5({column_sql}, content='{table}', "
+        f"content_rowid='rowid', tokenize='trigram')"
+    )
+    conn.execute(f"INSERT INTO {name}({name}) VALUES('rebuild')")
+
+
+def _event_rows_for_sql(service: EventService, df: pd.DataFrame) -> pd.DataFrame:
+    """事件表写入数据库前追加派生列：解析后的上报时间、报警人信息"""
+    df = df.copy()
+    df['_report_ts'] = _sql_times(service._parse_times(df['上报时间'])) if '上报时间' in df.columns else None
+    event_ids = df['事件编号'].astype(str) if '事件编号' in df.columns else pd.Series([''] * len(df))
+    df['_caller_info'] = [service._get_caller_info(event_id) or '' for event_id in event_ids]
+    return df
+
+
+def _stream_table(source: EventService, name: str, workers: Optional[int]) -> Iterator[pd.DataFrame]:
+    """分块读取一张数据表（读取失败时返回一个空表，与 EventService 加载失败时的行为一致）"""
+    rows = 0
+    try:
+        for chunk in source._table_chunks(name, workers=workers):
+            rows += len(chunk)
+            yield chunk
+        print(f"数据加载成功: {TABLE_LABELS[name]} {rows} 条")
+    except Exception as e:
+        print(f"数据加载失败: {TABLE_LABELS[name]}, 错误: {e}")
+        yield pd.DataFrame()
+
+
+def _decode_participants(text: str) -> List[Dict[str, Any]]:
+    """解析参与人表中的 JSON（旧数据库中文本来源参与人的角色为空，读出时补上）"""
+    return default_text_roles(EventService._parse_participants(text))
+
+
+def _stored_participants(conn: sqlite3.Connection, event_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """参与人表中这些事件的参与人"""
+    found = {}
+    for start in range(0, len(event_ids), IN_BATCH_SIZE):
+        batch = event_ids[start:start + IN_BATCH_SIZE]
+        rows = conn.execute(
+            f'SELECT event_id, participants FROM event_participants WHERE event_id IN ({", ".join("?" * len(batch))})',
+            batch
+        )
+        found.update((event_id, _decode_participants(info)) for event_id, info in rows)
+    return found
+
+
+def build_database(data_dir: str, db_path: str, workers: Optional[int] = None) -> str:
+    """由数据目录中的CSV构建 SQLite 数据库（先写入临时文件，完成后替换）
+
+    各表分块读取、逐块写入（见 csv_chunks.py），构建时的内存占用由分块大小决定，与CSV大小无关。
+    参与人表先由报警人信息表写入（同一事件以第一条记录为准），事件表每写入一块，从参与人表查询
+    本块事件的参与人生成报警人信息，没有上游参与人的事件从本块文本中提取。
+    """
+    source = EventService(data_dir=data_dir, compact_storage=False)
+    tmp_path = db_path + '.building'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute('PRAGMA journal_mode=OFF')
+        conn.execute('PRAGMA synchronous=OFF')
+        conn.execute('CREATE TABLE event_participants (event_id TEXT PRIMARY KEY, participants TEXT NOT NULL)')
+
+        with timed('sqlite.build.info'):
+            for chunk in _stream_table(source, 'info_df', workers):
+                _write_table(conn, 'info', chunk.astype(str), if_exists='append')
+                if not chunk.empty:
+                    conn.executemany(
+                        'INSERT OR IGNORE INTO event_participants VALUES (?, ?)',
+                        ((event_id, json.dumps(source._parse_participants(info), ensure_ascii=False))
+                         for event_id, info in zip(chunk['event_id'].astype(str), chunk['extracted_info']))
+                    )
+
+        with timed('sqlite.build.events'):
+            for chunk in _stream_table(source, 'detail_df', workers):
+                if '事件编号' in chunk.columns:
+                    source._participants_by_event = _stored_participants(
+                        conn, chunk['事件编号'].astype(str).unique().tolist()
+                    )
+                    text_participants = source._text_participants(chunk)
+                    source._participants_by_event.update(text_participants)
+                    conn.executemany(
+                        'INSERT OR REPLACE INTO event_participants VALUES (?, ?)',
+                        ((event_id, json.dumps(people, ensure_ascii=False))
+                         for event_id, people in text_participants.items())
+                    )
+                _write_table(conn, 'events', _event_rows_for_sql(source, chunk), if_exists='append')
+
+        for chunk in _stream_table(source, 'cluster_df', workers):
+            if not chunk.empty:
+                chunk['_first_ts'] = _sql_times(source._parse_times(chunk['first_report_time']))
+                chunk['_last_ts'] = _sql_times(source._parse_times(chunk['last_report_time']))
+            _write_table(conn, 'clusters', chunk, if_exists='append')
+
+        # 人口信息按文本存储，与 pandas 后端 astype(str) 后比较的行为一致
+        for chunk in _stream_table(source, 'people_df', workers):
+            _write_table(conn, 'people', chunk.astype(str), if_exists='append')
+        for chunk in _stream_table(source, 'phone_master_df', workers):
+            text_columns = [col for col in chunk.columns if col != 'event_count']
+            if text_columns:
+                chunk[text_columns] = chunk[text_columns].astype(str)
+            _write_table(conn, 'phone_master', chunk, if_exists='append')
+
+        for table, index_name, expression in SQL_INDEXES:
+            columns = {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+            if expression.strip('"') in columns:
+                conn.execute(f'CREATE INDEX {index_name} ON {table} ({expression})')
+
+        with timed('sqlite.build.fts'):
+            event_columns = {row[1] for row in conn.execute('PRAGMA table_info(events)')}
+            _create_fts(conn, 'events_fts', 'events', [col for col in EVENT_SEARCH_COLUMNS if col in event_columns])
+            cluster_columns = {row[1] for row in conn.execute('PRAGMA table_info(clusters)')}
+            if 'cluster_description' in cluster_columns:
+                _create_fts(conn, 'clusters_fts', 'clusters', ['cluster_description'])
+
+        conn.execute('ANALYZE')
+        conn.execute(f'PRAGMA user_version = {TIME_PARSE_VERSION}')
+        conn.commit()
+        conn.execute('PRAGMA journal_mode=WAL')
+    finally:
+        conn.close()
+
+    os.replace(tmp_path, db_path)
+    print(f"SQLite数据库构建完成: {db_path}")
+    return db_path
+
+
+# 按原始时间列重新计算的派生时间列：(表, 派生列, 原始列)
+DERIVED_TIME_COLUMNS = [
+    ('events', '_report_ts', '上报时间'),
+    ('clusters', '_first_ts', 'first_report_time'),
+    ('clusters', '_last_ts', 'last_report_time'),
+]
+
+
+def migrate_time_columns(db_path: str, batch_size: int = 50000):
+    """时间解析规则变化后（PRAGMA user_version 低于 TIME_PARSE_VERSION）原地重算派生时间列
+
+    不重新由 CSV 构建，增量写入的事件保留在数据库中。
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        if conn.execute('PRAGMA user_version').fetchone()[0] == TIME_PARSE_VERSION:
+            return
+        for table, derived, source in DERIVED_TIME_COLUMNS:
+            columns = {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+            if derived not in columns or source not in columns:
+                continue
+            cursor = conn.execute(f'SELECT rowid, {_quote(source)} FROM {table}')
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                times = _sql_times(EventService._parse_times(pd.Series([row[1] for row in rows], dtype=object)))
+                conn.executemany(f'UPDATE {table} SET {_quote(derived)} = ? WHERE rowid = ?',
+                                 zip(times, (row[0] for row in rows)))
+        conn.execute(f'PRAGMA user_version = {TIME_PARSE_VERSION}')
+        conn.commit()
+        print(f"SQLite数据库时间列已按新的解析规则重算: {db_path}")
+    finally:
+        conn.close()
+
+
+class SqliteParticipants(Mapping):
+    """事件编号 -> 参与人列表 的只读映射，数据在 event_participants 表中"""
+
+    def __init__(self, store: 'SqliteEventService'):
+        self._store = store
+
+    def __getitem__(self, event_id: str) -> List[Dict[str, Any]]:
+        row = self._store._conn().execute(
+            'SELECT participants FROM event_participants WHERE event_id = ?', (event_id,)
+        ).fetchone()
+        if row is None:
+            raise KeyError(event_id)
+        return _decode_participants(row['participants'])
+
+    def __iter__(self) -> Iterator[str]:
+        for row in self._store._conn().execute('SELECT event_id FROM event_participants ORDER BY rowid'):
+            yield row['event_id']
+
+    def __len__(self) -> int:
+        return self._store._conn().execute('SELECT COUNT(*) AS n FROM event_participants').fetchone()['n']
+
+
+class SqliteEventService(EventService):
+    """以 SQLite 数据库为存储的 EventService
+
+    列表、搜索、详情、筛选选项和增量写入直接查询数据库；相似度、热点和电话网络沿用父类实现，
+    所需的数据表在首次使用时从数据库读入内存。
+    """
+
+    def __init__(self, data_dir: Optional[str] = None, db_path: Optional[str] = None,
+                 compact_storage: Optional[bool] = None, lazy: bool = True):
+        # 事件在数据库中按需查询，不做冷热分层
+        super().__init__(data_dir=data_dir, compact_storage=compact_storage, lazy=True, hot_months=0)
+        self.db_path = db_path or default_database_path(self.data_dir)
+        self._local = threading.local()
+        self._db_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._db_ready = False
+        # 参与人索引直接查询数据库，不加载报警人信息表
+        self._participants_by_event = SqliteParticipants(self)
+        self._phone_graph = None
+        if not lazy:
+            self.load_data()
+
+    # ---- 连接与表读取 ----
+
+    def _ensure_database(self):
+        if self._db_ready:
+            return
+        with self._db_lock:
+            if not self._db_ready:
+                if not os.path.exists(self.db_path):
+                    with timed('load.sqlite_build'):
+                        build_database(self.data_dir, self.db_path)
+                else:
+                    migrate_time_columns(self.db_path)
+                self._db_ready = True
+
+    def _conn(self) -> sqlite3.Connection:
+        """当前线程的数据库连接（sqlite3 连接不能跨线程共享）"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            self._ensure_database()
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = _dict_factory
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA mmap_size=268435456')
+            conn.create_function('match_id_card', 2, self._match_masked_id_card, deterministic=True)
+            conn.create_function('match_phone', 2, self._match_masked_phone, deterministic=True)
+            # 回调返回非零值时 SQLite 中止当前语句（抛出 OperationalError: interrupted）
+            conn.set_progress_handler(lambda: 1 if query_interrupted() else 0, PROGRESS_CHECK_INSTRUCTIONS)
+            self._local.conn = conn
+        return conn
+
+    def _execute(self, sql: str, params: Union[tuple, list] = ()) -> Tuple[sqlite3.Cursor, List[Dict[str, Any]]]:
+        """执行查询并取回全部行；语句被进度回调中止时转换为查询超时/取消异常"""
+        try:
+            cursor = self._conn().execute(sql, params)
+            return cursor, cursor.fetchall()
+        except sqlite3.OperationalError:
+            check_deadline()
+            raise
+
+    def _query(self, sql: str, params: Union[tuple, list] = ()) -> List[Dict[str, Any]]:
+        return self._execute(sql, params)[1]
+
+    def _frame(self, sql: str, params: Union[tuple, list] = ()) -> pd.DataFrame:
+        cursor, rows = self._execute(sql, params)
+        columns = [column[0] for column in cursor.description]
+        return pd.DataFrame([[row[col] for col in columns] for row in rows], columns=columns)
+
+    def _table_columns(self, table: str) -> List[str]:
+        return [row['name'] for row in self._query(f'PRAGMA table_info({table})')]
+
+    def _read_table(self, name: str) -> pd.DataFrame:
+        """从数据库读取一张数据表（去掉派生列）并预处理"""
+        table = SQL_TABLES[name]
+        columns = [col for col in self._table_columns(table) if col not in DERIVED_COLUMNS and col != '_empty']
+        if not columns:
+            return pd.DataFrame()
+        df = self._frame(f'SELECT {", ".join(map(_quote, columns))} FROM {table} ORDER BY rowid')
+        return self._preprocess_table(name, df)
+
+    def _name_frame(self, component: str) -> Tuple[pd.DataFrame, np.ndarray]:
+        """建姓名索引用的姓名列，记录键为 rowid"""
+        table = SQL_TABLES[NAME_INDEX_TABLES[component][0]]
+        available = self._table_columns(table)
+        columns = [col for col in (NAME_INDEX_TABLES[component][1], 'name_candidates') if col in available]
+        df = self._frame(f'SELECT rowid AS _rowid{"".join(", " + _quote(col) for col in columns)} FROM {table} ORDER BY rowid')
+        return df, df['_rowid'].to_numpy() if not df.empty else np.array([], dtype=np.int64)
+
+    def _fuzzy_rows(self, table: str, matches: List[Tuple[int, int]], conditions: List[str],
+                    params: List[Any]) -> List[Dict[str, Any]]:
+        """姓名索引命中的行（按命中顺序，满足其余条件），附加 _name_distance"""
+        distances = dict(matches)
+        rows = []
+        rowids = [rowid for rowid, _ in matches]
+        for start in range(0, len(rowids), IN_BATCH_SIZE):
+            batch = rowids[start:start + IN_BATCH_SIZE]
+            placeholders = ', '.join('?' * len(batch))
+            rows += self._query(
+                f'SELECT rowid AS _rowid, * FROM {table}{self._where([f"rowid IN ({placeholders})", *conditions])}',
+                [*batch, *params]
+            )
+        for row in rows:
+            row['_name_distance'] = distances[row['_rowid']]
+        return sorted(rows, key=lambda row: (row['_name_distance'], row['_rowid']))
+
+    def _build_participant_index(self):
+        """参与人数据在数据库中，加载报警人信息表时只重置电话共现图"""
+        self._phone_graph = None
+
+    def _index_participants(self, info_df: pd.DataFrame):
+        """参与人在写入数据库时建立索引（见 ingest_events）"""
+
+    def _index_text_participants(self, events_df: pd.DataFrame):
+        """从文本提取的参与人在构建数据库和写入时存入参与人表"""
+
+    def start_warmup(self) -> threading.Thread:
+        """在后台线程中准备数据库（不存在时构建），数据表不预先读入内存"""
+        with self._load_lock:
+            if self._warmup_thread is None:
+                self._warmup_thread = threading.Thread(target=self._conn, name='event-service-warmup', daemon=True)
+                self._warmup_thread.start()
+        return self._warmup_thread
+
+    # ---- 条件构造 ----
+
+    @classmethod
+    def _time_conditions(cls, column: str, start_time: Optional[Union[datetime, date]] = None,
+                         end_time: Optional[Union[datetime, date]] = None) -> Tuple[List[str], List[Any]]:
+        """时间范围条件，语义与 _time_range_positions 一致（只给出日期时结束时间包含当天全天）"""
+        conditions, params = [], []
+        if start_time is not None:
+            conditions.append(f'{column} >= ?')
+            params.append(_sql_times(np.array([cls._to_datetime64(start_time)]))[0])
+        if end_time is not None:
+            if isinstance(end_time, date) and not isinstance(end_time, datetime):
+                conditions.append(f'{column} < ?')
+                params.append(_sql_times(np.array([cls._to_datetime64(end_time + timedelta(days=1))]))[0])
+            else:
+                conditions.append(f'{column} <= ?')
+                params.append(_sql_times(np.array([cls._to_datetime64(end_time)]))[0])
+        return conditions, params
+
+    @staticmethod
+    def _text_search_condition(table: str, fts_table: str, columns: List[str], search: str) -> Tuple[str, List[Any]]:
+        """文本包含搜索：三个字符以上走 FTS5 trigram 索引，更短的查询逐列 LIKE"""
+        if len(search) >= 3:
+            return f'{table}.rowid IN (SELECT rowid FROM {fts_table} WHERE {fts_table} MATCH ?)', [_fts_phrase(search)]
+        pattern = _like_pattern(search)
+        return '(' + ' OR '.join(f"{_quote(col)} LIKE ? ESCAPE '\\'" for col in columns) + ')', [pattern] * len(columns)
+
+    @staticmethod
+    def _where(conditions: List[str]) -> str:
+        return ' WHERE ' + ' AND '.join(conditions) if conditions else ''
+
+    def _paginate(self, table: str, conditions: List[str], params: List[Any], order_by: str,
+                  page: int, page_size: int) -> Tuple[int, List[Dict[str, Any]]]:
+        """返回（总数, 当前页的行）"""
+        where = self._where(conditions)
+        total = self._query(f'SELECT COUNT(*) AS n FROM {table}{where}', params)[0]['n']
+        rows = self._query(
+            f'SELECT * FROM {table}{where} ORDER BY {order_by} LIMIT ? OFFSET ?',
+            [*params, page_size, (page - 1) * page_size]
+        )
+        return total, rows
+
+    def _rows_by_key(self, table: str, column: str, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        """按键批量取行，同一键以第一条记录为准"""
+        found: Dict[str, Dict[str, Any]] = {}
+        for start in range(0, len(keys), IN_BATCH_SIZE):
+            batch = keys[start:start + IN_BATCH_SIZE]
+            placeholders = ', '.join('?' * len(batch))
+            for row in self._query(
+                f'SELECT * FROM {table} WHERE {_quote(column)} IN ({placeholders}) ORDER BY rowid', batch
+            ):
+                found.setdefault(str(row[column]), row)
+        return found
+
+    # ---- 事件 ----
+
+    def event_total(self) -> int:
+        return self._query('SELECT COUNT(*) AS n FROM events')[0]['n']
+
+    # ---- 详情预渲染 ----
+
+    # 增量写入的事件保存在数据库中，重启后仍在
+    persistent_ingest = True
+
+    def cluster_uids(self) -> List[str]:
+        if 'EventUID' not in self._table_columns('clusters'):
+            return []
+        return [str(row['v']) for row in self._query('SELECT "EventUID" AS v FROM clusters ORDER BY rowid')]
+
+    def top_phones(self, limit: int) -> List[str]:
+        columns = self._table_columns('phone_master')
+        if limit <= 0 or 'phone' not in columns:
+            return []
+        order = 'event_count DESC, rowid' if 'event_count' in columns else 'rowid'
+        rows = self._query(f'SELECT phone AS v FROM phone_master ORDER BY {order} LIMIT ?', (limit,))
+        return [str(row['v']) for row in rows]
+
+    # ---- 查询代价估算 ----
+
+    # 三个字符以上的搜索走 FTS5 trigram 索引
+    indexed_search_min_length = 3
+
+    def _event_candidate_count(self, start_time=None, end_time=None) -> int:
+        conditions, params = self._time_conditions('_report_ts', start_time, end_time)
+        return self._query(f'SELECT COUNT(*) AS n FROM events{self._where(conditions)}', params)[0]['n']
+
+    def _event_filter_cost(self, candidates: int, **filters) -> Tuple[int, int]:
+        """筛选条件按 LIKE 逐行匹配，代价为候选行数"""
+        return candidates, candidates
+
+    def _table_size(self, name: str) -> int:
+        return self._query(f'SELECT COUNT(*) AS n FROM {SQL_TABLES[name]}')[0]['n']
+
+    def _person_event_counts(self, phones: List[str]) -> int:
+        rows = self._rows_by_key('phone_master', 'phone', phones)
+        return int(sum(pd.to_numeric(row.get('event_count'), errors='coerce') or 0 for row in rows.values()))
+
+    def _cluster_member_counts(self, event_uids: List[str]) -> int:
+        total = 0
+        for start in range(0, len(event_uids), IN_BATCH_SIZE):
+            batch = event_uids[start:start + IN_BATCH_SIZE]
+            placeholders = ', '.join('?' * len(batch))
+            total += self._query(
+                f'SELECT COUNT(*) AS n FROM events WHERE "EventUID" IN ({placeholders})', batch
+            )[0]['n']
+        return total
+
+    @timed('get_events')
+    def get_events(self, page: int = 1, page_size: int = 20, search: Optional[str] = None,
+                   town: Optional[str] = None, level: Optional[str] = None,
+                   category: Optional[str] = None, related_events: Optional[str] = None,
+                   start_time: Optional[Union[datetime, date]] = None, end_time: Optional[Union[datetime, date]] = None,
+                   fields: Optional[List[str]] = None, description_length: Optional[int] = None,
+                   org_path: Optional[str] = None) -> Union[PaginatedResponse, ProjectedListResponse]:
+        """获取事件列表（分页），按上报时间倒序（无法解析的时间排在最后）"""
+        projected = fields is not None or description_length is not None
+        conditions, params = self._time_conditions('_report_ts', start_time, end_time)
+
+        if search:
+            condition, search_params = self._text_search_condition('events', 'events_fts', EVENT_SEARCH_COLUMNS, search)
+            conditions.append(condition)
+            params.extend(search_params)
+
+        # 每个条件可以用逗号分隔多个取值，满足任一即可
+        for param, value in (('town', town), ('level', level), ('category', category)):
+            terms = filter_terms(value)
+            if terms:
+                column = _quote(EVENT_FILTER_COLUMNS[param])
+                conditions.append('(' + ' OR '.join([f"{column} LIKE ? ESCAPE '\\'"] * len(terms)) + ')')
+                params.extend(_like_pattern(term) for term in terms)
+
+        ranges = [RELATED_EVENT_BUCKETS[bucket] for bucket in filter_terms(related_events) if bucket in RELATED_EVENT_BUCKETS]
+        if ranges:
+            conditions.append('(' + ' OR '.join(
+                ' AND '.join([f'sequence_total >= {low}'] * (low is not None) + [f'sequence_total <= {high}'] * (high is not None))
+                for low, high in ranges
+            ) + ')')
+
+        paths = self._org_path_filter(org_path)
+        if paths:
+            condition, org_params = self._org_path_condition(paths)
+            conditions.append(condition)
+            params.extend(org_params)
+
+        with timed('get_events.query'):
+            total, rows = self._paginate(
+                'events', conditions, params, '_report_ts DESC, rowid DESC', page, page_size
+            )
+        RESULT_SIZE.observe(total, 'get_events')
+
+        with timed('get_events.serialize'):
+            items = [self._event_item_from_row(row, row.get('_caller_info') or None) for row in rows]
+            if projected:
+                items = [project_item(item, fields, '事件描述', description_length) for item in items]
+
+        return (ProjectedListResponse if projected else PaginatedResponse)(
+            items=items,
+            total=total,
+            page=page,
+            page_size=page_size,
+            total_pages=(total + page_size - 1) // page_size
+        )
+
+    def _org_path_condition(self, paths: List[str]) -> Tuple[str, List[str]]:
+        """所属组织为任一节点本身或其下级：路径相等或在 ["路径/", "路径0") 范围内（'0' 紧接在 '/' 之后），走所属组织列的索引"""
+        if ORG_COLUMN not in self._table_columns('events'):
+            return '0', []
+        column = _quote(ORG_COLUMN)
+        condition = '(' + ' OR '.join([f'({column} = ? OR ({column} >= ? AND {column} < ?))'] * len(paths)) + ')'
+        return condition, [value for path in paths for value in (path, path + '/', path + '0')]
+
+    @timed('get_org_tree')
+    def get_org_tree(self, path: Optional[str] = None):
+        """所属组织树下钻：节点下的事件按所属组织分组计数，再归并到直接下级"""
+        path = normalize_org_path(path or '')
+        condition, params = self._org_path_condition([path]) if path else ('', [])
+        counts: Dict[str, int] = {}
+        if ORG_COLUMN in self._table_columns('events'):
+            column = _quote(ORG_COLUMN)
+            where = self._where([condition] if condition else [])
+            rows = self._query(f'SELECT {column} AS v, COUNT(*) AS n FROM events{where} GROUP BY {column}', params)
+            for row in rows:
+                leaf = normalize_org_path(row['v'] if row['v'] is not None else '')
+                counts[leaf] = counts.get(leaf, 0) + row['n']
+        elif not path:
+            counts[''] = self.event_total()
+        tree = OrgTree()
+        tree.add_counts(counts)
+        if path not in tree:
+            return None
+        return self._org_tree_response(path, tree.count(path), tree.children(path))
+
+    @timed('get_event_detail')
+    def get_event_detail(self, event_id: str) -> Optional[EventDetailResponse]:
+        """获取事件详情"""
+        row = self._rows_by_key('events', '事件编号', [event_id]).get(event_id)
+        cache_lookup('event_id_index', row is not None)
+        return self._event_detail_from_row(row) if row is not None else None
+
+    @timed('get_events_batch')
+    def get_events_batch(self, event_ids: List[str]) -> BatchEventDetailResponse:
+        """批量获取事件详情"""
+        event_ids = list(dict.fromkeys(str(x) for x in event_ids))
+        rows = self._rows_by_key('events', '事件编号', event_ids)
+        items = [self._event_detail_from_row(rows[event_id]) for event_id in event_ids if event_id in rows]
+        missing = [event_id for event_id in event_ids if event_id not in rows]
+        return BatchEventDetailResponse(items=items, missing=missing)
+
+    def get_filter_options(self) -> FilterOptions:
+        """获取筛选选项"""
+        columns = set(self._table_columns('events'))
+
+        def distinct(column: str) -> List[str]:
+            if column not in columns:
+                return []
+            values = self._query(f'SELECT DISTINCT {_quote(column)} AS v FROM events WHERE {_quote(column)} IS NOT NULL')
+            return sorted(str(row['v']) for row in values if str(row['v']).strip())
+
+        if not self.event_total():
+            return FilterOptions(towns=[], levels=[], categories=[], related_event_options=[])
+
+        return FilterOptions(
+            towns=distinct('镇街名称'),
+            levels=distinct('事件级别'),
+            categories=distinct('二级分类'),
+            related_event_options=list(RELATED_EVENT_BUCKETS)
+        )
+
+    @timed('ingest_events')
+    def ingest_events(self, events: List[Dict[str, Any]]) -> int:
+        """增量写入新事件：写入事件表、参与人表和全文索引
+
+        已读入内存的事件详情表（相似度、热点等功能使用）在写入数据库后按父类逻辑增量更新。
+        """
+        if not events:
+            return 0
+
+        with self._write_lock:
+            in_memory = self.is_loaded('detail_df')
+            new_df = pd.DataFrame(events)
+            participants = []
+            if 'extracted_info' in new_df.columns:
+                for event_id, info in zip(new_df['事件编号'].astype(str), new_df['extracted_info']):
+                    if isinstance(info, (str, list)) and info:
+                        participants.append((event_id, info if isinstance(info, str) else json.dumps(info, ensure_ascii=False)))
+                new_df = new_df.drop(columns=['extracted_info'])
+
+            columns = [col for col in self._table_columns('events') if col not in DERIVED_COLUMNS]
+            new_df = new_df.reindex(columns=columns).fillna('')
+            if 'sequence_total' in new_df.columns:
+                new_df['sequence_total'] = pd.to_numeric(
+                    new_df['sequence_total'], errors='coerce'
+                ).fillna(1).astype(int)
+
+            if in_memory and participants:
+                # 父类写入内存表时会追加报警人信息表，须在数据库写入前读入，避免新行重复
+                self._ensure_loaded('info_df')
+
+            # 没有附带参与人的事件从描述文本中提取（只写入参与人表，不写入报警人信息表）
+            upstream_ids = {event_id for event_id, _ in participants}
+            text_participants = [
+                (event_id, json.dumps(people, ensure_ascii=False))
+                for event_id, people in self._text_participants(
+                    new_df[~new_df['事件编号'].astype(str).isin(upstream_ids)]
+                ).items()
+            ] if '事件编号' in new_df.columns else []
+
+            conn = self._conn()
+            with conn:
+                conn.executemany('INSERT OR IGNORE INTO event_participants VALUES (?, ?)', participants + text_participants)
+                if participants:
+                    info_rows = pd.DataFrame(participants, columns=['event_id', 'extracted_info'])
+                    info_columns = [col for col in self._table_columns('info') if col != '_empty']
+                    if info_columns:
+                        info_rows = info_rows.reindex(columns=info_columns).fillna('')
+                    _write_table(conn, 'info', info_rows, if_exists='append' if info_columns else 'replace')
+                    if not in_memory and self.is_loaded('info_df'):
+                        self.info_df = pd.concat([self.info_df, info_rows], ignore_index=True)
+                self._phone_graph = None
+
+                last_rowid = conn.execute('SELECT COALESCE(MAX(rowid), 0) AS n FROM events').fetchone()['n']
+                _write_table(conn, 'events', _event_rows_for_sql(self, new_df), if_exists='append')
+                fts_columns = ', '.join(_quote(col) for col in self._table_columns('events_fts'))
+                conn.execute(
+                    f'INSERT INTO events_fts(rowid, {fts_columns}) SELECT rowid, {fts_columns} FROM events WHERE rowid > ?',
+                    (last_rowid,)
+                )
+
+            # 热点检测等内存结构需要读取已写入数据库的参与人
+            if in_memory:
+                EventService.ingest_events(self, events)
+            else:
+                self._ingest_count += 1
+                self._notify_ingest(new_df, self._parse_times(new_df['上报时间']) if '上报时间' in new_df.columns
+                                    else np.full(len(new_df), np.datetime64('NaT'), dtype='datetime64[ns]'))
+
+        return len(new_df)
+
+    # ---- 聚类事件 ----
+
+    def _cluster_member_rows(self, event_uid: str) -> Optional[pd.DataFrame]:
+        """聚类下的全部事件行（按写入顺序）"""
+        members = self._frame('SELECT * FROM events WHERE "EventUID" = ? ORDER BY rowid', (event_uid,))
+        return members if not members.empty else None
+
+    @timed('get_cluster_detail')
+    def get_cluster_detail(self, event_uid: str) -> Optional[ClusterEventResponse]:
+        """获取聚类事件详情"""
+        row = self._rows_by_key('clusters', 'EventUID', [event_uid]).get(event_uid)
+        cache_lookup('cluster_uid_index', row is not None)
+        return self._cluster_detail_from_row(event_uid, row) if row is not None else None
+
+    @timed('get_clusters_batch')
+    def get_clusters_batch(self, event_uids: List[str]) -> BatchClusterDetailResponse:
+        """批量获取聚类事件详情"""
+        event_uids = list(dict.fromkeys(str(x) for x in event_uids))
+        rows = self._rows_by_key('clusters', 'EventUID', event_uids)
+
+        items = []
+        missing = []
+        for event_uid in event_uids:
+            detail = self._cluster_detail_from_row(event_uid, rows[event_uid]) if event_uid in rows else None
+            if detail is None:
+                missing.append(event_uid)
+            else:
+                items.append(detail)
+        return BatchClusterDetailResponse(items=items, missing=missing)
+
+    @timed('get_cluster_list')
+    def get_cluster_list(self, page: int = 1, page_size: int = 20, search: Optional[str] = None,
+                        min_event_count: Optional[int] = None, max_event_count: Optional[int] = None,
+                        min_duration: Optional[float] = None, max_duration: Optional[float] = None,
+                        start_time: Optional[Union[datetime, date]] = None, end_time: Optional[Union[datetime, date]] = None,
+                        fields: Optional[List[str]] = None, description_length: Optional[int] = None) -> Union[ClusterListPaginatedResponse, ProjectedListResponse]:
+        """获取聚合事件列表（分页），按事件数量、持续时间倒序"""
+        projected = fields is not None or description_length is not None
+        # 时间跨度与 [start_time, end_time] 有交集
+        conditions, params = self._time_conditions('_first_ts', end_time=end_time)
+        last_conditions, last_params = self._time_conditions('_last_ts', start_time=start_time)
+        conditions += last_conditions
+        params += last_params
+
+        # 只显示record_count > 1的记录
+        conditions.append('record_count > 1')
+
+        if search:
+            condition, search_params = self._text_search_condition(
+                'clusters', 'clusters_fts', ['cluster_description'], search
+            )
+            conditions.append(condition)
+            params.extend(search_params)
+
+        for condition, value in (('record_count >= ?', min_event_count), ('record_count <= ?', max_event_count),
+                                 ('duration_days >= ?', min_duration), ('duration_days <= ?', max_duration)):
+            if value is not None:
+                conditions.append(condition)
+                params.append(value)
+
+        total, rows = self._paginate(
+            'clusters', conditions, params, 'record_count DESC, duration_days DESC, rowid', page, page_size
+        )
+        RESULT_SIZE.observe(total, 'get_cluster_list')
+
+        items = [self._cluster_item_from_row(row) for row in rows]
+        if projected:
+            items = [project_item(item, fields, 'cluster_description', description_length) for item in items]
+
+        return (ProjectedListResponse if projected else ClusterListPaginatedResponse)(
+            items=items,
+            total=total,
+            page=page,
+            page_size=page_size,
+            total_pages=(total + page_size - 1) // page_size
+        )
+
+    def get_cluster_filter_options(self) -> ClusterFilterOptions:
+        """获取聚合事件筛选选项"""
+        row = self._query(
+            'SELECT COUNT(*) AS n, MAX(record_count) AS max_count, MAX(duration_days) AS max_duration '
+            'FROM clusters WHERE record_count > 1'
+        )[0]
+        if not row['n']:
+            return ClusterFilterOptions(event_count_ranges=[], duration_ranges=[])
+        return self._cluster_filter_options(row['max_count'], row['max_duration'])
+
+    # ---- 人口信息 ----
+
+    @timed('search_people')
+    def search_people(self, query: PersonSearchQuery) -> PersonSearchResponse:
+        """搜索人口信息（证件号、手机号支持脱敏格式）"""
+        conditions, params = [], []
+        fuzzy = bool(query.name and query.fuzzy)
+        if query.name and not fuzzy:
+            conditions.append("name_cn LIKE ? ESCAPE '\\'")
+            params.append(_like_pattern(query.name))
+
+        # 完整号码走索引等值查找，脱敏格式由注册的匹配函数逐行判断
+        for column, value, function in (('id_card_no', query.id_card, 'match_id_card'),
+                                        ('mobile_phone', query.phone, 'match_phone')):
+            if not value:
+                continue
+            if '*' in value:
+                conditions.append(f'{function}(?, {column})')
+            else:
+                conditions.append(f'{column} = ?')
+            params.append(value)
+
+        if fuzzy:
+            # 模糊搜索：姓名索引给出候选行，按距离排序后分页
+            matched = self._fuzzy_rows('people', self._people_name_index.search(query.name), conditions, params)
+            total = len(matched)
+            rows = matched[(query.page - 1) * query.page_size:query.page * query.page_size]
+        else:
+            total, rows = self._paginate('people', conditions, params, 'rowid', query.page, query.page_size)
+        items = [self._person_info_from_row(row) for row in rows]
+        if fuzzy:
+            for item, row in zip(items, rows):
+                item.name_distance = row['_name_distance']
+        return PersonSearchResponse(
+            items=items,
+            total=total,
+            page=query.page,
+            page_size=query.page_size,
+            total_pages=(total + query.page_size - 1) // query.page_size
+        )
+
+    def get_person_detail(self, person_id: str) -> Optional[PersonInfo]:
+        """获取人员详细信息"""
+        row = self._rows_by_key('people', 'person_id', [person_id]).get(person_id)
+        return self._person_info_from_row(row) if row is not None else None
+
+    # ---- 人员分析 ----
+
+    @timed('get_person_analysis')
+    def get_person_analysis(self, query: PersonAnalysisQuery,
+                            fields: Optional[List[str]] = None) -> Union[PersonAnalysisResponse, ProjectedListResponse]:
+        """获取人员分析列表（分页），按事件数量倒序"""
+        conditions, params = [], []
+        fuzzy = bool(query.search and query.fuzzy)
+        if query.search and not fuzzy:
+            conditions.append("(name LIKE ? ESCAPE '\\' OR phone LIKE ? ESCAPE '\\')")
+            params += [_like_pattern(query.search)] * 2
+        roles = filter_terms(query.role)
+        if roles:
+            conditions.append('(' + ' OR '.join(["primary_role LIKE ? ESCAPE '\\'"] * len(roles)) + ')')
+            params.extend(_like_pattern(role) for role in roles)
+
+        if fuzzy:
+            # 模糊搜索：按（姓名距离, 事件数倒序）排序后分页
+            matched = self._fuzzy_rows('phone_master', self._person_name_index.search(query.search), conditions, params)
+            matched.sort(key=lambda row: (row['_name_distance'], -(row.get('event_count') or 0), row['_rowid']))
+            total = len(matched)
+            rows = matched[(query.page - 1) * query.page_size:query.page * query.page_size]
+        else:
+            total, rows = self._paginate(
+                'phone_master', conditions, params, 'event_count DESC, rowid', query.page, query.page_size
+            )
+        RESULT_SIZE.observe(total, 'get_person_analysis')
+
+        items = [self._person_analysis_from_row(row) for row in rows]
+        if fuzzy:
+            for item, row in zip(items, rows):
+                item.name_distance = row['_name_distance']
+        if fields is not None:
+            items = [project_item(item, fields) for item in items]
+
+        return (ProjectedListResponse if fields is not None else PersonAnalysisResponse)(
+            items=items,
+            total=total,
+            page=query.page,
+            page_size=query.page_size,
+            total_pages=(total + query.page_size - 1) // query.page_size
+        )
+
+    def _person_event_rows(self, event_ids: List[str], event_rows: Dict[str, Dict[str, Any]]) -> List[tuple]:
+        """按关联事件编号取出（事件行, 上报时间），不存在的事件跳过"""
+        return [
+            (event_rows[event_id], np.datetime64(event_rows[event_id]['_report_ts'] or 'NaT', 'ns'))
+            for event_id in event_ids if event_id in event_rows
+        ]
+
+    @timed('get_person_analysis_detail')
+    def get_person_analysis_detail(self, phone: str) -> Optional[PersonDetailResponse]:
+        """获取人员分析详情"""
+        row = self._rows_by_key('phone_master', 'phone', [phone]).get(phone)
+        cache_lookup('phone_index', row is not None)
+        if row is None:
+            return None
+
+        event_ids = self._parse_related_events(row)
+        event_rows = self._rows_by_key('events', '事件编号', event_ids)
+        return self._person_detail_from_row(phone, row, self._person_event_rows(event_ids, event_rows))
+
+    @timed('get_person_analysis_batch')
+    def get_person_analysis_batch(self, phones: List[str]) -> BatchPersonDetailResponse:
+        """批量获取人员分析详情（手机号和关联事件编号各一批 IN 查询）"""
+        phones = list(dict.fromkeys(str(x) for x in phones))
+        rows = self._rows_by_key('phone_master', 'phone', phones)
+        found_phones = [phone for phone in phones if phone in rows]
+
+        related = [self._parse_related_events(rows[phone]) for phone in found_phones]
+        all_event_ids = list(dict.fromkeys(event_id for event_ids in related for event_id in event_ids))
+        event_rows = self._rows_by_key('events', '事件编号', all_event_ids)
+
+        items = [
+            self._person_detail_from_row(phone, rows[phone], self._person_event_rows(event_ids, event_rows))
+            for phone, event_ids in zip(found_phones, related)
+        ]
+        missing = [phone for phone in phones if phone not in rows]
+        return BatchPersonDetailResponse(items=items, missing=missing)
+
+    def get_person_analysis_roles(self) -> List[str]:
+        """获取人员分析中的所有角色选项"""
+        if 'primary_role' not in self._table_columns('phone_master'):
+            return []
+        roles = self._query('SELECT DISTINCT primary_role AS v FROM phone_master WHERE primary_role IS NOT NULL')
+        return sorted(str(row['v']) for row in roles if str(row['v']).strip())
+
+    def _phone_names(self, phones: List[str]) -> Dict[str, Dict[str, Any]]:
+        """批量获取电话号码在人员分析表中的姓名和主要角色"""
+        return {
+            phone: {
+                'name': str(row.get('name', '')) if row.get('name') else None,
+                'primary_role': str(row.get('primary_role', '')) if row.get('primary_role') else None
+            }
+            for phone, row in self._rows_by_key('phone_master', 'phone', phones).items()
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='由CSV数据构建 SQLite 数据库')
+    parser.add_argument('--data-dir', help='CSV数据目录，默认同 EventService')
+    parser.add_argument('--db', help='数据库文件路径，默认取 EVENT_SQLITE_PATH 或 <数据目录>/events.sqlite3')
+    parser.add_argument('--workers', type=int, help='并行解析CSV的进程数，默认取 EVENT_CSV_WORKERS')
+    args = parser.parse_args()
+
+    data_dir = EventService(data_dir=args.data_dir).data_dir
+    build_database(data_dir, args.db or default_database_path(data_dir), workers=args.workers)
+
+
+if __name__ == '__main__':
+    main()
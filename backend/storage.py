@@ -0,0 +1,151 @@
+from importlib.util import find_spec
+from typing import Any, Dict, List
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+
+def compact_storage_enabled() -> bool:
+    """是否启用紧凑存储，取环境变量 EVENT_COMPACT_STORAGE（1/true/yes）"""
+    return os.environ.get('EVENT_COMPACT_STORAGE', '').lower() in ('1', 'true', 'yes')
+
+
+def arrow_strings_available() -> bool:
+    return find_spec('pyarrow') is not None
+
+
+def fill_missing(df: pd.DataFrame, compact: bool = False) -> pd.DataFrame:
+    """缺失值处理
+
+    默认模式与原有行为一致，全部列的缺失值填为 ''；紧凑模式只填充文本列，
+    数值列保留数值类型和 NaN，避免被填充成 object 列。只替换有缺失值的列，其余列不复制。
+    """
+    columns = [col for col in df.columns
+               if df[col].hasnans and (not compact or not pd.api.types.is_numeric_dtype(df[col]))]
+    if columns:
+        df = df.copy(deep=False)
+        df[columns] = df[columns].fillna('')
+    return df
+
+
+def _compact_strings(values: pd.Series, category_ratio: float, use_arrow: bool) -> pd.Series:
+    """文本列转换：重复度高的转为 category，否则转为 Arrow 字符串或对重复值做驻留
+
+    去重和编码用字典完成而不是 pd.factorize/nunique：pandas 的字符串哈希表会在每个字符串对象上
+    缓存一份 UTF-8 编码，中文长文本的内存反而增加约八成。
+    """
+    pool: Dict[str, int] = {}
+    codes = np.fromiter((pool.setdefault(value, len(pool)) for value in values.to_numpy()),
+                        dtype=np.int64, count=len(values))
+    uniques = np.empty(len(pool), dtype=object)
+    uniques[:] = list(pool)
+    if len(pool) <= len(values) * category_ratio:
+        # 类别按字典序排列，与按原字符串排序的结果一致
+        order = np.argsort(uniques, kind='stable')
+        remap = np.empty(len(order), dtype=np.int64)
+        remap[order] = np.arange(len(order))
+        categories = pd.Index(uniques[order], dtype=object)
+        return pd.Series(pd.Categorical.from_codes(remap[codes], categories=categories),
+                         index=values.index, name=values.name)
+    if use_arrow:
+        return values.astype('string[pyarrow]')
+    return pd.Series(uniques[codes], index=values.index, name=values.name)
+
+
+def compact_frame(df: pd.DataFrame, category_ratio: float = 0.5) -> pd.DataFrame:
+    """将表转换为紧凑存储
+
+    - 整数列按取值范围缩小位宽
+    - 重复度高的文本列（去重后不超过 category_ratio）转为 category
+    - 其余文本列在有 pyarrow 时转为 Arrow 字符串，否则对重复值做驻留
+    """
+    if df.empty:
+        return df
+    # 各列整体替换，浅拷贝即可（不复制未转换的列）
+    df = df.copy(deep=False)
+    use_arrow = arrow_strings_available()
+    for col in df.columns:
+        values = df[col]
+        if pd.api.types.is_integer_dtype(values.dtype) and not pd.api.types.is_extension_array_dtype(values.dtype):
+            df[col] = pd.to_numeric(values, downcast='integer')
+        elif values.dtype == object:
+            values = values.astype(str) if not values.map(type).eq(str).all() else values
+            df[col] = _compact_strings(values, category_ratio, use_arrow)
+    return df
+
+
+def align_categories(existing: pd.DataFrame, new_df: pd.DataFrame) -> pd.DataFrame:
+    """增量写入前对齐分类列：扩展已有表的类别，并把新数据转为相同的类型，
+    使拼接后的列仍为 category（否则 pd.concat 会退化为 object）"""
+    new_df = new_df.copy()
+    for col in existing.columns:
+        if col not in new_df.columns:
+            continue
+        dtype = existing[col].dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            new_values = new_df[col].astype(str)
+            missing = pd.Index(new_values.unique()).difference(dtype.categories)
+            if len(missing):
+                existing[col] = existing[col].cat.add_categories(missing)
+            new_df[col] = new_values.astype(existing[col].dtype)
+        elif str(dtype) == 'string' or isinstance(dtype, pd.StringDtype):
+            new_df[col] = new_df[col].astype(str).astype(dtype)
+    return new_df
+
+
+def _object_memory(values: np.ndarray) -> int:
+    """object 数组的内存：指针数组 + 各个不同对象的大小（共享对象只计一次）"""
+    seen = set()
+    total = values.nbytes
+    for value in values:
+        key = id(value)
+        if key not in seen:
+            seen.add(key)
+            total += sys.getsizeof(value)
+    return total
+
+
+def column_memory(values: pd.Series) -> int:
+    dtype = values.dtype
+    if dtype == object:
+        return _object_memory(values.to_numpy())
+    if isinstance(dtype, pd.CategoricalDtype):
+        categories = values.cat.categories
+        category_bytes = _object_memory(categories.to_numpy()) if categories.dtype == object else categories.memory_usage(deep=True)
+        return values.cat.codes.to_numpy().nbytes + category_bytes
+    return int(values.memory_usage(deep=True, index=False))
+
+
+def frame_memory_report(df: pd.DataFrame) -> Dict[str, Any]:
+    """按列统计表的内存占用（字节），按占用从大到小排列"""
+    columns: List[Dict[str, Any]] = []
+    for col in df.columns:
+        values = df[col]
+        columns.append({
+            'column': str(col),
+            'dtype': str(values.dtype),
+            'bytes': column_memory(values),
+        })
+    columns.sort(key=lambda item: -item['bytes'])
+    index_bytes = int(df.index.memory_usage(deep=True))
+    return {
+        'rows': len(df),
+        'bytes': sum(item['bytes'] for item in columns) + index_bytes,
+        'columns': columns,
+    }
+
+
+def process_rss() -> int:
+    """当前进程常驻内存（字节），无法读取时返回 0"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        try:
+            import resource
+            usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return usage if sys.platform == 'darwin' else usage * 1024
+        except (ImportError, OSError):
+            return 0
@@ -0,0 +1,26 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+# 后端模块为 backend 目录下的平铺模块
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.generator import generate  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def generated_dir(tmp_path_factory) -> str:
+    """合成数据目录（约 1000 条事件，2025年1-6月，原始时间格式），只读，需要写入时用 data_dir"""
+    path = tmp_path_factory.mktemp('generated')
+    generate(str(path), scale=0.2)
+    return str(path)
+
+
+@pytest.fixture
+def data_dir(generated_dir, tmp_path) -> str:
+    """合成数据的可写副本（SQLite 数据库、分区快照、预渲染缓存写在其中）"""
+    path = tmp_path / 'data'
+    shutil.copytree(generated_dir, path)
+    return str(path)
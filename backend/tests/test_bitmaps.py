@@ -0,0 +1,79 @@
+"""位图索引：位运算与按行的布尔运算一致，组合筛选结果与逐行 str.contains 筛选一致"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from bitmaps import BitmapIndex, bitmap_and, bitmap_contains, bitmap_count
+from services import EventService, RELATED_EVENT_BUCKETS
+
+
+def test_bitmap_operations_match_boolean_masks():
+    rng = np.random.default_rng(0)
+    values = rng.choice(['a', 'b', 'c', None], size=1000)
+    index = BitmapIndex()
+    # 分批追加，批的边界不与 64 位的字对齐
+    for start, end in [(0, 1), (1, 70), (70, 128), (128, 129), (129, 600), (600, 1000)]:
+        index.add(values[start:end])
+    keys = pd.Series(values).fillna('').to_numpy()
+    positions = np.arange(len(values))
+
+    assert len(index) == 1000 and sorted(index.values()) == ['', 'a', 'b', 'c']
+    for value in ['', 'a', 'b', 'c', 'missing']:
+        assert bitmap_count(index.bitmap(value)) == index.count(value) == (keys == value).sum()
+        np.testing.assert_array_equal(bitmap_contains(index.bitmap(value), positions), keys == value)
+    np.testing.assert_array_equal(bitmap_contains(index.union(['a', 'c']), positions), np.isin(keys, ['a', 'c']))
+
+    other = BitmapIndex(np.where(positions % 3 == 0, 'x', 'y'))
+    combined = bitmap_and([index.union(['a', 'b']), other.bitmap('x')])
+    np.testing.assert_array_equal(bitmap_contains(combined, positions), np.isin(keys, ['a', 'b']) & (positions % 3 == 0))
+    assert bitmap_count(combined) == (np.isin(keys, ['a', 'b']) & (positions % 3 == 0)).sum()
+
+
+def bitmap_filter(service, **params):
+    positions = np.arange(len(service.detail_df))
+    filters = {'town': None, 'level': None, 'category': None, 'related_events': None, **params}
+    return service._filter_event_positions(positions, **filters)
+
+
+def contains_filter(df, town=None, level=None, category=None, related_events=None):
+    """逐行 str.contains 的参考实现（每个条件逗号分隔的取值满足任一即可）"""
+    mask = np.ones(len(df), dtype=bool)
+    for column, value in (('镇街名称', town), ('事件级别', level), ('二级分类', category)):
+        if value:
+            matched = np.zeros(len(df), dtype=bool)
+            for term in value.split(','):
+                matched |= df[column].astype(str).str.contains(term, case=False, na=False).to_numpy()
+            mask &= matched
+    if related_events:
+        sequence_total = pd.to_numeric(df['sequence_total'], errors='coerce').fillna(1).to_numpy()
+        matched = np.zeros(len(df), dtype=bool)
+        for low, high in (RELATED_EVENT_BUCKETS[bucket] for bucket in related_events.split(',')):
+            matched |= (sequence_total >= (low or 0)) & (sequence_total <= (high or np.inf))
+        mask &= matched
+    return np.flatnonzero(mask)
+
+
+@pytest.mark.parametrize('compact', [False, True])
+@pytest.mark.parametrize('params', [
+    {'town': '古林'},
+    {'town': '古林镇,高桥', 'level': '二级'},
+    {'level': '三级事件', 'category': '纠纷'},
+    {'category': '消费,租赁', 'related_events': '1'},
+    {'related_events': '0,2-5'},
+    {'town': '不存在'},
+])
+def test_event_filter_matches_str_contains(generated_dir, compact, params):
+    service = EventService(data_dir=generated_dir, compact_storage=compact)
+    np.testing.assert_array_equal(bitmap_filter(service, **params), contains_filter(service.detail_df, **params))
+
+
+def test_ingest_appends_to_bitmaps(generated_dir):
+    service = EventService(data_dir=generated_dir)
+    rows = service.detail_df.head(77).astype(str).to_dict('records')
+    for i, row in enumerate(rows):
+        row['事件编号'] = f'NEW{i:05d}'
+        row['镇街名称'] = '新增镇' if i % 2 else row['镇街名称']
+    service.ingest_events(rows)
+    for params in ({'town': '新增'}, {'town': '古林,新增', 'related_events': '0,5+'}):
+        np.testing.assert_array_equal(bitmap_filter(service, **params), contains_filter(service.detail_df, **params))
+    assert service.get_events(town='新增镇').total == 38
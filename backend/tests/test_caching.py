@@ -0,0 +1,59 @@
+"""读接口的条件请求与响应压缩：ETag 一致时返回 304 且不执行接口，数据版本变化后重新生成；较大的响应 gzip 压缩"""
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from caching import CompressionMiddleware, ETagMiddleware
+
+
+def make_client(version):
+    calls = []
+
+    async def endpoint(request):
+        calls.append(request.url.path)
+        return PlainTextResponse('x' * int(request.query_params.get('size', '10')))
+
+    app = Starlette(routes=[Route('/api/events', endpoint), Route('/api/admin/memory', endpoint),
+                            Route('/api/feed', endpoint)])
+    app = ETagMiddleware(app, version=lambda: version['value'])
+    app = CompressionMiddleware(app, skip_paths=['/api/feed'])
+    return TestClient(app), calls
+
+
+def test_if_none_match_returns_304_without_calling_route():
+    version = {'value': 'v1'}
+    client, calls = make_client(version)
+    response = client.get('/api/events?page=1&town=a')
+    etag = response.headers['etag']
+    assert response.status_code == 200 and response.headers['cache-control'] == 'no-cache'
+
+    # 查询参数顺序不同的相同查询得到相同的 ETag
+    cached = client.get('/api/events?town=a&page=1', headers={'If-None-Match': f'"other", {etag}'})
+    assert cached.status_code == 304 and cached.content == b''
+    assert len(calls) == 1
+
+    assert client.get('/api/events?page=2&town=a', headers={'If-None-Match': etag}).status_code == 200
+    version['value'] = 'v2'
+    changed = client.get('/api/events?page=1&town=a', headers={'If-None-Match': etag})
+    assert changed.status_code == 200 and changed.headers['etag'] != etag
+    assert len(calls) == 3
+
+
+def test_admin_routes_have_no_etag():
+    client, _ = make_client({'value': 'v1'})
+    assert 'etag' not in client.get('/api/admin/memory').headers
+
+
+def test_large_responses_are_gzipped():
+    client, _ = make_client({'value': 'v1'})
+    headers = {'Accept-Encoding': 'gzip'}
+    small = client.get('/api/events?size=999', headers=headers)
+    assert 'content-encoding' not in small.headers
+
+    large = client.get('/api/events?size=5000', headers=headers)
+    assert large.headers['content-encoding'] == 'gzip' and large.text == 'x' * 5000
+    assert int(large.headers['content-length']) < 5000
+
+    assert 'content-encoding' not in client.get('/api/feed?size=5000', headers=headers).headers
+
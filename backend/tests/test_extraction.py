@@ -0,0 +1,41 @@
+"""从事件文本提取参与人：与上游报警人信息拼出相同格式的报警人/当事人信息"""
+import json
+
+import pandas as pd
+
+from extraction import TEXT_PARTY_ROLE, TEXT_SOURCE, default_text_roles, extract_participants
+from services import EventService
+
+DETAIL_COLUMNS = ['事件编号', '事件描述', '处置结果', '镇街名称', '事件级别', '二级分类', '上报时间', '最后派发时间',
+                  '最后受理时间', '办结时间', '所属组织', 'EventUID', 'sequence_total']
+
+
+def test_text_participants_have_roles():
+    participants = extract_participants(
+        pd.Series(['E1']), pd.Series(['报警电话:131****5926，对方（3412*****6910，150****7083）'])
+    )
+    roles = [(person['role'], person['phone']) for person in participants['E1']]
+    assert roles == [('报警人', '131****5926'), (TEXT_PARTY_ROLE, '150****7083')]
+
+
+def test_old_text_participants_get_default_role():
+    people = [{'role': None, 'phone': '150****7083', 'source': TEXT_SOURCE}, {'role': None, 'phone': '1'}]
+    assert [person['role'] for person in default_text_roles(people)] == [TEXT_PARTY_ROLE, None]
+
+
+def test_party_info_same_format_for_both_sources(tmp_path):
+    description = '报警电话:131****5926，对方 150****7083 不肯赔偿'
+    pd.DataFrame([
+        [event_id, description, '', '古林镇', '一级事件', '邻里纠纷', '6/5/25 8:00', '', '', '', '', f'U{i}', 1]
+        for i, event_id in enumerate(['E0', 'E1'])
+    ], columns=DETAIL_COLUMNS).to_csv(tmp_path / 'conflict_event_detail.csv', index=False)
+    upstream = [{'name': None, 'role': '报警人', 'id': None, 'phone': '131****5926'},
+                {'name': None, 'role': '当事人', 'id': None, 'phone': '150****7083'}]
+    pd.DataFrame({'event_id': ['E0'], 'extracted_info': [json.dumps(upstream, ensure_ascii=False)]}).to_csv(
+        tmp_path / 'info_merge.csv', index=False
+    )
+
+    service = EventService(data_dir=str(tmp_path))
+    assert service._participants_by_event['E1'][0]['source'] == TEXT_SOURCE
+    assert service._get_involved_parties_info('E1') == service._get_involved_parties_info('E0')
+    assert service._get_involved_parties_info('E1') == '角色: 当事人 | 电话: 150****7083'
@@ -0,0 +1,63 @@
+"""实时事件推送：订阅筛选与事件列表接口的筛选结果一致，断线重连按 Last-Event-ID 补发"""
+import asyncio
+from datetime import date, datetime
+
+import pytest
+
+from feed import EventFeed, FeedFilter
+from services import EventService
+
+FILTERS = [
+    {},
+    {'search': '押金'},
+    {'search': '131****'},
+    {'town': '古林镇,高桥镇'},
+    {'level': '二级事件', 'category': '消费,租赁'},
+    {'related_events': '1,2-5'},
+    {'start_time': date(2025, 3, 1), 'end_time': date(2025, 4, 30)},
+    {'end_time': datetime(2025, 2, 15, 12, 0)},
+]
+
+
+@pytest.fixture(scope='module')
+def ingested(generated_dir):
+    """把已有事件换上新编号重新写入，返回（服务, 推送中心, 新事件编号）"""
+    service = EventService(data_dir=generated_dir)
+    feed = EventFeed()
+    service.add_ingest_listener(feed.publish)
+    rows = service.detail_df.sample(200, random_state=1).astype(str).to_dict('records')
+    for i, row in enumerate(rows):
+        row['事件编号'] = f'NEW{i:05d}'
+        row['sequence_total'] = str(i % 12 + 1)
+    service.ingest_events(rows[:120])
+    service.ingest_events(rows[120:])
+    return service, feed, {row['事件编号'] for row in rows}
+
+
+@pytest.mark.parametrize('params', FILTERS)
+def test_filter_matches_get_events(ingested, params):
+    service, feed, new_ids = ingested
+    listed = {item.事件编号 for item in service.get_events(page_size=100000, **params).items} & new_ids
+    feed_filter = FeedFilter(**params)
+    pushed = {event.item.事件编号 for event in feed._history if feed_filter.matches(event)}
+    assert pushed == listed
+
+
+def test_resume_from_last_event_id(ingested):
+    _, feed, _ = ingested
+    history = list(feed._history)
+    feed_filter = FeedFilter(town='古林镇')
+
+    async def resumed(last_event_id):
+        subscriber = feed.subscribe(feed_filter, last_event_id)
+        feed.unsubscribe(subscriber)
+        events = []
+        while not subscriber.queue.empty():
+            events.append(subscriber.queue.get_nowait().seq)
+        return events
+
+    last_seen = history[150].seq
+    expected = [event.seq for event in history if event.seq > last_seen and feed_filter.matches(event)]
+    assert expected and asyncio.run(resumed(last_seen)) == expected
+    assert asyncio.run(resumed(None)) == []
+    assert feed.subscriber_count() == 0
@@ -0,0 +1,52 @@
+"""姓名模糊索引：对称删除索引的查询结果与逐个计算编辑距离的结果一致"""
+import random
+
+import pytest
+
+from fuzzy import NameIndex, edit_distance
+
+SURNAMES = '刘李王张陈'
+GIVEN = '康利力立国伟芳'
+
+
+def brute_force(names, query, max_distance):
+    distances = {}
+    for key, name in names:
+        distance = edit_distance(query, name)
+        if distance <= max_distance:
+            distances[key] = min(distance, distances.get(key, distance))
+    return sorted(distances.items(), key=lambda item: (item[1], item[0]))
+
+
+def test_edit_distance():
+    assert edit_distance('刘李康', '刘利康') == 1
+    assert edit_distance('刘康', '刘李康') == 1
+    assert edit_distance('abc', 'cab') == 2
+    assert edit_distance('', '王伟') == 2
+
+
+@pytest.mark.parametrize('max_distance', [1, 2])
+def test_search_matches_brute_force(max_distance):
+    rng = random.Random(max_distance)
+    names = []
+    for key in range(400):
+        length = rng.choice([1, 2, 2, 3, 3, 3, 4])
+        names.append((key % 300, rng.choice(SURNAMES) + ''.join(rng.choice(GIVEN) for _ in range(length - 1))))
+    index = NameIndex(max_distance=max_distance)
+    for key, name in names:
+        index.add(name, key)
+
+    queries = [name for _, name in names[:40]] + ['刘', '康', '刘利', '王国伟芳', '陈立立立力']
+    for query in queries:
+        assert index.search(query) == brute_force(names, query, max_distance), query
+        assert index.search(query, max_distance=0) == brute_force(names, query, 0), query
+
+
+def test_names_are_normalized():
+    index = NameIndex()
+    index.add(' 刘 李康 ', 'a')
+    index.add(None, 'b')
+    index.add('nan', 'c')
+    assert len(index) == 1
+    assert index.search('刘利康') == [('a', 1)]
+    assert index.search('  ') == []
@@ -0,0 +1,75 @@
+"""查询准入与截止时间：高代价查询排队超时返回 503，超过请求截止时间返回 504，低代价查询不占名额"""
+import threading
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from governor import (
+    GovernorMiddleware, QueryContext, QueryGovernor, QueryRejected, QueryTimeout, check_deadline, current_query
+)
+
+
+def test_expensive_queries_are_rejected_when_queue_times_out():
+    governor = QueryGovernor(max_expensive=1, expensive_cost=100, queue_timeout=0.05)
+    with governor.admit('get_events', cost=1000):
+        with governor.admit('get_events', cost=10):
+            pass
+        with pytest.raises(QueryRejected) as rejected:
+            with governor.admit('get_events', cost=1000):
+                pass
+    assert rejected.value.status_code == 503
+    assert rejected.value.headers == {'Retry-After': '1'}
+    # 名额释放后可以再次获得
+    with governor.admit('get_events', cost=1000):
+        pass
+
+
+def test_queue_wait_is_bounded_by_request_deadline():
+    governor = QueryGovernor(max_expensive=1, expensive_cost=100, queue_timeout=5)
+    holding, release = threading.Event(), threading.Event()
+
+    def hold():
+        with governor.admit('search_people', cost=1000):
+            holding.set()
+            release.wait()
+
+    thread = threading.Thread(target=hold)
+    thread.start()
+    holding.wait()
+    token = current_query.set(QueryContext(timeout=0.05))
+    start = time.monotonic()
+    try:
+        with pytest.raises(QueryTimeout):
+            with governor.admit('search_people', cost=1000):
+                pass
+    finally:
+        current_query.reset(token)
+        release.set()
+        thread.join()
+    assert time.monotonic() - start < 1
+
+
+def make_client(timeout):
+    app = FastAPI()
+
+    def slow():
+        for _ in range(30):
+            check_deadline()
+            time.sleep(0.01)
+        return {'done': True}
+
+    app.get('/api/slow')(slow)
+    app.get('/api/admin/slow')(slow)
+    app.add_middleware(GovernorMiddleware, timeout=timeout)
+    return TestClient(app)
+
+
+def test_middleware_returns_504_after_deadline():
+    client = make_client(timeout=0.05)
+    response = client.get('/api/slow')
+    assert response.status_code == 504 and response.json() == {'detail': '查询超时'}
+    # 管理接口不设截止时间
+    assert client.get('/api/admin/slow').json() == {'done': True}
+    assert make_client(timeout=None).get('/api/slow').status_code == 200
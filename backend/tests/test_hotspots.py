@@ -0,0 +1,17 @@
+"""重复报警热点：最长窗口的前一等长窗口也在保留期内"""
+import numpy as np
+
+from hotspots import MAX_WINDOW_HOURS, HotspotDetector
+
+
+def test_previous_window_at_max_window_hours():
+    detector = HotspotDetector()
+    latest = np.datetime64('2025-05-31T12:00', 's')
+    # 前一窗口内 2 条（距最新事件 1000 小时和 800 小时），当前窗口内 3 条
+    for i, hours in enumerate([1000, 800, 100, 10, 0]):
+        detector.observe(f'E{i}', latest - np.timedelta64(hours, 'h'), ['13800000000'])
+
+    [item] = detector.hotspots('phone', MAX_WINDOW_HOURS, threshold=3)
+    assert item['event_count'] == 3
+    assert item['previous_count'] == 2
+    assert item['escalating']
@@ -0,0 +1,26 @@
+"""按需加载：构造时不读取数据文件，首次访问只加载所属组件，结果与立即全部加载一致"""
+from services import WARMUP_ORDER, EventService
+
+
+def test_lazy_components_load_on_first_access(generated_dir):
+    lazy = EventService(data_dir=generated_dir)
+    eager = EventService(data_dir=generated_dir, lazy=False)
+    assert not any(lazy.is_loaded(component) for component in WARMUP_ORDER)
+
+    event_id = eager.detail_df['事件编号'].iloc[0]
+    assert lazy.get_events(page=2, page_size=15) == eager.get_events(page=2, page_size=15)
+    assert lazy.is_loaded('detail_df')
+    assert not lazy.is_loaded('people_df') and not lazy.is_loaded('hotspots')
+    assert lazy.get_event_detail(event_id) == eager.get_event_detail(event_id)
+
+    status = {item['name']: item for item in lazy.get_load_status()['components']}
+    assert status['detail_df']['rows'] == len(eager.detail_df)
+    assert status['people_df'] == {'name': 'people_df', 'loaded': False, 'rows': None, 'seconds': None}
+
+
+def test_warmup_loads_every_component(generated_dir):
+    service = EventService(data_dir=generated_dir)
+    service.start_warmup().join()
+    status = service.get_load_status()
+    assert status['ready'] and not status['warming_up']
+    assert all(item['loaded'] for item in status['components'])
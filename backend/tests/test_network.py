@@ -0,0 +1,82 @@
+"""电话共现图：稀疏矩阵上的 k 跳邻域、连通分量与逐条事件的 Python 遍历结果一致"""
+from collections import deque
+from itertools import combinations
+
+from network import PhoneGraph
+from services import EventService
+
+PARTICIPANTS = {
+    'E1': ['A', 'B'],
+    'E2': ['B', 'C', 'C'],
+    'E3': ['C', 'D'],
+    'E4': ['A', 'B'],
+    'E5': ['X', 'Y'],
+    'E6': ['Z', ''],
+}
+
+
+def reference_graph(participants):
+    """逐条事件累加边权的邻接表"""
+    adjacency = {}
+    for phones in participants.values():
+        phones = sorted({phone for phone in phones if phone})
+        for phone in phones:
+            adjacency.setdefault(phone, {})
+        for a, b in combinations(phones, 2):
+            adjacency[a][b] = adjacency[a].get(b, 0) + 1
+            adjacency[b][a] = adjacency[b].get(a, 0) + 1
+    return adjacency
+
+
+def reference_hops(adjacency, phone):
+    hops, queue = {phone: 0}, deque([phone])
+    while queue:
+        node = queue.popleft()
+        for neighbour in adjacency[node]:
+            if neighbour not in hops:
+                hops[neighbour] = hops[node] + 1
+                queue.append(neighbour)
+    return hops
+
+
+def graph_hops(graph, phone, hops):
+    nodes, node_hops, _ = graph.neighbourhood(phone, hops=hops)
+    return {str(graph.phones[node]): int(hop) for node, hop in zip(nodes, node_hops)}
+
+
+def test_neighbourhood_edges_and_components():
+    graph = PhoneGraph.from_participants(PARTICIPANTS)
+    adjacency = reference_graph(PARTICIPANTS)
+
+    assert graph_hops(graph, 'A', 1) == {'A': 0, 'B': 1}
+    assert graph_hops(graph, 'A', 3) == reference_hops(adjacency, 'A')
+    nodes, _, truncated = graph.neighbourhood('A', hops=3, max_nodes=2)
+    assert len(nodes) == 2 and truncated
+
+    nodes, _, _ = graph.neighbourhood('A', hops=3)
+    edges = {frozenset((str(graph.phones[s]), str(graph.phones[t]))): int(w) for s, t, w in zip(*graph.edges(nodes))}
+    assert edges == {frozenset(('A', 'B')): 2, frozenset(('B', 'C')): 1, frozenset(('C', 'D')): 1}
+
+    assert graph.component('A')[1] == 4
+    assert graph.component('X') == graph.component('Y')
+    assert graph.component('Z')[1] == 1
+    assert graph.event_counts[graph.phone_index['C']] == 2
+
+
+def test_service_graph_matches_reference(generated_dir):
+    service = EventService(data_dir=generated_dir)
+    participants = {
+        event_id: service._event_phones(event_id) for event_id in service._participants_by_event
+    }
+    adjacency = reference_graph(participants)
+    graph = service._get_phone_graph()
+    assert set(graph.phone_index) == set(adjacency)
+
+    # 邻居最多的几个号码
+    for phone in sorted(adjacency, key=lambda p: -len(adjacency[p]))[:5]:
+        expected = reference_hops(adjacency, phone)
+        result = service.get_person_network(phone, hops=4, max_nodes=100000)
+        assert {node.phone: node.hop for node in result.nodes} == {p: h for p, h in expected.items() if h <= 4}
+        component = service.get_person_component(phone, limit=100000)
+        assert set(component.phones) == set(expected)
+        assert component.component_size == len(expected)
@@ -0,0 +1,84 @@
+"""按上报月份分区：分区月份应与事件编号中的日期一致（编号为 区域前缀 + YYYYMMDD + 序号）；
+冷热分层时的查询结果与不分层一致"""
+import os
+import shutil
+from collections import Counter
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from partitions import partition_keys
+from services import EventService, parse_times
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'data')
+DETAIL_COLUMNS = ['事件编号', '事件描述', '镇街名称', '事件级别', '二级分类', '上报时间', '最后派发时间',
+                  '最后受理时间', '办结时间', '所属组织', 'EventUID', 'sequence_total']
+
+
+def id_months(event_ids: pd.Series) -> pd.Series:
+    """事件编号中的上报月份 YYYY-MM"""
+    digits = event_ids.astype(str).str.extract(r'(20\d{6})', expand=False)
+    return digits.str[:4] + '-' + digits.str[4:6]
+
+
+def test_partition_months_match_event_ids(tmp_path):
+    # 按月/日解析时 5/4/25 会落在 5月、1/6/25 落在 1月
+    rows = [('BYW202504050001', '5/4/25 8:00'), ('BYW202505010002', '1/5/25 9:30'),
+            ('GLOW202505120003', '12/5/25 23:57'), ('DQIW202506010004', '1/6/25 0:05')]
+    pd.DataFrame([
+        [event_id, '描述', '古林镇', '一级事件', '邻里纠纷', t, t, t, t, '海曙区/古林镇/岳童村/网格', f'U{i}', 1]
+        for i, (event_id, t) in enumerate(rows)
+    ], columns=DETAIL_COLUMNS).to_csv(tmp_path / 'conflict_event_detail.csv', index=False)
+
+    service = EventService(data_dir=str(tmp_path))
+    partitions = {partition.key: partition.rows for partition in service._event_partitions.partitions()}
+    assert partitions == dict(Counter(id_months(pd.Series([event_id for event_id, _ in rows]))))
+
+
+@pytest.mark.skipif(not os.path.exists(os.path.join(DATA_DIR, 'conflict_event_detail.csv')), reason='没有数据文件')
+def test_data_partition_months_match_event_ids():
+    df = pd.read_csv(os.path.join(DATA_DIR, 'conflict_event_detail.csv'), usecols=['事件编号', '上报时间'], dtype=str)
+    months = id_months(df['事件编号'])
+    keys = pd.Series(partition_keys(parse_times(df['上报时间'])), dtype=object)
+    known = months.notna() & (keys != '')
+    assert known.any()
+    assert (keys[known] == months[known]).all()
+
+
+@pytest.fixture(scope='module')
+def tiered_dir(generated_dir, tmp_path_factory):
+    """合成数据副本，冷热分层的分区快照写在其中"""
+    path = tmp_path_factory.mktemp('tiered') / 'data'
+    shutil.copytree(generated_dir, path)
+    return str(path)
+
+
+@pytest.mark.parametrize('params', [
+    {},
+    {'page': 7, 'page_size': 50},
+    {'page': 19, 'page_size': 50},
+    {'town': '古林镇', 'page': 3},
+    {'town': '古林镇', 'level': '二级事件', 'page': 2},
+    {'related_events': '0', 'page': 10},
+    {'search': '纠纷', 'page': 4},
+    {'start_time': date(2025, 2, 10), 'end_time': date(2025, 3, 20), 'page': 2},
+    {'end_time': date(2025, 1, 31), 'page_size': 100},
+])
+def test_tiered_get_events_matches_untiered(generated_dir, tiered_dir, params):
+    untiered = EventService(data_dir=generated_dir, hot_months=0)
+    tiered = EventService(data_dir=tiered_dir, hot_months=2)
+    assert not all(partition.loaded for partition in tiered._event_partitions.partitions())
+    assert tiered.get_events(**params) == untiered.get_events(**params)
+
+
+def test_tiered_details_and_clusters_match_untiered(generated_dir, tiered_dir):
+    untiered = EventService(data_dir=generated_dir, hot_months=0)
+    tiered = EventService(data_dir=tiered_dir, hot_months=2)
+    for item in untiered.get_events(page_size=5, end_time=date(2025, 1, 31)).items:
+        assert tiered.get_event_detail(item.事件编号) == untiered.get_event_detail(item.事件编号)
+    for params in ({'page': 3}, {'start_time': date(2025, 1, 1), 'end_time': date(2025, 1, 31)}):
+        page = untiered.get_cluster_list(**params)
+        assert tiered.get_cluster_list(**params) == page
+        for item in page.items[:5]:
+            assert tiered.get_cluster_detail(item.EventUID) == untiered.get_cluster_detail(item.EventUID)
@@ -0,0 +1,36 @@
+"""字段投影：投影后的列表项与完整列表项的对应字段一致，描述按长度截断，未请求报警人信息时不查询参与人"""
+import pytest
+
+from models import EventResponse
+from services import EventService, parse_fields
+
+
+@pytest.fixture(scope='module')
+def service(generated_dir):
+    return EventService(data_dir=generated_dir)
+
+
+def test_parse_fields():
+    assert parse_fields(None, EventResponse) is None
+    assert parse_fields(' 事件编号,上报时间,事件编号 ', EventResponse) == ['事件编号', '上报时间']
+    with pytest.raises(ValueError, match='未知字段: 不存在'):
+        parse_fields('事件编号,不存在', EventResponse)
+
+
+def test_projected_events_match_full_items(service, monkeypatch):
+    full = service.get_events(page=2, page_size=30, town='古林镇')
+    monkeypatch.setattr(service, '_get_caller_info', lambda event_id: pytest.fail('查询了报警人信息'))
+    projected = service.get_events(page=2, page_size=30, town='古林镇', fields=['事件编号', '事件描述'],
+                                   description_length=10)
+    assert (projected.total, projected.total_pages) == (full.total, full.total_pages)
+    for item, full_item in zip(projected.items, full.items, strict=True):
+        assert set(item) == {'事件编号', '事件描述'}
+        assert item['事件编号'] == full_item.事件编号
+        description = full_item.事件描述
+        assert item['事件描述'] == (description if len(description) <= 10 else description[:10] + '…')
+
+
+def test_projected_cluster_list(service):
+    full = service.get_cluster_list(page=1, page_size=20)
+    projected = service.get_cluster_list(page=1, page_size=20, fields=['EventUID', 'record_count'])
+    assert projected.items == [{'EventUID': item.EventUID, 'record_count': item.record_count} for item in full.items]
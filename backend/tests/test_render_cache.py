@@ -0,0 +1,89 @@
+"""详情预渲染缓存：命中内容与实时渲染一致，增量写入删除受影响的条目并推进代次，写入前开始的渲染结果不覆盖"""
+import os
+
+import pytest
+
+from render_cache import DetailRenderCache, render_json
+from services import EventService
+
+
+@pytest.fixture
+def cache(data_dir):
+    service = EventService(data_dir=data_dir)
+    # 只预渲染前 60 个聚类，缩短测试时间
+    uids = service.cluster_uids()[:60]
+    service.cluster_uids = lambda: uids
+    cache = DetailRenderCache(service, os.path.join(data_dir, 'render_cache.sqlite3'), top_phones=20, batch_size=50)
+    service.add_ingest_listener(cache.on_ingest)
+    # 不启动后台线程，在测试线程中渲染
+    assert not cache._open()
+    cache._ready = True
+    cache._render_all()
+    return cache
+
+
+def new_event(service, event_uid, phone, number=0):
+    """属于聚类 event_uid、参与人为 phone 的新事件"""
+    row = service.detail_df.iloc[0].astype(str).to_dict()
+    row.update({'事件编号': f'NEW{number:05d}', 'EventUID': event_uid,
+                'extracted_info': [{'name': None, 'role': '当事人', 'id': None, 'phone': phone}]})
+    return row
+
+
+def drain(cache):
+    while not cache._queue.empty():
+        cache._render(*cache._queue.get_nowait())
+
+
+def test_cached_details_match_live_render(cache):
+    service = cache.service
+    uids = service.cluster_uids()
+    assert cache.count('cluster') == len(uids) and cache.count('person') == 20
+    for uid in uids[:20]:
+        assert cache.get('cluster', uid) == render_json(service.get_cluster_detail(uid))
+    for phone in service.top_phones(5):
+        assert cache.get('person', phone) == render_json(service.get_person_analysis_detail(phone))
+    # 重新打开：缓存完整，无需重新渲染
+    assert DetailRenderCache(service, cache.path, top_phones=20)._open()
+
+
+def test_ingest_invalidates_affected_keys(cache):
+    service = cache.service
+    uid, other_uid = service.cluster_uids()[:2]
+    phone = service.top_phones(1)[0]
+    other_phone = service.top_phones(2)[1]
+    before = cache.get('cluster', uid)
+
+    service.ingest_events([new_event(service, uid, phone)])
+    assert cache._generation == 1
+    assert cache.get('cluster', uid) is None and cache.get('person', phone) is None
+    assert cache.get('cluster', other_uid) is not None and cache.get('person', other_phone) is not None
+
+    drain(cache)
+    after = cache.get('cluster', uid)
+    assert after == render_json(service.get_cluster_detail(uid)) != before
+    assert cache.get('person', phone) == render_json(service.get_person_analysis_detail(phone))
+    # pandas 后端的写入不持久，重启后整体重建
+    assert not DetailRenderCache(service, cache.path, top_phones=20)._open()
+
+
+def test_render_started_before_ingest_is_discarded(cache):
+    service = cache.service
+    uid = service.cluster_uids()[0]
+    fetch = service.get_clusters_batch
+
+    def fetch_during_ingest(batch):
+        result = fetch(batch)
+        # 渲染取数之后、写入缓存之前发生增量写入
+        service.ingest_events([new_event(service, uid, '000****0000', 1)])
+        return result
+
+    service.get_clusters_batch = fetch_during_ingest
+    cache._render('cluster', [uid])
+    service.get_clusters_batch = fetch
+    assert cache.get('cluster', uid) is None
+    assert cache._dirty == {('cluster', uid): 1}
+
+    drain(cache)
+    assert cache.get('cluster', uid) == render_json(service.get_cluster_detail(uid))
+    assert cache._dirty == {}
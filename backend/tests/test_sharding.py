@@ -0,0 +1,134 @@
+"""按镇街分片：协调者归并两个分片的分页结果与单个服务的结果一致
+
+排序键相同的行（如上报时间相同的事件）在单个服务中按数据文件中的行序排列，分片模式下按分片顺序排列，
+比较时只要求排序键序列相同、每组相同排序键的行相同，且各页拼起来与一次取出全部结果一致。
+"""
+import os
+import secrets
+import shutil
+import threading
+from collections import defaultdict
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from services import EventService, UnsupportedInBackend, project_item
+from sharding import (
+    ShardClient, ShardServer, ShardedEventService, _cluster_sort_keys, _event_sort_keys, shard_dirs, split_data
+)
+
+
+@pytest.fixture(scope='module')
+def services(generated_dir, tmp_path_factory):
+    """（单个服务, 两个分片的协调者），分片服务在本进程的线程中运行
+
+    上报时间都改为当天 8:00，让每天的事件排序键相同，检查相同排序键的行的归并
+    """
+    data_dir = str(tmp_path_factory.mktemp('unsharded') / 'data')
+    shutil.copytree(generated_dir, data_dir)
+    detail_path = os.path.join(data_dir, 'conflict_event_detail.csv')
+    detail = pd.read_csv(detail_path, dtype=str)
+    detail['上报时间'] = detail['上报时间'].str.split(' ').str[0] + ' 8:00'
+    detail.to_csv(detail_path, index=False)
+
+    shards_dir = str(tmp_path_factory.mktemp('shards'))
+    split_data(data_dir, shards_dir, 2)
+    authkey = secrets.token_hex(16).encode('ascii')
+    addresses = []
+    for shard_dir in shard_dirs(shards_dir):
+        listener = Listener(('127.0.0.1', 0), authkey=authkey)
+        server = ShardServer(EventService(data_dir=shard_dir))
+        threading.Thread(target=server.serve_forever, args=(listener,), daemon=True).start()
+        addresses.append(listener.address)
+    return EventService(data_dir=data_dir), ShardedEventService(addresses=addresses, authkey=authkey)
+
+
+# 取出全部结果时只投影编号和排序字段
+KEY_FIELDS = {'get_events': ['事件编号', '上报时间'], 'get_cluster_list': ['EventUID', 'record_count', 'duration_days']}
+
+
+def assert_same_results(services, method, sort_keys, params):
+    """列表方法在分片协调者与单个服务上的结果一致（相同排序键的行顺序除外）"""
+    single, sharded = (getattr(service, method)(**params) for service in services)
+    assert (sharded.total, sharded.total_pages) == (single.total, single.total_pages)
+    assert sort_keys(sharded.items) == sort_keys(single.items)
+
+    everything = {**params, 'page': 1, 'page_size': max(single.total, 1), 'fields': KEY_FIELDS[method]}
+    single_all, sharded_all = ([SimpleNamespace(**item) for item in getattr(service, method)(**everything).items]
+                               for service in services)
+    groups = [defaultdict(set) for _ in services]
+    for items, grouped in zip((single_all, sharded_all), groups):
+        for key, item in zip(sort_keys(items), items):
+            grouped[key].add(next(iter(vars(item).values())))
+    assert groups[0] == groups[1]
+
+    page, page_size = params.get('page', 1), params.get('page_size', 20)
+    identifiers = [next(iter(vars(item).values())) for item in sharded_all[(page - 1) * page_size:page * page_size]]
+    assert [getattr(item, KEY_FIELDS[method][0]) for item in sharded.items] == identifiers
+
+
+def negated(items):
+    return [-item for item in items]
+
+
+def test_merge_page():
+    results = [SimpleNamespace(items=[9, 6, 2], total=30), SimpleNamespace(items=[8, 7, 1], total=12)]
+    assert ShardedEventService._merge_page(results, negated, 1, 4) == ([9, 8, 7, 6], 42)
+    assert ShardedEventService._merge_page(results, negated, 2, 2) == ([7, 6], 42)
+    assert ShardedEventService._merge_page(results, negated, 4, 2) == ([], 42)
+
+
+def test_split_keeps_every_event_once(services):
+    single, sharded = services
+    assert sharded.event_total() == single.event_total()
+    assert sharded.get_filter_options().towns == single.get_filter_options().towns
+
+
+@pytest.mark.parametrize('params', [
+    {},
+    {'page': 5, 'page_size': 30},
+    {'page': 20, 'page_size': 50},
+    {'town': '古林镇', 'page': 2},
+    {'town': '古林镇,高桥镇', 'level': '二级事件'},
+    {'search': '纠纷', 'page': 3},
+    {'related_events': '0,1', 'page': 4},
+])
+def test_get_events_matches_single_service(services, params):
+    assert_same_results(services, 'get_events', _event_sort_keys, params)
+
+
+@pytest.mark.parametrize('params', [{}, {'page': 3, 'page_size': 25}, {'min_event_count': 2, 'page': 2}])
+def test_get_cluster_list_matches_single_service(services, params):
+    assert_same_results(services, 'get_cluster_list', _cluster_sort_keys, params)
+
+
+def test_projected_events(services):
+    _, sharded = services
+    full = sharded.get_events(page=6)
+    projected = sharded.get_events(page=6, fields=['事件编号', '事件描述'], description_length=5)
+    assert projected.items == [project_item(item, ['事件编号', '事件描述'], '事件描述', 5) for item in full.items]
+
+
+def test_details_match_single_service(services):
+    single, sharded = services
+    event_ids = [item.事件编号 for item in single.get_events(page=3, page_size=10).items]
+    for event_id in event_ids:
+        assert sharded.get_event_detail(event_id) == single.get_event_detail(event_id)
+    assert sharded.get_events_batch(event_ids + ['不存在']) == single.get_events_batch(event_ids + ['不存在'])
+    for item in single.get_cluster_list(page_size=10).items:
+        assert sharded.get_cluster_detail(item.EventUID) == single.get_cluster_detail(item.EventUID)
+
+
+def test_wrong_authkey_is_rejected(services):
+    _, sharded = services
+    with pytest.raises(AuthenticationError):
+        ShardClient(sharded.addresses[0], b'wrong-key').call('event_total')
+
+
+def test_unsupported_queries(services):
+    _, sharded = services
+    with pytest.raises(UnsupportedInBackend):
+        sharded.get_hotspots()
@@ -0,0 +1,29 @@
+"""处置时效统计：用时按日/月/两位年的原始时间计算"""
+import pandas as pd
+
+from services import parse_times
+from sla import SlaIndex
+
+
+def test_stage_hours_from_raw_times():
+    df = pd.DataFrame({
+        '上报时间': ['6/5/25 8:00', '12/5/25 23:00', '20/5/25 15:13'],
+        '最后派发时间': ['6/5/25 9:00', '13/5/25 1:00', '20/5/25 15:16'],
+        '最后受理时间': ['6/5/25 11:00', '13/5/25 2:30', '20/5/25 15:15'],  # 第三条受理后又被再次派发
+        '办结时间': ['7/5/25 8:00', '', '20/5/25 15:27'],
+        '办结职能科室/部门': ['甲', '甲', '乙'],
+        '镇街名称': ['月湖街道'] * 3,
+        '二级分类': ['邻里纠纷'] * 3,
+    })
+    index = SlaIndex(parse_times)
+    index.add(df)
+    report = index.report('department')
+
+    stages = report['overall']['stages']
+    assert stages['dispatch']['count'] == 3
+    assert stages['accept']['count'] == 2
+    assert stages['close']['count'] == 2
+    assert stages['close']['p50'] == round((24 + 14 / 60) / 2, 3)
+    group = next(group for group in report['groups'] if group['name'] == '甲')
+    assert group['stages']['dispatch']['mean'] == 1.5
+    assert group['stages']['accept']['mean'] == 1.75
@@ -0,0 +1,60 @@
+"""SQLite 后端：列表和搜索结果与 pandas 后端一致，搜索词中的 LIKE/FTS5 特殊字符按字面匹配"""
+import os
+import shutil
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from services import EventService
+from sqlite_store import SqliteEventService, _fts_phrase, _like_pattern
+
+SPECIAL_DESCRIPTIONS = ['打折50%_促销 "双引号" 纠纷', '比例 50%以上', '编号 a_b 争吵', '路径 C:\\temp 吵闹']
+
+
+@pytest.fixture(scope='module')
+def services(generated_dir, tmp_path_factory):
+    data_dir = str(tmp_path_factory.mktemp('sqlite') / 'data')
+    shutil.copytree(generated_dir, data_dir)
+    detail_path = os.path.join(data_dir, 'conflict_event_detail.csv')
+    detail = pd.read_csv(detail_path, dtype=str)
+    detail.loc[:len(SPECIAL_DESCRIPTIONS) - 1, '事件描述'] = SPECIAL_DESCRIPTIONS
+    detail.to_csv(detail_path, index=False)
+    return EventService(data_dir=data_dir), SqliteEventService(data_dir=data_dir)
+
+
+def test_like_and_fts_escaping():
+    assert _like_pattern('50%_a\\b') == '%50\\%\\_a\\\\b%'
+    assert _fts_phrase('say "hi"') == '"say ""hi"""'
+    with sqlite3.connect(':memory:') as conn:
+        matches = [conn.execute("SELECT ? LIKE ? ESCAPE '\\'", (text, _like_pattern('%_'))).fetchone()[0]
+                   for text in ('50%_off', '50%off', 'x_y')]
+    assert matches == [1, 0, 0]
+
+
+@pytest.mark.parametrize('params', [
+    {},
+    {'page': 3, 'page_size': 7},
+    {'town': '古林镇'},
+    {'town': '古林镇,高桥镇', 'level': '二级事件'},
+    {'related_events': '2,3-5'},
+    {'search': '纠纷'},
+    {'search': '争吵', 'town': '古林镇'},
+    {'search': '50%'},
+    {'search': '%_'},
+    {'search': '50%_促销'},
+    {'search': '"双引号"'},
+    {'search': 'a_b'},
+    {'search': 'C:\\temp'},
+    {'search': '*'},
+])
+def test_get_events_matches_pandas(services, params):
+    pandas_service, sqlite_service = services
+    assert sqlite_service.get_events(**params) == pandas_service.get_events(**params)
+
+
+def test_special_character_search_is_literal(services):
+    _, sqlite_service = services
+    assert [item.事件描述 for item in sqlite_service.get_events(search='50%_').items] == [SPECIAL_DESCRIPTIONS[0]]
+    assert sqlite_service.get_events(search='%_').total == 1
+    assert sqlite_service.get_events(search='_b ').total == 1
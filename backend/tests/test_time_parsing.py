@@ -0,0 +1,39 @@
+"""时间解析：原始数据为 日/月/两位年 格式（如 12/5/25 23:57 为 2025年5月12日）"""
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from services import EventService, parse_time, parse_times
+
+DETAIL_COLUMNS = ['事件编号', '事件描述', '镇街名称', '事件级别', '二级分类', '上报时间', '最后派发时间',
+                  '最后受理时间', '办结时间', '所属组织', 'EventUID', 'sequence_total']
+
+
+def test_day_first_raw_format():
+    times = parse_times(['12/5/25 23:57', '6/5/25 9:16', '1/12/24 0:05'])
+    assert list(times) == [np.datetime64('2025-05-12T23:57'), np.datetime64('2025-05-06T09:16'),
+                           np.datetime64('2024-12-01T00:05')]
+
+
+def test_iso_fallback_and_invalid():
+    times = parse_times(['2025-05-06 14:51:00', '2025-05-06', '', 'nan', '不是时间'])
+    assert list(times[:2]) == [np.datetime64('2025-05-06T14:51'), np.datetime64('2025-05-06')]
+    assert np.isnat(times[2:]).all()
+    assert parse_time('3/5/25 8:00') == pd.Timestamp('2025-05-03 08:00')
+
+
+def _write_events(tmp_path, rows):
+    pd.DataFrame(rows, columns=DETAIL_COLUMNS).to_csv(tmp_path / 'conflict_event_detail.csv', index=False)
+
+
+def test_event_time_window_uses_day_first(tmp_path):
+    # 按月/日解析时 2/5/25 会落在 2月5日、12/5/25 落在 12月5日，不在 5月1日-7日的范围内
+    reported = ['1/5/25 8:00', '2/5/25 9:30', '7/5/25 23:59', '8/5/25 0:00', '12/5/25 23:57']
+    _write_events(tmp_path, [
+        [f'E{i}', '描述', '古林镇', '一级事件', '邻里纠纷', t, t, t, t, '海曙区/古林镇/岳童村/网格', f'U{i}', 1]
+        for i, t in enumerate(reported)
+    ])
+    service = EventService(data_dir=str(tmp_path))
+    result = service.get_events(start_time=date(2025, 5, 1), end_time=date(2025, 5, 7), page_size=100)
+    assert [item.事件编号 for item in result.items] == ['E2', 'E1', 'E0']